@@ -25,6 +25,7 @@ REPLICA_SET_SCRIPT_NAME = "mongo_replica_set_setup.sh"
 BLOB_STORAGE_NAME = "blob_storage/"
 FMD_WEB_CLIENT_ENV_FILE_NAME = "EnvConfig.js"
 FMD_WEB_CLIENT_ENV_PATH = "firmware-droid-client/src/"
+PROMETHEUS_CONFIG_NAME = "prometheus.yml"
 
 
 def is_valid_domain_name(domain_name):
@@ -119,6 +120,7 @@ class FmdEnvironment:
     api_doc_folder = None
     cors_additional_host = None
     django_secret_key = None
+    metrics_auth_token = None
     django_sqlite_database_path = None
     django_sqlite_database_mount_path = None
     use_defaults = False
@@ -128,6 +130,12 @@ class FmdEnvironment:
     docker_memory_limit = None
     docker_memory_swap_limit = None
     docker_cpu_limit = None
+    scanner_interactive_cpu_limit = None
+    scanner_interactive_memory_limit = None
+    scanner_interactive_memory_swap_limit = None
+    scanner_bulk_cpu_limit = None
+    scanner_bulk_memory_limit = None
+    scanner_bulk_memory_swap_limit = None
     local_neo4j_db_path = None
     neo4j_password = None
     neo4j_auth_enabled = None
@@ -286,6 +294,7 @@ class FmdEnvironment:
         self.api_doc_folder = "/docs"
         self.cors_additional_host = default_companion_domain_name
         self.django_secret_key = secrets.token_hex(100)
+        self.metrics_auth_token = secrets.token_urlsafe(32)
         self.django_sqlite_database_path = os.path.join("/var/www/", BLOB_STORAGE_NAME, "django_database/")
         self.django_superuser_username = "fmd-admin"
         self.django_superuser_password = uuid.uuid4()
@@ -309,6 +318,35 @@ class FmdEnvironment:
             while not is_valid_cpu_limit(self.docker_cpu_limit):
                 self.docker_cpu_limit = input("Enter the cpu limit for the docker container "
                                               "(default: 0.5):") or "0.5"
+        self._get_scanner_lane_limits()
+
+    def _get_scanner_lane_limits(self):
+        """
+        Sets the limits per replica of the interactive and bulk scanner lanes. The lanes run next to the
+        apk_scanner-worker-1 container, so they get a smaller share than the docker limits by default.
+        """
+        if self.use_defaults:
+            self.scanner_interactive_cpu_limit = "0.5"
+            self.scanner_interactive_memory_limit = "4GB"
+            self.scanner_interactive_memory_swap_limit = "4GB"
+            self.scanner_bulk_cpu_limit = "0.5"
+            self.scanner_bulk_memory_limit = "4GB"
+            self.scanner_bulk_memory_swap_limit = "4GB"
+        else:
+            while not self.scanner_interactive_memory_limit or not is_valid_memory_limit(self.scanner_interactive_memory_limit):
+                self.scanner_interactive_memory_limit = input("Enter the memory limit per interactive scanner "
+                                                              "worker (default: 4GB):") or "4GB"
+                self.scanner_interactive_memory_swap_limit = self.scanner_interactive_memory_limit
+            while not self.scanner_interactive_cpu_limit or not is_valid_cpu_limit(self.scanner_interactive_cpu_limit):
+                self.scanner_interactive_cpu_limit = input("Enter the cpu limit per interactive scanner "
+                                                           "worker (default: 0.5):") or "0.5"
+            while not self.scanner_bulk_memory_limit or not is_valid_memory_limit(self.scanner_bulk_memory_limit):
+                self.scanner_bulk_memory_limit = input("Enter the memory limit per bulk scanner "
+                                                       "worker (default: 4GB):") or "4GB"
+                self.scanner_bulk_memory_swap_limit = self.scanner_bulk_memory_limit
+            while not self.scanner_bulk_cpu_limit or not is_valid_cpu_limit(self.scanner_bulk_cpu_limit):
+                self.scanner_bulk_cpu_limit = input("Enter the cpu limit per bulk scanner "
+                                                    "worker (default: 0.5):") or "0.5"
 
     def _get_neo4j_settings(self):
         """
@@ -366,6 +404,7 @@ class FmdEnvironment:
             api_doc_folder=self.api_doc_folder,
             cors_additional_host=self.cors_additional_host,
             django_secret_key=self.django_secret_key,
+            metrics_auth_token=self.metrics_auth_token,
             django_sqlite_database_path=self.django_sqlite_database_path,
             django_sqlite_database_mount_path=self.django_sqlite_database_mount_path,
             django_superuser_password=self.django_superuser_password,
@@ -374,6 +413,12 @@ class FmdEnvironment:
             docker_memory_limit=self.docker_memory_limit,
             docker_memory_swap_limit=self.docker_memory_swap_limit,
             docker_cpu_limit=self.docker_cpu_limit,
+            scanner_interactive_cpu_limit=self.scanner_interactive_cpu_limit,
+            scanner_interactive_memory_limit=self.scanner_interactive_memory_limit,
+            scanner_interactive_memory_swap_limit=self.scanner_interactive_memory_swap_limit,
+            scanner_bulk_cpu_limit=self.scanner_bulk_cpu_limit,
+            scanner_bulk_memory_limit=self.scanner_bulk_memory_limit,
+            scanner_bulk_memory_swap_limit=self.scanner_bulk_memory_swap_limit,
             local_neo4j_db_path=self.local_neo4j_db_path,
             neo4j_password=self.neo4j_password,
             neo4j_auth_enabled=self.neo4j_auth_enabled,
@@ -644,6 +689,19 @@ def setup_monitoring(env_instance):
     with open(grafana_env_file, "w", encoding="utf-8") as f:
         f.write(grafana_env_content)
     os.chmod(grafana_env_file, 0o600)
+
+    # prometheus scrape config. FirmwareDroid is scraped through nginx on the docker host.
+    template = TEMPLATE_ENV.get_template(PROMETHEUS_CONFIG_NAME)
+    prometheus_config_content = template.render(node_exporter_target="node-exporter:9100",
+                                                cadvisor_target="cadvisor:8080",
+                                                prometheus_target="localhost:9090",
+                                                firmwaredroid_target="host.docker.internal:443",
+                                                metrics_auth_token=env_instance.metrics_auth_token,
+                                                domain_name=env_instance.domain_name)
+    prometheus_config_file = os.path.join(prometheus_dir, PROMETHEUS_CONFIG_NAME)
+    with open(prometheus_config_file, "w", encoding="utf-8") as f:
+        f.write(prometheus_config_content)
+    os.chmod(prometheus_config_file, 0o644)
     print("Completed monitoring env setup.")
 
 
@@ -40,7 +40,7 @@ class AecsJobQuery(graphene.ObjectType):
 
     @superuser_required
     def resolve_aecs_job_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(AecsJob, object_id_list, field_filter)
+        return get_filtered_queryset(AecsJob, object_id_list, field_filter, info=info)
 
 
 class UpdateOrCreateAECSJob(graphene.Mutation):
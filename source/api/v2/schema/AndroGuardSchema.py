@@ -28,4 +28,4 @@ class AndroGuardReportQuery(graphene.ObjectType):
 
     @superuser_required
     def resolve_androguard_report_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(AndroGuardReport, object_id_list, field_filter)
+        return get_filtered_queryset(AndroGuardReport, object_id_list, field_filter, info=info)
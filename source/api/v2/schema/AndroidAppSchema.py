@@ -7,15 +7,23 @@ import graphene
 import django_rq
 import importlib
 from enum import Enum
+from graphene import relay
 from graphene.relay import Node
 from graphene_mongo import MongoengineObjectType
 from graphql_jwt.decorators import superuser_required
-from api.v2.schema.RqJobsSchema import ONE_WEEK_TIMEOUT, MAX_OBJECT_ID_LIST_SIZE
+from api.v2.schema.RqJobsSchema import ONE_WEEK_TIMEOUT, ONE_DAY_TIMEOUT, MAX_OBJECT_ID_LIST_SIZE
 from api.v2.types.GenericFilter import generate_filter, get_filtered_queryset
+from api.v2.types.KeysetPagination import get_keyset_connection
+from api.v2.types.ReferenceLoader import create_reference_resolver
 from api.v2.validators.chunking import create_object_id_chunks
 from api.v2.validators.validation import *
 from model import AndroidApp, AndroidFirmware
+from model.ApkScannerReport import ApkScannerReport
 from android_app_importer.standalone_importer import start_android_app_standalone_importer
+from processing.sharded_scan import start_sharded_scan, retry_failed_shards
+from processing.queue_lanes import resolve_lane_queue_name
+from processing.job_coalescing import create_job_fingerprint, enqueue_unique
+from app_metrics.profiler import create_profile_meta
 from webserver.settings import RQ_QUEUES
 
 ModelFilter = generate_filter(AndroidApp)
@@ -39,13 +47,29 @@ class ScannerModules(Enum):
     TRUESEEING = {"TrueseeingScanJob": "static_analysis.Trueseeing.trueseeing_wrapper"}
 
 
+def get_apk_scanner_report_interface():
+    from api.v2.schema.ApkScannerReportSchema import ApkScannerReportInterface
+    return ApkScannerReportInterface
+
+
 class AndroidAppType(MongoengineObjectType):
     pk = graphene.String(source='pk')
+    # Not named like the model field, because graphene-mongo creates a connection filter argument for every model
+    # field and an interface can't be used as filter argument.
+    apk_scanner_report_list = graphene.List(get_apk_scanner_report_interface)
 
     class Meta:
         model = AndroidApp
         interfaces = (Node,)
 
+    resolve_apk_scanner_report_list = create_reference_resolver("apk_scanner_report_reference_list",
+                                                                ApkScannerReport)
+
+
+class AndroidAppConnection(relay.Connection):
+    class Meta:
+        node = AndroidAppType
+
 
 class AndroidAppQuery(graphene.ObjectType):
     android_app_list = graphene.List(AndroidAppType,
@@ -58,10 +82,16 @@ class AndroidAppQuery(graphene.ObjectType):
                                         name="android_app_id_list")
     scanner_module_name_list = graphene.List(graphene.String,
                                              name="scanner_module_name_list")
+    android_app_connection = relay.ConnectionField(
+        AndroidAppConnection,
+        object_id_list=graphene.List(graphene.String),
+        field_filter=graphene.Argument(ModelFilter),
+        name="android_app_connection"
+    )
 
     @superuser_required
     def resolve_android_app_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(AndroidApp, object_id_list, field_filter)
+        return get_filtered_queryset(AndroidApp, object_id_list, field_filter, info=info)
 
     @superuser_required
     def resolve_android_app_id_list(self, info, object_id_list=None, field_filter=None):
@@ -74,13 +104,15 @@ class AndroidAppQuery(graphene.ObjectType):
                                              query_filter=field_filter,
                                              object_id_list=android_app_id_list,
                                              only_fields=['pk'],
-                                             no_dereference=True)
+                                             no_dereference=True,
+                                             info=info)
         else:
             queryset = get_filtered_queryset(model=AndroidApp,
                                              query_filter=field_filter,
                                              object_id_list=None,
                                              only_fields=['pk'],
-                                             no_dereference=True)
+                                             no_dereference=True,
+                                             info=info)
 
         return [document.pk for document in queryset]
 
@@ -88,12 +120,33 @@ class AndroidAppQuery(graphene.ObjectType):
     def resolve_scanner_module_name_list(self, info):
         return [member.name for member in ScannerModules]
 
+    @superuser_required
+    def resolve_android_app_connection(self, info, object_id_list=None, field_filter=None, **kwargs):
+        return get_keyset_connection(AndroidAppConnection, AndroidApp, info, object_id_list, field_filter, **kwargs)
+
+
+def get_scanner_class_meta(scanner_name):
+    """
+    Gets the class and module name of a scanner.
+
+    :param scanner_name: str - Name of the scanner to use.
+
+    :return: tuple(str, str) - class name and module name of the class:'ScanJob' implementation.
+    """
+    if scanner_name not in ScannerModules.__members__:
+        raise ValueError("Invalid scanner name selected. "
+                         "Possible scanner names must be attributes from class:'ScannerModules'")
+    meta_dict = getattr(ScannerModules, scanner_name).value
+    return next(iter((meta_dict.items())))
+
 
-def import_module_function(scanner_name, object_id_list, init_args=None):
+def import_module_function(scanner_name, object_id_list, init_args=None, incremental=False, rescan_failed_only=False):
     """
     Import the module and return the function to run.
 
     :param init_args: dict - Additional arguments to create an obj instance.
+    :param incremental: bool - skip apps that already have a completed report of the same scanner version.
+    :param rescan_failed_only: bool - only scan apps with a failed report.
     :param scanner_name: str - Name of the scanner to use.
     :param object_id_list: list(str) - List of object ids to scan.
 
@@ -110,6 +163,7 @@ def import_module_function(scanner_name, object_id_list, init_args=None):
             instance_obj = class_obj(object_id_list, **init_args)
         else:
             instance_obj = class_obj(object_id_list)
+        instance_obj.set_scan_mode(incremental=incremental, rescan_failed_only=rescan_failed_only)
         func_to_run = getattr(instance_obj, APK_SCAN_FUNCTION_NAME)
     else:
         raise ValueError("Invalid scanner name selected. "
@@ -131,19 +185,33 @@ class CreateApkScanJob(graphene.Mutation):
         :param module_name: str - Name of the module to use. For instance, "ANDROGUARD".
         :param object_id_list: list(str) - List of objectId to scan.
         :param kwargs: dict - Additional arguments passed to the scan instance.
+        :param sharded: bool - If true, one parent job splits the list into cost balanced shards that are spread
+        across all scanner workers.
+        :param incremental: bool - If true, apps that already have a completed report of the same scanner version
+        are skipped.
+        :param rescan_failed_only: bool - If true, only apps with a failed report are scanned again.
+        :param priority_lane: str - "interactive", "normal" or "bulk". If not set, the lane is selected by the
+        number of apps.
+        :param profile_mode: str - "cprofile" or "sampling" to profile the job and its scanner processes.
         """
         queue_name = graphene.String(required=True, default_value=list(RQ_QUEUES.keys())[1])
         module_name = graphene.String(required=True)
         firmware_id_list = graphene.List(graphene.NonNull(graphene.String), required=False, default_value=[])
         object_id_list = graphene.List(graphene.NonNull(graphene.String), required=False, default_value=[])
         kwargs = graphene.JSONString(required=True, default_value="{}")
-
+        sharded = graphene.Boolean(required=False, default_value=False)
+        incremental = graphene.Boolean(required=False, default_value=False)
+        rescan_failed_only = graphene.Boolean(required=False, default_value=False)
+        priority_lane = graphene.String(required=False)
+        profile_mode = graphene.String(required=False)
 
     @classmethod
     @superuser_required
     @sanitize_and_validate(
         validators={
             'queue_name': validate_queue_name,
+            'priority_lane': validate_priority_lane,
+            'profile_mode': validate_profile_mode,
             'module_name': validate_module_name,
             'object_id_list': validate_object_id_list,
             'firmware_id_list': validate_object_id_list,
@@ -155,78 +223,149 @@ class CreateApkScanJob(graphene.Mutation):
             'kwargs': sanitize_json
         }
     )
-    def mutate(cls, root, info, queue_name, module_name, firmware_id_list, object_id_list, kwargs=None):
+    def mutate(cls, root, info, queue_name, module_name, firmware_id_list, object_id_list, kwargs=None,
+               sharded=False, incremental=False, rescan_failed_only=False, priority_lane=None, profile_mode=None):
         """
         Enqueue a RQ job to start one of the scanners for apk files. In case the object_id_list is too large, the list
-        will be split into smaller chunks and each chunk will be processed in a separate RQ job.
+        will be split into smaller chunks and each chunk will be processed in a separate RQ job. If the same scan of
+        the same apps is already queued or running, the id of that job is returned instead.
 
         :param kwargs: Additional arguments passed to the scan instance.
         :param queue_name: str - Name of the rq queue to use.
         :param module_name: str - Name of the module to use. For instance, "ANDROGUARD".
         :param firmware_id_list: list(str) - List of firmwareId to scan. Optional if object_id_list is defined.
         :param object_id_list: list(str) - List of objectId to scan. Optional if firmware_id_list is defined.
+        :param sharded: bool - If true, a single parent job is enqueued that shards the scan.
+        :param incremental: bool - If true, only apps without a completed report are scanned.
+        :param rescan_failed_only: bool - If true, only apps with a failed report are scanned.
+        :param priority_lane: str - lane of the scanner queue. Selected by the number of apps if not set.
+        :param profile_mode: str - profiler of the job. Nothing is profiled if not set.
 
         :return: list of unique IDs of the RQ jobs.
         """
         response = {}
-        queue = django_rq.get_queue(queue_name)
-
         if firmware_id_list:
             if not object_id_list:
                 object_id_list = []
             android_app_list = AndroidApp.objects(firmware_id_reference__in=firmware_id_list).only('pk')
             object_id_list.extend([app.pk for app in android_app_list])
         logging.info(f"Object ID list: {object_id_list}, kwargs: {kwargs}")
-
-        if len(object_id_list) > 0:
+        queue = django_rq.get_queue(resolve_lane_queue_name(queue_name, len(object_id_list), priority_lane))
+        argument_dict = {"kwargs": kwargs or {},
+                         "incremental": incremental,
+                         "rescan_failed_only": rescan_failed_only,
+                         "profile_mode": profile_mode}
+
+        if len(object_id_list) > 0 and sharded:
+            class_name, scanner_module_path = get_scanner_class_meta(module_name)
+            fingerprint = create_job_fingerprint(f"sharded_scan:{module_name}", object_id_list, argument_dict)
+            job = enqueue_unique(queue,
+                                 fingerprint,
+                                 start_sharded_scan,
+                                 module_name,
+                                 scanner_module_path,
+                                 class_name,
+                                 [str(object_id) for object_id in object_id_list],
+                                 kwargs or None,
+                                 ONE_WEEK_TIMEOUT,
+                                 incremental,
+                                 rescan_failed_only,
+                                 job_timeout=ONE_DAY_TIMEOUT,
+                                 meta=create_profile_meta(profile_mode, module_name=module_name))
+            response = cls(job_id_list=[job.id])
+        elif len(object_id_list) > 0:
             object_id_chunks = create_object_id_chunks(object_id_list, chunk_size=MAX_OBJECT_ID_LIST_SIZE)
             job_id_list = []
             for object_id_chunk in object_id_chunks:
                 if kwargs:
                     logging.info("With kwargs")
-                    func_to_run = import_module_function(module_name, object_id_chunk, kwargs)
+                    func_to_run = import_module_function(module_name, object_id_chunk, kwargs,
+                                                         incremental, rescan_failed_only)
                 else:
                     logging.info("No kwargs")
-                    func_to_run = import_module_function(module_name, object_id_chunk)
-                job = queue.enqueue(func_to_run,
-                                        job_timeout=ONE_WEEK_TIMEOUT,
-                                        meta={"module_name": module_name}
-                                    )
+                    func_to_run = import_module_function(module_name, object_id_chunk,
+                                                         incremental=incremental,
+                                                         rescan_failed_only=rescan_failed_only)
+                fingerprint = create_job_fingerprint(f"scan:{module_name}", object_id_chunk, argument_dict)
+                job = enqueue_unique(queue,
+                                     fingerprint,
+                                     func_to_run,
+                                     job_timeout=ONE_WEEK_TIMEOUT,
+                                     meta=create_profile_meta(profile_mode, module_name=module_name))
                 job_id_list.append(job.id)
                 response = cls(job_id_list=job_id_list)
         return response
 
 
+class RetryShardedScanJob(graphene.Mutation):
+    """
+    Requeues the failed shards of a sharded apk scan. Shards that finished are not scanned again.
+    """
+    job_id_list = graphene.List(graphene.String)
+
+    class Arguments:
+        queue_name = graphene.String(required=True, default_value=list(RQ_QUEUES.keys())[1])
+        parent_job_id = graphene.String(required=True)
+
+    @classmethod
+    @superuser_required
+    @sanitize_and_validate(
+        validators={
+            'queue_name': validate_queue_name,
+        },
+        sanitizers={
+            'queue_name': sanitize_string,
+            'parent_job_id': sanitize_string,
+        }
+    )
+    def mutate(cls, root, info, queue_name, parent_job_id):
+        """
+        Requeue the failed shards of a sharded scan.
+
+        :param queue_name: str - Name of the rq queue of the sharded scan.
+        :param parent_job_id: str - Job id of the parent job returned by CreateApkScanJob.
+
+        :return: list of job ids of the requeued shards.
+        """
+        queue = django_rq.get_queue(queue_name)
+        return cls(job_id_list=retry_failed_shards(parent_job_id, queue))
+
+
 class CreateAppImportJob(graphene.Mutation):
     job_id = graphene.String()
 
     class Arguments:
         queue_name = graphene.String(required=True, default_value=list(RQ_QUEUES.keys())[0])
         storage_index = graphene.Int(required=True, default_value=0)
+        priority_lane = graphene.String(required=False)
 
     @classmethod
     @superuser_required
     @sanitize_and_validate(
         validators={
             'queue_name': [validate_queue_name, validate_queue_extractor_task],
+            'priority_lane': validate_priority_lane,
         },
         sanitizers={}
     )
-    def mutate(cls, root, info, queue_name, storage_index):
+    def mutate(cls, root, info, queue_name, storage_index, priority_lane=None):
         """
         Create a job to import android apps without a firmware.
 
         :param queue_name: str - The queue name to use.
         :param storage_index: int - The storage index to use.
+        :param priority_lane: str - lane of the extractor queue. The normal lane is used if not set.
 
         :return: Returns the job id of the job.
         """
-        queue = django_rq.get_queue(queue_name)
+        queue = django_rq.get_queue(resolve_lane_queue_name(queue_name, lane=priority_lane))
         func_to_run = start_android_app_standalone_importer
-        job = queue.enqueue(func_to_run, storage_index, job_timeout=ONE_WEEK_TIMEOUT)
+        fingerprint = create_job_fingerprint("app_import", argument_dict={"storage_index": storage_index})
+        job = enqueue_unique(queue, fingerprint, func_to_run, storage_index, job_timeout=ONE_WEEK_TIMEOUT)
         return cls(job_id=job.id)
 
 
 class AndroidAppMutation(graphene.ObjectType):
     create_apk_scan_job = CreateApkScanJob.Field()
+    retry_sharded_scan_job = RetryShardedScanJob.Field()
     create_app_import_job = CreateAppImportJob.Field()
@@ -10,15 +10,21 @@ from graphene_mongo import MongoengineObjectType
 from graphql_jwt.decorators import superuser_required
 from api.v2.schema.RqJobsSchema import ONE_DAY_TIMEOUT, ONE_WEEK_TIMEOUT
 from api.v2.types.GenericDeletion import delete_queryset_background
+from api.v2.types.FieldProjection import get_projection_fields
 from api.v2.types.GenericFilter import get_filtered_queryset, generate_filter
+from api.v2.types.KeysetPagination import CONNECTION_NODE_PATH
 from api.v2.validators.validation import (
-    sanitize_and_validate, validate_object_id_list, validate_queue_name, validate_queue_extractor_task, sanitize_string
+    sanitize_and_validate, validate_object_id_list, validate_queue_name, validate_queue_extractor_task, sanitize_string,
+    validate_priority_lane, validate_profile_mode
 )
 from firmware_handler.firmware_reimporter import start_firmware_re_import
 from hashing.fuzzy_hash_creator import start_fuzzy_hasher
 from model.AndroidFirmware import AndroidFirmware
 from firmware_handler.firmware_importer import start_firmware_mass_import
 from firmware_handler.firmware_os_detect import update_firmware_vendor_by_build_prop
+from processing.queue_lanes import resolve_lane_queue_name
+from processing.job_coalescing import create_job_fingerprint, enqueue_unique
+from app_metrics.profiler import create_profile_meta
 from webserver.settings import RQ_QUEUES
 
 ModelFilter = generate_filter(AndroidFirmware)
@@ -57,7 +63,7 @@ class AndroidFirmwareQuery(graphene.ObjectType):
 
     @superuser_required
     def resolve_android_firmware_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(AndroidFirmware, object_id_list, field_filter, no_dereference=True)
+        return get_filtered_queryset(AndroidFirmware, object_id_list, field_filter, no_dereference=True, info=info)
 
     @superuser_required
     def resolve_android_firmware_id_list(self, info, field_filter=None):
@@ -66,12 +72,19 @@ class AndroidFirmwareQuery(graphene.ObjectType):
                                          query_filter=field_filter,
                                          object_id_list=None,
                                          only_fields=fields,
-                                         no_dereference=True)
+                                         no_dereference=True,
+                                         info=info)
         return [document.pk for document in queryset]
 
     @superuser_required
     def resolve_android_firmware_connection(self, info, object_id_list=None, field_filter=None, **kwargs):
-        queryset = get_filtered_queryset(AndroidFirmware, object_id_list, field_filter)
+        only_fields = get_projection_fields(info, AndroidFirmware, CONNECTION_NODE_PATH)
+        queryset = get_filtered_queryset(AndroidFirmware,
+                                         object_id_list,
+                                         field_filter,
+                                         only_fields=only_fields,
+                                         no_dereference=True,
+                                         info=info)
         return queryset
 
 
@@ -102,7 +115,8 @@ class DeleteAndroidFirmwareMutation(graphene.Mutation):
 class CreateFirmwareExtractorJob(graphene.Mutation):
     """
     Starts the firmware extractor module. The extractor module is used to import firmware from the "firmware_import"
-    directory to the database. Only one instance of the extractor module is allowed to run.
+    directory to the database. Only one instance of the extractor module is allowed to run per storage. A request
+    for a storage with a queued or running import returns the id of that job.
     """
     job_id = graphene.String()
 
@@ -111,18 +125,23 @@ class CreateFirmwareExtractorJob(graphene.Mutation):
         create_fuzzy_hashes = graphene.Boolean(required=True)
         storage_index = graphene.Int(required=True, default_value=0)
         keep_files_on_disk = graphene.Boolean(required=False, default_value=False)
+        priority_lane = graphene.String(required=False)
+        profile_mode = graphene.String(required=False)
 
     @classmethod
     @superuser_required
     @sanitize_and_validate(
         validators={
             'queue_name': [validate_queue_name, validate_queue_extractor_task],
+            'priority_lane': validate_priority_lane,
+            'profile_mode': validate_profile_mode,
         },
         sanitizers={
             'queue_name': sanitize_string,
         }
     )
-    def mutate(cls, root, info, queue_name, create_fuzzy_hashes, storage_index, keep_files_on_disk):
+    def mutate(cls, root, info, queue_name, create_fuzzy_hashes, storage_index, keep_files_on_disk,
+               priority_lane=None, profile_mode=None):
         """
         Create a job to import firmware.
 
@@ -130,18 +149,24 @@ class CreateFirmwareExtractorJob(graphene.Mutation):
         :param storage_index: int - index of the storage to use.
         :param queue_name: str - name of the RQ to use.
         :param create_fuzzy_hashes: boolean - True: will create fuzzy hashes for all files in the firmware found.
+        :param priority_lane: str - lane of the extractor queue. The normal lane is used if not set.
+        :param profile_mode: str - "cprofile" or "sampling" to profile the import. Nothing is profiled if not set.
 
         :return: str - job-id of the string
         """
-        queue = django_rq.get_queue(queue_name)
+        queue = django_rq.get_queue(resolve_lane_queue_name(queue_name, lane=priority_lane))
         func_to_run = start_firmware_mass_import
-        job = queue.enqueue(func_to_run,
-                            create_fuzzy_hashes,
-                            storage_index,
-                            keep_files_on_disk,
-                            job_timeout=ONE_WEEK_TIMEOUT,
-                            meta={"storage_index": storage_index}
-                            )
+        fingerprint = create_job_fingerprint("firmware_import", argument_dict={"storage_index": storage_index,
+                                                                               "profile_mode": profile_mode})
+        job = enqueue_unique(queue,
+                             fingerprint,
+                             func_to_run,
+                             create_fuzzy_hashes,
+                             storage_index,
+                             keep_files_on_disk,
+                             job_timeout=ONE_WEEK_TIMEOUT,
+                             meta=create_profile_meta(profile_mode, storage_index=storage_index)
+                             )
         return cls(job_id=job.id)
 
 
@@ -157,20 +182,30 @@ class CreateFirmwareReImportJob(graphene.Mutation):
         firmware_id_list = graphene.List(graphene.NonNull(graphene.String), required=True)
         create_fuzzy_hashes = graphene.Boolean(required=False, default_value=False)
         keep_files_on_disk = graphene.Boolean(required=False, default_value=False)
+        priority_lane = graphene.String(required=False)
+        profile_mode = graphene.String(required=False)
 
     @classmethod
     @superuser_required
     @sanitize_and_validate(
         validators={
             'queue_name': [validate_queue_name, validate_queue_extractor_task],
+            'priority_lane': validate_priority_lane,
+            'profile_mode': validate_profile_mode,
             'firmware_id_list': validate_object_id_list
         },
         sanitizers={}
     )
-    def mutate(cls, root, info, queue_name, firmware_id_list, create_fuzzy_hashes, keep_files_on_disk):
-        queue = django_rq.get_queue(queue_name)
+    def mutate(cls, root, info, queue_name, firmware_id_list, create_fuzzy_hashes, keep_files_on_disk,
+               priority_lane=None, profile_mode=None):
+        queue = django_rq.get_queue(resolve_lane_queue_name(queue_name, len(firmware_id_list), priority_lane))
         func_to_run = start_firmware_re_import
-        job = queue.enqueue(func_to_run, firmware_id_list, create_fuzzy_hashes, keep_files_on_disk, job_timeout=ONE_WEEK_TIMEOUT)
+        fingerprint = create_job_fingerprint("firmware_re_import", firmware_id_list,
+                                             {"create_fuzzy_hashes": create_fuzzy_hashes,
+                                              "keep_files_on_disk": keep_files_on_disk,
+                                              "profile_mode": profile_mode})
+        job = enqueue_unique(queue, fingerprint, func_to_run, firmware_id_list, create_fuzzy_hashes, keep_files_on_disk,
+                             job_timeout=ONE_WEEK_TIMEOUT, meta=create_profile_meta(profile_mode))
         return cls(job_id=job.id)
 
 
@@ -185,20 +220,25 @@ class CreateFuzzyHashesJob(graphene.Mutation):
         queue_name = graphene.String(required=True, default_value=list(RQ_QUEUES.keys())[0])
         firmware_id_list = graphene.List(graphene.NonNull(graphene.String), required=False)
         storage_index = graphene.Int(required=True, default_value=0)
+        priority_lane = graphene.String(required=False)
 
     @classmethod
     @superuser_required
     @sanitize_and_validate(
         validators={
             'queue_name': [validate_queue_name, validate_queue_extractor_task],
+            'priority_lane': validate_priority_lane,
             'firmware_id_list': validate_object_id_list
         },
         sanitizers={}
     )
-    def mutate(cls, root, info, queue_name, firmware_id_list, storage_index):
-        queue = django_rq.get_queue(queue_name)
+    def mutate(cls, root, info, queue_name, firmware_id_list, storage_index, priority_lane=None):
+        item_count = len(firmware_id_list) if firmware_id_list is not None else None
+        queue = django_rq.get_queue(resolve_lane_queue_name(queue_name, item_count, priority_lane))
         func_to_run = start_fuzzy_hasher
-        job = queue.enqueue(func_to_run, firmware_id_list, storage_index, job_timeout=ONE_WEEK_TIMEOUT)
+        fingerprint = create_job_fingerprint("fuzzy_hash", firmware_id_list, {"storage_index": storage_index})
+        job = enqueue_unique(queue, fingerprint, func_to_run, firmware_id_list, storage_index,
+                             job_timeout=ONE_WEEK_TIMEOUT)
         return cls(job_id=job.id)
 
 
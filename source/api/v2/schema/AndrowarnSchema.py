@@ -27,4 +27,4 @@ class AndrowarnReportQuery(graphene.ObjectType):
 
     @superuser_required
     def resolve_androwarn_report_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(AndrowarnReport, object_id_list, field_filter)
+        return get_filtered_queryset(AndrowarnReport, object_id_list, field_filter, info=info)
@@ -23,4 +23,4 @@ class ApkScannerLogQuery(graphene.ObjectType):
 
     @superuser_required
     def resolve_apk_scanner_log_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(ApkScannerLog, object_id_list, field_filter)
+        return get_filtered_queryset(ApkScannerLog, object_id_list, field_filter, info=info)
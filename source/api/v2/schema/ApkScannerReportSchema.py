@@ -2,15 +2,21 @@
 # This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
 # See the file 'LICENSE' for copying permission.
 import logging
+import math
 
 import graphene
 from graphql_jwt.decorators import superuser_required
 from api.v2.schema.AndroidAppSchema import AndroidAppType
 from api.v2.types.GenericFilter import get_filtered_queryset, generate_filter
+from api.v2.types.KeysetPagination import get_keyset_connection
+from api.v2.types.ReferenceLoader import get_reference_loader
+from model import AndroidApp
 from model.ApkScannerReport import ApkScannerReport
+from graphene import relay
 from graphene.relay import Node
 
 ModelFilter = generate_filter(ApkScannerReport)
+TASK_METRIC_FIELD_LIST = ["wall_time_seconds", "cpu_time_seconds", "peak_rss_bytes"]
 
 
 class ApkScannerReportInterface(graphene.Interface):
@@ -28,7 +34,7 @@ class ApkScannerReportInterface(graphene.Interface):
 
     def resolve_android_app_id_reference(parent, info):
         if parent.android_app_id_reference:
-            return parent.android_app_id_reference.fetch()
+            return get_reference_loader(info).load(AndroidApp, parent.android_app_id_reference)
         return None
 
     @classmethod
@@ -83,6 +89,77 @@ class ApkScannerReportInterface(graphene.Interface):
 #         name = "MetaApkScannerReport"
 
 
+class ApkScannerReportConnection(relay.Connection):
+    class Meta:
+        node = ApkScannerReportInterface
+
+
+class ScanTaskStatisticsType(graphene.ObjectType):
+    scanner_name = graphene.String()
+    task_count = graphene.Int()
+    timeout_count = graphene.Int()
+    wall_time_seconds_p50 = graphene.Float()
+    wall_time_seconds_p95 = graphene.Float()
+    cpu_time_seconds_p50 = graphene.Float()
+    cpu_time_seconds_p95 = graphene.Float()
+    peak_rss_bytes_p50 = graphene.Float()
+    peak_rss_bytes_p95 = graphene.Float()
+
+
+def get_task_metric_percentile(collection, scanner_name, metric_name, percentile, task_count):
+    """
+    Gets the nearest-rank percentile of a task metric for one scanner.
+
+    :param collection: pymongo collection of class:'ApkScannerReport'.
+    :param scanner_name: str - name of the scanner.
+    :param metric_name: str - name of the field in class:'ScanTaskMetrics'.
+    :param percentile: int - percentile between 1 and 100.
+    :param task_count: int - number of reports with task metrics of the scanner.
+
+    :return: float or None - the percentile value.
+    """
+    field_name = f"task_metrics.{metric_name}"
+    rank = max(int(math.ceil(percentile / 100 * task_count)) - 1, 0)
+    cursor = collection.find({"scanner_name": scanner_name, field_name: {"$exists": True}}, {field_name: 1}) \
+        .sort(field_name, 1).skip(rank).limit(1).allow_disk_use(True)
+    for document in cursor:
+        return document["task_metrics"][metric_name]
+    return None
+
+
+def get_scan_task_statistics(scanner_name_list=None):
+    """
+    Creates p50/p95 statistics of the task metrics per scanner.
+
+    :param scanner_name_list: list(str) - optional list of scanners to include.
+
+    :return: list(class:'ScanTaskStatisticsType')
+    """
+    collection = ApkScannerReport._get_collection()
+    if not scanner_name_list:
+        scanner_name_list = collection.distinct("scanner_name", {"task_metrics": {"$exists": True}})
+    statistics_list = []
+    for scanner_name in scanner_name_list:
+        task_filter = {"scanner_name": scanner_name, "task_metrics": {"$exists": True}}
+        task_count = collection.count_documents(task_filter)
+        if task_count == 0:
+            continue
+        statistics = {
+            "scanner_name": scanner_name,
+            "task_count": task_count,
+            "timeout_count": collection.count_documents({**task_filter, "task_metrics.timed_out": True}),
+        }
+        for metric_name in TASK_METRIC_FIELD_LIST:
+            for percentile in [50, 95]:
+                statistics[f"{metric_name}_p{percentile}"] = get_task_metric_percentile(collection,
+                                                                                        scanner_name,
+                                                                                        metric_name,
+                                                                                        percentile,
+                                                                                        task_count)
+        statistics_list.append(ScanTaskStatisticsType(**statistics))
+    return statistics_list
+
+
 class ApkScannerReportQuery(graphene.ObjectType):
     apk_scanner_report_list = graphene.List(
         ApkScannerReportInterface,
@@ -90,6 +167,26 @@ class ApkScannerReportQuery(graphene.ObjectType):
         field_filter=graphene.Argument(ModelFilter),
         name="apk_scanner_report_list"
     )
+    scan_task_statistics = graphene.List(
+        ScanTaskStatisticsType,
+        scanner_name_list=graphene.List(graphene.String),
+        name="scan_task_statistics"
+    )
+    apk_scanner_report_connection = relay.ConnectionField(
+        ApkScannerReportConnection,
+        object_id_list=graphene.List(graphene.String),
+        field_filter=graphene.Argument(ModelFilter),
+        name="apk_scanner_report_connection"
+    )
+
+    @superuser_required
+    def resolve_scan_task_statistics(self, info, scanner_name_list=None):
+        return get_scan_task_statistics(scanner_name_list)
+
+    @superuser_required
+    def resolve_apk_scanner_report_connection(self, info, object_id_list=None, field_filter=None, **kwargs):
+        return get_keyset_connection(ApkScannerReportConnection, ApkScannerReport, info, object_id_list, field_filter,
+                                     **kwargs)
 
     @superuser_required
     def resolve_apk_scanner_report_list(self, info, object_id_list=None, field_filter=None):
@@ -121,7 +218,7 @@ class ApkScannerReportQuery(graphene.ObjectType):
             for model_path in type_to_model.values():
                 module_name, class_name = model_path.rsplit(".", 1)
                 model_cls = getattr(__import__(module_name, fromlist=[class_name]), class_name)
-                all_reports.extend(get_filtered_queryset(model_cls, object_id_list, field_filter))
+                all_reports.extend(get_filtered_queryset(model_cls, object_id_list, field_filter, info=info))
             return all_reports
 
         # Otherwise, collect only requested types
@@ -131,7 +228,7 @@ class ApkScannerReportQuery(graphene.ObjectType):
             if model_path:
                 module_name, class_name = model_path.rsplit(".", 1)
                 model_cls = getattr(__import__(module_name, fromlist=[class_name]), class_name)
-                all_reports.extend(get_filtered_queryset(model_cls, object_id_list, field_filter))
+                all_reports.extend(get_filtered_queryset(model_cls, object_id_list, field_filter, info=info))
 
         return all_reports
 
@@ -29,4 +29,4 @@ class ApkidReportQuery(graphene.ObjectType):
 
     @superuser_required
     def resolve_apkid_report_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(ApkidReport, object_id_list, field_filter)
+        return get_filtered_queryset(ApkidReport, object_id_list, field_filter, info=info)
@@ -26,4 +26,4 @@ class AppCertificateQuery(graphene.ObjectType):
 
     @superuser_required
     def resolve_app_certificate_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(AppCertificate, object_id_list, field_filter)
+        return get_filtered_queryset(AppCertificate, object_id_list, field_filter, info=info)
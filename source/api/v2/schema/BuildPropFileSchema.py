@@ -8,6 +8,7 @@ import graphene
 from graphene.relay import Node
 from graphene_mongo import MongoengineObjectType
 from graphql_jwt.decorators import superuser_required
+from api.v2.types.FieldProjection import get_projection_fields
 from api.v2.types.GenericFilter import generate_filter, get_filtered_queryset
 from model.BuildPropFile import BuildPropFile
 from graphene.types.generic import GenericScalar
@@ -62,7 +63,13 @@ class BuildPropFileQuery(graphene.ObjectType):
                         value_list = v
                     else:
                         filter_dict[k] = v
-        queryset = get_filtered_queryset(BuildPropFile, object_id_list, filter_dict)
+        only_fields = get_projection_fields(info, BuildPropFile)
+        if only_fields is not None:
+            if value_list:
+                only_fields.append("properties")
+            if distinct_on in BuildPropFile._fields:
+                only_fields.append(distinct_on)
+        queryset = get_filtered_queryset(BuildPropFile, object_id_list, filter_dict, only_fields=only_fields, info=info)
 
         # Filter by property_values
         if value_list:
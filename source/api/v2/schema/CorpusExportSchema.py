@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import uuid
+import django_rq
+import graphene
+from graphql_jwt.decorators import superuser_required
+from api.v2.schema.RqJobsSchema import ONE_WEEK_TIMEOUT
+from api.v2.validators.validation import (sanitize_and_validate, validate_queue_name, validate_object_id_list,
+                                          validate_export_format, validate_export_model_name)
+from processing.corpus_export import (start_corpus_export, get_export_folder, read_manifest, EXPORT_FORMAT_NDJSON,
+                                      DEFAULT_ROWS_PER_CHUNK)
+from webserver.settings import RQ_QUEUES
+
+
+class CorpusExportQuery(graphene.ObjectType):
+    corpus_export_manifest = graphene.JSONString(export_id=graphene.String(required=True),
+                                                 storage_index=graphene.Int(required=False, default_value=0),
+                                                 name="corpus_export_manifest")
+
+    @superuser_required
+    def resolve_corpus_export_manifest(self, info, export_id, storage_index=0):
+        return read_manifest(get_export_folder(export_id, storage_index))
+
+
+class CreateCorpusExportJob(graphene.Mutation):
+    job_id = graphene.String()
+    export_id = graphene.String()
+
+    class Arguments:
+        model_name = graphene.String(required=True)
+        field_filter = graphene.JSONString(required=False)
+        object_id_list = graphene.List(graphene.NonNull(graphene.String), required=False)
+        field_name_list = graphene.List(graphene.NonNull(graphene.String), required=False)
+        export_format = graphene.String(required=True, default_value=EXPORT_FORMAT_NDJSON)
+        rows_per_chunk = graphene.Int(required=False, default_value=DEFAULT_ROWS_PER_CHUNK)
+        storage_index = graphene.Int(required=False, default_value=0)
+        export_id = graphene.String(required=False)
+        queue_name = graphene.String(required=True, default_value=list(RQ_QUEUES.keys())[1])
+
+    @classmethod
+    @superuser_required
+    @sanitize_and_validate(
+        validators={
+            'model_name': validate_export_model_name,
+            'export_format': validate_export_format,
+            'object_id_list': validate_object_id_list,
+            'queue_name': validate_queue_name,
+        },
+        sanitizers={}
+    )
+    def mutate(cls, root, info, model_name, export_format, queue_name, field_filter=None, object_id_list=None,
+               field_name_list=None, rows_per_chunk=DEFAULT_ROWS_PER_CHUNK, storage_index=0, export_id=None):
+        """
+        Enqueues a job that streams a filtered collection into chunked NDJSON or Parquet files. The files are
+        downloaded from /download/export/<export_id>/<file_name>.
+
+        :param model_name: str - class name of the document, for instance, "FirmwareFile".
+        :param export_format: str - "ndjson" or "parquet".
+        :param queue_name: str - name of the RQ queue.
+        :param field_filter: dict - field names/values to filter by.
+        :param object_id_list: list(str) - optional object-ids to export.
+        :param field_name_list: list(str) - fields to export or None for all fields.
+        :param rows_per_chunk: int - maximal number of rows per chunk file.
+        :param storage_index: int - index of the file storage the export is written to.
+        :param export_id: str - uuid of an unfinished export to resume.
+
+        :return: job-id of the rq job and uuid of the export.
+        """
+        if rows_per_chunk < 1:
+            raise ValueError("Argument 'rows_per_chunk' must be a positive integer.")
+        export_id = str(uuid.UUID(export_id)) if export_id else str(uuid.uuid4())
+        queue = django_rq.get_queue(queue_name)
+        job = queue.enqueue(start_corpus_export,
+                            export_id,
+                            model_name,
+                            field_filter,
+                            object_id_list,
+                            field_name_list,
+                            export_format,
+                            rows_per_chunk,
+                            storage_index,
+                            job_timeout=ONE_WEEK_TIMEOUT)
+        return cls(job_id=job.id, export_id=export_id)
+
+
+class CorpusExportMutation(graphene.ObjectType):
+    create_corpus_export_job = CreateCorpusExportJob.Field()
@@ -26,4 +26,4 @@ class ExodusReportQuery(graphene.ObjectType):
 
     @superuser_required
     def resolve_exodus_report_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(ExodusReport, object_id_list, field_filter)
+        return get_filtered_queryset(ExodusReport, object_id_list, field_filter, info=info)
@@ -24,4 +24,4 @@ class ExodusStatisticsReportQuery(graphene.ObjectType):
 
     @superuser_required
     def resolve_exodus_statistics_report_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(ExodusStatisticsReport, object_id_list, field_filter)
+        return get_filtered_queryset(ExodusStatisticsReport, object_id_list, field_filter, info=info)
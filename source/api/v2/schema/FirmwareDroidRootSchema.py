@@ -26,7 +26,7 @@ from api.v2.schema.VirustotalSchema import VirustotalReportQuery, VirusTotalMuta
 from api.v2.schema.JsonFileSchema import JsonFileQuery
 from api.v2.schema.ImageFileSchema import ImageFileQuery
 from api.v2.schema.WebclientSettingSchema import WebclientSettingQuery
-from api.v2.schema.StatisticsReportSchema import StatisticsReportQuery
+from api.v2.schema.StatisticsReportSchema import StatisticsReportQuery, StatisticsReportMutation
 from api.v2.schema.SuperStatisticsReportSchema import SuperStatisticsReportQuery
 from api.v2.schema.QuarkEngineStatisticsReportSchema import QuarkEngineStatisticsReportQuery
 from api.v2.schema.ExodusStatisticsReportSchema import ExodusStatisticsReportQuery
@@ -36,11 +36,15 @@ from api.v2.schema.SuperReportSchema import SuperReportQuery
 from api.v2.schema.QuarkEngineReportSchema import QuarkEngineReportQuery
 from api.v2.schema.SsDeepClusterAnalysisSchema import SsDeepClusterAnalysisQuery
 from api.v2.schema.TlshHashSchema import TlshHashQuery
+from api.v2.schema.SsDeepHashSchema import SsDeepHashQuery
 from api.v2.schema.AppCertificateSchema import AppCertificateQuery
 from api.v2.schema.AecsJobSchema import AecsJobMutation, AecsJobQuery
 from api.v2.schema.BuildPropFileSchema import BuildPropFileQuery
 from api.v2.schema.AndroGuardSchema import AndroGuardReportQuery
 from api.v2.schema.ApkScannerReportSchema import ApkScannerReportQuery
+from api.v2.schema.CorpusExportSchema import CorpusExportQuery, CorpusExportMutation
+from api.v2.schema.QueryProfilerSchema import QueryProfilerQuery, QueryProfilerMutation
+from api.v2.types.ReferenceLoader import add_reference_resolvers_to_registry
 
 
 class Query(WebclientSettingQuery,
@@ -68,6 +72,7 @@ class Query(WebclientSettingQuery,
             QuarkEngineReportQuery,
             SsDeepClusterAnalysisQuery,
             TlshHashQuery,
+            SsDeepHashQuery,
             AppCertificateQuery,
             RqQueueQuery,
             HealthCheckQuery,
@@ -79,6 +84,8 @@ class Query(WebclientSettingQuery,
             MobSFScanReportQuery,
             TrueseeingReportQuery,
             ApkScannerLogQuery,
+            CorpusExportQuery,
+            QueryProfilerQuery,
             graphene.ObjectType):
     debug = graphene.Field(DjangoDebug, name='_debug')
     token_auth = graphql_jwt.ObtainJSONWebToken.Field()
@@ -92,6 +99,9 @@ class Mutation(AndroidAppMutation,
                FirmwareFileMutation,
                VirusTotalMutation,
                FirmwareImporterSettingMutation,
+               StatisticsReportMutation,
+               CorpusExportMutation,
+               QueryProfilerMutation,
                graphene.ObjectType):
     debug = graphene.Field(DjangoDebug, name='_debug')
     delete_token_cookie = graphql_jwt.DeleteJSONWebTokenCookie.Field()
@@ -100,5 +110,5 @@ class Mutation(AndroidAppMutation,
 
 
 
-
+add_reference_resolvers_to_registry()
 schema = graphene.Schema(query=Query, mutation=Mutation)
@@ -3,11 +3,13 @@
 # See the file 'LICENSE' for copying permission.
 import django_rq
 import graphene
+from graphene import relay
 from graphene.relay import Node
 from graphene_mongo import MongoengineObjectType
 from graphql_jwt.decorators import superuser_required
 from api.v2.schema.RqJobsSchema import ONE_DAY_TIMEOUT
 from api.v2.types.GenericFilter import generate_filter, get_filtered_queryset
+from api.v2.types.KeysetPagination import get_keyset_connection
 from api.v2.validators.validation import (
     sanitize_and_validate, validate_object_id_list, validate_queue_name,
     validate_regex_pattern, validate_object_id, validate_queue_extractor_task
@@ -27,16 +29,32 @@ class FirmwareFileType(MongoengineObjectType):
         interfaces = (Node,)
 
 
+class FirmwareFileConnection(relay.Connection):
+    class Meta:
+        node = FirmwareFileType
+
+
 class FirmwareFileQuery(graphene.ObjectType):
     firmware_file_list = graphene.List(FirmwareFileType,
                                        object_id_list=graphene.List(graphene.String),
                                        field_filter=graphene.Argument(ModelFilter),
                                        name="firmware_file_list"
                                        )
+    firmware_file_connection = relay.ConnectionField(
+        FirmwareFileConnection,
+        object_id_list=graphene.List(graphene.String),
+        field_filter=graphene.Argument(ModelFilter),
+        name="firmware_file_connection"
+    )
 
     @superuser_required
     def resolve_firmware_file_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(FirmwareFile, object_id_list, field_filter)
+        return get_filtered_queryset(FirmwareFile, object_id_list, field_filter, info=info)
+
+    @superuser_required
+    def resolve_firmware_file_connection(self, info, object_id_list=None, field_filter=None, **kwargs):
+        return get_keyset_connection(FirmwareFileConnection, FirmwareFile, info, object_id_list, field_filter,
+                                     **kwargs)
 
 
 class ExportFirmwareFileByRegexMutation(graphene.Mutation):
@@ -28,5 +28,5 @@ class FlowDroidReportQuery(graphene.ObjectType):
 
     @superuser_required
     def resolve_flowdroid_report_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(FlowDroidReport, object_id_list, filter)
+        return get_filtered_queryset(FlowDroidReport, object_id_list, field_filter, info=info)
 
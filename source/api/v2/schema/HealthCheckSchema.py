@@ -2,10 +2,17 @@
 # This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
 # See the file 'LICENSE' for copying permission.
 import graphene
+from graphql_jwt.decorators import superuser_required
+from database.connector import get_pool_statistics
 
 
 class HealthCheckQuery(graphene.ObjectType):
     is_api_up = graphene.Boolean()
+    db_pool_statistics = graphene.JSONString(name="db_pool_statistics")
 
     def resolve_is_api_up(self, info):
         return True
+
+    @superuser_required
+    def resolve_db_pool_statistics(self, info):
+        return get_pool_statistics()
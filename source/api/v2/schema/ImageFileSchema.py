@@ -23,4 +23,4 @@ class ImageFileQuery(graphene.ObjectType):
 
     @superuser_required
     def resolve_image_file_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(ImageFile, object_id_list, field_filter)
+        return get_filtered_queryset(ImageFile, object_id_list, field_filter, info=info)
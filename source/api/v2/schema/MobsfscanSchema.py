@@ -28,4 +28,4 @@ class MobSFScanReportQuery(graphene.ObjectType):
 
     @superuser_required
     def resolve_mobsfscan_report_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(MobSFScanReport, object_id_list, filter)
+        return get_filtered_queryset(MobSFScanReport, object_id_list, field_filter, info=info)
@@ -24,4 +24,4 @@ class QuarkEngineStatisticsReportQuery(graphene.ObjectType):
 
     @superuser_required
     def resolve_quark_engine_statistics_report_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(QuarkEngineStatisticsReport, object_id_list, field_filter)
+        return get_filtered_queryset(QuarkEngineStatisticsReport, object_id_list, field_filter, info=info)
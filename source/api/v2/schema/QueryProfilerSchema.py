@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import datetime
+import django_rq
+import graphene
+from graphql_jwt.decorators import superuser_required
+from api.v2.schema.RqJobsSchema import ONE_DAY_TIMEOUT
+from api.v2.validators.validation import sanitize_and_validate, validate_queue_name
+from database.index_plan import get_index_plan_status, start_index_plan_build
+from database.query_profiler import get_top_slow_operations
+from app_metrics.profiler import get_job_profile_top_functions
+from webserver.settings import RQ_QUEUES
+
+MAX_SLOW_OPERATION_GROUPS = 100
+MAX_PROFILE_FUNCTIONS = 500
+
+
+class QueryProfilerQuery(graphene.ObjectType):
+    slow_operation_top_list = graphene.JSONString(limit=graphene.Int(required=False, default_value=20),
+                                                  since_hours=graphene.Int(required=False),
+                                                  collection_name=graphene.String(required=False),
+                                                  name="slow_operation_top_list")
+    index_plan_status = graphene.JSONString(name="index_plan_status")
+    job_profile_top_list = graphene.JSONString(job_id=graphene.String(required=True),
+                                               limit=graphene.Int(required=False, default_value=20),
+                                               sort_by=graphene.String(required=False, default_value="self_seconds"),
+                                               name="job_profile_top_list")
+
+    @superuser_required
+    def resolve_slow_operation_top_list(self, info, limit=20, since_hours=None, collection_name=None):
+        since = None
+        if since_hours:
+            since = datetime.datetime.now() - datetime.timedelta(hours=since_hours)
+        limit = max(1, min(limit, MAX_SLOW_OPERATION_GROUPS))
+        return get_top_slow_operations(limit=limit, since=since, collection_name=collection_name)
+
+    @superuser_required
+    def resolve_index_plan_status(self, info):
+        return get_index_plan_status()
+
+    @superuser_required
+    def resolve_job_profile_top_list(self, info, job_id, limit=20, sort_by="self_seconds"):
+        limit = max(1, min(limit, MAX_PROFILE_FUNCTIONS))
+        return get_job_profile_top_functions(job_id, limit=limit, sort_by=sort_by)
+
+
+class CreateIndexPlanJob(graphene.Mutation):
+    job_id = graphene.String()
+
+    class Arguments:
+        queue_name = graphene.String(required=True, default_value=list(RQ_QUEUES.keys())[1])
+
+    @classmethod
+    @superuser_required
+    @sanitize_and_validate(
+        validators={
+            'queue_name': validate_queue_name,
+        },
+        sanitizers={}
+    )
+    def mutate(cls, root, info, queue_name):
+        """
+        Enqueues a job that builds the declared indexes of the hot collections.
+
+        :param queue_name: str - name of the RQ queue.
+
+        :return: job-id of the rq job.
+        """
+        queue = django_rq.get_queue(queue_name)
+        job = queue.enqueue(start_index_plan_build, job_timeout=ONE_DAY_TIMEOUT)
+        return cls(job_id=job.id)
+
+
+class QueryProfilerMutation(graphene.ObjectType):
+    create_index_plan_job = CreateIndexPlanJob.Field()
@@ -2,19 +2,26 @@
 # This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
 # See the file 'LICENSE' for copying permission.
 import logging
+import threading
+import time
 
 import graphene
 import django_rq
 from datetime import datetime
-from graphene import String, ObjectType, List, Field, Boolean, DateTime
+from graphene import String, ObjectType, List, Field, Boolean, DateTime, Float
 from graphql_jwt.decorators import superuser_required
 from rq.job import Job
 from webserver.settings import RQ_QUEUES
+from processing.sharded_scan import get_sharded_scan_summary
+from processing.job_progress import get_job_progress_list
 
 ONE_WEEK_TIMEOUT = 60 * 60 * 24 * 7
 ONE_DAY_TIMEOUT = 60 * 60 * 24
 ONE_HOUR_TIMEOUT = 60 * 60 * 24
 MAX_OBJECT_ID_LIST_SIZE = 1000
+RQ_JOB_LIST_CACHE_SECONDS = 5
+_rq_job_list_cache = {}
+_rq_job_list_cache_lock = threading.Lock()
 
 
 class RqJobType(ObjectType):
@@ -34,6 +41,37 @@ class RqJobType(ObjectType):
     exc_info = String(description="Exception information if job failed")
 
 
+class ShardedScanJobType(ObjectType):
+    """GraphQL type representing the aggregated state of a sharded scan"""
+    parent_job_id = String(description="Job id of the parent job")
+    module_name = String(description="Name of the scanner module")
+    status = String(description="Aggregated status (running, finished, failed)")
+    shard_count = graphene.Int(description="Number of shards")
+    item_count = graphene.Int(description="Number of apps in the scan")
+    finished_shard_count = graphene.Int(description="Number of finished shards")
+    failed_shard_count = graphene.Int(description="Number of failed shards")
+    pending_shard_count = graphene.Int(description="Number of queued or running shards")
+    finished_item_count = graphene.Int(description="Number of apps in finished shards")
+    failed_shard_job_id_list = List(String, description="Job ids of the failed shards")
+
+
+class RqJobProgressType(ObjectType):
+    """GraphQL type representing the progress reported by a running or ended RQ job"""
+    job_id = String(description="Unique job identifier")
+    stage = String(description="Current stage of the job")
+    status = String(description="Status reported by the job when it ended")
+    items_total = graphene.Int(description="Number of items the job processes, 0 if unknown")
+    items_done = graphene.Int(description="Number of processed items")
+    items_failed = graphene.Int(description="Number of failed items")
+    bytes_processed = Float(description="Number of processed bytes")
+    started_at = Float(description="Unix time of the first progress report")
+    updated_at = Float(description="Unix time of the last progress report")
+    elapsed_seconds = Float(description="Seconds between the first and the last progress report")
+    items_per_second = Float(description="Processed and failed items per second")
+    bytes_per_second = Float(description="Processed bytes per second")
+    percent = Float(description="Processed and failed items in percent of the total")
+
+
 def create_job_data(job, queue_name):
     """Create job data dictionary from RQ Job object"""
     logging.info(f"Creating job data for job ID {job.id} in queue {queue_name}")
@@ -88,17 +126,53 @@ def create_job_data(job, queue_name):
         }
 
 
-def fetch_jobs_from_registry(job_registry, qname, queue):
+def fetch_jobs_by_id(job_id_list, qname, queue):
+    """
+    Fetches the jobs with one pipelined redis round-trip. Jobs that expired are skipped.
+
+    :param job_id_list: list(str) - ids of the jobs.
+    :param qname: str - queue name of the jobs or None to use the queue the job was enqueued on.
+    :param queue: class:'Queue' - queue whose redis connection is used.
+
+    :return: list(dict) - job data.
+    """
     jobs = []
-    for job_id in job_registry.get_job_ids():
-        try:
-            job = Job.fetch(job_id, connection=queue.connection)
-            jobs.append(create_job_data(job, qname))
-        except Exception as e:
-            logging.error(f"Error fetching job {job_id} from registry in queue {qname}: {e}")
+    for job_id, job in zip(job_id_list, Job.fetch_many(job_id_list, connection=queue.connection)):
+        if job is None:
+            logging.debug(f"Job {job_id} in queue {qname} does not exist anymore.")
+            continue
+        jobs.append(create_job_data(job, qname or job.origin))
     return jobs
 
 
+def fetch_jobs_from_registry(job_registry, qname, queue):
+    try:
+        return fetch_jobs_by_id(job_registry.get_job_ids(), qname, queue)
+    except Exception as e:
+        logging.error(f"Error fetching jobs from registry in queue {qname}: {e}")
+        return []
+
+
+def get_cached_job_list(cache_key):
+    """
+    :return: list(dict) or None - cached job data or None if the cache entry expired.
+    """
+    with _rq_job_list_cache_lock:
+        cache_entry = _rq_job_list_cache.get(cache_key)
+        if cache_entry and cache_entry[0] > time.monotonic():
+            return cache_entry[1]
+        _rq_job_list_cache.pop(cache_key, None)
+    return None
+
+
+def set_cached_job_list(cache_key, jobs):
+    now = time.monotonic()
+    with _rq_job_list_cache_lock:
+        for expired_key in [key for key, entry in _rq_job_list_cache.items() if entry[0] <= now]:
+            del _rq_job_list_cache[expired_key]
+        _rq_job_list_cache[cache_key] = (now + RQ_JOB_LIST_CACHE_SECONDS, jobs)
+
+
 class RqQueueQuery(graphene.ObjectType):
     rq_queue_name_list = graphene.List(String,
                                        name="rq_queue_name_list"
@@ -114,6 +188,16 @@ class RqQueueQuery(graphene.ObjectType):
                    queue_name=String(description="Queue name (optional, will search all queues if not provided)"),
                    name="rq_job"
                    )
+    rq_job_progress_list = graphene.List(RqJobProgressType,
+                                         job_ids=graphene.List(String, required=True,
+                                                               description="List of job IDs to retrieve progress for"),
+                                         name="rq_job_progress_list"
+                                         )
+    sharded_scan_job = Field(ShardedScanJobType,
+                             job_id=String(required=True, description="Job ID of the parent job"),
+                             queue_name=String(required=True, description="Queue name of the sharded scan"),
+                             name="sharded_scan_job"
+                             )
 
     @superuser_required
     def resolve_rq_queue_name_list(self, info):
@@ -121,25 +205,30 @@ class RqQueueQuery(graphene.ObjectType):
     
     @superuser_required
     def resolve_rq_job_list(self, info, queue_name=None, job_ids=None, status=None):
-        """Retrieve a list of RQ jobs with optional filtering"""
+        """Retrieve a list of RQ jobs with optional filtering. The result is cached for a few seconds."""
+        cache_key = (queue_name, tuple(job_ids) if job_ids else None, status)
+        jobs = get_cached_job_list(cache_key)
+        if jobs is not None:
+            return [RqJobType(**job_data) for job_data in jobs]
         jobs = []
+        if job_ids:
+            # All queues share one redis database, so the jobs are fetched once and not per queue.
+            logging.info(f"Retrieving RQ jobs with job IDs: {job_ids}")
+            try:
+                queue = django_rq.get_queue(queue_name or next(iter(RQ_QUEUES)))
+                for job_data in fetch_jobs_by_id(job_ids, None, queue):
+                    if (not queue_name or job_data.get('queue_name') == queue_name) \
+                            and (not status or job_data.get('status') == status):
+                        jobs.append(job_data)
+            except Exception as e:
+                logging.error(f"Failed to retrieve RQ jobs {job_ids}: {e}")
+            set_cached_job_list(cache_key, jobs)
+            return [RqJobType(**job_data) for job_data in jobs]
         queue_names = [queue_name] if queue_name else RQ_QUEUES.keys()
 
         for qname in queue_names:
             try:
                 queue = django_rq.get_queue(qname)
-                if job_ids:
-                    logging.info(f"Retrieving RQ jobs with job IDs: {job_ids}")
-                    for job_id in job_ids:
-                        try:
-                            job = Job.fetch(job_id, connection=queue.connection)
-                            job_data = create_job_data(job, qname)
-                            if not status or job_data.get('status') == status:
-                                jobs.append(job_data)
-                        except Exception as e:
-                            logging.error(f"Error fetching job {job_id} from queue {qname}: {e}")
-                    continue
-
                 registry_map = {
                     'queued': lambda q: q.get_jobs(),
                     'finished': lambda q: q.finished_job_registry,
@@ -162,7 +251,8 @@ class RqQueueQuery(graphene.ObjectType):
             except Exception as e:
                 logging.error(f"Failed to retrieve RQ jobs from queue {qname}: {e}")
 
-        logging.info(f"Fetched RQ Job List: {jobs}")
+        logging.debug(f"Fetched RQ Job List: {jobs}")
+        set_cached_job_list(cache_key, jobs)
         return [RqJobType(**job_data) for job_data in jobs]
     
     @superuser_required
@@ -185,3 +275,21 @@ class RqQueueQuery(graphene.ObjectType):
         
         # Job not found in any queue
         return None
+
+    @superuser_required
+    def resolve_rq_job_progress_list(self, info, job_ids):
+        """Retrieve the progress of many jobs with one pipelined redis round-trip"""
+        if len(job_ids) > MAX_OBJECT_ID_LIST_SIZE:
+            raise ValueError(f"At most {MAX_OBJECT_ID_LIST_SIZE} job ids are allowed.")
+        queue = django_rq.get_queue(list(RQ_QUEUES.keys())[0])
+        return [RqJobProgressType(**progress) for progress in get_job_progress_list(job_ids, queue.connection)]
+
+    @superuser_required
+    def resolve_sharded_scan_job(self, info, job_id, queue_name):
+        """Retrieve the aggregated progress of a sharded scan"""
+        try:
+            queue = django_rq.get_queue(queue_name)
+            return ShardedScanJobType(**get_sharded_scan_summary(job_id, queue.connection))
+        except Exception as e:
+            logging.error(f"Failed to retrieve sharded scan {job_id}: {e}")
+            return None
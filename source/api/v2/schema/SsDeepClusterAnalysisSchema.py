@@ -24,4 +24,4 @@ class SsDeepClusterAnalysisQuery(graphene.ObjectType):
 
     @superuser_required
     def resolve_ssdeep_cluster_analysis_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(SsDeepClusterAnalysis, object_id_list, field_filter)
+        return get_filtered_queryset(SsDeepClusterAnalysis, object_id_list, field_filter, info=info)
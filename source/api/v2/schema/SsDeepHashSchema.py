@@ -2,9 +2,11 @@
 # This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
 # See the file 'LICENSE' for copying permission.
 import graphene
+from graphene import relay
 from graphene_mongo import MongoengineObjectType
 from graphql_jwt.decorators import superuser_required
 from api.v2.types.GenericFilter import generate_filter, get_filtered_queryset
+from api.v2.types.KeysetPagination import get_keyset_connection
 from model.SsDeepHash import SsDeepHash
 
 ModelFilter = generate_filter(SsDeepHash)
@@ -15,13 +17,28 @@ class SsDeepHashType(MongoengineObjectType):
         model = SsDeepHash
 
 
+class SsDeepHashConnection(relay.Connection):
+    class Meta:
+        node = SsDeepHashType
+
+
 class SsDeepHashQuery(graphene.ObjectType):
     ssdeep_hash_list = graphene.List(SsDeepHashType,
                                      object_id_list=graphene.List(graphene.String),
                                      field_filter=graphene.Argument(ModelFilter),
                                      name="ssdeep_hash_list"
                                      )
+    ssdeep_hash_connection = relay.ConnectionField(
+        SsDeepHashConnection,
+        object_id_list=graphene.List(graphene.String),
+        field_filter=graphene.Argument(ModelFilter),
+        name="ssdeep_hash_connection"
+    )
 
     @superuser_required
     def resolve_ssdeep_hash_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(SsDeepHash, object_id_list, field_filter)
+        return get_filtered_queryset(SsDeepHash, object_id_list, field_filter, info=info)
+
+    @superuser_required
+    def resolve_ssdeep_hash_connection(self, info, object_id_list=None, field_filter=None, **kwargs):
+        return get_keyset_connection(SsDeepHashConnection, SsDeepHash, info, object_id_list, field_filter, **kwargs)
@@ -1,11 +1,17 @@
 # -*- coding: utf-8 -*-
 # This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
 # See the file 'LICENSE' for copying permission.
+import django_rq
 import graphene
 from graphene_mongo import MongoengineObjectType
 from graphql_jwt.decorators import superuser_required
+from api.v2.schema.RqJobsSchema import ONE_DAY_TIMEOUT
 from api.v2.types.GenericFilter import generate_filter, get_filtered_queryset
+from api.v2.validators.validation import (sanitize_and_validate, validate_queue_name,
+                                          validate_statistics_report_name_list)
 from model.StatisticsReport import StatisticsReport
+from processing.statistics_engine import start_statistics_aggregation
+from webserver.settings import RQ_QUEUES
 
 ModelFilter = generate_filter(StatisticsReport)
 
@@ -23,4 +29,42 @@ class StatisticsReportQuery(graphene.ObjectType):
 
     @superuser_required
     def resolve_statistics_report_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(StatisticsReport, object_id_list, field_filter)
+        return get_filtered_queryset(StatisticsReport, object_id_list, field_filter, info=info)
+
+
+class CreateStatisticsReportJob(graphene.Mutation):
+    job_id = graphene.String()
+
+    class Arguments:
+        report_name_list = graphene.List(graphene.NonNull(graphene.String), required=True)
+        incremental = graphene.Boolean(required=False, default_value=True)
+        queue_name = graphene.String(required=True, default_value=list(RQ_QUEUES.keys())[1])
+
+    @classmethod
+    @superuser_required
+    @sanitize_and_validate(
+        validators={
+            'report_name_list': validate_statistics_report_name_list,
+            'queue_name': validate_queue_name,
+        },
+        sanitizers={}
+    )
+    def mutate(cls, root, info, report_name_list, queue_name, incremental=True):
+        """
+        Enqueues a job that computes statistics reports with aggregation pipelines.
+
+        :param report_name_list: list(str) - names of the statistics reports, for instance,
+        "ExodusStatisticsReport".
+        :param queue_name: str - name of the RQ queue.
+        :param incremental: bool - if true, only reports created since the last run are aggregated and merged
+        with the last statistics report.
+
+        :return: job-id of the rq job.
+        """
+        queue = django_rq.get_queue(queue_name)
+        job = queue.enqueue(start_statistics_aggregation, report_name_list, incremental, job_timeout=ONE_DAY_TIMEOUT)
+        return cls(job_id=job.id)
+
+
+class StatisticsReportMutation(graphene.ObjectType):
+    create_statistics_report_job = CreateStatisticsReportJob.Field()
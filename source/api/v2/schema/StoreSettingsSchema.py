@@ -23,4 +23,4 @@ class StoreSettingsQuery(graphene.ObjectType):
 
     @superuser_required
     def resolve_store_settings_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(StoreSetting, object_id_list, field_filter)
+        return get_filtered_queryset(StoreSetting, object_id_list, field_filter, info=info)
@@ -2,9 +2,11 @@
 # This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
 # See the file 'LICENSE' for copying permission.
 import graphene
+from graphene import relay
 from graphene_mongo import MongoengineObjectType
 from graphql_jwt.decorators import superuser_required
 from api.v2.types.GenericFilter import generate_filter, get_filtered_queryset
+from api.v2.types.KeysetPagination import get_keyset_connection
 from model.TlshHash import TlshHash
 
 ModelFilter = generate_filter(TlshHash)
@@ -15,13 +17,28 @@ class TlshHashType(MongoengineObjectType):
         model = TlshHash
 
 
+class TlshHashConnection(relay.Connection):
+    class Meta:
+        node = TlshHashType
+
+
 class TlshHashQuery(graphene.ObjectType):
     tlsh_hash_list = graphene.List(TlshHashType,
                                    object_id_list=graphene.List(graphene.String),
                                    field_filter=graphene.Argument(ModelFilter),
                                    name="tlsh_hash_list"
                                    )
+    tlsh_hash_connection = relay.ConnectionField(
+        TlshHashConnection,
+        object_id_list=graphene.List(graphene.String),
+        field_filter=graphene.Argument(ModelFilter),
+        name="tlsh_hash_connection"
+    )
 
     @superuser_required
     def resolve_tlsh_hash_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(TlshHash, object_id_list, field_filter)
+        return get_filtered_queryset(TlshHash, object_id_list, field_filter, info=info)
+
+    @superuser_required
+    def resolve_tlsh_hash_connection(self, info, object_id_list=None, field_filter=None, **kwargs):
+        return get_keyset_connection(TlshHashConnection, TlshHash, info, object_id_list, field_filter, **kwargs)
@@ -28,5 +28,5 @@ class TrueseeingReportQuery(graphene.ObjectType):
 
     @superuser_required
     def resolve_trueseeing_report_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(TrueseeingReport, object_id_list, filter)
+        return get_filtered_queryset(TrueseeingReport, object_id_list, field_filter, info=info)
 
@@ -35,7 +35,7 @@ class VirustotalReportQuery(graphene.ObjectType):
 
     @superuser_required
     def resolve_virustotal_report_list(self, info, object_id_list=None, field_filter=None):
-        return get_filtered_queryset(VirusTotalReport, object_id_list, field_filter)
+        return get_filtered_queryset(VirusTotalReport, object_id_list, field_filter, info=info)
 
 
 class CreateVirusTotalScanJob(graphene.Mutation):
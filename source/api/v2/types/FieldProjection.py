@@ -0,0 +1,177 @@
+from graphene.utils.str_converters import to_snake_case
+from graphene_mongo.registry import get_global_registry
+from graphql.language.ast import FieldNode, InlineFragmentNode, FragmentSpreadNode
+from mongoengine import EmbeddedDocumentField, ListField
+from mongoengine.base import get_document
+
+PROJECTION_META_FIELDS = {"id", "pk", "__typename", "_cls"}
+
+
+def get_model_names(model):
+    """
+    Gets the class names of a document class and its subclasses.
+
+    :param model: document class - a subclass of mongoengine.Document.
+
+    :return: set(str) - class names.
+    """
+    model_name_set = {model.__name__}
+    if model._meta.get("allow_inheritance"):
+        model_name_set.update(get_document(subclass_name).__name__
+                              for subclass_name in getattr(model, "_subclasses", ()))
+    return model_name_set
+
+
+def get_graphql_type_model_names():
+    """
+    Gets the model names of the registered object types by graphql type name. The type name can differ from the
+    class name of the object type, for instance, QarkReportType is named "QarkReport" in the schema.
+
+    :return: dict(str, str) - graphql type names mapped to model class names.
+    """
+    return {object_type._meta.name: model.__name__
+            for model, object_type in get_global_registry()._registry.items()}
+
+
+def is_fragment_for_model(type_condition, model):
+    """
+    Checks if a fragment can apply to documents of the model. Fragments on object types of other models, for
+    instance, "... on QarkReport" while ApkidReport documents are loaded, are ignored.
+
+    :param type_condition: NamedTypeNode - type condition of the fragment.
+    :param model: document class or None to accept all fragments.
+
+    :return: bool - true if the fragment applies.
+    """
+    if model is None or type_condition is None:
+        return True
+    model_name = get_graphql_type_model_names().get(type_condition.name.value)
+    return model_name is None or model_name in get_model_names(model)
+
+
+def iter_selected_fields(selection_set, fragments, model=None):
+    """
+    Iterates over the fields of a selection set. Inline fragments and fragment spreads are resolved.
+
+    :param selection_set: SelectionSetNode - the graphql selection set.
+    :param fragments: dict(str, FragmentDefinitionNode) - fragments of the graphql document.
+    :param model: document class - if set, fragments on types of other models are skipped.
+
+    :return: generator(FieldNode) - selected fields.
+    """
+    if selection_set is None:
+        return
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            yield selection
+        elif isinstance(selection, InlineFragmentNode):
+            if is_fragment_for_model(selection.type_condition, model):
+                yield from iter_selected_fields(selection.selection_set, fragments, model)
+        elif isinstance(selection, FragmentSpreadNode):
+            fragment = fragments.get(selection.name.value)
+            if fragment and is_fragment_for_model(fragment.type_condition, model):
+                yield from iter_selected_fields(fragment.selection_set, fragments, model)
+
+
+def get_selection_sets(info, path=None):
+    """
+    Gets the selection sets of the resolved field at the given path, for instance, ["edges", "node"] for relay
+    connections.
+
+    :param info: ResolveInfo - graphql resolve info.
+    :param path: list(str) - field names to descend into.
+
+    :return: list(SelectionSetNode) - selection sets at the path.
+    """
+    selection_set_list = [field_node.selection_set for field_node in info.field_nodes]
+    for field_name in path or []:
+        selection_set_list = [field_node.selection_set
+                              for selection_set in selection_set_list
+                              for field_node in iter_selected_fields(selection_set, info.fragments)
+                              if field_node.name.value == field_name]
+    return selection_set_list
+
+
+def get_model_fields(model):
+    """
+    Gets the fields of a document class including the fields of its subclasses.
+
+    :param model: document class - a subclass of mongoengine.Document or mongoengine.EmbeddedDocument.
+
+    :return: dict(str, BaseField) - fields by name.
+    """
+    field_dict = dict(model._fields)
+    if model._meta.get("allow_inheritance"):
+        for subclass_name in getattr(model, "_subclasses", ()):
+            field_dict.update(get_document(subclass_name)._fields)
+    return field_dict
+
+
+def get_embedded_document_type(field):
+    """
+    Gets the embedded document class of an EmbeddedDocumentField or a ListField of EmbeddedDocumentFields.
+
+    :return: document class or None
+    """
+    if isinstance(field, ListField):
+        field = field.field
+    if isinstance(field, EmbeddedDocumentField):
+        return field.document_type
+    return None
+
+
+def get_selection_projection(selection_set, fragments, model, prefix=""):
+    """
+    Creates the projection of a selection set. Selections on embedded documents are projected to the selected
+    sub-fields, for instance, "task_metrics.wall_time_seconds".
+
+    :param selection_set: SelectionSetNode - the graphql selection set.
+    :param fragments: dict(str, FragmentDefinitionNode) - fragments of the graphql document.
+    :param model: document class - the document class of the selection.
+    :param prefix: str - path of the embedded document.
+
+    :return: list(str) or None - field paths or None if a selected field is not a model field.
+    """
+    field_dict = get_model_fields(model)
+    projection_list = []
+    for field_node in iter_selected_fields(selection_set, fragments, model):
+        field_name = field_node.name.value
+        if field_name in PROJECTION_META_FIELDS:
+            continue
+        field_name = to_snake_case(field_name)
+        field = field_dict.get(field_name)
+        if field is None:
+            return None
+        embedded_type = get_embedded_document_type(field)
+        nested_projection_list = None
+        if embedded_type and field_node.selection_set:
+            nested_projection_list = get_selection_projection(field_node.selection_set,
+                                                              fragments,
+                                                              embedded_type,
+                                                              f"{prefix}{field_name}.")
+        if nested_projection_list:
+            projection_list.extend(nested_projection_list)
+        else:
+            projection_list.append(f"{prefix}{field_name}")
+    return projection_list
+
+
+def get_projection_fields(info, model, path=None):
+    """
+    Creates the list of model fields requested in the graphql selection set. If a selected field is not a model
+    field, for instance, a custom resolver, no projection is used.
+
+    :param info: ResolveInfo - graphql resolve info.
+    :param model: document class - a subclass of mongoengine.Document.
+    :param path: list(str) - field names to descend into.
+
+    :return: list(str) or None - fields to load from MongoDB or None to load all fields.
+    """
+    only_field_set = set()
+    for selection_set in get_selection_sets(info, path):
+        projection_list = get_selection_projection(selection_set, info.fragments, model)
+        if projection_list is None:
+            return None
+        only_field_set.update(projection_list)
+    return sorted(only_field_set) or ["id"]
+
@@ -3,6 +3,8 @@ import logging
 import graphene
 from graphene import InputObjectType
 from mongoengine.fields import ListField, DictField, StringField, IntField, FloatField, BooleanField, LazyReferenceField
+from api.v2.types.FieldProjection import get_projection_fields
+from api.v2.types.ReferenceLoader import register_documents
 
 
 def generate_filter(model):
@@ -57,11 +59,14 @@ def get_filtered_queryset(model=None,
                           query_filter=None,
                           batch_size=50,
                           only_fields=None,
-                          no_dereference=False):
+                          no_dereference=False,
+                          info=None):
     """
     Get a filtered queryset (or generator of querysets) for a given model.
     Efficient for large collections by batching large object_id_list queries.
-    Loads only specified fields if only_fields is provided.
+    Loads only specified fields if only_fields is provided. If the graphql info is provided, only the fields of the
+    selection set are loaded and the documents are registered with the reference loader of the request, so their
+    reference fields are resolved in batches.
 
     :param model: document class - a subclass of mongoengine.Document
     :param object_id_list: list(str) - a list of object ids to filter by
@@ -69,9 +74,17 @@ def get_filtered_queryset(model=None,
     :param batch_size: int - maximum number of IDs per $in query (default: 1000)
     :param only_fields: list(str) - fields to load from MongoDB
     :param no_dereference: bool - if True, do not dereference LazyReferenceFields
+    :param info: ResolveInfo - optional graphql resolve info of the resolver.
 
-    :return: QuerySet (if small set of IDs) or generator yielding QuerySets (if batched)
+    :return: QuerySet (if small set of IDs) or generator yielding QuerySets (if batched). A list of documents if
+    info is provided.
     """
+    if info is not None:
+        if only_fields is None:
+            only_fields = get_projection_fields(info, model)
+        document_list = list(get_filtered_queryset(model, object_id_list, query_filter, batch_size, only_fields,
+                                                   no_dereference=True))
+        return register_documents(info, document_list)
     filter_dict = {k: v for k, v in (query_filter or {}).items() if v is not None}
 
     def apply_optimizations(qs):
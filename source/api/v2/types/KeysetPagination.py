@@ -0,0 +1,107 @@
+import base64
+import binascii
+from bson import ObjectId
+from graphene.relay import PageInfo
+from api.v2.types.FieldProjection import get_projection_fields
+from api.v2.types.ReferenceLoader import register_documents
+
+KEYSET_CURSOR_PREFIX = "keyset:"
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+CONNECTION_NODE_PATH = ["edges", "node"]
+
+
+def encode_keyset_cursor(object_id):
+    """
+    Creates an opaque relay cursor from the object-id of a document.
+
+    :param object_id: ObjectId or str - object-id of the document.
+
+    :return: str - base64 encoded cursor.
+    """
+    return base64.b64encode(f"{KEYSET_CURSOR_PREFIX}{object_id}".encode("utf-8")).decode("utf-8")
+
+
+def decode_keyset_cursor(cursor):
+    """
+    Gets the object-id of a relay cursor created by encode_keyset_cursor.
+
+    :param cursor: str - base64 encoded cursor.
+
+    :return: ObjectId - object-id of the document.
+    """
+    try:
+        value = base64.b64decode(cursor.encode("utf-8"), validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    object_id = value[len(KEYSET_CURSOR_PREFIX):]
+    if not value.startswith(KEYSET_CURSOR_PREFIX) or not ObjectId.is_valid(object_id):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return ObjectId(object_id)
+
+
+def get_page_size(first=None):
+    """
+    Gets the number of documents of a page. Requests above MAX_PAGE_SIZE are capped.
+
+    :param first: int - requested page size.
+
+    :return: int - page size.
+    """
+    if first is None:
+        return DEFAULT_PAGE_SIZE
+    if first < 0:
+        raise ValueError("Argument 'first' must be a non-negative integer.")
+    return min(first, MAX_PAGE_SIZE)
+
+
+def get_keyset_connection(connection_type,
+                          model,
+                          info,
+                          object_id_list=None,
+                          field_filter=None,
+                          first=None,
+                          after=None,
+                          last=None,
+                          before=None,
+                          **kwargs):
+    """
+    Resolves a relay connection with keyset pagination on the _id index. Instead of skipping over all previous
+    documents, every page starts after the object-id of the cursor, so the cost of a page does not grow with the
+    offset. Only the fields requested in the selection set of the nodes are loaded.
+
+    :param connection_type: class:'relay.Connection' - the connection type to create.
+    :param model: document class - a subclass of mongoengine.Document.
+    :param info: ResolveInfo - graphql resolve info.
+    :param object_id_list: list(str) - optional list of object ids to filter by.
+    :param field_filter: dict - dictionary of field names/values to filter by.
+    :param first: int - page size, capped at MAX_PAGE_SIZE.
+    :param after: str - cursor of the last document of the previous page.
+    :param last: int - not supported.
+    :param before: str - not supported.
+
+    :return: instance of the connection type.
+    """
+    if last is not None or before is not None:
+        raise ValueError("Keyset connections only support forward pagination with 'first' and 'after'.")
+    page_size = get_page_size(first)
+    filter_dict = {k: v for k, v in (field_filter or {}).items() if v is not None}
+    queryset = model.objects(**filter_dict)
+    if object_id_list:
+        queryset = queryset.filter(pk__in=object_id_list)
+    if after:
+        queryset = queryset.filter(pk__gt=decode_keyset_cursor(after))
+    only_fields = get_projection_fields(info, model, CONNECTION_NODE_PATH)
+    if only_fields:
+        queryset = queryset.only(*only_fields)
+    document_list = list(queryset.no_dereference().order_by("pk").limit(page_size + 1))
+
+    has_next_page = len(document_list) > page_size
+    document_list = register_documents(info, document_list[:page_size])
+    edge_list = [connection_type.Edge(node=document, cursor=encode_keyset_cursor(document.pk))
+                 for document in document_list]
+    page_info = PageInfo(start_cursor=edge_list[0].cursor if edge_list else None,
+                         end_cursor=edge_list[-1].cursor if edge_list else None,
+                         has_previous_page=after is not None,
+                         has_next_page=has_next_page)
+    return connection_type(edges=edge_list, page_info=page_info)
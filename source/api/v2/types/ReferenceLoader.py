@@ -0,0 +1,199 @@
+import logging
+from collections import defaultdict
+from bson import DBRef, ObjectId
+from mongoengine import LazyReferenceField, ListField, Document
+from mongoengine.base import LazyReference
+from graphene_mongo.registry import get_global_registry
+
+REFERENCE_LOADER_ATTRIBUTE = "reference_loader"
+
+
+def get_reference_fields(model):
+    """
+    Gets the LazyReferenceFields and ListFields of LazyReferenceFields of a document class.
+
+    :param model: document class - a subclass of mongoengine.Document.
+
+    :return: dict(str, document class) - field name mapped to the referenced document class.
+    """
+    reference_field_dict = {}
+    for field_name, field in model._fields.items():
+        if isinstance(field, ListField):
+            field = field.field
+        if isinstance(field, LazyReferenceField):
+            reference_field_dict[field_name] = field.document_type
+    return reference_field_dict
+
+
+def get_reference_pk(reference):
+    """
+    Gets the object-id of a reference value.
+
+    :param reference: LazyReference, DBRef, Document or ObjectId.
+
+    :return: ObjectId - object-id of the referenced document.
+    """
+    if isinstance(reference, (LazyReference, Document)):
+        return reference.pk
+    if isinstance(reference, DBRef):
+        return reference.id
+    return ObjectId(str(reference))
+
+
+class ReferenceLoader:
+    """
+    Request-scoped batch loader for LazyReferenceFields. Documents returned by the list resolvers are registered
+    with the loader. The first time a reference to a collection is resolved, the references of all registered
+    documents to this collection are fetched with one $in query. Fetched documents are registered as well, so every
+    nested level costs one query per referenced collection.
+    """
+
+    def __init__(self):
+        self.document_cache = {}
+        self.pending_id_dict = defaultdict(set)
+        self.query_count = 0
+
+    def register_documents(self, document_list):
+        """
+        Adds the references of the documents to the pending references.
+
+        :param document_list: list(document) - documents that will be resolved in the same request.
+        """
+        for document in document_list:
+            for field_name, document_type in get_reference_fields(type(document)).items():
+                value = document._data.get(field_name)
+                if not value:
+                    continue
+                collection_name = document_type._get_collection_name()
+                reference_list = value if isinstance(value, list) else [value]
+                for reference in reference_list:
+                    if reference is not None:
+                        reference_pk = get_reference_pk(reference)
+                        if (collection_name, reference_pk) not in self.document_cache:
+                            self.pending_id_dict[collection_name].add(reference_pk)
+
+    def fetch(self, document_type, object_id_set):
+        """
+        Loads the pending references of a collection with one query and memoizes the documents. References to
+        deleted documents are memoized as None.
+
+        :param document_type: document class - the referenced document class.
+        :param object_id_set: set(ObjectId) - object-ids to load in addition to the pending ones.
+        """
+        collection_name = document_type._get_collection_name()
+        object_id_set = (self.pending_id_dict.pop(collection_name, set()) | object_id_set)
+        object_id_set = {object_id for object_id in object_id_set
+                         if (collection_name, object_id) not in self.document_cache}
+        if not object_id_set:
+            return
+        document_list = list(document_type.objects(pk__in=list(object_id_set)).no_dereference())
+        self.query_count += 1
+        for object_id in object_id_set:
+            self.document_cache[(collection_name, object_id)] = None
+        for document in document_list:
+            self.document_cache[(collection_name, document.pk)] = document
+        logging.debug(f"Reference loader fetched {len(document_list)} {document_type.__name__} documents "
+                      f"(query {self.query_count}).")
+        self.register_documents(document_list)
+
+    def load(self, document_type, reference):
+        """
+        Resolves a single reference.
+
+        :param document_type: document class - the referenced document class.
+        :param reference: LazyReference - the reference to resolve.
+
+        :return: document or None
+        """
+        return self.load_many(document_type, [reference])[0]
+
+    def load_many(self, document_type, reference_list):
+        """
+        Resolves a list of references in input order.
+
+        :param document_type: document class - the referenced document class.
+        :param reference_list: list(LazyReference) - the references to resolve.
+
+        :return: list(document) - resolved documents. References to deleted documents are None.
+        """
+        collection_name = document_type._get_collection_name()
+        object_id_list = [get_reference_pk(reference) for reference in reference_list]
+        missing_id_set = {object_id for object_id in object_id_list
+                          if (collection_name, object_id) not in self.document_cache}
+        if missing_id_set:
+            self.fetch(document_type, missing_id_set)
+        return [self.document_cache.get((collection_name, object_id)) for object_id in object_id_list]
+
+
+def get_reference_loader(info):
+    """
+    Gets the reference loader of the current request. The loader is stored on the request context, so documents
+    are memoized for one request only.
+
+    :param info: ResolveInfo - graphql resolve info.
+
+    :return: class:'ReferenceLoader'
+    """
+    loader = getattr(info.context, REFERENCE_LOADER_ATTRIBUTE, None)
+    if loader is None:
+        loader = ReferenceLoader()
+        try:
+            setattr(info.context, REFERENCE_LOADER_ATTRIBUTE, loader)
+        except AttributeError:
+            logging.debug("Request context does not support attributes. References are not batched.")
+    return loader
+
+
+def register_documents(info, document_list):
+    """
+    Registers the documents of a list resolver with the reference loader of the request.
+
+    :param info: ResolveInfo - graphql resolve info.
+    :param document_list: list(document) - documents returned by the resolver.
+
+    :return: list(document) - the same documents.
+    """
+    get_reference_loader(info).register_documents(document_list)
+    return document_list
+
+
+def create_reference_resolver(field_name, document_type):
+    """
+    Creates a graphql resolver that resolves a reference field with the reference loader of the request.
+
+    :param field_name: str - name of the LazyReferenceField or ListField.
+    :param document_type: document class - the referenced document class.
+
+    :return: function - resolver function.
+    """
+    def resolve_reference(parent, info, **kwargs):
+        value = getattr(parent, field_name, None)
+        loader = get_reference_loader(info)
+        if isinstance(value, list):
+            return [document for document in loader.load_many(document_type, value) if document is not None]
+        if not value:
+            return None
+        return loader.load(document_type, value)
+    return resolve_reference
+
+
+def add_reference_resolvers(object_type):
+    """
+    Adds batched resolvers for all reference fields of a MongoengineObjectType. Resolvers defined on the type
+    are kept.
+
+    :param object_type: class:'MongoengineObjectType'
+    """
+    for field_name, document_type in get_reference_fields(object_type._meta.model).items():
+        resolver_name = f"resolve_{field_name}"
+        if not hasattr(object_type, resolver_name):
+            setattr(object_type, resolver_name, create_reference_resolver(field_name, document_type))
+
+
+def add_reference_resolvers_to_registry():
+    """
+    Adds batched reference resolvers to every type of the graphene-mongo registry. Has to run before the schema is
+    created, because graphene-mongo picks up the resolvers when the fields are converted.
+    """
+    for object_type in get_global_registry()._registry.values():
+        add_reference_resolvers(object_type)
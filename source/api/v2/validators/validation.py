@@ -169,11 +169,26 @@ def validate_queue_name(queue_name):
 
 
 def validate_queue_extractor_task(queue_name):
-    if queue_name != "extractor":
+    from processing.queue_lanes import get_base_queue_name
+    if get_base_queue_name(queue_name) != "extractor":
         raise ValueError(f"Invalid queue name for extractor task: {queue_name}. Must contain 'extractor'")
     return queue_name
 
 
+def validate_priority_lane(priority_lane):
+    from processing.queue_lanes import LANE_LIST
+    if priority_lane is not None and priority_lane not in LANE_LIST:
+        raise ValueError(f"Invalid priority lane: {priority_lane}. Must be one of {LANE_LIST}")
+    return priority_lane
+
+
+def validate_profile_mode(profile_mode):
+    from app_metrics.profiler import PROFILE_MODE_LIST
+    if profile_mode is not None and profile_mode not in PROFILE_MODE_LIST:
+        raise ValueError(f"Invalid profile mode: {profile_mode}. Must be one of {PROFILE_MODE_LIST}")
+    return profile_mode
+
+
 def validate_email(email):
     """Validate email format using regex pattern."""
     import re
@@ -291,3 +306,28 @@ def validate_importer_threads(value):
     if value > 30:
         raise ValueError("Number of threads cannot exceed 30")
     return value
+
+
+def validate_statistics_report_name_list(report_name_list):
+    """Validate report names against the statistics engine definitions."""
+    from processing.statistics_engine import STATISTICS_DEFINITION_DICT
+    for report_name in report_name_list:
+        if report_name not in STATISTICS_DEFINITION_DICT:
+            raise ValueError(f"Invalid statistics report name: {report_name}. "
+                             f"Must be one of {list(STATISTICS_DEFINITION_DICT.keys())}")
+    return report_name_list
+
+
+def validate_export_format(export_format):
+    """Validate the file format of a corpus export."""
+    from processing.corpus_export import EXPORT_FORMAT_LIST
+    if export_format not in EXPORT_FORMAT_LIST:
+        raise ValueError(f"Invalid export format: {export_format}. Must be one of {EXPORT_FORMAT_LIST}")
+    return export_format
+
+
+def validate_export_model_name(model_name):
+    """Validate that the model name is an exportable document class."""
+    from processing.corpus_export import get_export_model
+    get_export_model(model_name)
+    return model_name
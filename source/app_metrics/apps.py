@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+from django.apps import AppConfig
+
+
+class AppMetricsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "app_metrics"
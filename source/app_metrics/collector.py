@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import json
+import logging
+from app_metrics.recorder import (METRIC_DEFINITION_DICT, METRIC_TYPE_COUNTER, FIELD_SEPARATOR, BUCKET_PREFIX,
+                                  INF_BUCKET, get_metric_key)
+
+
+def decode_value(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def parse_metric_hash(raw_dict):
+    """
+    Groups the fields of a metric hash by their label values.
+
+    :param raw_dict: dict(bytes, bytes) - content of the redis hash of a metric.
+
+    :return: dict(tuple(str), dict(str, float)) - values by suffix for every combination of label values.
+    """
+    sample_dict = {}
+    for field, value in raw_dict.items():
+        label_json, _, suffix = decode_value(field).rpartition(FIELD_SEPARATOR)
+        try:
+            label_values = tuple(json.loads(label_json))
+        except ValueError:
+            continue
+        sample_dict.setdefault(label_values, {})[suffix] = float(decode_value(value))
+    return sample_dict
+
+
+def get_cumulative_buckets(bucket_list, value_dict):
+    """
+    :param bucket_list: list(float) - upper bounds of the histogram.
+    :param value_dict: dict(str, float) - non-cumulative bucket counts by suffix.
+
+    :return: list(tuple(str, float)) - cumulative counts including the +Inf bucket.
+    """
+    cumulative_list = []
+    total = 0
+    for bucket in [str(bucket) for bucket in bucket_list] + [INF_BUCKET]:
+        total += value_dict.get(f"{BUCKET_PREFIX}{bucket}", 0)
+        cumulative_list.append((bucket, total))
+    return cumulative_list
+
+
+def create_metric_family(name, raw_dict):
+    """
+    :param name: str - name of the metric in METRIC_DEFINITION_DICT.
+    :param raw_dict: dict(bytes, bytes) - content of the redis hash of the metric.
+
+    :return: class:'Metric' - counter or histogram family of prometheus_client.
+    """
+    from prometheus_client.core import CounterMetricFamily, HistogramMetricFamily
+    definition = METRIC_DEFINITION_DICT[name]
+    if definition["type"] == METRIC_TYPE_COUNTER:
+        family = CounterMetricFamily(name, definition["help"], labels=definition["label_names"])
+        for label_values, value_dict in parse_metric_hash(raw_dict).items():
+            family.add_metric(list(label_values), value_dict.get("value", 0))
+    else:
+        family = HistogramMetricFamily(name, definition["help"], labels=definition["label_names"])
+        for label_values, value_dict in parse_metric_hash(raw_dict).items():
+            family.add_metric(list(label_values),
+                              buckets=get_cumulative_buckets(definition["bucket_list"], value_dict),
+                              sum_value=value_dict.get("sum", 0))
+    return family
+
+
+def get_queue_state_counts(queue):
+    """
+    :param queue: class:'Queue' - rq queue.
+
+    :return: dict(str, int) - number of jobs in the queue and its registries.
+    """
+    return {"queued": queue.count,
+            "started": queue.started_job_registry.count,
+            "deferred": queue.deferred_job_registry.count,
+            "scheduled": queue.scheduled_job_registry.count,
+            "failed": queue.failed_job_registry.count}
+
+
+class PipelineMetricCollector:
+    """
+    Custom collector of prometheus_client. Reads the metrics the workers added to redis and the depth of the rq
+    queues when Prometheus scrapes, so the webserver exposes the metrics of all processes and containers.
+    """
+
+    def collect(self):
+        from django_rq import get_queue
+        from prometheus_client.core import GaugeMetricFamily
+        from rq import Worker
+        from webserver.settings import RQ_QUEUES
+        queue_name_list = list(RQ_QUEUES.keys())
+        connection = get_queue(queue_name_list[0]).connection
+        name_list = list(METRIC_DEFINITION_DICT.keys())
+        pipeline = connection.pipeline(transaction=False)
+        for name in name_list:
+            pipeline.hgetall(get_metric_key(name))
+        for name, raw_dict in zip(name_list, pipeline.execute()):
+            yield create_metric_family(name, raw_dict)
+
+        queue_job_family = GaugeMetricFamily("fmd_rq_queue_jobs", "Jobs of the rq queues by state.",
+                                             labels=["queue", "state"])
+        worker_family = GaugeMetricFamily("fmd_rq_workers", "Rq workers listening on the queue.", labels=["queue"])
+        for queue_name in queue_name_list:
+            queue = get_queue(queue_name)
+            try:
+                for state, count in get_queue_state_counts(queue).items():
+                    queue_job_family.add_metric([queue_name, state], count)
+                worker_family.add_metric([queue_name], Worker.count(queue=queue))
+            except Exception as err:
+                logging.warning(f"Could not collect metrics of queue {queue_name}: {err}")
+        yield queue_job_family
+        yield worker_family
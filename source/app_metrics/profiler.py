@@ -0,0 +1,466 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import cProfile
+import json
+import logging
+import multiprocessing
+import os
+import pstats
+import socket
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing.util import Finalize
+
+PROFILE_MODE_ENV = "PROFILE_MODE"
+PROFILE_MODE_META_KEY = "profile_mode"
+PROFILE_PARENT_JOB_ID_ENV = "PROFILE_PARENT_JOB_ID"
+PROFILE_MODE_CPROFILE = "cprofile"
+PROFILE_MODE_SAMPLING = "sampling"
+PROFILE_MODE_LIST = [PROFILE_MODE_CPROFILE, PROFILE_MODE_SAMPLING]
+PROFILE_SAMPLE_INTERVAL_SECONDS = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_SECONDS", 0.01))
+MAX_SAMPLED_STACK_DEPTH = 256
+# Functions kept per stored profile. The most expensive functions by self and by cumulative time are kept.
+MAX_STORED_FUNCTION_COUNT = 2000
+# Position of the sort keys in the statistics of a function.
+PROFILE_SORT_INDEX_DICT = {"calls": 0, "self_seconds": 1, "cumulative_seconds": 2}
+UNKNOWN_JOB_ID = "unknown"
+
+_active_profiler_dict = {}
+_sampler_thread_id_set = set()
+_process_accumulator = None
+_profiler_lock = threading.Lock()
+
+
+def get_function_key(filename, line_number, function_name):
+    return f"{filename}:{line_number}({function_name})"
+
+
+def merge_function_stats(target_dict, source_dict):
+    """
+    Adds the statistics of one profile to another.
+
+    :param target_dict: dict(str, list) - calls, self seconds and cumulative seconds by function key.
+    :param source_dict: dict(str, list) - statistics to add.
+
+    :return: dict(str, list) - the target dict.
+    """
+    for function_key, (calls, self_seconds, cumulative_seconds) in source_dict.items():
+        stats = target_dict.setdefault(function_key, [0, 0.0, 0.0])
+        stats[0] += calls
+        stats[1] += self_seconds
+        stats[2] += cumulative_seconds
+    return target_dict
+
+
+class DeterministicProfiler:
+    """
+    Wraps cProfile. Counts every call with exact timing, but only of the thread that starts the profiler and with
+    an overhead that can double the run time of call heavy code.
+    """
+    mode = PROFILE_MODE_CPROFILE
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.start_time = None
+        self.duration_seconds = 0.0
+
+    def start(self):
+        self.start_time = time.monotonic()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.duration_seconds = time.monotonic() - self.start_time
+
+    def get_function_stats(self):
+        function_stats = {}
+        for (filename, line_number, function_name), (_, calls, self_seconds, cumulative_seconds, _) \
+                in pstats.Stats(self.profile).stats.items():
+            function_stats[get_function_key(filename, line_number, function_name)] = [calls, self_seconds,
+                                                                                      cumulative_seconds]
+        return function_stats
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler. A daemon thread takes the stacks of all threads of the process every sample interval.
+    The top frame of a stack counts as self time, every function on the stack as cumulative time. The overhead
+    does not depend on the number of calls, so it can be used on production workloads. Calls are not counted.
+    """
+    mode = PROFILE_MODE_SAMPLING
+
+    def __init__(self, interval=PROFILE_SAMPLE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.sample_count = 0
+        self.self_count_dict = {}
+        self.cumulative_count_dict = {}
+        self.stop_event = threading.Event()
+        self.sampler_thread = None
+        self.start_time = None
+        self.duration_seconds = 0.0
+
+    def start(self):
+        self.start_time = time.monotonic()
+        self.sampler_thread = threading.Thread(target=self.run_sampler, name="profile-sampler", daemon=True)
+        self.sampler_thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.sampler_thread is not None:
+            self.sampler_thread.join()
+        self.duration_seconds = time.monotonic() - self.start_time
+
+    def run_sampler(self):
+        _sampler_thread_id_set.add(threading.get_ident())
+        try:
+            while not self.stop_event.wait(self.interval):
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id not in _sampler_thread_id_set:
+                        self.add_sample(frame)
+        finally:
+            _sampler_thread_id_set.discard(threading.get_ident())
+
+    def add_sample(self, frame):
+        """
+        :param frame: frame - the top frame of a thread stack.
+        """
+        self.sample_count += 1
+        top_key = get_function_key(frame.f_code.co_filename, frame.f_code.co_firstlineno, frame.f_code.co_name)
+        self.self_count_dict[top_key] = self.self_count_dict.get(top_key, 0) + 1
+        stack_key_set = set()
+        depth = 0
+        while frame is not None and depth < MAX_SAMPLED_STACK_DEPTH:
+            code = frame.f_code
+            stack_key_set.add(get_function_key(code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+            depth += 1
+        for function_key in stack_key_set:
+            self.cumulative_count_dict[function_key] = self.cumulative_count_dict.get(function_key, 0) + 1
+
+    def get_function_stats(self):
+        return {function_key: [0,
+                               self.self_count_dict.get(function_key, 0) * self.interval,
+                               cumulative_count * self.interval]
+                for function_key, cumulative_count in self.cumulative_count_dict.items()}
+
+
+def create_profiler(mode):
+    """
+    :param mode: str - one of PROFILE_MODE_LIST.
+
+    :return: class:'DeterministicProfiler' or class:'SamplingProfiler'
+    """
+    if mode == PROFILE_MODE_CPROFILE:
+        return DeterministicProfiler()
+    if mode == PROFILE_MODE_SAMPLING:
+        return SamplingProfiler()
+    raise ValueError(f"Invalid profile mode: {mode}. Must be one of {PROFILE_MODE_LIST}")
+
+
+def get_current_job_meta():
+    from processing.job_progress import get_current_rq_job
+    job = get_current_rq_job()
+    return (job.id, job.meta or {}) if job else (None, {})
+
+
+def get_profile_request():
+    """
+    Gets the profiling request of the current job. The mode is set per job by the mutation in the job meta-data or
+    for all jobs of a container with the environment variable PROFILE_MODE. The standalone python workers get the
+    mode and the job-ids of their job in the environment. Threads of a job do not see the rq job, so the request
+    is taken in the job thread and handed to the threads.
+
+    :return: dict or None - mode, job-id and parent job-id. None if profiling is off.
+    """
+    from processing.job_progress import JOB_PROGRESS_JOB_ID_ENV
+    job_id, meta = get_current_job_meta()
+    mode = (meta.get(PROFILE_MODE_META_KEY) or os.environ.get(PROFILE_MODE_ENV, "")).lower()
+    if mode not in PROFILE_MODE_LIST:
+        return None
+    if job_id:
+        return {"mode": mode, "job_id": job_id, "parent_job_id": meta.get("parent_job_id")}
+    return {"mode": mode,
+            "job_id": os.environ.get(JOB_PROGRESS_JOB_ID_ENV) or UNKNOWN_JOB_ID,
+            "parent_job_id": os.environ.get(PROFILE_PARENT_JOB_ID_ENV)}
+
+
+def create_profile_meta(profile_mode, **meta):
+    """
+    :param profile_mode: str or None - profile mode requested for a job.
+    :param meta: meta-data of the job.
+
+    :return: dict - meta-data of the job with the profile mode.
+    """
+    if profile_mode:
+        meta[PROFILE_MODE_META_KEY] = profile_mode
+    return meta
+
+
+def get_profile_environment(environment):
+    """
+    :param environment: dict(str, str) - environment of a subprocess.
+
+    :return: dict(str, str) - the environment with the profile mode and the parent job-id of the current job.
+    """
+    profile_request = get_profile_request()
+    if not profile_request:
+        return environment
+    profile_environment = dict(environment, **{PROFILE_MODE_ENV: profile_request["mode"]})
+    if profile_request["parent_job_id"]:
+        profile_environment[PROFILE_PARENT_JOB_ID_ENV] = profile_request["parent_job_id"]
+    return profile_environment
+
+
+def select_stored_functions(function_stats, max_count=MAX_STORED_FUNCTION_COUNT):
+    """
+    Limits the functions of a profile, so the stored file stays small. The top functions by self time and by
+    cumulative time are kept.
+
+    :param function_stats: dict(str, list) - calls, self seconds and cumulative seconds by function key.
+    :param max_count: int - maximal number of functions.
+
+    :return: dict(str, list) - the selected functions.
+    """
+    if len(function_stats) <= max_count:
+        return function_stats
+    half_count = max_count // 2
+    key_set = set(sorted(function_stats, key=lambda key: function_stats[key][1], reverse=True)[:half_count])
+    for function_key in sorted(function_stats, key=lambda key: function_stats[key][2], reverse=True):
+        if len(key_set) >= max_count:
+            break
+        key_set.add(function_key)
+    return {function_key: function_stats[function_key] for function_key in key_set}
+
+
+def store_job_profile(label, profile_request, function_stats, duration_seconds):
+    """
+    Stores a profile as class:'JsonFile' in GridFS and references it from a class:'JobProfile'. Errors are logged
+    and never fail the job.
+
+    :param label: str - name of the profiled code, for instance, the name of the job function.
+    :param profile_request: dict - mode, job-id and parent job-id of get_profile_request.
+    :param function_stats: dict(str, list) - calls, self seconds and cumulative seconds by function key.
+    :param duration_seconds: float - profiled wall time.
+    """
+    if not function_stats:
+        return
+    try:
+        from context.context_creator import create_app_context
+        from model import JsonFile, JobProfile
+        create_app_context()
+        stored_stats = select_stored_functions(function_stats)
+        profile_json = json.dumps({"job_id": profile_request["job_id"],
+                                   "label": label,
+                                   "mode": profile_request["mode"],
+                                   "function_list": [[function_key, *stats]
+                                                     for function_key, stats in stored_stats.items()]})
+        json_file = JsonFile(file=profile_json.encode("utf-8")).save()
+        JobProfile(job_id=profile_request["job_id"],
+                   parent_job_id=profile_request["parent_job_id"],
+                   label=label,
+                   profile_mode=profile_request["mode"],
+                   hostname=socket.gethostname(),
+                   pid=os.getpid(),
+                   duration_seconds=round(duration_seconds, 3),
+                   function_count=len(function_stats),
+                   profile_file_reference=json_file).save()
+        logging.info(f"Stored {profile_request['mode']} profile of {label} for job {profile_request['job_id']}.")
+    except Exception as err:
+        logging.warning(f"Could not store profile of {label}: {err}")
+
+
+class ProfileAccumulator:
+    """
+    Sums up the profiles of the tasks a pool process runs and stores them as one profile when the process exits.
+    Processes of a ProcessPoolExecutor end with os._exit, but run the finalizers of multiprocessing before.
+    """
+
+    def __init__(self, label, profile_request):
+        self.label = label
+        self.profile_request = profile_request
+        self.function_stats = {}
+        self.duration_seconds = 0.0
+        self.lock = threading.Lock()
+        self.finalizer = Finalize(self, self.store, exitpriority=10)
+
+    def add(self, function_stats, duration_seconds):
+        with self.lock:
+            merge_function_stats(self.function_stats, function_stats)
+            self.duration_seconds += duration_seconds
+
+    def store(self):
+        with self.lock:
+            function_stats, duration_seconds = self.function_stats, self.duration_seconds
+            self.function_stats, self.duration_seconds = {}, 0.0
+        store_job_profile(self.label, self.profile_request, function_stats, duration_seconds)
+
+
+def get_process_accumulator(label, profile_request):
+    """
+    :return: class:'ProfileAccumulator' - the accumulator of the pool process.
+    """
+    global _process_accumulator
+    with _profiler_lock:
+        if _process_accumulator is None:
+            _process_accumulator = ProfileAccumulator(label, profile_request)
+        return _process_accumulator
+
+
+def save_function_stats(label, profile_request, function_stats, duration_seconds):
+    """
+    Stores a profile directly or, in a process of a multiprocessing pool, adds it to the accumulator of the process,
+    so a pool stores one profile per process instead of one per task.
+    """
+    if multiprocessing.parent_process() is not None:
+        get_process_accumulator(label, profile_request).add(function_stats, duration_seconds)
+    else:
+        store_job_profile(label, profile_request, function_stats, duration_seconds)
+
+
+def save_profile(label, profile_request, profiler):
+    save_function_stats(label, profile_request, profiler.get_function_stats(), profiler.duration_seconds)
+
+
+def is_profiled(thread_id):
+    """
+    :return: bool - true if the thread runs in a profiler. A sampling profiler covers all threads of the process,
+    cProfile only the thread that started it.
+    """
+    return thread_id in _active_profiler_dict or any(profiler.mode == PROFILE_MODE_SAMPLING
+                                                     for profiler in _active_profiler_dict.values())
+
+
+@contextmanager
+def profile_job(label, profile_request=None, save_function=save_profile):
+    """
+    Profiles the code of the block if profiling is requested for the current job. Blocks in code that is already
+    profiled run in the outer profiler.
+
+    :param label: str - name of the profiled code.
+    :param profile_request: dict - request of get_profile_request. Defaults to the request of the current job.
+    :param save_function: function(str, dict, profiler) - called with the stopped profiler.
+
+    :return: profiler or None if nothing is profiled.
+    """
+    profile_request = profile_request or get_profile_request()
+    thread_id = threading.get_ident()
+    with _profiler_lock:
+        if not profile_request or is_profiled(thread_id):
+            profiler = None
+        else:
+            profiler = _active_profiler_dict[thread_id] = create_profiler(profile_request["mode"])
+    if profiler is None:
+        yield None
+        return
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        with _profiler_lock:
+            _active_profiler_dict.pop(thread_id, None)
+        try:
+            save_function(label, profile_request, profiler)
+        except Exception as err:
+            logging.warning(f"Could not save profile of {label}: {err}")
+
+
+def create_task_profile_path():
+    """
+    :return: str - path of a temporary file a forked task writes its profile to.
+    """
+    file_descriptor, path = tempfile.mkstemp(prefix="fmd_profile_", suffix=".json")
+    os.close(file_descriptor)
+    return path
+
+
+def write_task_profile(path):
+    """
+    :return: function(str, dict, profiler) - save function of profile_job that writes the profile to a file,
+    because forked tasks exit with os._exit.
+    """
+
+    def save_function(label, profile_request, profiler):
+        with open(path, "w", encoding="utf-8") as profile_file:
+            json.dump({"profile_request": profile_request,
+                       "function_stats": profiler.get_function_stats(),
+                       "duration_seconds": profiler.duration_seconds}, profile_file)
+
+    return save_function
+
+
+def collect_task_profile(label, path):
+    """
+    Adds the profile a forked task wrote to the profile of the process and removes the file.
+
+    :param label: str - name of the profiled code.
+    :param path: str - path of the profile file.
+    """
+    try:
+        if os.path.getsize(path) > 0:
+            with open(path, encoding="utf-8") as profile_file:
+                task_profile = json.load(profile_file)
+            save_function_stats(label, task_profile["profile_request"], task_profile["function_stats"],
+                                task_profile["duration_seconds"])
+    except Exception as err:
+        logging.warning(f"Could not collect task profile {path}: {err}")
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def get_job_profile_top_functions(job_id, limit=20, sort_by="self_seconds"):
+    """
+    Sums up all profiles of a job and of its shards by function.
+
+    :param job_id: str - id of the job or of the parent job of a sharded scan.
+    :param limit: int - number of functions.
+    :param sort_by: str - a key of PROFILE_SORT_INDEX_DICT.
+
+    :return: dict - the profiled processes and the top functions.
+    """
+    from mongoengine.queryset.visitor import Q
+    from model import JobProfile
+    if sort_by not in PROFILE_SORT_INDEX_DICT:
+        raise ValueError(f"Invalid sort key: {sort_by}. Must be one of {list(PROFILE_SORT_INDEX_DICT)}")
+    function_stats = {}
+    profile_list = []
+    for job_profile in JobProfile.objects(Q(job_id=job_id) | Q(parent_job_id=job_id)):
+        profile_json = json.loads(job_profile.profile_file_reference.fetch().file.read())
+        merge_function_stats(function_stats, {function_key: stats for function_key, *stats
+                                              in profile_json["function_list"]})
+        profile_list.append({"job_id": job_profile.job_id,
+                             "label": job_profile.label,
+                             "mode": job_profile.profile_mode,
+                             "hostname": job_profile.hostname,
+                             "pid": job_profile.pid,
+                             "duration_seconds": job_profile.duration_seconds})
+    sort_index = PROFILE_SORT_INDEX_DICT[sort_by]
+    top_list = sorted(function_stats.items(), key=lambda item: item[1][sort_index], reverse=True)[:limit]
+    return {"job_id": job_id,
+            "profile_list": profile_list,
+            "function_list": [{"function": function_key,
+                               "calls": calls,
+                               "self_seconds": round(self_seconds, 6),
+                               "cumulative_seconds": round(cumulative_seconds, 6)}
+                              for function_key, (calls, self_seconds, cumulative_seconds) in top_list]}
+
+
+def reset_after_fork():
+    """
+    The sampler thread and the accumulator of the parent do not belong to a forked process.
+    """
+    global _active_profiler_dict, _process_accumulator, _profiler_lock
+    _active_profiler_dict = {}
+    _sampler_thread_id_set.clear()
+    _process_accumulator = None
+    _profiler_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
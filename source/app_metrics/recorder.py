@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import atexit
+import collections
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from app_metrics.tracing import start_span
+
+METRICS_KEY_PREFIX = "fmd:metrics:"
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+METRICS_FLUSH_INTERVAL_SECONDS = 10.0
+METRIC_TYPE_COUNTER = "counter"
+METRIC_TYPE_HISTOGRAM = "histogram"
+FIELD_SEPARATOR = "|"
+BUCKET_PREFIX = "le:"
+INF_BUCKET = "+Inf"
+DURATION_BUCKET_LIST = [0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200, 21600]
+DATABASE_BUCKET_LIST = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 10]
+METRIC_DEFINITION_DICT = {
+    "fmd_import_stage_duration_seconds": {
+        "type": METRIC_TYPE_HISTOGRAM,
+        "help": "Duration of the stages of a firmware import.",
+        "label_names": ["stage"],
+        "bucket_list": DURATION_BUCKET_LIST,
+    },
+    "fmd_firmware_imports_total": {
+        "type": METRIC_TYPE_COUNTER,
+        "help": "Firmware imports by outcome.",
+        "label_names": ["outcome"],
+    },
+    "fmd_firmware_files_indexed_total": {
+        "type": METRIC_TYPE_COUNTER,
+        "help": "Firmware files indexed from the partitions.",
+        "label_names": [],
+    },
+    "fmd_extracted_bytes_total": {
+        "type": METRIC_TYPE_COUNTER,
+        "help": "Bytes of the files extracted from the partitions.",
+        "label_names": [],
+    },
+    "fmd_extraction_cache_requests_total": {
+        "type": METRIC_TYPE_COUNTER,
+        "help": "Lookups of already extracted partitions by result (hit or miss).",
+        "label_names": ["result"],
+    },
+    "fmd_scan_task_duration_seconds": {
+        "type": METRIC_TYPE_HISTOGRAM,
+        "help": "Wall time of scanner tasks by scanner and outcome.",
+        "label_names": ["scanner", "outcome"],
+        "bucket_list": DURATION_BUCKET_LIST,
+    },
+    "fmd_mongodb_operation_duration_seconds": {
+        "type": METRIC_TYPE_HISTOGRAM,
+        "help": "Duration of MongoDB commands by command and collection.",
+        "label_names": ["command", "collection"],
+        "bucket_list": DATABASE_BUCKET_LIST,
+    },
+}
+
+
+def get_metric_key(name):
+    return f"{METRICS_KEY_PREFIX}{name}"
+
+
+def get_label_field(label_values, suffix):
+    """
+    :param label_values: tuple(str) - values of the labels in the order of the metric definition.
+    :param suffix: str - "value" for counters, "sum", "count" or a bucket for histograms.
+
+    :return: str - field of the metric hash.
+    """
+    return f"{json.dumps(list(label_values))}{FIELD_SEPARATOR}{suffix}"
+
+
+def get_bucket_suffix(bucket_list, value):
+    """
+    :return: str - suffix of the smallest bucket the value fits in. The buckets are stored non-cumulative and
+    summed up when they are collected.
+    """
+    for bucket in bucket_list:
+        if value <= bucket:
+            return f"{BUCKET_PREFIX}{bucket}"
+    return f"{BUCKET_PREFIX}{INF_BUCKET}"
+
+
+def get_metrics_connection():
+    """
+    :return: redis connection - the connection of the current rq job or a connection from the queue settings.
+    """
+    from processing.job_progress import get_current_rq_job, get_redis_connection
+    job = get_current_rq_job()
+    return job.connection if job else get_redis_connection()
+
+
+class MetricRecorder:
+    """
+    Sums up metrics in memory and adds them to one redis hash per metric with HINCRBY in one pipeline every flush
+    interval. Rq work horses, the standalone python workers and their process pools all write into the same
+    hashes, so the webserver can expose the metrics of every process without shared files. Errors of redis are
+    logged and never fail the caller.
+    """
+
+    def __init__(self, connection_factory=get_metrics_connection, flush_interval=METRICS_FLUSH_INTERVAL_SECONDS):
+        self.pid = os.getpid()
+        self.connection_factory = connection_factory
+        self.connection = None
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.count_dict = collections.defaultdict(int)
+        self.sum_dict = collections.defaultdict(float)
+        self.flush_thread = None
+
+    def increment(self, name, value=1, **labels):
+        label_values = self.get_label_values(name, labels)
+        with self.lock:
+            self.count_dict[(name, get_label_field(label_values, "value"))] += value
+        self.ensure_flusher()
+
+    def observe(self, name, value, **labels):
+        label_values = self.get_label_values(name, labels)
+        bucket_suffix = get_bucket_suffix(METRIC_DEFINITION_DICT[name]["bucket_list"], value)
+        with self.lock:
+            self.count_dict[(name, get_label_field(label_values, bucket_suffix))] += 1
+            self.count_dict[(name, get_label_field(label_values, "count"))] += 1
+            self.sum_dict[(name, get_label_field(label_values, "sum"))] += value
+        self.ensure_flusher()
+
+    @staticmethod
+    def get_label_values(name, labels):
+        return tuple(str(labels.get(label_name, "")) for label_name in METRIC_DEFINITION_DICT[name]["label_names"])
+
+    def ensure_flusher(self):
+        if self.flush_thread is None or not self.flush_thread.is_alive():
+            with self.lock:
+                if self.flush_thread is None or not self.flush_thread.is_alive():
+                    self.flush_thread = threading.Thread(target=self.run_flusher,
+                                                         name="metric-flusher",
+                                                         daemon=True)
+                    self.flush_thread.start()
+
+    def run_flusher(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """
+        Sends the collected metrics to redis. The metrics are kept if redis can not be reached.
+        """
+        with self.lock:
+            count_dict = self.count_dict
+            sum_dict = self.sum_dict
+            self.count_dict = collections.defaultdict(int)
+            self.sum_dict = collections.defaultdict(float)
+        if not count_dict and not sum_dict:
+            return
+        try:
+            if self.connection is None:
+                self.connection = self.connection_factory()
+            pipeline = self.connection.pipeline(transaction=False)
+            for (name, field), value in count_dict.items():
+                pipeline.hincrby(get_metric_key(name), field, value)
+            for (name, field), value in sum_dict.items():
+                pipeline.hincrbyfloat(get_metric_key(name), field, value)
+            pipeline.execute()
+        except Exception as err:
+            logging.debug(f"Could not write metrics: {err}")
+            with self.lock:
+                for key, value in count_dict.items():
+                    self.count_dict[key] += value
+                for key, value in sum_dict.items():
+                    self.sum_dict[key] += value
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_metric_recorder():
+    """
+    :return: class:'MetricRecorder' - the recorder of the process.
+    """
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = MetricRecorder()
+    return _recorder
+
+
+def reset_after_fork():
+    """
+    Forked processes do not inherit the recorder, so metrics of the parent that are not flushed yet are not
+    counted twice and the child starts its own flush thread.
+    """
+    global _recorder, _recorder_lock
+    _recorder = None
+    _recorder_lock = threading.Lock()
+
+
+def increment_counter(name, value=1, **labels):
+    """
+    :param name: str - name of a counter in METRIC_DEFINITION_DICT.
+    :param value: int - amount to add.
+    :param labels: label values of the metric.
+    """
+    if METRICS_ENABLED:
+        get_metric_recorder().increment(name, value, **labels)
+
+
+def observe_histogram(name, value, **labels):
+    """
+    :param name: str - name of a histogram in METRIC_DEFINITION_DICT.
+    :param value: float - the observed value.
+    :param labels: label values of the metric.
+    """
+    if METRICS_ENABLED:
+        get_metric_recorder().observe(name, value, **labels)
+
+
+@contextmanager
+def time_import_stage(stage, **attributes):
+    """
+    Measures the duration of a firmware import stage and traces it as span. Failed stages are measured as well.
+
+    :param stage: str - name of the stage, for instance, "extract".
+    :param attributes: attributes of the span.
+
+    :return: class:'Span'
+    """
+    start_time = time.monotonic()
+    try:
+        with start_span(stage, **attributes) as span:
+            yield span
+    finally:
+        observe_histogram("fmd_import_stage_duration_seconds", time.monotonic() - start_time, stage=stage)
+
+
+def flush_metrics():
+    """
+    Writes the metrics of the process. Rq work horses and forked children end with os._exit, so they have to flush
+    before they exit.
+    """
+    if _recorder is not None:
+        _recorder.flush()
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+atexit.register(flush_metrics)
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import contextvars
+import fcntl
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+TRACE_EXPORT_PATH = os.environ.get("TRACE_EXPORT_PATH", "")
+TRACE_SERVICE_NAME = "firmwaredroid"
+TRACE_SCOPE_NAME = "firmwaredroid.pipeline"
+MAX_SPANS_PER_TRACE = 10000
+SPAN_KIND_INTERNAL = 1
+STATUS_CODE_OK = 1
+STATUS_CODE_ERROR = 2
+
+_current_span = contextvars.ContextVar("fmd_current_span", default=None)
+_export_lock = threading.Lock()
+
+
+class Trace:
+    """
+    Collects the finished spans of one trace. The number of spans is limited, so a firmware with thousands of images
+    does not keep an unbounded list in memory.
+    """
+
+    def __init__(self):
+        self.trace_id = secrets.token_hex(16)
+        self.span_list = []
+        self.dropped_count = 0
+        self.lock = threading.Lock()
+
+    def add(self, span):
+        with self.lock:
+            if len(self.span_list) < MAX_SPANS_PER_TRACE:
+                self.span_list.append(span)
+            else:
+                self.dropped_count += 1
+
+    def get_child_span_list(self, span):
+        with self.lock:
+            return [child for child in self.span_list if child.parent_span_id == span.span_id]
+
+
+class Span:
+    def __init__(self, name, trace, parent=None, attributes=None):
+        self.name = name
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.event_list = []
+        self.status_code = STATUS_CODE_OK
+        self.status_message = ""
+        self.start_time_ns = time.time_ns()
+        self.start_monotonic = time.monotonic()
+        self.end_time_ns = None
+        self.duration_seconds = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def record_exception(self, error):
+        self.status_code = STATUS_CODE_ERROR
+        self.status_message = str(error)
+        self.event_list.append({"name": "exception",
+                                "time_ns": time.time_ns(),
+                                "attributes": {"exception.type": type(error).__name__,
+                                               "exception.message": str(error)}})
+
+    def end(self):
+        self.duration_seconds = time.monotonic() - self.start_monotonic
+        self.end_time_ns = self.start_time_ns + int(self.duration_seconds * 1e9)
+
+    def get_elapsed_seconds(self):
+        return self.duration_seconds if self.duration_seconds is not None \
+            else time.monotonic() - self.start_monotonic
+
+
+def get_current_span():
+    """
+    :return: class:'Span' or None - the innermost open span of the thread.
+    """
+    return _current_span.get()
+
+
+@contextmanager
+def start_span(name, **attributes):
+    """
+    Opens a span as child of the current span of the thread. A span without parent starts a new trace, which is
+    exported to TRACE_EXPORT_PATH when the span ends. Exceptions are recorded on the span and raised again.
+
+    :param name: str - name of the span, for instance, "index_partitions".
+    :param attributes: attributes of the span, for instance, partition="system".
+
+    :return: class:'Span'
+    """
+    parent = _current_span.get()
+    trace = parent.trace if parent else Trace()
+    span = Span(name, trace, parent, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as err:
+        span.record_exception(err)
+        raise
+    finally:
+        span.end()
+        _current_span.reset(token)
+        trace.add(span)
+        if parent is None:
+            export_trace(trace)
+
+
+def get_timing_summary(span):
+    """
+    Sums up the duration of the direct children of a span by name. Children that have not ended are not counted.
+
+    :param span: class:'Span'
+
+    :return: dict - total seconds of the span and seconds per child name.
+    """
+    stage_dict = {}
+    for child in span.trace.get_child_span_list(span):
+        stage_dict[child.name] = round(stage_dict.get(child.name, 0) + child.duration_seconds, 3)
+    return {"total_seconds": round(span.get_elapsed_seconds(), 3),
+            "stage_seconds": stage_dict,
+            "trace_id": span.trace.trace_id}
+
+
+def create_otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def create_otlp_attributes(attribute_dict):
+    return [{"key": key, "value": create_otlp_value(value)} for key, value in attribute_dict.items()
+            if value is not None]
+
+
+def create_otlp_span(span):
+    otlp_span = {"traceId": span.trace.trace_id,
+                 "spanId": span.span_id,
+                 "name": span.name,
+                 "kind": SPAN_KIND_INTERNAL,
+                 "startTimeUnixNano": str(span.start_time_ns),
+                 "endTimeUnixNano": str(span.end_time_ns),
+                 "attributes": create_otlp_attributes(span.attributes),
+                 "events": [{"name": event["name"],
+                             "timeUnixNano": str(event["time_ns"]),
+                             "attributes": create_otlp_attributes(event["attributes"])}
+                            for event in span.event_list],
+                 "status": {"code": span.status_code, "message": span.status_message}}
+    if span.parent_span_id:
+        otlp_span["parentSpanId"] = span.parent_span_id
+    return otlp_span
+
+
+def create_otlp_request(trace):
+    """
+    :param trace: class:'Trace'
+
+    :return: dict - the spans of the trace as OTLP/JSON ExportTraceServiceRequest.
+    """
+    resource_attribute_dict = {"service.name": TRACE_SERVICE_NAME,
+                               "host.name": os.environ.get("HOSTNAME", ""),
+                               "process.pid": os.getpid(),
+                               "fmd.dropped_span_count": trace.dropped_count}
+    return {"resourceSpans": [{
+        "resource": {"attributes": create_otlp_attributes(resource_attribute_dict)},
+        "scopeSpans": [{"scope": {"name": TRACE_SCOPE_NAME},
+                        "spans": [create_otlp_span(span) for span in trace.span_list]}]
+    }]}
+
+
+def export_trace(trace, export_path=None):
+    """
+    Appends the trace as one line of OTLP/JSON to the export file. The file can be read by the otlpjsonfile receiver
+    of the OpenTelemetry collector. The file is locked while the line is written, because several workers share it.
+
+    :param trace: class:'Trace'
+    :param export_path: str - path of the file. Defaults to TRACE_EXPORT_PATH. Nothing is exported if it is empty.
+    """
+    export_path = export_path or TRACE_EXPORT_PATH
+    if not export_path:
+        return
+    try:
+        line = json.dumps(create_otlp_request(trace), separators=(",", ":")) + "\n"
+        os.makedirs(os.path.dirname(os.path.abspath(export_path)), exist_ok=True)
+        with _export_lock, open(export_path, "a", encoding="utf-8") as export_file:
+            fcntl.flock(export_file, fcntl.LOCK_EX)
+            try:
+                export_file.write(line)
+                export_file.flush()
+            finally:
+                fcntl.flock(export_file, fcntl.LOCK_UN)
+    except Exception as err:
+        logging.warning(f"Could not export trace {trace.trace_id}: {err}")
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+from django.urls import path
+from .views import metrics_view
+
+urlpatterns = [
+    path("metrics", metrics_view),
+]
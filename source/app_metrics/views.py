@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import hmac
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import require_GET
+from app_metrics.collector import PipelineMetricCollector
+
+_registry = None
+
+
+def get_registry():
+    """
+    :return: class:'CollectorRegistry' - registry with the pipeline collector. The default registry is not used, so
+    the metrics of the webserver process itself are not mixed into the metrics of the pipeline.
+    """
+    global _registry
+    if _registry is None:
+        from prometheus_client import CollectorRegistry
+        registry = CollectorRegistry(auto_describe=False)
+        registry.register(PipelineMetricCollector())
+        _registry = registry
+    return _registry
+
+
+def is_authorized(request):
+    expected_header = f"Bearer {settings.METRICS_AUTH_TOKEN}"
+    return hmac.compare_digest(request.headers.get("Authorization", ""), expected_header)
+
+
+@require_GET
+def metrics_view(request):
+    """
+    Exposes the metrics of the processing pipeline in the Prometheus text format. The endpoint does not exist if no
+    token is configured and needs the token as bearer token otherwise.
+    """
+    if not settings.METRICS_AUTH_TOKEN:
+        raise Http404()
+    if not is_authorized(request):
+        return HttpResponse(status=401)
+    from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,551 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import argparse
+import datetime
+import importlib
+import json
+import logging
+import os
+import platform
+import re
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from benchmark.synthetic_firmware import (SCENARIO_DICT, FIRMWARE_FORMAT_LIST, get_scenario, get_tree_size,
+                                          create_synthetic_firmware)
+
+STAGE_HASHING = "hashing"
+STAGE_EXTRACTION = "extraction"
+STAGE_INDEXER = "indexer"
+STAGE_IMPORTER = "importer"
+STAGE_SCANNER = "scanner"
+STAGE_LIST = [STAGE_HASHING, STAGE_EXTRACTION, STAGE_INDEXER, STAGE_IMPORTER, STAGE_SCANNER]
+STATUS_OK = "ok"
+STATUS_SKIPPED = "skipped"
+STATUS_FAILED = "failed"
+STATUS_TIMEOUT = "timeout"
+MONGOMOCK_URI_PREFIX = "mongomock://"
+DEFAULT_MONGO_URI = "mongomock://localhost"
+DEFAULT_DB_NAME = "fmd_benchmark"
+DEFAULT_STAGE_TIMEOUT = 60 * 60
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_MEMORY_TOLERANCE = 0.25
+RESULT_FORMAT_VERSION = 1
+# Scanner stages run the worker function of the scanner module in the benchmark process instead of a separate
+# interpreter, so they can use the same database connection.
+SCANNER_WORKER_DICT = {
+    "manifest_parser": ("static_analysis.ManifestParser.android_manifest_parser",
+                        "manifest_parser_worker_multiprocessing"),
+    "androguard": ("static_analysis.AndroGuard.androguard_wrapper",
+                   "androguard_worker_multiprocessing"),
+}
+
+
+class StageSkipped(Exception):
+    """
+    Raised by a stage that can not run in the current environment, for instance, if a scanner is not installed.
+    """
+    pass
+
+
+def connect_database(mongo_uri, db_name):
+    """
+    Connects the process to the benchmark database and drops its content, so every stage starts empty.
+
+    :param mongo_uri: str - uri of a local mongod or "mongomock://" for an in-memory database.
+    :param db_name: str - name of the database.
+    """
+    from database.connector import init_db, init_mock_db
+    if mongo_uri.startswith(MONGOMOCK_URI_PREFIX):
+        try:
+            client = init_mock_db(db_name)
+        except ImportError as err:
+            raise StageSkipped(f"mongomock is not installed: {err}")
+    else:
+        client = init_db({"host": mongo_uri, "db": db_name})
+    client.drop_database(db_name)
+
+
+def get_archive_size(context):
+    return sum(os.path.getsize(path) for path in context["firmware"]["archive_dict"].values())
+
+
+def run_hashing_stage(context):
+    """
+    Creates the checksums of the firmware archives as the importer does.
+    """
+    from hashing.standard_hash_generator import md5_from_file, sha1_from_file, sha256_from_file
+    archive_path_list = list(context["firmware"]["archive_dict"].values())
+    start_time = time.monotonic()
+    for archive_path in archive_path_list:
+        md5_from_file(archive_path)
+        sha1_from_file(archive_path)
+        sha256_from_file(archive_path)
+    return {"duration_seconds": time.monotonic() - start_time,
+            "item_count": len(archive_path_list),
+            "byte_count": get_archive_size(context)}
+
+
+def find_partition_images(search_dir):
+    """
+    :return: list(tuple(str, str)) - partition name and path of the partition images in the folder.
+    """
+    from firmware_handler.const_regex_patterns import EXT_IMAGE_PATTERNS_DICT
+    image_list = []
+    for root, _, file_list in os.walk(search_dir):
+        for file_name in sorted(file_list):
+            for partition_name, pattern_list in EXT_IMAGE_PATTERNS_DICT.items():
+                if any(re.search(pattern, file_name) for pattern in pattern_list):
+                    image_list.append((partition_name, os.path.join(root, file_name)))
+                    break
+    return image_list
+
+
+def extract_partition_image(partition_name, image_path, destination_dir):
+    """
+    Extracts a partition image like the second layer of the importer, without indexing the files.
+    """
+    from extractor.expand_archives import extract_image_file
+    from extractor.lpunpack_extractor import lpunpack_extractor
+    if partition_name == "super":
+        super_dir = tempfile.mkdtemp(dir=destination_dir, prefix="fmd_extract_super_")
+        if not lpunpack_extractor(image_path, super_dir):
+            raise RuntimeError(f"Could not unpack super image: {image_path}")
+        for logical_partition_name, logical_image_path in find_partition_images(super_dir):
+            extract_partition_image(logical_partition_name, logical_image_path,
+                                    tempfile.mkdtemp(dir=destination_dir, prefix=f"{logical_partition_name}_"))
+    else:
+        extract_image_file(image_path, destination_dir)
+
+
+def run_extraction_stage(context):
+    """
+    Extracts the firmware archives and the partition images they contain.
+    """
+    from extractor.expand_archives import extract_first_layer
+    failed_count = 0
+    byte_count = 0
+    extracted_byte_count = 0
+    duration_seconds = 0
+    for firmware_format, archive_path in context["firmware"]["archive_dict"].items():
+        extract_dir = tempfile.mkdtemp(dir=context["work_dir"], prefix=f"extract_{firmware_format}_")
+        start_time = time.monotonic()
+        try:
+            extract_first_layer(archive_path, extract_dir)
+            image_list = find_partition_images(extract_dir)
+            if not image_list:
+                raise RuntimeError(f"No partition image found in {archive_path}")
+            for partition_name, image_path in image_list:
+                extract_partition_image(partition_name, image_path,
+                                        tempfile.mkdtemp(dir=extract_dir, prefix=f"{partition_name}_"))
+            byte_count += os.path.getsize(archive_path)
+        except Exception as err:
+            logging.error(f"Extraction of {firmware_format} archive failed: {err}")
+            failed_count += 1
+        duration_seconds += time.monotonic() - start_time
+        extracted_byte_count += get_tree_size(extract_dir)["byte_count"]
+        shutil.rmtree(extract_dir, ignore_errors=True)
+    return {"duration_seconds": duration_seconds,
+            "item_count": len(context["firmware"]["archive_dict"]),
+            "byte_count": byte_count,
+            "failed_count": failed_count,
+            "extracted_byte_count": extracted_byte_count}
+
+
+def run_indexer_stage(context):
+    """
+    Indexes the partition folders and stores a class:'FirmwareFile' for every file and folder.
+    """
+    from firmware_handler.firmware_file_indexer import create_firmware_file_list
+    connect_database(context["mongo_uri"], context["db_name"])
+    file_count = 0
+    start_time = time.monotonic()
+    for partition_name, partition_dir in context["firmware"]["partition_dir_dict"].items():
+        file_count += len(create_firmware_file_list(partition_dir, partition_name))
+    return {"duration_seconds": time.monotonic() - start_time,
+            "item_count": file_count,
+            "byte_count": context["firmware"]["content_size"]["byte_count"]}
+
+
+def run_importer_stage(context):
+    """
+    Imports every firmware archive into a store of the work folder.
+    """
+    from firmware_handler.firmware_importer import import_firmware
+    from hashing.standard_hash_generator import md5_from_file
+    from model import AndroidFirmware
+    from model.StoreSetting import create_file_store_setting
+    connect_database(context["mongo_uri"], context["db_name"])
+    store_setting = create_file_store_setting(docker_root_folder=os.path.join(context["work_dir"], ""),
+                                              storage_folder="importer_store",
+                                              is_active=True)
+    store_paths = store_setting.get_store_paths()
+    # The importer moves the archives, so it works on copies.
+    import_list = []
+    for archive_path in context["firmware"]["archive_dict"].values():
+        import_path = os.path.join(store_paths["FIRMWARE_FOLDER_IMPORT"], os.path.basename(archive_path))
+        shutil.copy(archive_path, import_path)
+        import_list.append((import_path, md5_from_file(import_path), os.path.getsize(import_path)))
+    start_time = time.monotonic()
+    for import_path, md5, _ in import_list:
+        import_firmware(original_filename=os.path.basename(import_path),
+                        md5=md5,
+                        firmware_archive_file_path=import_path,
+                        create_fuzzy_hashes=False,
+                        store_paths=store_paths,
+                        keep_files_on_disk=False)
+    duration_seconds = time.monotonic() - start_time
+    imported_md5_set = set(AndroidFirmware.objects(md5__in=[md5 for _, md5, _ in import_list]).distinct("md5"))
+    return {"duration_seconds": duration_seconds,
+            "item_count": len(import_list),
+            "byte_count": sum(size for _, md5, size in import_list if md5 in imported_md5_set),
+            "failed_count": len(import_list) - len(imported_md5_set)}
+
+
+def create_benchmark_apps(partition_dir_dict):
+    """
+    Stores a class:'AndroidApp' for every apk of the partition folders.
+
+    :return: list(class:'AndroidApp') - the stored apps.
+    """
+    from android_app_importer.android_app_import import create_android_app
+    android_app_list = []
+    for partition_name, partition_dir in partition_dir_dict.items():
+        for root, _, file_list in os.walk(partition_dir):
+            for file_name in sorted(file_list):
+                if not file_name.endswith(".apk"):
+                    continue
+                apk_path = os.path.join(root, file_name)
+                android_app = create_android_app(filename=file_name,
+                                                 relative_firmware_path=os.path.relpath(root, partition_dir),
+                                                 firmware_mount_path=partition_dir,
+                                                 apk_abs_path=apk_path,
+                                                 partition_name=partition_name)
+                android_app.absolute_store_path = apk_path
+                android_app.save()
+                android_app_list.append(android_app)
+    return android_app_list
+
+
+def run_scanner_stage(context):
+    """
+    Scans the synthetic apks with the worker functions of the selected scanners.
+    """
+    worker_function_list = []
+    for scanner_name in context["scanner_list"]:
+        if scanner_name not in SCANNER_WORKER_DICT:
+            raise ValueError(f"Unknown scanner {scanner_name}. Valid scanners: {list(SCANNER_WORKER_DICT.keys())}")
+        module_name, function_name = SCANNER_WORKER_DICT[scanner_name]
+        try:
+            worker_function_list.append(getattr(importlib.import_module(module_name), function_name))
+        except ImportError as err:
+            raise StageSkipped(f"Scanner {scanner_name} is not installed in this environment: {err}")
+    connect_database(context["mongo_uri"], context["db_name"])
+    android_app_list = create_benchmark_apps(context["firmware"]["partition_dir_dict"])
+    start_time = time.monotonic()
+    for worker_function in worker_function_list:
+        for android_app in android_app_list:
+            worker_function(str(android_app.id))
+    return {"duration_seconds": time.monotonic() - start_time,
+            "item_count": len(android_app_list) * len(worker_function_list),
+            "byte_count": sum(android_app.file_size_bytes for android_app in android_app_list)
+                          * len(worker_function_list)}
+
+
+STAGE_FUNCTION_DICT = {
+    STAGE_HASHING: run_hashing_stage,
+    STAGE_EXTRACTION: run_extraction_stage,
+    STAGE_INDEXER: run_indexer_stage,
+    STAGE_IMPORTER: run_importer_stage,
+    STAGE_SCANNER: run_scanner_stage,
+}
+
+
+def get_stage_status(stage_result):
+    """
+    A stage in which every item failed did not measure the pipeline, for instance, because an extraction tool is
+    missing on the host, so it is not reported as ok.
+
+    :param stage_result: dict - result of a stage function.
+
+    :return: str - STATUS_OK or STATUS_FAILED.
+    """
+    failed_count = stage_result.get("failed_count", 0)
+    if failed_count > 0 and failed_count >= stage_result["item_count"]:
+        return STATUS_FAILED
+    return STATUS_OK
+
+
+def run_stage_child(stage_function, context, result_path):
+    """
+    Runs a stage in the forked child process and writes its result to a file for the parent.
+    """
+    try:
+        stage_result = stage_function(context)
+        stage_result["status"] = get_stage_status(stage_result)
+        if stage_result["status"] == STATUS_FAILED:
+            stage_result["reason"] = f"All {stage_result['item_count']} items failed."
+    except StageSkipped as err:
+        logging.warning(f"Stage {stage_function.__name__} skipped: {err}")
+        stage_result = {"status": STATUS_SKIPPED, "reason": str(err)}
+    except Exception as err:
+        stage_result = {"status": STATUS_FAILED, "reason": str(err)}
+        raise
+    finally:
+        with open(result_path, "w") as result_file:
+            json.dump(stage_result, result_file)
+
+
+def run_stage_once(stage_name, context, timeout):
+    """
+    Runs a stage in a forked child process, so the peak memory and cpu time of the stage and the tools it starts
+    are measured separately from the other stages.
+
+    :param stage_name: str - one of STAGE_LIST.
+    :param context: dict - the synthetic firmware and the settings of the run.
+    :param timeout: int - seconds until the stage is killed.
+
+    :return: dict - status, duration, processed items and bytes and resource usage of the stage.
+    """
+    from processing.task_harness import run_in_child_process, wait_for_child_process
+    result_path = os.path.join(context["work_dir"], f"{stage_name}_result.json")
+    if os.path.exists(result_path):
+        os.remove(result_path)
+    pid = run_in_child_process(run_stage_child, STAGE_FUNCTION_DICT[stage_name], [context, result_path])
+    exit_code, rusage, is_timeout = wait_for_child_process(pid, timeout)
+    stage_result = {}
+    if os.path.exists(result_path):
+        with open(result_path, "r") as result_file:
+            stage_result = json.load(result_file)
+    if is_timeout:
+        stage_result["status"] = STATUS_TIMEOUT
+    elif exit_code != 0 or not stage_result:
+        stage_result["status"] = STATUS_FAILED
+        stage_result["exit_code"] = exit_code
+    # ru_maxrss is in kilobytes on Linux.
+    stage_result["peak_rss_mb"] = round(rusage.ru_maxrss / 1024, 1)
+    stage_result["cpu_seconds"] = round(rusage.ru_utime + rusage.ru_stime, 3)
+    return stage_result
+
+
+def summarize_stage_runs(stage_run_list):
+    """
+    Combines the repetitions of a stage. Durations are summarized by the median and memory by the maximum. The
+    throughput only counts the items and bytes that were processed without error.
+
+    :param stage_run_list: list(dict) - results of run_stage_once.
+
+    :return: dict - the result of the stage with throughput.
+    """
+    failed_run_list = [run for run in stage_run_list if run["status"] != STATUS_OK]
+    if failed_run_list:
+        return failed_run_list[0]
+    duration_seconds = statistics.median(run["duration_seconds"] for run in stage_run_list)
+    summary = dict(stage_run_list[0])
+    summary.update({
+        "duration_seconds": round(duration_seconds, 3),
+        "duration_list": [round(run["duration_seconds"], 3) for run in stage_run_list],
+        "cpu_seconds": statistics.median(run["cpu_seconds"] for run in stage_run_list),
+        "peak_rss_mb": max(run["peak_rss_mb"] for run in stage_run_list),
+        "items_per_second": round((summary["item_count"] - summary.get("failed_count", 0)) / duration_seconds, 3)
+        if duration_seconds else None,
+        "megabytes_per_second": round(summary["byte_count"] / (1024 * 1024) / duration_seconds, 3)
+        if duration_seconds else None,
+    })
+    return summary
+
+
+def compare_with_baseline(result, baseline, tolerance=DEFAULT_TOLERANCE, memory_tolerance=DEFAULT_MEMORY_TOLERANCE):
+    """
+    Compares the stages of a benchmark result with a stored baseline.
+
+    :param result: dict - result of run_benchmark.
+    :param baseline: dict - result of an earlier run with the same scenario and seed.
+    :param tolerance: float - allowed relative increase of the duration, for instance, 0.25 for 25%.
+    :param memory_tolerance: float - allowed relative increase of the peak memory.
+
+    :raises: ValueError - if the result and the baseline did not use the same synthetic firmware.
+
+    :return: list(str) - descriptions of the regressions. Empty if there is none.
+    """
+    for key in ["scenario", "seed"]:
+        if result[key] != baseline[key]:
+            raise ValueError(f"Baseline is not comparable: {key} is {baseline[key]} instead of {result[key]}")
+    regression_list = []
+    for stage_name, baseline_stage in baseline["stages"].items():
+        stage = result["stages"].get(stage_name)
+        if stage is None or baseline_stage["status"] != STATUS_OK or stage["status"] == STATUS_SKIPPED:
+            continue
+        if stage["status"] != STATUS_OK:
+            regression_list.append(f"{stage_name}: status {stage['status']}")
+            continue
+        max_duration = baseline_stage["duration_seconds"] * (1 + tolerance)
+        if stage["duration_seconds"] > max_duration:
+            regression_list.append(f"{stage_name}: duration {stage['duration_seconds']}s exceeds "
+                                   f"{baseline_stage['duration_seconds']}s by more than {tolerance:.0%}")
+        max_peak_rss = baseline_stage["peak_rss_mb"] * (1 + memory_tolerance)
+        if stage["peak_rss_mb"] > max_peak_rss:
+            regression_list.append(f"{stage_name}: peak memory {stage['peak_rss_mb']}MB exceeds "
+                                   f"{baseline_stage['peak_rss_mb']}MB by more than {memory_tolerance:.0%}")
+        if stage.get("failed_count", 0) > baseline_stage.get("failed_count", 0):
+            regression_list.append(f"{stage_name}: {stage['failed_count']} failed items instead of "
+                                   f"{baseline_stage.get('failed_count', 0)}")
+    return regression_list
+
+
+def run_benchmark(scenario_name, seed, work_dir, stage_list=None, firmware_format_list=None,
+                  mongo_uri=DEFAULT_MONGO_URI, db_name=DEFAULT_DB_NAME, scanner_list=None, repeat=1,
+                  timeout=DEFAULT_STAGE_TIMEOUT, **scenario_overrides):
+    """
+    Creates the synthetic firmware and runs the selected stages against it.
+
+    :param scenario_name: str - key of SCENARIO_DICT.
+    :param seed: int - seed of the synthetic firmware.
+    :param work_dir: str - folder for the synthetic firmware and the stage outputs.
+    :param stage_list: list(str) - stages to run. Defaults to STAGE_LIST.
+    :param firmware_format_list: list(str) - formats of the archives. Defaults to FIRMWARE_FORMAT_LIST.
+    :param mongo_uri: str - uri of a local mongod or "mongomock://" for an in-memory database. The database is
+    dropped by every stage that uses it.
+    :param db_name: str - name of the benchmark database.
+    :param scanner_list: list(str) - keys of SCANNER_WORKER_DICT the scanner stage runs.
+    :param repeat: int - number of runs of every stage.
+    :param timeout: int - seconds until a stage run is killed.
+    :param scenario_overrides: values that replace the ones of the scenario, for instance, file_count=10.
+
+    :return: dict - the environment, the synthetic input and the result of every stage.
+    """
+    stage_list = stage_list or STAGE_LIST
+    scenario = get_scenario(scenario_name, **scenario_overrides)
+    start_time = time.monotonic()
+    firmware = create_synthetic_firmware(os.path.join(work_dir, "firmware"), scenario, seed, firmware_format_list)
+    generation_seconds = time.monotonic() - start_time
+    context = {"work_dir": work_dir,
+               "firmware": firmware,
+               "mongo_uri": mongo_uri,
+               "db_name": db_name,
+               "scanner_list": scanner_list or ["manifest_parser"]}
+    stage_dict = {}
+    for stage_name in stage_list:
+        logging.info(f"Running benchmark stage {stage_name}")
+        stage_run_list = []
+        for _ in range(repeat):
+            stage_run = run_stage_once(stage_name, context, timeout)
+            stage_run_list.append(stage_run)
+            if stage_run["status"] != STATUS_OK:
+                break
+        stage_dict[stage_name] = summarize_stage_runs(stage_run_list)
+    return {"format_version": RESULT_FORMAT_VERSION,
+            "create_date": datetime.datetime.now().isoformat(),
+            "hostname": socket.gethostname(),
+            "platform": platform.platform(),
+            "python_version": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "scenario": scenario,
+            "seed": seed,
+            "database": "mongomock" if mongo_uri.startswith(MONGOMOCK_URI_PREFIX) else "mongod",
+            "input": {"archive_size_dict": {firmware_format: os.path.getsize(path)
+                                            for firmware_format, path in firmware["archive_dict"].items()},
+                      "skipped_format_dict": firmware["skipped_format_dict"],
+                      "content_size": firmware["content_size"],
+                      "generation_seconds": round(generation_seconds, 3)},
+            "stages": stage_dict}
+
+
+def write_json(data, file_path):
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    with open(file_path, "w") as json_file:
+        json.dump(data, json_file, indent=2, sort_keys=True)
+
+
+def main():
+    """
+    Command-line interface of the benchmarks. Exits with 1 if a stage regressed against the baseline.
+    """
+    parser = argparse.ArgumentParser(prog="benchmark_runner",
+                                     description="Runs the import pipeline against synthetic firmware and compares "
+                                                 "throughput and peak memory with a baseline.")
+    parser.add_argument("--scenario", choices=list(SCENARIO_DICT.keys()), default="small",
+                        help="Size of the synthetic firmware.")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the synthetic firmware.")
+    parser.add_argument("--file-count", type=int, help="Overrides the number of files of the scenario.")
+    parser.add_argument("--file-size", type=int, help="Overrides the average file size in bytes of the scenario.")
+    parser.add_argument("--apk-count", type=int, help="Overrides the number of apks of the scenario.")
+    parser.add_argument("--apk-size", type=int, help="Overrides the apk size in bytes of the scenario.")
+    parser.add_argument("--nested-depth", type=int, help="Overrides the number of archives of the nested format.")
+    parser.add_argument("--formats", nargs="+", choices=FIRMWARE_FORMAT_LIST, default=FIRMWARE_FORMAT_LIST,
+                        help="Firmware formats to create.")
+    parser.add_argument("--stages", nargs="+", choices=STAGE_LIST, default=STAGE_LIST, help="Stages to run.")
+    parser.add_argument("--scanners", nargs="+", choices=list(SCANNER_WORKER_DICT.keys()),
+                        default=["manifest_parser"], help="Scanners of the scanner stage.")
+    parser.add_argument("--mongo-uri", default=DEFAULT_MONGO_URI,
+                        help="Uri of a local mongod or mongomock:// for an in-memory database. "
+                             "The benchmark database is dropped by every stage.")
+    parser.add_argument("--db-name", default=DEFAULT_DB_NAME, help="Name of the benchmark database.")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs of every stage. The median duration is used.")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_STAGE_TIMEOUT, help="Seconds until a stage is killed.")
+    parser.add_argument("--work-dir", help="Folder for the synthetic firmware. Defaults to a temporary folder.")
+    parser.add_argument("--keep-files", action="store_true", help="Keeps the work folder after the run.")
+    parser.add_argument("--output", default="benchmark_result.json", help="Path of the result file.")
+    parser.add_argument("--baseline", help="Path of a baseline result to compare with.")
+    parser.add_argument("--write-baseline", action="store_true",
+                        help="Stores the result as baseline instead of comparing with it.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative increase of the duration of a stage.")
+    parser.add_argument("--memory-tolerance", type=float, default=DEFAULT_MEMORY_TOLERANCE,
+                        help="Allowed relative increase of the peak memory of a stage.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Logs the output of the pipeline.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    # Metrics are not sent to redis, so the benchmark runs without a redis server.
+    os.environ.setdefault("METRICS_ENABLED", "false")
+    work_dir = os.path.abspath(args.work_dir) if args.work_dir else tempfile.mkdtemp(prefix="fmd_benchmark_")
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        result = run_benchmark(scenario_name=args.scenario,
+                               seed=args.seed,
+                               work_dir=work_dir,
+                               stage_list=args.stages,
+                               firmware_format_list=args.formats,
+                               mongo_uri=args.mongo_uri,
+                               db_name=args.db_name,
+                               scanner_list=args.scanners,
+                               repeat=args.repeat,
+                               timeout=args.timeout,
+                               file_count=args.file_count,
+                               file_size_bytes=args.file_size,
+                               apk_count=args.apk_count,
+                               apk_size_bytes=args.apk_size,
+                               nested_depth=args.nested_depth)
+    finally:
+        if not args.keep_files:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    write_json(result, args.output)
+    for stage_name, stage in result["stages"].items():
+        print(f"{stage_name}: {stage['status']} {stage.get('duration_seconds', '-')}s "
+              f"{stage.get('megabytes_per_second', '-')}MB/s peak {stage['peak_rss_mb']}MB "
+              f"{stage.get('reason', '')}")
+    if args.baseline and args.write_baseline:
+        write_json(result, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+        not_ok_stage_list = [stage_name for stage_name, stage in result["stages"].items()
+                             if stage["status"] != STATUS_OK]
+        if not_ok_stage_list:
+            print(f"Warning - stages {not_ok_stage_list} are not ok and not compared with this baseline.")
+    elif args.baseline:
+        with open(args.baseline, "r") as baseline_file:
+            regression_list = compare_with_baseline(result, json.load(baseline_file), args.tolerance,
+                                                    args.memory_tolerance)
+        for regression in regression_list:
+            print(f"Regression - {regression}")
+        if regression_list:
+            sys.exit(1)
+        print("No regression against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import os
+import struct
+import zipfile
+
+ANDROID_NAMESPACE_URI = "http://schemas.android.com/apk/res/android"
+RES_STRING_POOL_TYPE = 0x0001
+RES_XML_TYPE = 0x0003
+RES_XML_START_NAMESPACE_TYPE = 0x0100
+RES_XML_END_NAMESPACE_TYPE = 0x0101
+RES_XML_START_ELEMENT_TYPE = 0x0102
+RES_XML_END_ELEMENT_TYPE = 0x0103
+RES_XML_RESOURCE_MAP_TYPE = 0x0180
+TYPE_STRING = 0x03
+TYPE_INT_DEC = 0x10
+NO_INDEX = 0xFFFFFFFF
+# Attribute names of the android namespace must come first in the string pool, in the order of the resource map.
+ANDROID_ATTRIBUTE_RESOURCE_ID_DICT = {
+    "versionCode": 0x0101021B,
+    "versionName": 0x0101021C,
+    "minSdkVersion": 0x0101020C,
+    "targetSdkVersion": 0x01010270,
+    "label": 0x01010001,
+    "name": 0x01010003,
+    "exported": 0x01010010,
+}
+DEX_HEADER_MAGIC = b"dex\n035\x00"
+# Fixed timestamp of zip entries, so the same seed creates byte-identical archives.
+ZIP_ENTRY_DATE_TIME = (2020, 1, 1, 0, 0, 0)
+
+
+class StringPool:
+    """
+    Collects the strings of a binary xml document. The attribute names of the android namespace get the first
+    indexes, so the resource map can refer to them.
+    """
+
+    def __init__(self):
+        self.string_list = list(ANDROID_ATTRIBUTE_RESOURCE_ID_DICT.keys())
+        self.index_dict = {string: index for index, string in enumerate(self.string_list)}
+
+    def get_index(self, string):
+        if string not in self.index_dict:
+            self.index_dict[string] = len(self.string_list)
+            self.string_list.append(string)
+        return self.index_dict[string]
+
+    def to_bytes(self):
+        """
+        :return: bytes - the string pool chunk with UTF-16 strings.
+        """
+        offset_list = []
+        string_data = b""
+        for string in self.string_list:
+            offset_list.append(len(string_data))
+            string_data += struct.pack("<H", len(string)) + string.encode("utf-16-le") + b"\x00\x00"
+        string_data += b"\x00" * (-len(string_data) % 4)
+        header_size = 28
+        strings_start = header_size + 4 * len(offset_list)
+        chunk_size = strings_start + len(string_data)
+        return (struct.pack("<HHIIIIII", RES_STRING_POOL_TYPE, header_size, chunk_size, len(self.string_list), 0, 0,
+                            strings_start, 0)
+                + b"".join(struct.pack("<I", offset) for offset in offset_list)
+                + string_data)
+
+
+def create_attribute(string_pool, name, value, is_android_namespace=True):
+    """
+    :param string_pool: class:'StringPool'
+    :param name: str - name of the attribute.
+    :param value: str or int - value of the attribute.
+    :param is_android_namespace: bool - true if the attribute is in the android namespace.
+
+    :return: bytes - the attribute of a start element chunk.
+    """
+    namespace_index = string_pool.get_index(ANDROID_NAMESPACE_URI) if is_android_namespace else NO_INDEX
+    name_index = string_pool.get_index(name)
+    if isinstance(value, bool):
+        return struct.pack("<IIIHBBI", namespace_index, name_index, NO_INDEX, 8, 0, 0x12, 0xFFFFFFFF if value else 0)
+    if isinstance(value, int):
+        return struct.pack("<IIIHBBI", namespace_index, name_index, NO_INDEX, 8, 0, TYPE_INT_DEC, value)
+    value_index = string_pool.get_index(value)
+    return struct.pack("<IIIHBBI", namespace_index, name_index, value_index, 8, 0, TYPE_STRING, value_index)
+
+
+def create_element_chunks(string_pool, element):
+    """
+    :param string_pool: class:'StringPool'
+    :param element: tuple(str, list(tuple), list(tuple)) - name, attributes as (name, value, is_android_namespace)
+    and child elements.
+
+    :return: bytes - start element, the chunks of the children and end element.
+    """
+    name, attribute_list, child_list = element
+    name_index = string_pool.get_index(name)
+    attribute_data = b"".join(create_attribute(string_pool, *attribute) for attribute in attribute_list)
+    start_chunk = (struct.pack("<HHIII", RES_XML_START_ELEMENT_TYPE, 16, 36 + len(attribute_data), 1, NO_INDEX)
+                   + struct.pack("<IIHHHHHH", NO_INDEX, name_index, 20, 20, len(attribute_list), 0, 0, 0)
+                   + attribute_data)
+    child_data = b"".join(create_element_chunks(string_pool, child) for child in child_list)
+    end_chunk = struct.pack("<HHIIIII", RES_XML_END_ELEMENT_TYPE, 16, 24, 1, NO_INDEX, NO_INDEX, name_index)
+    return start_chunk + child_data + end_chunk
+
+
+def create_binary_manifest(package_name, version_code=1, activity_count=1, min_sdk_version=24,
+                           target_sdk_version=34):
+    """
+    Creates the binary AndroidManifest.xml of an apk with a launcher-less application and some activities.
+
+    :param package_name: str - package name of the app.
+    :param version_code: int - version code of the app.
+    :param activity_count: int - number of activities.
+    :param min_sdk_version: int - minimal sdk version.
+    :param target_sdk_version: int - target sdk version.
+
+    :return: bytes - the manifest in the binary xml format.
+    """
+    activity_list = [("activity", [("name", f"{package_name}.Activity{index}", True), ("exported", False, True)], [])
+                     for index in range(activity_count)]
+    manifest = ("manifest",
+                [("versionCode", version_code, True),
+                 ("versionName", f"1.0.{version_code}", True),
+                 ("package", package_name, False)],
+                [("uses-sdk", [("minSdkVersion", min_sdk_version, True),
+                               ("targetSdkVersion", target_sdk_version, True)], []),
+                 ("application", [("label", package_name.rsplit(".", 1)[-1], True)], activity_list)])
+    string_pool = StringPool()
+    prefix_index = string_pool.get_index("android")
+    uri_index = string_pool.get_index(ANDROID_NAMESPACE_URI)
+    element_data = create_element_chunks(string_pool, manifest)
+    resource_id_list = list(ANDROID_ATTRIBUTE_RESOURCE_ID_DICT.values())
+    resource_map = (struct.pack("<HHI", RES_XML_RESOURCE_MAP_TYPE, 8, 8 + 4 * len(resource_id_list))
+                    + b"".join(struct.pack("<I", resource_id) for resource_id in resource_id_list))
+    start_namespace = struct.pack("<HHIIIII", RES_XML_START_NAMESPACE_TYPE, 16, 24, 1, NO_INDEX, prefix_index,
+                                  uri_index)
+    end_namespace = struct.pack("<HHIIIII", RES_XML_END_NAMESPACE_TYPE, 16, 24, 1, NO_INDEX, prefix_index, uri_index)
+    body = string_pool.to_bytes() + resource_map + start_namespace + element_data + end_namespace
+    return struct.pack("<HHI", RES_XML_TYPE, 8, 8 + len(body)) + body
+
+
+def write_zip_entry(zip_file, name, data, compress_type=zipfile.ZIP_DEFLATED):
+    """
+    Writes data to a zip archive with a fixed timestamp.
+
+    :param zip_file: class:'zipfile.ZipFile'
+    :param name: str - name of the entry.
+    :param data: bytes or str - content of the entry.
+    :param compress_type: int - compression of the entry.
+    """
+    zip_info = zipfile.ZipInfo(name, date_time=ZIP_ENTRY_DATE_TIME)
+    zip_info.compress_type = compress_type
+    zip_info.external_attr = 0o644 << 16
+    zip_file.writestr(zip_info, data)
+
+
+def create_placeholder_dex(rng, size_bytes):
+    """
+    :return: bytes - data with the header magic of a dex file. The content is not valid bytecode, so scanners that
+    decompile the code fail on it.
+    """
+    return DEX_HEADER_MAGIC + rng.randbytes(max(0, size_bytes - len(DEX_HEADER_MAGIC)))
+
+
+def create_synthetic_apk(apk_path, package_name, size_bytes, rng, version_code=1):
+    """
+    Creates an unsigned apk with a valid binary manifest, a placeholder dex and random assets.
+
+    :param apk_path: str - path of the apk to create.
+    :param package_name: str - package name of the app.
+    :param size_bytes: int - approximate size of the content before compression.
+    :param rng: class:'random.Random' - source of the content, so the same seed creates the same apk.
+    :param version_code: int - version code of the app.
+
+    :return: str - path of the apk.
+    """
+    os.makedirs(os.path.dirname(apk_path), exist_ok=True)
+    dex_size = max(1024, size_bytes // 4)
+    asset_size = max(0, size_bytes - dex_size)
+    text_size = asset_size // 2
+    with zipfile.ZipFile(apk_path, "w") as apk_file:
+        write_zip_entry(apk_file, "AndroidManifest.xml",
+                        create_binary_manifest(package_name, version_code, activity_count=rng.randint(1, 5)))
+        write_zip_entry(apk_file, "classes.dex", create_placeholder_dex(rng, dex_size))
+        # Half of the assets are compressible text, as most apks contain resources and random binary data.
+        write_zip_entry(apk_file, "assets/data.bin", rng.randbytes(asset_size - text_size), zipfile.ZIP_STORED)
+        write_zip_entry(apk_file, "assets/strings.txt",
+                        (f"{package_name} " * (text_size // (len(package_name) + 1) + 1))[:text_size])
+    return apk_path
+
+
+def create_synthetic_apk_set(destination_dir, apk_count, apk_size_bytes, rng, package_prefix="org.fmdbench"):
+    """
+    Creates a set of apks in the folder layout of a system partition.
+
+    :param destination_dir: str - root folder of the partition.
+    :param apk_count: int - number of apks.
+    :param apk_size_bytes: int - approximate size of every apk.
+    :param rng: class:'random.Random'
+    :param package_prefix: str - prefix of the package names.
+
+    :return: list(str) - paths of the apks.
+    """
+    apk_path_list = []
+    for index in range(apk_count):
+        app_folder = "priv-app" if index % 4 == 0 else "app"
+        app_name = f"BenchApp{index}"
+        apk_path = os.path.join(destination_dir, app_folder, app_name, f"{app_name}.apk")
+        apk_path_list.append(create_synthetic_apk(apk_path, f"{package_prefix}.app{index}", apk_size_bytes, rng,
+                                                  version_code=index + 1))
+    return apk_path_list
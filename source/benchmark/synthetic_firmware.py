@@ -0,0 +1,598 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import hashlib
+import logging
+import lzma
+import os
+import random
+import shutil
+import struct
+import subprocess
+import uuid
+import zipfile
+from benchmark.synthetic_apk import create_synthetic_apk_set, ZIP_ENTRY_DATE_TIME
+
+BLOCK_SIZE = 4096
+# Fixed time of the files and the ext4 images. The images of the same seed only differ in the inode change times.
+FIXED_TIMESTAMP = 1577836800
+MKE2FS_PATH = shutil.which("mke2fs") or "/sbin/mke2fs"
+MIN_IMAGE_SIZE_BYTES = 8 * 1024 * 1024
+IMAGE_SIZE_OVERHEAD_FACTOR = 1.3
+SPARSE_HEADER_MAGIC = 0xED26FF3A
+SPARSE_CHUNK_TYPE_RAW = 0xCAC1
+SPARSE_CHUNK_TYPE_DONT_CARE = 0xCAC3
+SPARSE_FILE_HEADER_SIZE = 28
+SPARSE_CHUNK_HEADER_SIZE = 12
+MAX_SPARSE_CHUNK_BLOCKS = 1024
+LP_PARTITION_RESERVED_BYTES = 4096
+LP_METADATA_GEOMETRY_MAGIC = 0x616C4467
+LP_METADATA_GEOMETRY_SIZE = 4096
+LP_METADATA_HEADER_MAGIC = 0x414C5030
+LP_METADATA_MAJOR_VERSION = 10
+LP_METADATA_MINOR_VERSION = 0
+LP_METADATA_HEADER_SIZE = 128
+LP_METADATA_MAX_SIZE = 65536
+LP_METADATA_SLOT_COUNT = 2
+LP_SECTOR_SIZE = 512
+LP_PARTITION_ALIGNMENT = 1024 * 1024
+LP_PARTITION_ATTR_READONLY = 0x1
+LP_TARGET_TYPE_LINEAR = 0
+PAYLOAD_MAGIC = b"CrAU"
+PAYLOAD_MAJOR_VERSION = 2
+PAYLOAD_OPERATION_BLOCKS = 512
+TRANSFER_LIST_VERSION = 4
+FIRMWARE_FORMAT_EXT4 = "ext4"
+FIRMWARE_FORMAT_SPARSE = "sparse"
+FIRMWARE_FORMAT_SUPER = "super"
+FIRMWARE_FORMAT_PAYLOAD = "payload"
+FIRMWARE_FORMAT_DAT = "dat"
+FIRMWARE_FORMAT_NESTED = "nested"
+FIRMWARE_FORMAT_LIST = [FIRMWARE_FORMAT_EXT4, FIRMWARE_FORMAT_SPARSE, FIRMWARE_FORMAT_SUPER, FIRMWARE_FORMAT_PAYLOAD,
+                        FIRMWARE_FORMAT_DAT, FIRMWARE_FORMAT_NESTED]
+# Share of the files and apks that are stored on each partition.
+PARTITION_SHARE_DICT = {"system": 0.8, "vendor": 0.2}
+PARTITION_FOLDER_LIST = ["bin", "etc", "etc/permissions", "framework", "lib", "lib64", "usr/share", "media"]
+SCENARIO_DICT = {
+    "small": {"file_count": 200, "file_size_bytes": 16 * 1024, "apk_count": 10, "apk_size_bytes": 256 * 1024,
+              "nested_depth": 2},
+    "medium": {"file_count": 2000, "file_size_bytes": 64 * 1024, "apk_count": 50, "apk_size_bytes": 1024 * 1024,
+               "nested_depth": 3},
+    "large": {"file_count": 20000, "file_size_bytes": 128 * 1024, "apk_count": 200,
+              "apk_size_bytes": 4 * 1024 * 1024, "nested_depth": 4},
+}
+
+
+def get_scenario(scenario_name, **overrides):
+    """
+    :param scenario_name: str - key of SCENARIO_DICT.
+    :param overrides: values that replace the ones of the scenario, for instance, file_count=10. None is ignored.
+
+    :return: dict - the sizes of the synthetic firmware.
+    """
+    if scenario_name not in SCENARIO_DICT:
+        raise ValueError(f"Unknown scenario {scenario_name}. Valid scenarios: {list(SCENARIO_DICT.keys())}")
+    scenario = dict(SCENARIO_DICT[scenario_name])
+    scenario.update({key: value for key, value in overrides.items() if value is not None})
+    return scenario
+
+
+def create_build_prop(partition_name, rng):
+    """
+    :return: str - content of a build.prop file the version and vendor detection can parse.
+    """
+    sdk_version = rng.choice([30, 31, 33, 34])
+    release_dict = {30: "11", 31: "12", 33: "13", 34: "14"}
+    return "\n".join([
+        "# begin build properties",
+        f"ro.{partition_name}.build.id=FMDBENCH.{sdk_version}",
+        f"ro.build.version.sdk={sdk_version}",
+        f"ro.build.version.release={release_dict[sdk_version]}",
+        f"ro.build.version.security_patch=2024-0{rng.randint(1, 9)}-01",
+        "ro.product.brand=fmdbench",
+        "ro.product.manufacturer=FirmwareDroid",
+        f"ro.product.{partition_name}.model=Benchmark",
+        "ro.build.type=user",
+        "ro.build.tags=release-keys",
+        "# end build properties",
+        ""])
+
+
+def create_file_content(rng, size_bytes):
+    """
+    :return: bytes - random data for one half of the files and compressible text for the other half.
+    """
+    if rng.random() < 0.5:
+        return rng.randbytes(size_bytes)
+    line = f"fmdbench {rng.getrandbits(64):016x}\n".encode()
+    return (line * (size_bytes // len(line) + 1))[:size_bytes]
+
+
+def set_fixed_timestamps(root_dir):
+    for root, dir_list, file_list in os.walk(root_dir):
+        for name in dir_list + file_list:
+            os.utime(os.path.join(root, name), (FIXED_TIMESTAMP, FIXED_TIMESTAMP), follow_symlinks=False)
+    os.utime(root_dir, (FIXED_TIMESTAMP, FIXED_TIMESTAMP))
+
+
+def create_partition_tree(destination_dir, partition_name, file_count, file_size_bytes, apk_count, apk_size_bytes,
+                          rng):
+    """
+    Creates the folder of a partition with a build.prop, apks and files of random size in the usual folders.
+
+    :param destination_dir: str - root folder of the partition.
+    :param partition_name: str - name of the partition, for instance, "system".
+    :param file_count: int - number of files besides the apks.
+    :param file_size_bytes: int - average size of the files.
+    :param apk_count: int - number of apks.
+    :param apk_size_bytes: int - approximate size of the apks.
+    :param rng: class:'random.Random'
+
+    :return: dict - number and bytes of the created files.
+    """
+    os.makedirs(destination_dir, exist_ok=True)
+    with open(os.path.join(destination_dir, "build.prop"), "w") as build_prop_file:
+        build_prop_file.write(create_build_prop(partition_name, rng))
+    for folder in PARTITION_FOLDER_LIST:
+        os.makedirs(os.path.join(destination_dir, folder), exist_ok=True)
+    for index in range(file_count):
+        folder = PARTITION_FOLDER_LIST[index % len(PARTITION_FOLDER_LIST)]
+        size_bytes = rng.randint(file_size_bytes // 2, file_size_bytes * 3 // 2)
+        with open(os.path.join(destination_dir, folder, f"{partition_name}_file_{index}.bin"), "wb") as file:
+            file.write(create_file_content(rng, size_bytes))
+    create_synthetic_apk_set(destination_dir, apk_count, apk_size_bytes, rng,
+                             package_prefix=f"org.fmdbench.{partition_name}")
+    set_fixed_timestamps(destination_dir)
+    return get_tree_size(destination_dir)
+
+
+def get_tree_size(root_dir):
+    """
+    :return: dict - number of files and their total size in bytes.
+    """
+    file_count = 0
+    byte_count = 0
+    for root, _, file_list in os.walk(root_dir):
+        for file_name in file_list:
+            file_count += 1
+            byte_count += os.path.getsize(os.path.join(root, file_name))
+    return {"file_count": file_count, "byte_count": byte_count}
+
+
+def create_ext4_image(source_dir, image_path, label, seed, inode_count):
+    """
+    Creates a raw ext4 image with the content of the source folder. The image is created with mke2fs -d, so no
+    mount or root permissions are required.
+
+    :param source_dir: str - folder to copy into the image.
+    :param image_path: str - path of the image to create.
+    :param label: str - volume label, for instance, "system".
+    :param seed: int - seed of the uuid and the directory hash, so the same seed creates the same image.
+    :param inode_count: int - number of inodes, at least the number of files and folders.
+
+    :return: str - path of the image.
+    """
+    tree_size = get_tree_size(source_dir)
+    image_size = max(MIN_IMAGE_SIZE_BYTES, int(tree_size["byte_count"] * IMAGE_SIZE_OVERHEAD_FACTOR))
+    block_count = image_size // BLOCK_SIZE + 1
+    fs_uuid = str(uuid.UUID(int=random.Random(f"{seed}:{label}").getrandbits(128), version=4))
+    command = [MKE2FS_PATH, "-q", "-F", "-t", "ext4", "-b", str(BLOCK_SIZE), "-m", "0",
+               "-N", str(inode_count + 64),
+               "-O", "^has_journal,^metadata_csum",
+               "-U", fs_uuid,
+               "-E", f"hash_seed={fs_uuid}",
+               "-L", label,
+               "-d", source_dir,
+               image_path, str(block_count)]
+    environment = dict(os.environ, E2FSPROGS_FAKE_TIME=str(FIXED_TIMESTAMP))
+    subprocess.run(command, check=True, capture_output=True, env=environment)
+    return image_path
+
+
+def iterate_block_runs(image_path, block_size=BLOCK_SIZE, max_run_blocks=None):
+    """
+    Reads an image in runs of blocks that are either all zero or all contain data.
+
+    :param image_path: str - path of the raw image.
+    :param block_size: int - size of a block.
+    :param max_run_blocks: int - maximal blocks of a data run, so large images are not read into memory.
+
+    :return: generator(tuple(bool, int, int, bytes)) - zero flag, first block, number of blocks and data of the run.
+    The data is empty for zero runs.
+    """
+    zero_block = bytes(block_size)
+    run_is_zero = None
+    run_start = 0
+    run_data = []
+    block_index = 0
+    with open(image_path, "rb") as image_file:
+        while True:
+            block = image_file.read(block_size)
+            if not block:
+                break
+            block = block.ljust(block_size, b"\x00")
+            is_zero = block == zero_block
+            run_length = block_index - run_start
+            if run_is_zero is not None and (is_zero != run_is_zero
+                                            or (not is_zero and max_run_blocks and run_length >= max_run_blocks)):
+                yield run_is_zero, run_start, run_length, b"".join(run_data)
+                run_start = block_index
+                run_data = []
+            run_is_zero = is_zero
+            if not is_zero:
+                run_data.append(block)
+            block_index += 1
+    if run_is_zero is not None:
+        yield run_is_zero, run_start, block_index - run_start, b"".join(run_data)
+
+
+def create_sparse_image(raw_image_path, sparse_image_path, block_size=BLOCK_SIZE):
+    """
+    Converts a raw image to the Android sparse format. Zero blocks are stored as don't care chunks, as img2simg does.
+
+    :param raw_image_path: str - path of the raw image.
+    :param sparse_image_path: str - path of the sparse image to create.
+    :param block_size: int - size of a block.
+
+    :return: str - path of the sparse image.
+    """
+    total_block_count = 0
+    chunk_count = 0
+    with open(sparse_image_path, "wb") as sparse_file:
+        sparse_file.write(bytes(SPARSE_FILE_HEADER_SIZE))
+        for is_zero, _, block_count, data in iterate_block_runs(raw_image_path, block_size, MAX_SPARSE_CHUNK_BLOCKS):
+            if is_zero:
+                sparse_file.write(struct.pack("<2H2I", SPARSE_CHUNK_TYPE_DONT_CARE, 0, block_count,
+                                              SPARSE_CHUNK_HEADER_SIZE))
+            else:
+                sparse_file.write(struct.pack("<2H2I", SPARSE_CHUNK_TYPE_RAW, 0, block_count,
+                                              SPARSE_CHUNK_HEADER_SIZE + len(data)))
+                sparse_file.write(data)
+            total_block_count += block_count
+            chunk_count += 1
+        sparse_file.seek(0)
+        sparse_file.write(struct.pack("<I4H4I", SPARSE_HEADER_MAGIC, 1, 0, SPARSE_FILE_HEADER_SIZE,
+                                      SPARSE_CHUNK_HEADER_SIZE, block_size, total_block_count, chunk_count, 0))
+    return sparse_image_path
+
+
+def align_up(value, alignment):
+    return (value + alignment - 1) // alignment * alignment
+
+
+def encode_lp_name(name):
+    return name.encode().ljust(36, b"\x00")
+
+
+def create_lp_geometry():
+    """
+    :return: bytes - the geometry of the super image padded to LP_METADATA_GEOMETRY_SIZE.
+    """
+    geometry = struct.pack("<2I32s3I", LP_METADATA_GEOMETRY_MAGIC, 52, bytes(32), LP_METADATA_MAX_SIZE,
+                           LP_METADATA_SLOT_COUNT, BLOCK_SIZE)
+    checksum = hashlib.sha256(geometry).digest()
+    geometry = struct.pack("<2I32s3I", LP_METADATA_GEOMETRY_MAGIC, 52, checksum, LP_METADATA_MAX_SIZE,
+                           LP_METADATA_SLOT_COUNT, BLOCK_SIZE)
+    return geometry.ljust(LP_METADATA_GEOMETRY_SIZE, b"\x00")
+
+
+def create_lp_metadata(partition_layout_list, device_size):
+    """
+    Creates the metadata of a super image in the format of liblp version 10.0.
+
+    :param partition_layout_list: list(tuple(str, int, int)) - name, first sector and size in bytes of the partitions.
+    :param device_size: int - size of the super image in bytes.
+
+    :return: bytes - the metadata header and its tables.
+    """
+    partition_table = b""
+    extent_table = b""
+    for index, (name, first_sector, size_bytes) in enumerate(partition_layout_list):
+        partition_table += struct.pack("<36s4I", encode_lp_name(name), LP_PARTITION_ATTR_READONLY, index, 1, 1)
+        extent_table += struct.pack("<QIQI", size_bytes // LP_SECTOR_SIZE, LP_TARGET_TYPE_LINEAR, first_sector, 0)
+    group_table = (struct.pack("<36sIQ", encode_lp_name("default"), 0, 0)
+                   + struct.pack("<36sIQ", encode_lp_name("main"), 0, device_size))
+    first_logical_sector = partition_layout_list[0][1] if partition_layout_list else 0
+    block_device_table = struct.pack("<Q2IQ36sI", first_logical_sector, LP_PARTITION_ALIGNMENT, 0, device_size,
+                                     encode_lp_name("super"), 0)
+    tables = partition_table + extent_table + group_table + block_device_table
+    descriptor_list = [(0, len(partition_layout_list), 52),
+                       (len(partition_table), len(partition_layout_list), 24),
+                       (len(partition_table) + len(extent_table), 2, 48),
+                       (len(partition_table) + len(extent_table) + len(group_table), 1, 64)]
+
+    def pack_header(header_checksum):
+        return (struct.pack("<I2HI32sI32s", LP_METADATA_HEADER_MAGIC, LP_METADATA_MAJOR_VERSION,
+                            LP_METADATA_MINOR_VERSION, LP_METADATA_HEADER_SIZE, header_checksum, len(tables),
+                            hashlib.sha256(tables).digest())
+                + b"".join(struct.pack("<3I", *descriptor) for descriptor in descriptor_list))
+
+    header = pack_header(hashlib.sha256(pack_header(bytes(32))).digest())
+    return header + tables
+
+
+def copy_file_into(destination_file, source_path, offset):
+    destination_file.seek(offset)
+    with open(source_path, "rb") as source_file:
+        shutil.copyfileobj(source_file, destination_file, 1024 * 1024)
+
+
+def create_super_image(partition_image_dict, super_image_path, slot_suffix="_a"):
+    """
+    Creates a super image with one slot of logical partitions as lpunpack expects it.
+
+    :param partition_image_dict: dict(str, str) - raw image path by partition name.
+    :param super_image_path: str - path of the super image to create.
+    :param slot_suffix: str - suffix of the partition names.
+
+    :return: str - path of the super image.
+    """
+    metadata_end = (LP_PARTITION_RESERVED_BYTES + 2 * LP_METADATA_GEOMETRY_SIZE
+                    + 2 * LP_METADATA_SLOT_COUNT * LP_METADATA_MAX_SIZE)
+    offset = align_up(metadata_end, LP_PARTITION_ALIGNMENT)
+    partition_layout_list = []
+    for name, image_path in partition_image_dict.items():
+        size_bytes = align_up(os.path.getsize(image_path), LP_SECTOR_SIZE)
+        partition_layout_list.append((f"{name}{slot_suffix}", offset // LP_SECTOR_SIZE, size_bytes))
+        offset = align_up(offset + size_bytes, LP_PARTITION_ALIGNMENT)
+    device_size = offset
+    geometry = create_lp_geometry()
+    metadata = create_lp_metadata(partition_layout_list, device_size).ljust(LP_METADATA_MAX_SIZE, b"\x00")
+    with open(super_image_path, "wb") as super_file:
+        super_file.truncate(device_size)
+        super_file.seek(LP_PARTITION_RESERVED_BYTES)
+        super_file.write(geometry + geometry)
+        # Primary and backup copy of the metadata for every slot.
+        super_file.write(metadata * (2 * LP_METADATA_SLOT_COUNT))
+        for (_, first_sector, _), image_path in zip(partition_layout_list, partition_image_dict.values()):
+            copy_file_into(super_file, image_path, first_sector * LP_SECTOR_SIZE)
+    return super_image_path
+
+
+def create_payload(partition_image_dict, payload_path):
+    """
+    Creates a full OTA payload.bin with xz compressed replace operations, as update_engine creates it for a full
+    update.
+
+    :param partition_image_dict: dict(str, str) - raw image path by partition name.
+    :param payload_path: str - path of the payload to create.
+
+    :return: str - path of the payload.
+    """
+    from extractor.bin_extractor import update_metadata_pb2
+    manifest = update_metadata_pb2.DeltaArchiveManifest()
+    manifest.block_size = BLOCK_SIZE
+    manifest.minor_version = 0
+    data_path = f"{payload_path}.data"
+    data_offset = 0
+    with open(data_path, "wb") as data_file:
+        for name, image_path in partition_image_dict.items():
+            partition = manifest.partitions.add()
+            partition.partition_name = name
+            partition.new_partition_info.size = os.path.getsize(image_path)
+            image_hash = hashlib.sha256()
+            with open(image_path, "rb") as image_file:
+                block_index = 0
+                while True:
+                    data = image_file.read(PAYLOAD_OPERATION_BLOCKS * BLOCK_SIZE)
+                    if not data:
+                        break
+                    image_hash.update(data)
+                    block_count = (len(data) + BLOCK_SIZE - 1) // BLOCK_SIZE
+                    blob = lzma.compress(data.ljust(block_count * BLOCK_SIZE, b"\x00"), format=lzma.FORMAT_XZ,
+                                         check=lzma.CHECK_CRC32)
+                    operation = partition.operations.add()
+                    operation.type = update_metadata_pb2.InstallOperation.REPLACE_XZ
+                    operation.data_offset = data_offset
+                    operation.data_length = len(blob)
+                    operation.data_sha256_hash = hashlib.sha256(blob).digest()
+                    extent = operation.dst_extents.add()
+                    extent.start_block = block_index
+                    extent.num_blocks = block_count
+                    data_file.write(blob)
+                    data_offset += len(blob)
+                    block_index += block_count
+            partition.new_partition_info.hash = image_hash.digest()
+    manifest_data = manifest.SerializeToString()
+    with open(payload_path, "wb") as payload_file:
+        payload_file.write(PAYLOAD_MAGIC + struct.pack(">QQI", PAYLOAD_MAJOR_VERSION, len(manifest_data), 0))
+        payload_file.write(manifest_data)
+        with open(data_path, "rb") as data_file:
+            shutil.copyfileobj(data_file, payload_file, 1024 * 1024)
+    os.remove(data_path)
+    return payload_path
+
+
+def format_rangeset(range_list):
+    """
+    :param range_list: list(tuple(int, int)) - half-open block ranges.
+
+    :return: str - the ranges in the rangeset notation of the transfer list, for instance, "2,0,5".
+    """
+    value_list = [value for block_range in range_list for value in block_range]
+    return ",".join(str(value) for value in [len(value_list)] + value_list)
+
+
+def create_dat_files(raw_image_path, dat_path, transfer_list_path):
+    """
+    Converts a raw image to a new.dat file and a transfer.list of version 4 with new and zero commands.
+
+    :param raw_image_path: str - path of the raw image.
+    :param dat_path: str - path of the .new.dat to create.
+    :param transfer_list_path: str - path of the .transfer.list to create.
+
+    :return: tuple(str, str) - paths of the dat file and the transfer list.
+    """
+    new_range_list = []
+    zero_range_list = []
+    new_block_count = 0
+    total_block_count = 0
+    with open(dat_path, "wb") as dat_file:
+        for is_zero, start_block, block_count, data in iterate_block_runs(raw_image_path, BLOCK_SIZE,
+                                                                          MAX_SPARSE_CHUNK_BLOCKS):
+            range_list = zero_range_list if is_zero else new_range_list
+            if range_list and range_list[-1][1] == start_block:
+                range_list[-1] = (range_list[-1][0], start_block + block_count)
+            else:
+                range_list.append((start_block, start_block + block_count))
+            if not is_zero:
+                dat_file.write(data)
+                new_block_count += block_count
+            total_block_count = start_block + block_count
+    line_list = [str(TRANSFER_LIST_VERSION), str(new_block_count), "0", "0",
+                 f"erase {format_rangeset([(0, total_block_count)])}"]
+    if new_range_list:
+        line_list.append(f"new {format_rangeset(new_range_list)}")
+    if zero_range_list:
+        line_list.append(f"zero {format_rangeset(zero_range_list)}")
+    with open(transfer_list_path, "w") as transfer_list_file:
+        transfer_list_file.write("\n".join(line_list) + "\n")
+    return dat_path, transfer_list_path
+
+
+def create_zip_archive(archive_path, file_path_dict):
+    """
+    Creates a zip archive with fixed timestamps. Images are stored deflated like in firmware downloads.
+
+    :param archive_path: str - path of the archive to create.
+    :param file_path_dict: dict(str, str) - file path by name in the archive.
+
+    :return: str - path of the archive.
+    """
+    with zipfile.ZipFile(archive_path, "w", allowZip64=True) as zip_file:
+        for name, file_path in file_path_dict.items():
+            zip_info = zipfile.ZipInfo(name, date_time=ZIP_ENTRY_DATE_TIME)
+            zip_info.compress_type = zipfile.ZIP_DEFLATED
+            zip_info.external_attr = 0o644 << 16
+            with open(file_path, "rb") as source_file, zip_file.open(zip_info, "w", force_zip64=True) as entry:
+                shutil.copyfileobj(source_file, entry, 1024 * 1024)
+    return archive_path
+
+
+def create_nested_archive(archive_path, file_path_dict, depth, work_dir):
+    """
+    Wraps the files into zip archives that contain each other.
+
+    :param depth: int - number of archives, 1 creates a flat archive.
+
+    :return: str - path of the outermost archive.
+    """
+    inner_path = os.path.join(work_dir, "nested_level_1.zip")
+    create_zip_archive(inner_path, file_path_dict)
+    for level in range(2, depth + 1):
+        outer_path = os.path.join(work_dir, f"nested_level_{level}.zip")
+        create_zip_archive(outer_path, {os.path.basename(inner_path): inner_path})
+        os.remove(inner_path)
+        inner_path = outer_path
+    shutil.move(inner_path, archive_path)
+    return archive_path
+
+
+def create_partition_trees(work_dir, scenario, rng):
+    """
+    :return: dict(str, str) - root folder by partition name.
+    """
+    partition_dir_dict = {}
+    for partition_name, share in PARTITION_SHARE_DICT.items():
+        partition_dir = os.path.join(work_dir, "partitions", partition_name)
+        create_partition_tree(partition_dir,
+                              partition_name,
+                              file_count=max(1, int(scenario["file_count"] * share)),
+                              file_size_bytes=scenario["file_size_bytes"],
+                              apk_count=max(1, int(scenario["apk_count"] * share)),
+                              apk_size_bytes=scenario["apk_size_bytes"],
+                              rng=rng)
+        partition_dir_dict[partition_name] = partition_dir
+    return partition_dir_dict
+
+
+def create_firmware_archive(firmware_format, image_dict, archive_path, work_dir, nested_depth):
+    """
+    Packs the raw partition images in the layout of the firmware format into a zip archive.
+
+    :param firmware_format: str - one of FIRMWARE_FORMAT_LIST.
+    :param image_dict: dict(str, str) - raw ext4 image path by partition name.
+    :param archive_path: str - path of the archive to create.
+    :param work_dir: str - folder for intermediate files.
+    :param nested_depth: int - number of archives of the nested format.
+
+    :return: str - path of the archive.
+    """
+    format_dir = os.path.join(work_dir, firmware_format)
+    os.makedirs(format_dir, exist_ok=True)
+    if firmware_format == FIRMWARE_FORMAT_EXT4:
+        file_path_dict = {f"{name}.img": image_path for name, image_path in image_dict.items()}
+    elif firmware_format == FIRMWARE_FORMAT_SPARSE:
+        file_path_dict = {f"{name}.img": create_sparse_image(image_path, os.path.join(format_dir, f"{name}.img"))
+                          for name, image_path in image_dict.items()}
+    elif firmware_format == FIRMWARE_FORMAT_SUPER:
+        file_path_dict = {"super.img": create_super_image(image_dict, os.path.join(format_dir, "super.img"))}
+    elif firmware_format == FIRMWARE_FORMAT_PAYLOAD:
+        file_path_dict = {"payload.bin": create_payload(image_dict, os.path.join(format_dir, "payload.bin"))}
+    elif firmware_format == FIRMWARE_FORMAT_DAT:
+        file_path_dict = {}
+        for name, image_path in image_dict.items():
+            dat_path, transfer_list_path = create_dat_files(image_path,
+                                                            os.path.join(format_dir, f"{name}.new.dat"),
+                                                            os.path.join(format_dir, f"{name}.transfer.list"))
+            file_path_dict[f"{name}.new.dat"] = dat_path
+            file_path_dict[f"{name}.transfer.list"] = transfer_list_path
+    elif firmware_format == FIRMWARE_FORMAT_NESTED:
+        file_path_dict = {f"{name}.img": image_path for name, image_path in image_dict.items()}
+        create_nested_archive(archive_path, file_path_dict, nested_depth, format_dir)
+        shutil.rmtree(format_dir, ignore_errors=True)
+        return archive_path
+    else:
+        raise ValueError(f"Unknown firmware format {firmware_format}. Valid formats: {FIRMWARE_FORMAT_LIST}")
+    create_zip_archive(archive_path, file_path_dict)
+    shutil.rmtree(format_dir, ignore_errors=True)
+    return archive_path
+
+
+def create_synthetic_firmware(output_dir, scenario, seed, firmware_format_list=None):
+    """
+    Creates the partition folders, their ext4 images and one firmware archive per format. The same scenario and seed
+    create the same content, so benchmark runs are comparable.
+
+    :param output_dir: str - folder to store the firmware in.
+    :param scenario: dict - sizes of the firmware, see get_scenario.
+    :param seed: int - seed of the random content.
+    :param firmware_format_list: list(str) - formats to create. Defaults to FIRMWARE_FORMAT_LIST.
+
+    :return: dict - paths of the partition folders, images and archives, formats that could not be created and the
+    size of the content.
+    """
+    firmware_format_list = firmware_format_list or FIRMWARE_FORMAT_LIST
+    rng = random.Random(seed)
+    partition_dir_dict = create_partition_trees(output_dir, scenario, rng)
+    image_dir = os.path.join(output_dir, "images")
+    os.makedirs(image_dir, exist_ok=True)
+    image_dict = {}
+    for partition_name, partition_dir in partition_dir_dict.items():
+        tree_size = get_tree_size(partition_dir)
+        image_dict[partition_name] = create_ext4_image(partition_dir,
+                                                       os.path.join(image_dir, f"{partition_name}.img"),
+                                                       label=partition_name,
+                                                       seed=seed,
+                                                       inode_count=tree_size["file_count"] * 2)
+    archive_dir = os.path.join(output_dir, "archives")
+    os.makedirs(archive_dir, exist_ok=True)
+    archive_dict = {}
+    skipped_format_dict = {}
+    for firmware_format in firmware_format_list:
+        archive_path = os.path.join(archive_dir, f"fmdbench_{firmware_format}.zip")
+        try:
+            archive_dict[firmware_format] = create_firmware_archive(firmware_format, image_dict, archive_path,
+                                                                    output_dir, scenario["nested_depth"])
+        except ImportError as err:
+            logging.warning(f"Skipping firmware format {firmware_format}: {err}")
+            skipped_format_dict[firmware_format] = str(err)
+    content_size = {"file_count": 0, "byte_count": 0}
+    for partition_dir in partition_dir_dict.values():
+        for key, value in get_tree_size(partition_dir).items():
+            content_size[key] += value
+    return {"partition_dir_dict": partition_dir_dict,
+            "image_dict": image_dict,
+            "archive_dict": archive_dict,
+            "skipped_format_dict": skipped_format_dict,
+            "content_size": content_size}
@@ -4,20 +4,37 @@
 # See the file 'LICENSE' for copying permission.
 import functools
 import logging
+import os
+import queue
 import sys
+import threading
+import time
 from log4mongo.handlers import MongoHandler
+from app_metrics.recorder import flush_metrics
+from app_metrics.profiler import profile_job
+
+APK_SCANNER_LOGGER_NAME = "apk_scanner_logger"
+LOG_QUEUE_SIZE = int(os.environ.get("APK_SCANNER_LOG_QUEUE_SIZE", 10000))
+LOG_BATCH_SIZE = 500
+LOG_FLUSH_INTERVAL_SECONDS = 1.0
+LOG_SAMPLE_THRESHOLD = 0.8
+LOG_SAMPLE_RATE = 10
+LOG_CLOSE_TIMEOUT_SECONDS = 10
+LOG_WRITER_STOP = object()
 
 
 def create_db_context(f):
     """
-    Decorator for creating an app context and pushing into to the context stack.
+    Decorator for creating an app context and pushing into to the context stack. Does nothing if the process is
+    already connected.
     """
 
     @functools.wraps(f)
     def decorated(*args, **kwargs):
-        from database.connector import init_db
-        from webserver.settings import MONGO_DATABASES
-        init_db(MONGO_DATABASES["default"])
+        from database.connector import init_db, is_db_connected
+        if not is_db_connected():
+            from webserver.settings import MONGO_DATABASES
+            init_db(MONGO_DATABASES["default"])
         return f(*args, **kwargs)
 
     return decorated
@@ -91,14 +108,200 @@ class TaggedMongoHandler(MongoHandler):
         super().emit(record)
 
 
+class AsyncTaggedMongoHandler(TaggedMongoHandler):
+    """
+    Non-blocking variant of the TaggedMongoHandler. Records are formatted on the logging thread and put on a bounded
+    queue. A writer thread inserts them with insert_many as soon as LOG_BATCH_SIZE records are queued or
+    LOG_FLUSH_INTERVAL_SECONDS passed. When the queue is filled above LOG_SAMPLE_THRESHOLD only every
+    LOG_SAMPLE_RATE-th record below WARNING is kept, and records that do not fit into the full queue are dropped.
+    Both are counted and reported when the handler is closed.
+    """
+
+    def __init__(self, tags, details, *args, queue_size=LOG_QUEUE_SIZE, batch_size=LOG_BATCH_SIZE,
+                 flush_interval=LOG_FLUSH_INTERVAL_SECONDS, **kwargs):
+        super().__init__(tags, details, *args, **kwargs)
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._init_writer_state()
+
+    def _init_writer_state(self):
+        self._pid = os.getpid()
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._insert_lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._writer_thread = None
+        self.sample_counter = 0
+        self.sampled_count = 0
+        self.dropped_count = 0
+
+    def _ensure_writer(self):
+        """
+        Starts the writer thread. Threads and the mongo client do not survive a fork, so a forked process creates
+        its own queue, connection and writer thread. Records queued by the parent are not inserted twice.
+        """
+        if self._pid != os.getpid():
+            self._init_writer_state()
+            self.reuse = False
+            self._connect()
+        if self._writer_thread is None or not self._writer_thread.is_alive():
+            self._writer_thread = threading.Thread(target=self._run_writer,
+                                                   name="apk_scanner_log_writer",
+                                                   daemon=True)
+            self._writer_thread.start()
+
+    def _is_sampled_out(self, record):
+        if record.levelno >= logging.WARNING or self._queue.qsize() < self.queue_size * LOG_SAMPLE_THRESHOLD:
+            return False
+        with self._counter_lock:
+            self.sample_counter += 1
+            if self.sample_counter % LOG_SAMPLE_RATE == 0:
+                return False
+            self.sampled_count += 1
+            return True
+
+    def emit(self, record):
+        try:
+            self._ensure_writer()
+            if self._is_sampled_out(record):
+                return
+            if not hasattr(record, 'tags'):
+                record.tags = self.tags
+            if not hasattr(record, 'details'):
+                record.details = self.details
+            self._queue.put_nowait(self.format(record))
+        except queue.Full:
+            with self._counter_lock:
+                self.dropped_count += 1
+        except Exception:
+            self.handleError(record)
+
+    def _insert_documents(self, document_list):
+        if not document_list or self.collection is None:
+            return
+        with self._insert_lock:
+            try:
+                self.collection.insert_many(document_list, ordered=False)
+            except Exception as err:
+                if not self.fail_silently:
+                    sys.stderr.write(f"Could not write {len(document_list)} log records: {err}\n")
+
+    def _drain_queue(self, max_count=None):
+        document_list = []
+        while max_count is None or len(document_list) < max_count:
+            try:
+                document = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(document, threading.Event):
+                document.set()
+            elif document is not LOG_WRITER_STOP:
+                document_list.append(document)
+        return document_list
+
+    def _run_writer(self):
+        while not self._stop_event.is_set():
+            document_list = []
+            flush_event = None
+            deadline = time.monotonic() + self.flush_interval
+            while len(document_list) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0 or self._stop_event.is_set():
+                    break
+                try:
+                    document = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if document is LOG_WRITER_STOP:
+                    break
+                if isinstance(document, threading.Event):
+                    flush_event = document
+                    break
+                document_list.append(document)
+            self._insert_documents(document_list)
+            if flush_event is not None:
+                flush_event.set()
+
+    def flush(self):
+        """
+        Writes all queued records synchronously. If the writer thread runs, a flush event is queued behind the
+        records and the writer sets it after inserting its current batch, so records the writer already took from
+        the queue are written as well.
+        """
+        if self._pid != os.getpid():
+            return
+        if self._writer_thread is not None and self._writer_thread.is_alive() and not self._stop_event.is_set():
+            flush_event = threading.Event()
+            try:
+                self._queue.put(flush_event, timeout=LOG_CLOSE_TIMEOUT_SECONDS)
+                if flush_event.wait(LOG_CLOSE_TIMEOUT_SECONDS):
+                    return
+            except queue.Full:
+                pass
+        while True:
+            document_list = self._drain_queue(self.batch_size)
+            if not document_list:
+                break
+            self._insert_documents(document_list)
+
+    def get_statistics(self):
+        """
+        :return: dict - number of queued, sampled out and dropped records.
+        """
+        return {"queued_count": self._queue.qsize(),
+                "sampled_count": self.sampled_count,
+                "dropped_count": self.dropped_count}
+
+    def close(self):
+        """
+        Stops the writer thread, writes the queued records and a warning with the number of records lost under
+        back-pressure.
+        """
+        if self._pid == os.getpid():
+            self._stop_event.set()
+            if self._writer_thread is not None and self._writer_thread.is_alive():
+                try:
+                    self._queue.put_nowait(LOG_WRITER_STOP)
+                except queue.Full:
+                    pass
+                self._writer_thread.join(LOG_CLOSE_TIMEOUT_SECONDS)
+            self.flush()
+            if self.sampled_count or self.dropped_count:
+                self.emit_back_pressure_warning()
+        super().close()
+
+    def emit_back_pressure_warning(self):
+        record = logging.LogRecord(APK_SCANNER_LOGGER_NAME, logging.WARNING, __file__, 0,
+                                   f"Log back-pressure: sampled out {self.sampled_count} and dropped "
+                                   f"{self.dropped_count} records.", None, None)
+        record.tags = self.tags
+        record.details = self.get_statistics()
+        self._insert_documents([self.format(record)])
+        self.sampled_count = 0
+        self.dropped_count = 0
+
+
+def flush_apk_scanner_logger():
+    """
+    Writes the queued records of the apk scanner logger. Rq work horses end with os._exit, so the queue has to be
+    flushed before the job function returns.
+    """
+    for handler in logging.getLogger(APK_SCANNER_LOGGER_NAME).handlers:
+        try:
+            handler.flush()
+        except Exception as err:
+            logging.warning(f"Could not flush log handler {handler}: {err}")
+
+
 def setup_apk_scanner_logger(tags=None, details=None):
     if tags is None:
         tags = []
     from webserver.settings import MONGO_DATABASES
-    logger = logging.getLogger("apk_scanner_logger")
+    logger = logging.getLogger(APK_SCANNER_LOGGER_NAME)
     logger.setLevel(logging.DEBUG)
-    if not any(h.__class__.__name__ == "TaggedMongoHandler" for h in logger.handlers):
-        mongo_handler = TaggedMongoHandler(
+    if not any(isinstance(h, TaggedMongoHandler) for h in logger.handlers):
+        mongo_handler = AsyncTaggedMongoHandler(
             tags=tags,
             details=details,
             host=MONGO_DATABASES["default"]["host"],
@@ -116,7 +319,8 @@ def setup_apk_scanner_logger(tags=None, details=None):
 
 def create_log_context(f):
     """
-    Decorator for creating a log context and pushing into.
+    Decorator for creating a log context and pushing into. Profiles the function if profiling is requested for the
+    job.
     """
 
     @functools.wraps(f)
@@ -125,6 +329,11 @@ def create_log_context(f):
             setup_logging()
         except Exception as e:
             pass
-        return f(*args, **kwargs)
+        try:
+            with profile_job(f.__qualname__):
+                return f(*args, **kwargs)
+        finally:
+            flush_apk_scanner_logger()
+            flush_metrics()
 
     return decorated
@@ -1,11 +1,18 @@
 # -*- coding: utf-8 -*-
 # This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
 # See the file 'LICENSE' for copying permission.
-import functools
 import logging
-import uuid
+import os
+import threading
 import mongoengine
 from mongoengine import connection
+from pymongo import monitoring
+from database.query_profiler import SlowOperationProfiler
+
+DEFAULT_ALIAS = "default"
+MAX_POOL_SIZE = int(os.environ.get("MONGODB_MAX_POOL_SIZE", 100))
+_connection_lock = threading.Lock()
+_connection_registry = {"pid": None, "max_pool_size": None, "pool_statistics": None, "slow_operation_profiler": None}
 
 
 def test_connection():
@@ -13,45 +20,171 @@ def test_connection():
     application_setting = WebclientSetting.objects.first()
 
 
-def multiprocess_disconnect_db_connection(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        multiprocess_disconnect_all()
-        return func(*args, **kwargs)
-    return wrapper
+class ConnectionPoolStatistics(monitoring.ConnectionPoolListener):
+    """
+    Counts the connection pool events of the pymongo client of this process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counter_dict = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "connections_checked_out": 0,
+            "connections_checked_in": 0,
+            "check_out_failed": 0,
+            "pool_cleared": 0,
+        }
+
+    def increment(self, counter_name):
+        with self.lock:
+            self.counter_dict[counter_name] += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.increment("pool_cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.increment("connections_created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.increment("connections_closed")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self.increment("check_out_failed")
+
+    def connection_checked_out(self, event):
+        self.increment("connections_checked_out")
+
+    def connection_checked_in(self, event):
+        self.increment("connections_checked_in")
+
+    def get_statistics(self):
+        with self.lock:
+            statistics = dict(self.counter_dict)
+        statistics["open_connections"] = statistics["connections_created"] - statistics["connections_closed"]
+        statistics["in_use_connections"] = statistics["connections_checked_out"] - statistics["connections_checked_in"]
+        return statistics
+
+
+def reset_connection_lock():
+    """
+    Creates a new lock in a forked child, because the lock may have been held by another thread of the parent.
+    """
+    global _connection_lock
+    _connection_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=reset_connection_lock)
 
 
 def multiprocess_disconnect_all():
     """
-    Disconnects all mongoEngine connections and then registers default connection.
-    Workaround for using mongoEngine in a multiprocess environment:
-    See link: https://stackoverflow.com/questions/49390825/using-mongoengine-with-multiprocessing-how-do-you-close-mongoengine-connection
+    Drops all mongoEngine connections without closing them. Used after a fork, because the pymongo client of the
+    parent process must not be used or closed in the child:
+    See link: https://pymongo.readthedocs.io/en/stable/faq.html#is-pymongo-fork-safe
 
     """
-    from webserver.settings import MONGO_DATABASES
-    #mongoengine.disconnect_all()
-    #mongoengine.disconnect()
     connection._connections = {}
     connection._connection_settings = {}
     connection._dbs = {}
 
 
-@multiprocess_disconnect_db_connection
-def init_db(db_settings):
+def is_db_connected(alias=DEFAULT_ALIAS):
     """
-    Register a new mongoengine default connection
+    Checks if this process already registered its own connection.
+
+    :param alias: str - the connection alias.
+
+    :return: bool - True if the connection was created by the current process.
+    """
+    return _connection_registry["pid"] == os.getpid() and alias in connection._connections
+
+
+def init_db(db_settings, max_pool_size=MAX_POOL_SIZE):
+    """
+    Registers the mongoengine default connection of this process. The pooled client is shared by all threads of
+    the process and only created again if the process was forked.
 
     :param db_settings: dict - with mongodb configuration.
+    :param max_pool_size: int - maximal number of connections in the pool.
+
+    :return: pymongo.MongoClient - the client of the default connection.
+
+    """
+    with _connection_lock:
+        if not is_db_connected():
+            if _connection_registry["pid"] is not None:
+                logging.debug(f"Process {os.getpid()} was forked from {_connection_registry['pid']}. Reconnecting.")
+            multiprocess_disconnect_all()
+            pool_statistics = ConnectionPoolStatistics()
+            slow_operation_profiler = SlowOperationProfiler()
+            register_connection(db_settings,
+                                alias=DEFAULT_ALIAS,
+                                connect=True,
+                                maxPoolSize=max_pool_size,
+                                event_listeners=[pool_statistics, slow_operation_profiler])
+            _connection_registry.update({"pid": os.getpid(),
+                                         "max_pool_size": max_pool_size,
+                                         "pool_statistics": pool_statistics,
+                                         "slow_operation_profiler": slow_operation_profiler})
+        return mongoengine.get_connection(DEFAULT_ALIAS)
+
+
+def init_mock_db(db_name):
+    """
+    Registers an in-memory mongomock client as default connection of this process, for instance, to run the
+    benchmarks without a MongoDB server. The data is lost when the process exits.
 
-    :return: mongoengine database connection object.
+    :param db_name: str - name of the database.
+
+    :return: mongomock.MongoClient - the client of the default connection.
+    """
+    import mongomock
+    try:
+        from mongomock.gridfs import enable_gridfs_integration
+        enable_gridfs_integration()
+    except ImportError:
+        logging.debug("GridFS is not supported by the installed mongomock version.")
+    with _connection_lock:
+        multiprocess_disconnect_all()
+        mongoengine.register_connection(alias=DEFAULT_ALIAS,
+                                        db=db_name,
+                                        host="mongodb://localhost",
+                                        mongo_client_class=mongomock.MongoClient)
+        _connection_registry.update({"pid": os.getpid(),
+                                     "max_pool_size": None,
+                                     "pool_statistics": ConnectionPoolStatistics(),
+                                     "slow_operation_profiler": SlowOperationProfiler()})
+        return mongoengine.get_connection(DEFAULT_ALIAS)
+
+
+def get_pool_statistics():
+    """
+    Gets the connection pool statistics of the current process.
 
+    :return: dict - pool counters or an empty dict if the process is not connected.
     """
-    alias = uuid.uuid4()
-    register_connection(db_settings, alias='default', connect=True, maxPoolSize=300)
-    db_con = open_db_connection(db_settings, str(alias))
-    register_connection(db_settings, str(alias))
-    #test_connection()
-    return db_con
+    if not is_db_connected():
+        return {}
+    statistics = _connection_registry["pool_statistics"].get_statistics()
+    statistics.update(_connection_registry["slow_operation_profiler"].get_statistics())
+    statistics.update({"pid": _connection_registry["pid"], "max_pool_size": _connection_registry["max_pool_size"]})
+    return statistics
 
 
 def open_db_connection(db_settings, alias):
@@ -85,7 +218,7 @@ def close_db_con(alias):
     mongoengine.disconnect(alias=alias)
 
 
-def register_connection(db_settings, alias='default', connect=True, maxPoolSize=10):
+def register_connection(db_settings, alias='default', connect=True, maxPoolSize=10, **kwargs):
     db_name, host, port, username, password, authentication_source, auth_mechanism = get_connection_options(db_settings)
     mongoengine.register_connection(alias=alias,
                                     db=db_name,
@@ -96,7 +229,8 @@ def register_connection(db_settings, alias='default', connect=True, maxPoolSize=
                                     authentication_mechanism=auth_mechanism,
                                     authentication_source=authentication_source,
                                     maxPoolSize=maxPoolSize,
-                                    connect=connect)
+                                    connect=connect,
+                                    **kwargs)
 
 
 def reconnect(alias):
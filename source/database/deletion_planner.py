@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import logging
+import os
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from bson import ObjectId
+from mongoengine import CASCADE, FileField, ListField, LazyReferenceField
+from mongoengine.base import get_document
+from rq import get_current_job
+
+DELETE_BATCH_SIZE = 10000
+ROOT_BATCH_SIZE = 20
+FILE_REMOVAL_WORKERS = int(os.environ.get("FILE_REMOVAL_WORKERS", 8))
+GENERIC_FILE_CLASS_NAME = "GenericFile"
+
+
+class DeletionPlan:
+    """
+    Object-ids of all documents that are deleted together with a set of root documents. The ids of dependent
+    collections are collected by following the CASCADE delete rules of the models with bulk $in queries. The side
+    effects of the pre_delete signals (GridFS files, generic files and files on disk) are collected as well, because
+    delete_many does not send signals.
+    """
+
+    def __init__(self):
+        self.document_class_dict = {}
+        self.id_set_dict = {}
+        self.grid_file_dict = {}
+        self.disk_path_set = set()
+
+    def add_ids(self, document_class, object_id_list):
+        """
+        Adds object-ids to the plan.
+
+        :param document_class: document class - root class of the collection.
+        :param object_id_list: iterable(ObjectId)
+
+        :return: list(ObjectId) - the ids that were not planned yet.
+        """
+        collection_name = document_class._get_collection_name()
+        self.document_class_dict.setdefault(collection_name, document_class)
+        id_set = self.id_set_dict.setdefault(collection_name, set())
+        new_id_list = [object_id for object_id in object_id_list if object_id not in id_set]
+        id_set.update(new_id_list)
+        return new_id_list
+
+    def get_document_count_dict(self):
+        """
+        :return: dict(str, int) - number of planned documents by collection.
+        """
+        return {collection_name: len(id_set) for collection_name, id_set in self.id_set_dict.items()}
+
+
+def get_root_document_class(document_class):
+    """
+    :return: document class - the class that owns the collection of an inherited document class.
+    """
+    return get_document(document_class._class_name.split(".")[0])
+
+
+def get_document_class_family(document_class):
+    """
+    :return: list(document class) - the class and all its subclasses.
+    """
+    return [get_document(class_name) for class_name in getattr(document_class, "_subclasses", ())] \
+        or [document_class]
+
+
+def get_cascade_rule_list(document_class):
+    """
+    Gets the fields that reference a document class with the CASCADE delete rule. The rules of subclasses are
+    included, because they share the collection.
+
+    :param document_class: document class - root class of a collection.
+
+    :return: list(tuple(document class, str)) - referencing root class and db field name.
+    """
+    cascade_rule_set = set()
+    for family_class in get_document_class_family(document_class):
+        for (referencing_class, field_name), rule in family_class._meta.get("delete_rules", {}).items():
+            if rule == CASCADE:
+                db_field = referencing_class._fields[field_name].db_field
+                cascade_rule_set.add((get_root_document_class(referencing_class), db_field))
+    return sorted(cascade_rule_set, key=lambda rule: (rule[0].__name__, rule[1]))
+
+
+def iter_object_id_chunks(object_id_list, batch_size=DELETE_BATCH_SIZE):
+    object_id_list = list(object_id_list)
+    for i in range(0, len(object_id_list), batch_size):
+        yield object_id_list[i:i + batch_size]
+
+
+def find_referencing_ids(document_class, db_field, object_id_list):
+    """
+    Gets the object-ids of the documents that reference one of the given ids.
+
+    :return: generator(ObjectId)
+    """
+    collection = document_class._get_collection()
+    for id_chunk in iter_object_id_chunks(object_id_list):
+        for document in collection.find({db_field: {"$in": id_chunk}}, {"_id": 1}):
+            yield document["_id"]
+
+
+def iter_projected_documents(document_class, object_id_list, db_field_list):
+    """
+    Streams the given fields of the planned documents of a collection.
+
+    :return: generator(dict) - raw documents.
+    """
+    collection = document_class._get_collection()
+    projection = {db_field: 1 for db_field in db_field_list}
+    for id_chunk in iter_object_id_chunks(object_id_list):
+        yield from collection.find({"_id": {"$in": id_chunk}}, projection)
+
+
+def get_file_field_dict(document_class):
+    """
+    :return: dict(str, str) - db field name mapped to the GridFS collection of the FileFields of the class family.
+    """
+    file_field_dict = {}
+    for family_class in get_document_class_family(document_class):
+        for field in family_class._fields.values():
+            if isinstance(field, FileField):
+                file_field_dict[field.db_field] = field.collection_name
+    return file_field_dict
+
+
+def get_generic_file_field_list(document_class):
+    """
+    :return: list(str) - db field names of the lists of references to class:'GenericFile'.
+    """
+    db_field_set = set()
+    for family_class in get_document_class_family(document_class):
+        for field in family_class._fields.values():
+            if isinstance(field, ListField) and isinstance(field.field, LazyReferenceField) \
+                    and field.field.document_type.__name__ == GENERIC_FILE_CLASS_NAME:
+                db_field_set.add(field.db_field)
+    return sorted(db_field_set)
+
+
+def add_generic_files(plan, document_class, object_id_list):
+    """
+    Adds the generic files referenced by the documents to the plan. Replaces the pre_delete signals of
+    class:'AndroidApp' and class:'AppCertificate'.
+
+    :return: list(ObjectId) - object-ids of the new generic files.
+    """
+    db_field_list = get_generic_file_field_list(document_class)
+    if not db_field_list:
+        return []
+    generic_file_id_list = []
+    for document in iter_projected_documents(document_class, object_id_list, db_field_list):
+        for db_field in db_field_list:
+            generic_file_id_list.extend(reference for reference in document.get(db_field) or []
+                                        if isinstance(reference, ObjectId))
+    return plan.add_ids(get_document(GENERIC_FILE_CLASS_NAME), generic_file_id_list)
+
+
+def add_grid_files(plan, document_class, object_id_list):
+    """
+    Adds the GridFS files of the FileFields of the documents to the plan.
+    """
+    file_field_dict = get_file_field_dict(document_class)
+    if not file_field_dict:
+        return
+    for document in iter_projected_documents(document_class, object_id_list, list(file_field_dict.keys())):
+        for db_field, grid_collection_name in file_field_dict.items():
+            grid_id = document.get(db_field)
+            if grid_id is not None:
+                plan.grid_file_dict.setdefault(grid_collection_name, set()).add(grid_id)
+
+
+def get_firmware_disk_path_list(firmware, store_paths_list):
+    """
+    Gets the paths on disk that belong to a firmware: the firmware archive, the extracted apps, the exported files
+    and the AECS build files. Replaces the pre_delete signal of class:'AndroidFirmware'.
+
+    :param firmware: dict - raw class:'AndroidFirmware' document.
+    :param store_paths_list: list(tuple(str, dict)) - uuid and paths of the store settings.
+
+    :return: list(str) - absolute paths.
+    """
+    from firmware_handler.firmware_file_exporter import NAME_EXPORT_FOLDER
+    disk_path_list = [path for path in (firmware.get("absolute_store_path"), firmware.get("aecs_build_file_path"))
+                      if path]
+    absolute_store_path = firmware.get("absolute_store_path") or ""
+    for store_uuid, store_paths in store_paths_list:
+        if store_uuid and store_uuid in absolute_store_path:
+            disk_path_list.append(os.path.join(store_paths["FIRMWARE_FOLDER_APP_EXTRACT"], firmware["md5"]))
+            disk_path_list.append(os.path.join(os.path.abspath(store_paths["FIRMWARE_FOLDER_FILE_EXTRACT"]),
+                                               NAME_EXPORT_FOLDER,
+                                               str(firmware["_id"])))
+            break
+    return disk_path_list
+
+
+def add_firmware_disk_paths(plan, document_class, object_id_list):
+    from model import AndroidFirmware, StoreSetting
+    if get_root_document_class(document_class) is not AndroidFirmware:
+        return
+    store_paths_list = [(store_setting.uuid, store_setting.get_store_paths()) for store_setting in StoreSetting.objects()]
+    db_field_list = ["absolute_store_path", "aecs_build_file_path", "md5"]
+    for firmware in iter_projected_documents(document_class, object_id_list, db_field_list):
+        plan.disk_path_set.update(get_firmware_disk_path_list(firmware, store_paths_list))
+
+
+def create_deletion_plan(document_class, object_id_list):
+    """
+    Collects all documents and files that are deleted together with the given documents. The CASCADE rules are
+    followed level by level, so every level costs one $in query per referencing collection and id chunk.
+
+    :param document_class: document class - class of the root documents.
+    :param object_id_list: list(str) - object-ids of the root documents.
+
+    :return: class:'DeletionPlan'
+    """
+    plan = DeletionPlan()
+    root_class = get_root_document_class(document_class)
+    root_id_list = plan.add_ids(root_class, [ObjectId(str(object_id)) for object_id in object_id_list])
+    pending_queue = deque([(root_class, root_id_list)])
+    while pending_queue:
+        planned_class, planned_id_list = pending_queue.popleft()
+        add_grid_files(plan, planned_class, planned_id_list)
+        add_firmware_disk_paths(plan, planned_class, planned_id_list)
+        generic_file_id_list = add_generic_files(plan, planned_class, planned_id_list)
+        if generic_file_id_list:
+            pending_queue.append((get_document(GENERIC_FILE_CLASS_NAME), generic_file_id_list))
+        for referencing_class, db_field in get_cascade_rule_list(planned_class):
+            new_id_list = plan.add_ids(referencing_class,
+                                       find_referencing_ids(referencing_class, db_field, planned_id_list))
+            if new_id_list:
+                pending_queue.append((referencing_class, new_id_list))
+    return plan
+
+
+def delete_grid_files(database, grid_collection_name, grid_id_set):
+    """
+    Deletes GridFS files with two delete_many calls per chunk instead of one GridFS.delete per file.
+    """
+    for id_chunk in iter_object_id_chunks(grid_id_set):
+        database[f"{grid_collection_name}.chunks"].delete_many({"files_id": {"$in": id_chunk}})
+        database[f"{grid_collection_name}.files"].delete_many({"_id": {"$in": id_chunk}})
+
+
+def remove_disk_path(path):
+    """
+    Removes a file or directory. Missing paths are ignored.
+
+    :return: bool - True if the path was removed.
+    """
+    try:
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        elif os.path.lexists(path):
+            os.remove(path)
+        else:
+            return False
+        return True
+    except OSError as err:
+        logging.error(f"Could not remove {path}: {err}")
+        return False
+
+
+def remove_disk_paths(disk_path_list, max_workers=FILE_REMOVAL_WORKERS):
+    """
+    Removes files and directories with a pool of threads. Removing extracted firmware is bound by file system
+    latency, so several removals run in parallel.
+
+    :return: int - number of removed paths.
+    """
+    if not disk_path_list:
+        return 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return sum(executor.map(remove_disk_path, disk_path_list))
+
+
+def update_deletion_progress(progress_dict):
+    job = get_current_job()
+    if job:
+        job.meta["deletion_progress"] = progress_dict
+        job.save_meta()
+
+
+def execute_deletion_plan(plan, progress_dict=None):
+    """
+    Deletes the planned documents with delete_many in batches of DELETE_BATCH_SIZE. Collections are deleted in
+    reverse discovery order, so dependent documents are removed before the documents they reference. Files on disk
+    are removed last.
+
+    :param plan: class:'DeletionPlan'
+    :param progress_dict: dict - progress counters that are updated and stored in the meta-data of the rq job.
+
+    :return: dict - the progress counters.
+    """
+    progress_dict = progress_dict if progress_dict is not None else {}
+    deleted_count_dict = progress_dict.setdefault("deleted_count_dict", {})
+    for collection_name in reversed(list(plan.id_set_dict.keys())):
+        document_class = plan.document_class_dict[collection_name]
+        collection = document_class._get_collection()
+        for id_chunk in iter_object_id_chunks(plan.id_set_dict[collection_name]):
+            result = collection.delete_many({"_id": {"$in": id_chunk}})
+            deleted_count_dict[collection_name] = deleted_count_dict.get(collection_name, 0) + result.deleted_count
+            update_deletion_progress(progress_dict)
+
+    database = next(iter(plan.document_class_dict.values()))._get_db() if plan.document_class_dict else None
+    for grid_collection_name, grid_id_set in plan.grid_file_dict.items():
+        delete_grid_files(database, grid_collection_name, grid_id_set)
+        progress_dict["deleted_grid_file_count"] = progress_dict.get("deleted_grid_file_count", 0) + len(grid_id_set)
+
+    progress_dict["removed_path_count"] = progress_dict.get("removed_path_count", 0) + \
+        remove_disk_paths(sorted(plan.disk_path_set))
+    update_deletion_progress(progress_dict)
+    return progress_dict
+
+
+def delete_documents_with_plan(document_class, object_id_list, root_batch_size=ROOT_BATCH_SIZE):
+    """
+    Deletes documents and everything that depends on them. The root documents are processed in batches, so the id
+    sets of a plan stay small enough to be held in memory.
+
+    :param document_class: document class - class of the documents to delete.
+    :param object_id_list: list(str) - object-ids of the documents to delete.
+    :param root_batch_size: int - number of root documents per plan.
+
+    :return: dict - progress counters with the number of deleted documents per collection.
+    """
+    object_id_list = list(object_id_list)
+    progress_dict = {"root_count": len(object_id_list), "deleted_root_count": 0}
+    for id_chunk in iter_object_id_chunks(object_id_list, root_batch_size):
+        plan = create_deletion_plan(document_class, id_chunk)
+        logging.info(f"Deletion plan for {len(id_chunk)} {document_class.__name__}: "
+                     f"{plan.get_document_count_dict()}, {len(plan.disk_path_set)} paths on disk.")
+        execute_deletion_plan(plan, progress_dict)
+        progress_dict["deleted_root_count"] += len(id_chunk)
+        update_deletion_progress(progress_dict)
+    return progress_dict
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import logging
+from mongoengine.base import get_document
+from context.context_creator import create_db_context, create_log_context
+
+INDEX_PLAN_DOCUMENT_LIST = ["AndroidFirmware", "AndroidApp", "FirmwareFile", "ApkScannerReport"]
+
+
+def get_index_plan_status(document_name_list=None):
+    """
+    Compares the declared indexes of the hot collections with the indexes in the database.
+
+    :param document_name_list: list(str) - class names of the documents to compare.
+
+    :return: dict(str, dict) - missing and extra index keys by class name.
+    """
+    status_dict = {}
+    for document_name in document_name_list or INDEX_PLAN_DOCUMENT_LIST:
+        status_dict[document_name] = get_document(document_name).compare_indexes()
+    return status_dict
+
+
+def ensure_index_plan(document_name_list=None):
+    """
+    Creates the declared indexes of the hot collections. The index specifications set background builds, so
+    servers before MongoDB 4.2 do not block the collection. Newer servers ignore the option and always use the
+    optimized build that only locks at the start and end.
+
+    :param document_name_list: list(str) - class names of the documents to index.
+
+    :return: dict(str, dict) - missing and extra index keys by class name after the build.
+    """
+    for document_name in document_name_list or INDEX_PLAN_DOCUMENT_LIST:
+        logging.info(f"Ensure indexes of {document_name}")
+        get_document(document_name).ensure_indexes()
+    return get_index_plan_status(document_name_list)
+
+
+@create_log_context
+@create_db_context
+def start_index_plan_build(document_name_list=None):
+    status_dict = ensure_index_plan(document_name_list)
+    for document_name, status in status_dict.items():
+        if status["missing"] or status["extra"]:
+            logging.warning(f"Indexes of {document_name} differ from the plan: {status}")
+    return status_dict
@@ -51,7 +51,17 @@ def filter_mongodb_dict_chars(to_replace_dict):
     for key, value in to_replace_dict.items():
         if isinstance(value, dict):
             value = filter_mongodb_dict_chars(value)
-        new_key = re.sub("^[$]+", MONGODB_REPLACEMENT_CHARS, str(key))
-        new_key = new_key.replace('.', MONGODB_REPLACEMENT_CHARS)
-        result_dict[new_key] = value
+        result_dict[filter_mongodb_key(key)] = value
     return result_dict
+
+
+def filter_mongodb_key(key):
+    """
+    Replaces the invalid mongodb chars of a single dict key.
+
+    :param key: object - the key to sanitize. Non-string keys are converted to str.
+    :return: str - sanitized key.
+
+    """
+    new_key = re.sub("^[$]+", MONGODB_REPLACEMENT_CHARS, str(key))
+    return new_key.replace('.', MONGODB_REPLACEMENT_CHARS)
@@ -2,23 +2,25 @@
 # This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
 # See the file 'LICENSE' for copying permission.
 import logging
-from mongoengine import DoesNotExist
 from bson import ObjectId
 
-def get_all_document_ids(document_class):
+DEFAULT_FETCH_BATCH_SIZE = 1000
+
+
+def get_all_document_ids(document_class, query_filter=None):
     """
-    Gets a list of all document id's of the given document class.
+    Gets a list of all document id's of the given document class. The ids are read with a scalar query, so no
+    documents are created.
 
     :param document_class: document - the type of the document to fetch.
+    :param query_filter: dict - optional field names/values to filter by.
 
     :return: list(str) - complete list of object-id's of the given document class from the db.
 
     """
-    document_instance_list = document_class.objects.only('id')
-    id_list = []
-    for document_instance in document_instance_list:
-        id_list.append(str(document_instance.id))
-    logging.info(f"Number of documents in list: {len(document_instance_list)}")
+    id_list = [str(object_id) for object_id in
+               document_class.objects(**(query_filter or {})).no_cache().scalar('id')]
+    logging.info(f"Number of documents in list: {len(id_list)}")
     return id_list
 
 
@@ -37,6 +39,72 @@ def is_valid_object_id(document_id):
         return False
 
 
+def get_document_id(document_reference):
+    """
+    Gets the object-id of a document, a lazy reference or an object-id string.
+
+    :param document_reference: document, LazyReference, ObjectId or str.
+
+    :return: str - the object-id.
+    """
+    return str(getattr(document_reference, "pk", document_reference))
+
+
+def iter_id_chunks(document_id_list, batch_size=DEFAULT_FETCH_BATCH_SIZE):
+    """
+    Splits the object-ids into chunks. Invalid object-ids are skipped.
+
+    :param document_id_list: iterable(str) - object-ids, documents or lazy references.
+    :param batch_size: int - number of ids per chunk.
+
+    :return: generator(list(str)) - chunks of object-ids.
+    """
+    id_chunk = []
+    for document_reference in document_id_list:
+        document_id = get_document_id(document_reference)
+        if not is_valid_object_id(document_id):
+            logging.warning(f"Skipping ID because is not a valid object-id {document_id}")
+            continue
+        id_chunk.append(document_id)
+        if len(id_chunk) >= batch_size:
+            yield id_chunk
+            id_chunk = []
+    if id_chunk:
+        yield id_chunk
+
+
+def iter_documents_by_ids(document_id_list,
+                          document_class,
+                          only_fields=None,
+                          batch_size=DEFAULT_FETCH_BATCH_SIZE,
+                          no_dereference=True):
+    """
+    Loads the documents of the given object-ids lazily. Every chunk of ids is fetched with one $in query and the
+    documents are yielded in the order of the input list.
+
+    :param document_id_list: iterable(str) - object-ids, documents or lazy references.
+    :param document_class: document - type of the document to fetch.
+    :param only_fields: list(str) - inclusion list of attributes name to fetch from the object.
+    :param batch_size: int - number of ids per query.
+    :param no_dereference: bool - if True, references are not dereferenced.
+
+    :return: generator(document_instance) - documents in input order. Missing ids are skipped.
+    """
+    for id_chunk in iter_id_chunks(document_id_list, batch_size):
+        queryset = document_class.objects(pk__in=id_chunk)
+        if only_fields:
+            queryset = queryset.only(*only_fields)
+        if no_dereference:
+            queryset = queryset.no_dereference()
+        document_dict = {str(document.pk): document for document in queryset}
+        for document_id in id_chunk:
+            document = document_dict.get(document_id)
+            if document is None:
+                logging.warning(f"ID does not exist {document_id} {document_class}")
+            else:
+                yield document
+
+
 def create_document_list_by_ids(document_id_list, document_class, attribute_filter_list=None):
     """
     Gets a list of document instances from the database.
@@ -48,20 +116,7 @@ def create_document_list_by_ids(document_id_list, document_class, attribute_filt
     :return: list(document_instances)
 
     """
-    document_instance_list = []
-    for document_id in document_id_list:
-        if is_valid_object_id(document_id):
-            try:
-                if not attribute_filter_list:
-                    document_instance = document_class.objects.get(pk=document_id)
-                else:
-                    document_instance = document_class.objects.only(*attribute_filter_list).get(pk=document_id)
-                document_instance_list.append(document_instance)
-            except DoesNotExist:
-                logging.warning(f"ID does not exist {document_id} {document_class}")
-        else:
-            logging.warning(f"Skipping ID because is not a valid object-id {document_id}")
-    return document_instance_list
+    return list(iter_documents_by_ids(document_id_list, document_class, only_fields=attribute_filter_list))
 
 
 def filter_by_attribute_exists(document_list, reference_attribute_name):
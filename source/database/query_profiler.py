@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import datetime
+import json
+import logging
+import os
+import queue
+import threading
+from pymongo import monitoring
+from app_metrics.recorder import observe_histogram, METRICS_ENABLED
+
+SLOW_OPERATION_LOG_COLLECTION = "slow_operation_log"
+SLOW_OPERATION_THRESHOLD_MS = float(os.environ.get("MONGODB_SLOW_OPERATION_MS", 100))
+SLOW_OPERATION_QUEUE_SIZE = 10000
+SLOW_OPERATION_BATCH_SIZE = 100
+SLOW_OPERATION_FLUSH_INTERVAL_SECONDS = 2.0
+MAX_EXPLAINED_SHAPES = 1000
+SHAPE_PLACEHOLDER = "?"
+IGNORED_COMMAND_NAMES = {"hello", "ismaster", "ping", "buildinfo", "saslstart", "saslcontinue", "authenticate",
+                         "getnonce", "endsessions", "killcursors", "explain", "getlasterror", "listdatabases",
+                         "aborttransaction", "committransaction"}
+EXPLAINABLE_COMMAND_NAMES = {"find", "aggregate", "count", "distinct"}
+EXPLAIN_REMOVED_KEYS = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "autocommit",
+                        "startTransaction", "readConcern", "writeConcern"}
+COLLECTION_KEY_BY_COMMAND = {"getMore": "collection"}
+
+
+def get_value_shape(value):
+    """
+    Replaces the values of a query by placeholders and keeps its structure. Field names and operators stay, so
+    queries that only differ in their values have the same shape.
+
+    :param value: object - query document, list or value.
+
+    :return: object - the shape of the value.
+    """
+    if isinstance(value, dict):
+        return {key: get_value_shape(sub_value) for key, sub_value in value.items()}
+    if isinstance(value, (list, tuple)) and value and all(isinstance(item, dict) for item in value):
+        return [get_value_shape(item) for item in value]
+    return SHAPE_PLACEHOLDER
+
+
+def get_pipeline_shape(pipeline):
+    """
+    Gets the shape of an aggregation pipeline. The $match stages are normalised, all other stages are reduced to
+    their name.
+
+    :param pipeline: list(dict) - aggregation stages.
+
+    :return: list - the shape of the pipeline.
+    """
+    shape_list = []
+    for stage in pipeline or []:
+        stage_name = next(iter(stage), SHAPE_PLACEHOLDER)
+        if stage_name == "$match":
+            shape_list.append({stage_name: get_value_shape(stage[stage_name])})
+        else:
+            shape_list.append(stage_name)
+    return shape_list
+
+
+def get_command_shape(command_name, command):
+    """
+    Creates a normalised description of a command that is used to group slow operations.
+
+    :param command_name: str - name of the command, for instance, "find".
+    :param command: dict - the command document.
+
+    :return: str - json of the command shape.
+    """
+    if command_name == "find":
+        shape = {"filter": get_value_shape(command.get("filter", {}))}
+        if command.get("sort"):
+            shape["sort"] = dict(command["sort"])
+    elif command_name == "aggregate":
+        shape = {"pipeline": get_pipeline_shape(command.get("pipeline"))}
+    elif command_name in ("count", "findAndModify"):
+        shape = {"query": get_value_shape(command.get("query", {}))}
+    elif command_name == "distinct":
+        shape = {"key": command.get("key"), "query": get_value_shape(command.get("query", {}))}
+    elif command_name in ("update", "delete"):
+        statement_key = "updates" if command_name == "update" else "deletes"
+        statement_list = command.get(statement_key) or [{}]
+        shape = {"q": get_value_shape(statement_list[0].get("q", {})), "statements": len(statement_list)}
+    else:
+        shape = {}
+    return json.dumps(shape, default=str)
+
+
+def get_collection_name(command_name, command):
+    """
+    :param command_name: str - name of the command.
+    :param command: dict - the command document.
+
+    :return: str - the collection the command runs on or an empty string for database commands.
+    """
+    collection_name = command.get(COLLECTION_KEY_BY_COMMAND.get(command_name, command_name))
+    return collection_name if isinstance(collection_name, str) else ""
+
+
+def get_docs_returned(command_name, reply):
+    """
+    Gets the number of documents returned or modified by a command.
+
+    :param command_name: str - name of the command.
+    :param reply: dict - the reply of the server.
+
+    :return: int or None
+    """
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+        return len(batch) if batch is not None else None
+    if command_name == "distinct" and "values" in reply:
+        return len(reply["values"])
+    return reply.get("n")
+
+
+def get_docs_examined(explain_reply):
+    """
+    Sums the examined documents of all execution stats in an explain reply. Aggregations and sharded queries
+    report one execution stats document per stage or shard.
+
+    :param explain_reply: dict - reply of the explain command with verbosity "executionStats".
+
+    :return: int or None - the number of examined documents.
+    """
+    docs_examined = None
+    if isinstance(explain_reply, dict):
+        if "totalDocsExamined" in explain_reply:
+            return explain_reply["totalDocsExamined"]
+        sub_value_list = explain_reply.values()
+    elif isinstance(explain_reply, list):
+        sub_value_list = explain_reply
+    else:
+        return None
+    for sub_value in sub_value_list:
+        sub_docs_examined = get_docs_examined(sub_value)
+        if sub_docs_examined is not None:
+            docs_examined = (docs_examined or 0) + sub_docs_examined
+    return docs_examined
+
+
+def create_explain_command(command_name, command):
+    """
+    :param command_name: str - name of the command.
+    :param command: dict - the command document.
+
+    :return: dict - explain command that executes the command with the same filter.
+    """
+    explained_command = {key: value for key, value in command.items() if key not in EXPLAIN_REMOVED_KEYS}
+    return {"explain": explained_command, "verbosity": "executionStats"}
+
+
+class SlowOperationProfiler(monitoring.CommandListener):
+    """
+    Records commands that take longer than the threshold to the capped slow operation log. The callbacks of pymongo
+    only put the record into a bounded queue, a writer thread normalises, explains and inserts them in batches. The
+    examined documents are taken from one explain per shape, because the replies of the commands do not contain them.
+    The duration of every command is added to the latency histogram of the pipeline metrics.
+    """
+
+    def __init__(self, threshold_ms=SLOW_OPERATION_THRESHOLD_MS, queue_size=SLOW_OPERATION_QUEUE_SIZE):
+        self.threshold_ms = threshold_ms
+        self.started_command_dict = {}
+        self.record_queue = queue.Queue(maxsize=queue_size)
+        self.explained_shape_dict = {}
+        self.dropped_count = 0
+        self.writer_lock = threading.Lock()
+        self.writer_thread = None
+
+    def is_ignored(self, event):
+        if event.command_name.lower() in IGNORED_COMMAND_NAMES:
+            return True
+        return get_collection_name(event.command_name, event.command) == SLOW_OPERATION_LOG_COLLECTION
+
+    def started(self, event):
+        if (self.threshold_ms > 0 or METRICS_ENABLED) and not self.is_ignored(event):
+            self.started_command_dict[event.request_id] = (event.command, event.database_name)
+
+    def succeeded(self, event):
+        started_command = self.started_command_dict.pop(event.request_id, None)
+        if started_command is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        command, database_name = started_command
+        observe_histogram("fmd_mongodb_operation_duration_seconds", duration_ms / 1000,
+                          command=event.command_name,
+                          collection=get_collection_name(event.command_name, command))
+        if 0 < self.threshold_ms <= duration_ms:
+            self.enqueue({"command_name": event.command_name,
+                          "command": command,
+                          "database_name": database_name,
+                          "duration_ms": duration_ms,
+                          "docs_returned": get_docs_returned(event.command_name, event.reply),
+                          "timestamp": datetime.datetime.now()})
+
+    def failed(self, event):
+        self.started_command_dict.pop(event.request_id, None)
+
+    def enqueue(self, record):
+        try:
+            self.record_queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_count += 1
+            return
+        self.ensure_writer()
+
+    def ensure_writer(self):
+        if self.writer_thread is None or not self.writer_thread.is_alive():
+            with self.writer_lock:
+                if self.writer_thread is None or not self.writer_thread.is_alive():
+                    self.writer_thread = threading.Thread(target=self.write_records,
+                                                          name="slow-operation-writer",
+                                                          daemon=True)
+                    self.writer_thread.start()
+
+    def write_records(self):
+        """
+        Inserts the queued records into the slow operation log until the process exits.
+        """
+        while True:
+            record_list = [self.record_queue.get()]
+            try:
+                while len(record_list) < SLOW_OPERATION_BATCH_SIZE:
+                    record_list.append(self.record_queue.get(timeout=SLOW_OPERATION_FLUSH_INTERVAL_SECONDS))
+            except queue.Empty:
+                pass
+            try:
+                self.insert_records(record_list)
+            except Exception as err:
+                logging.warning(f"Could not write {len(record_list)} slow operations: {err}")
+
+    def insert_records(self, record_list):
+        from model.SlowOperationLog import SlowOperationLog
+        collection = SlowOperationLog._get_collection()
+        document_list = [self.create_log_document(collection.database.client, record) for record in record_list]
+        collection.insert_many(document_list, ordered=False)
+
+    def create_log_document(self, client, record):
+        command_name = record["command_name"]
+        command = record["command"]
+        collection_name = get_collection_name(command_name, command)
+        shape = get_command_shape(command_name, command)
+        return {"timestamp": record["timestamp"],
+                "database_name": record["database_name"],
+                "collection_name": collection_name,
+                "command_name": command_name,
+                "shape": shape,
+                "duration_ms": record["duration_ms"],
+                "docs_examined": self.get_shape_docs_examined(client, record, collection_name, shape),
+                "docs_returned": record["docs_returned"],
+                "pid": os.getpid()}
+
+    def get_shape_docs_examined(self, client, record, collection_name, shape):
+        """
+        Runs an explain for the first slow command of a shape. Later commands of the same shape reuse the result.
+
+        :return: int or None - examined documents or None if the command can not be explained.
+        """
+        command_name = record["command_name"]
+        if command_name not in EXPLAINABLE_COMMAND_NAMES:
+            return None
+        shape_key = (collection_name, command_name, shape)
+        if shape_key not in self.explained_shape_dict:
+            if len(self.explained_shape_dict) >= MAX_EXPLAINED_SHAPES:
+                return None
+            try:
+                explain_reply = client[record["database_name"]].command(
+                    create_explain_command(command_name, record["command"]))
+                self.explained_shape_dict[shape_key] = get_docs_examined(explain_reply)
+            except Exception as err:
+                logging.debug(f"Could not explain {command_name} on {collection_name}: {err}")
+                self.explained_shape_dict[shape_key] = None
+        return self.explained_shape_dict[shape_key]
+
+    def get_statistics(self):
+        return {"slow_operation_threshold_ms": self.threshold_ms,
+                "slow_operations_queued": self.record_queue.qsize(),
+                "slow_operations_dropped": self.dropped_count,
+                "explained_shapes": len(self.explained_shape_dict)}
+
+
+def get_top_slow_operations(limit=20, since=None, collection_name=None):
+    """
+    Groups the slow operation log by collection and shape and sorts the groups by their total duration.
+
+    :param limit: int - maximal number of groups.
+    :param since: datetime - only operations after this time are grouped.
+    :param collection_name: str - only operations on this collection are grouped.
+
+    :return: list(dict) - groups with count, total, average and maximal duration and examined documents.
+    """
+    from model.SlowOperationLog import SlowOperationLog
+    match_dict = {}
+    if since:
+        match_dict["timestamp"] = {"$gte": since}
+    if collection_name:
+        match_dict["collection_name"] = collection_name
+    pipeline = [
+        {"$match": match_dict},
+        {"$group": {"_id": {"collection_name": "$collection_name",
+                            "command_name": "$command_name",
+                            "shape": "$shape"},
+                    "count": {"$sum": 1},
+                    "total_duration_ms": {"$sum": "$duration_ms"},
+                    "avg_duration_ms": {"$avg": "$duration_ms"},
+                    "max_duration_ms": {"$max": "$duration_ms"},
+                    "max_docs_examined": {"$max": "$docs_examined"},
+                    "avg_docs_returned": {"$avg": "$docs_returned"},
+                    "last_seen": {"$max": "$timestamp"}}},
+        {"$sort": {"total_duration_ms": -1}},
+        {"$limit": limit}
+    ]
+    offender_list = []
+    for group in SlowOperationLog.objects.aggregate(pipeline, allowDiskUse=True):
+        offender = group.pop("_id")
+        offender.update(group)
+        offender["last_seen"] = offender["last_seen"].isoformat() if offender.get("last_seen") else None
+        offender_list.append(offender)
+    return offender_list
@@ -6,7 +6,8 @@ from mongoengine import DoesNotExist
 from string import Template
 from dynamic_analysis.emulator_preparation.aosp_file_exporter import get_subfolders
 from firmware_handler.firmware_file_exporter import remove_unblob_extract_directories
-from model import GenericFile
+from database.query_document import iter_documents_by_ids
+from model import GenericFile, AndroidApp
 from dynamic_analysis.emulator_preparation.aosp_meta_writer import add_module_to_meta_file, add_to_log_file
 from dynamic_analysis.emulator_preparation.templates.android_app_module_template import ANDROID_MK_TEMPLATE, \
     ANDROID_BP_TEMPLATE, LIST_SINGLETON_APP_MODULES, AOSP_DEFAULT_PACKAGE_NAMES
@@ -18,8 +19,7 @@ def create_build_files_for_apps(android_app_id_list, format_name):
     :param android_app_id_list: list - A list of ObjectIDs for class:'AndroidApp'.
     :param format_name: str - 'mk' or 'bp' file format.
     """
-    for android_app_lazy in android_app_id_list:
-        android_app = android_app_lazy.fetch()
+    for android_app in iter_documents_by_ids(android_app_id_list, AndroidApp):
         logging.debug(f"Creating build files for app {android_app.filename}...")
         create_build_file_for_app(android_app, format_name)
 
@@ -64,13 +64,12 @@ class VirusTotalScanJob(ScanJob):
     @create_log_context
     @create_db_context
     def start_scan(self, vt_api_key):
-        android_app_id_list = self.object_id_list
+        android_app_id_list = self.get_scan_id_list()
         logging.info(f"Virustotal analysis started! With {str(len(android_app_id_list))} apps.")
         worker_args_list = [vt_api_key]
         if len(android_app_id_list) > 0:
             python_process = start_python_interpreter(item_list=android_app_id_list,
                                                       worker_function=start_virustotal_multiprocessing,
-                                                      number_of_processes=os.cpu_count(),
                                                       use_id_list=True,
                                                       module_name=self.MODULE_NAME,
                                                       interpreter_path=self.INTERPRETER_PATH,
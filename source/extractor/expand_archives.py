@@ -23,6 +23,7 @@ from extractor.brotli_extractor import extract_brotli
 from firmware_handler.const_regex_patterns import EXT_IMAGE_PATTERNS_DICT
 from firmware_handler.ext4_mount_util import run_simg2img_convert
 from firmware_handler.firmware_file_indexer import create_firmware_file_list
+from app_metrics.tracing import start_span
 
 
 EXTRACTION_SEMAPHORE = threading.Semaphore(20)
@@ -334,23 +335,34 @@ def remove_fmd_temp_directories(search_path):
 
 
 def extract_image_file(image_path, extract_dir_path):
+    """
+    Tries the image extraction strategies in order until one succeeds. Every attempt is traced as span, so the time
+    of failed strategies is visible.
+
+    :param image_path: str - path to the image file.
+    :param extract_dir_path: str - path to the folder where the image is extracted to.
+
+    :raises: RuntimeError - in case no strategy could extract the image.
+    """
     image_path = os.path.abspath(image_path)
     extract_dir_path = os.path.abspath(extract_dir_path)
     logging.info(f"Attempt to extract image: {image_path} to: {extract_dir_path}")
-    if extract_simg_ext4(image_path, extract_dir_path):
-        logging.debug("Image extraction successful with simg_ext4extractor")
-    elif extract_ext4(image_path, extract_dir_path):
-        logging.debug("Image extraction successful with ext4extractor")
-    elif mount_extract(image_path, extract_dir_path):
-        logging.debug("Image extraction successful with mount extractor")
-    elif simg2img_and_mount_extract(image_path, extract_dir_path):
-        logging.debug("Image extraction successful with simg2img and mount extractor")
-    elif unblob_extract(image_path, extract_dir_path, depth=25):
-        logging.debug("Image extraction successful with unblob extraction suite")
-    elif binwalk_extract(image_path, extract_dir_path, recursive_extraction=True):
-        logging.debug("Image extraction successful with binwalk extraction suite")
-    else:
-        raise RuntimeError(f"Could not extract data from image: {image_path} Maybe unknown format or mount error.")
+    strategy_list = [
+        ("simg_ext4extractor", lambda: extract_simg_ext4(image_path, extract_dir_path)),
+        ("ext4extractor", lambda: extract_ext4(image_path, extract_dir_path)),
+        ("mount", lambda: mount_extract(image_path, extract_dir_path)),
+        ("simg2img_mount", lambda: simg2img_and_mount_extract(image_path, extract_dir_path)),
+        ("unblob", lambda: unblob_extract(image_path, extract_dir_path, depth=25)),
+        ("binwalk", lambda: binwalk_extract(image_path, extract_dir_path, recursive_extraction=True)),
+    ]
+    for strategy, extract_function in strategy_list:
+        with start_span("extract_image_strategy", strategy=strategy) as span:
+            is_success = bool(extract_function())
+            span.set_attribute("is_success", is_success)
+        if is_success:
+            logging.debug(f"Image extraction successful with {strategy}")
+            return
+    raise RuntimeError(f"Could not extract data from image: {image_path} Maybe unknown format or mount error.")
 
 
 def is_enough_extracted(file_path):
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.http import content_disposition_header, http_date
+
+DOWNLOAD_BLOCK_SIZE = 1024 * 1024
+DEFAULT_CONTENT_TYPE = "application/octet-stream"
+RANGE_HEADER_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class RangeFileReader:
+    """
+    Reads a byte range of an open file. The file is positioned at the start of the range, so servers that support
+    wsgi.file_wrapper, for instance gunicorn, send the range with os.sendfile and the Content-Length as count.
+    Other servers read the range in blocks.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining_bytes = length
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def read(self, size=-1):
+        if self.remaining_bytes <= 0:
+            return b""
+        if size is None or size < 0 or size > self.remaining_bytes:
+            size = self.remaining_bytes
+        data = self.file.read(size)
+        self.remaining_bytes -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def create_etag(file_stat):
+    """
+    :param file_stat: os.stat_result - stat of the file.
+
+    :return: str - strong etag that changes with the size and modification time of the file.
+    """
+    return f'"{file_stat.st_size:x}-{file_stat.st_mtime_ns:x}"'
+
+
+def parse_range_header(range_header, file_size):
+    """
+    Parses a single byte range of a Range header. Multiple ranges are not supported and answered with the
+    complete file, which RFC 9110 allows.
+
+    :param range_header: str - value of the Range header, for instance, "bytes=100-" or "bytes=-500".
+    :param file_size: int - size of the file in bytes.
+
+    :raises RangeNotSatisfiable: if the range starts after the end of the file.
+
+    :return: (int, int) or None - first and last byte of the range or None to send the complete file.
+    """
+    match = RANGE_HEADER_PATTERN.match((range_header or "").strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    start_raw, end_raw = match.groups()
+    if start_raw == "":
+        suffix_length = int(end_raw)
+        if suffix_length == 0 or file_size == 0:
+            raise RangeNotSatisfiable()
+        return max(file_size - suffix_length, 0), file_size - 1
+    start = int(start_raw)
+    end = int(end_raw) if end_raw else file_size - 1
+    if end_raw and end < start:
+        return None
+    if start >= file_size:
+        raise RangeNotSatisfiable()
+    return start, min(end, file_size - 1)
+
+
+def is_if_range_valid(if_range_header, etag, last_modified):
+    """
+    Checks the If-Range precondition. Ranges are only sent if the client has the current version of the file.
+
+    :param if_range_header: str or None - value of the If-Range header.
+    :param etag: str - etag of the file.
+    :param last_modified: str - http date of the last modification of the file.
+
+    :return: bool - true if the range can be sent.
+    """
+    if not if_range_header:
+        return True
+    if_range_header = if_range_header.strip()
+    if if_range_header.startswith(('"', 'W/')):
+        return if_range_header == etag
+    return if_range_header == last_modified
+
+
+def get_accel_redirect_uri(file_path):
+    """
+    Maps a file in the protected file store to the internal nginx location.
+
+    :param file_path: str - path of the file.
+
+    :return: str or None - the internal uri or None if offloading is disabled or the file is outside the store.
+    """
+    if not settings.DOWNLOAD_ACCEL_REDIRECT_ENABLED:
+        return None
+    store_root = os.path.realpath(settings.DOWNLOAD_ACCEL_REDIRECT_ROOT)
+    real_path = os.path.realpath(file_path)
+    if os.path.commonpath([store_root, real_path]) != store_root:
+        return None
+    relative_path = os.path.relpath(real_path, store_root)
+    return settings.DOWNLOAD_ACCEL_REDIRECT_LOCATION + quote(relative_path)
+
+
+def create_accel_redirect_response(accel_redirect_uri, filename, content_type):
+    """
+    Creates an empty response that lets nginx send the file. nginx handles Range and If-Range itself.
+    """
+    response = HttpResponse(content_type=content_type)
+    response["X-Accel-Redirect"] = accel_redirect_uri
+    response["X-Accel-Buffering"] = "no"
+    response["Content-Disposition"] = content_disposition_header(True, filename)
+    return response
+
+
+def create_download_response(request, file_path, filename, allow_accel_redirect=True):
+    """
+    Creates the download response of a file from the file store. Files within the protected store are sent by
+    nginx with X-Accel-Redirect. Otherwise, the file is sent by the wsgi server with support for Range and
+    If-Range requests.
+
+    :param request: django request - the download request.
+    :param file_path: str - path of the file.
+    :param filename: str - filename of the attachment.
+    :param allow_accel_redirect: bool - false for requests that nginx can not serve as static files, for instance,
+    POST requests.
+
+    :return: django response
+    """
+    if not os.path.isfile(file_path):
+        return HttpResponse(status=404)
+    content_type = mimetypes.guess_type(filename)[0] or DEFAULT_CONTENT_TYPE
+    accel_redirect_uri = get_accel_redirect_uri(file_path) if allow_accel_redirect else None
+    if accel_redirect_uri:
+        return create_accel_redirect_response(accel_redirect_uri, filename, content_type)
+
+    file = open(file_path, "rb")
+    file_stat = os.fstat(file.fileno())
+    file_size = file_stat.st_size
+    etag = create_etag(file_stat)
+    last_modified = http_date(file_stat.st_mtime)
+    byte_range = None
+    if is_if_range_valid(request.headers.get("If-Range"), etag, last_modified):
+        try:
+            byte_range = parse_range_header(request.headers.get("Range"), file_size)
+        except RangeNotSatisfiable:
+            file.close()
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{file_size}"
+            return response
+    start, end = byte_range or (0, file_size - 1)
+    file.seek(start)
+    response = FileResponse(RangeFileReader(file, end - start + 1),
+                            status=206 if byte_range else 200,
+                            content_type=content_type,
+                            as_attachment=True,
+                            filename=filename)
+    response.block_size = DOWNLOAD_BLOCK_SIZE
+    response["Content-Length"] = str(end - start + 1)
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = last_modified
+    if byte_range:
+        response["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+    return response
@@ -2,8 +2,12 @@
 # This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
 # See the file 'LICENSE' for copying permission.
 from django.urls import path
-from .views import DownloadAppBuildView
+from .views import DownloadAppBuildView, DownloadExportView, DownloadFileView, \
+    DownloadBundleView
 
 urlpatterns = [
-    path("download/android_app/build_files", DownloadAppBuildView.as_view({'post': 'download'}))
+    path("download/android_app/build_files", DownloadAppBuildView.as_view({'post': 'download'})),
+    path("download/export/<str:export_id>/<str:file_name>", DownloadExportView.as_view({'get': 'download'})),
+    path("download/file/<str:file_kind>/<str:object_id>", DownloadFileView.as_view({'get': 'download'})),
+    path("download/bundle", DownloadBundleView.as_view({'post': 'download'})),
 ]
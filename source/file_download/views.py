@@ -2,30 +2,101 @@
 # This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
 # See the file 'LICENSE' for copying permission.
 import logging
-import mimetypes
 import os
 import uuid
-from django.http import FileResponse, StreamingHttpResponse
-from wsgiref.util import FileWrapper
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from rest_framework.viewsets import ViewSet
-from model import AndroidFirmware
+from model import AndroidFirmware, AndroidApp, FirmwareFile
+from processing.corpus_export import get_export_folder, read_manifest, MANIFEST_FILE_NAME
 from rest_framework.decorators import action
+from file_download.download_backend import create_download_response
+from file_download.zip_stream import iter_zip_stream
+
+FILE_KIND_FIRMWARE = "firmware"
+FILE_KIND_ANDROID_APP = "android_app"
+FILE_KIND_AECS_BUILD = "aecs_build"
+FILE_KIND_EXPORT = "export"
+BUNDLE_MODEL_DICT = {"AndroidApp": (AndroidApp, "filename"), "FirmwareFile": (FirmwareFile, "name")}
+BUNDLE_QUERY_BATCH_SIZE = 1000
+MAX_BUNDLE_SIZE = 100000
+
+
+def get_export_file_path(export_id, file_name, storage_index):
+    """
+    Gets the path of the manifest or a chunk file of a corpus export. The chunk files are listed in the manifest
+    and can be downloaded while the export is still running.
+
+    :param export_id: str - uuid of the export.
+    :param file_name: str - "manifest.json" or the file name of a chunk from the manifest.
+    :param storage_index: int - index of the store setting.
+
+    :raises ValueError: if the export id is invalid.
+
+    :return: str or None - path of the file or None if the file is not part of the export.
+    """
+    export_folder = get_export_folder(export_id, storage_index)
+    manifest = read_manifest(export_folder)
+    if manifest is None:
+        return None
+    chunk_file_name_list = [chunk["file_name"] for chunk in manifest["chunk_list"]]
+    if file_name != MANIFEST_FILE_NAME and file_name not in chunk_file_name_list:
+        return None
+    return os.path.join(export_folder, file_name)
+
+
+def get_document_file(file_kind, object_id):
+    """
+    Gets the path and attachment name of a file that belongs to a document.
+
+    :param file_kind: str - one of "firmware", "android_app" or "aecs_build".
+    :param object_id: str - id of the document.
+
+    :return: (str, str) - path and filename or (None, None) if the document or file does not exist.
+    """
+    if file_kind == FILE_KIND_FIRMWARE:
+        firmware = AndroidFirmware.objects(pk=object_id).only("absolute_store_path", "original_filename").first()
+        if firmware:
+            return firmware.absolute_store_path, firmware.original_filename
+    elif file_kind == FILE_KIND_ANDROID_APP:
+        android_app = AndroidApp.objects(pk=object_id).only("absolute_store_path", "filename").first()
+        if android_app:
+            return android_app.absolute_store_path, android_app.filename
+    elif file_kind == FILE_KIND_AECS_BUILD:
+        firmware = AndroidFirmware.objects(pk=object_id, aecs_build_file_path__exists=True) \
+            .only("aecs_build_file_path").first()
+        if firmware:
+            return firmware.aecs_build_file_path, f"{object_id}.zip"
+    return None, None
+
+
+def iter_bundle_entries(model_name, object_id_list):
+    """
+    Loads the file paths of the documents in batches, so the first entries of a bundle are sent before all
+    documents are loaded. Every entry is put into a folder named by the document id, because apps of different
+    firmware often have the same filename.
+
+    :param model_name: str - "AndroidApp" or "FirmwareFile".
+    :param object_id_list: list(str) - ids of the documents.
+
+    :return: generator((str, str)) - archive name and path of the files.
+    """
+    document_class, name_field = BUNDLE_MODEL_DICT[model_name]
+    for index in range(0, len(object_id_list), BUNDLE_QUERY_BATCH_SIZE):
+        id_batch = object_id_list[index:index + BUNDLE_QUERY_BATCH_SIZE]
+        queryset = document_class.objects(id__in=id_batch)
+        if document_class is FirmwareFile:
+            queryset = queryset.filter(is_directory=False)
+        for document in queryset.only("absolute_store_path", name_field).as_pymongo():
+            if document.get("absolute_store_path"):
+                yield f"{document['_id']}/{os.path.basename(document[name_field])}", document["absolute_store_path"]
 
 
 class DownloadAppBuildView(ViewSet):
 
     def get_download_file_response(self, request, file_path, filename):
-        chunk_size = 8192
-        response = StreamingHttpResponse(
-            FileWrapper(
-                open(file_path, "rb"),
-                chunk_size,
-            ),
-            content_type=mimetypes.guess_type(file_path)[0],
-        )
-        response["Content-Length"] = os.path.getsize(file_path)
-        response["Content-Disposition"] = f"attachment; filename={filename}"
-        return response
+        return create_download_response(request, file_path, filename, allow_accel_redirect=False)
 
     @action(methods=['post'], detail=False, url_path='download', url_name='download')
     def download(self, request, *args, **kwargs):
@@ -48,3 +119,95 @@ class DownloadAppBuildView(ViewSet):
         firmware = firmware_list[0]
         response = self.get_download_file_response(request, firmware.aecs_build_file_path, f"{uuid.uuid4()}.zip")
         return response
+
+
+class DownloadExportView(ViewSet):
+
+    @action(methods=['get'], detail=False, url_path='download', url_name='download')
+    def download(self, request, export_id, file_name, *args, **kwargs):
+        """
+        Downloads the manifest or a chunk file of a corpus export.
+
+        :param request: Django http get request. Allows to set the query parameter storage_index (default: 0).
+        :param export_id: str - uuid of the export.
+        :param file_name: str - "manifest.json" or the file name of a chunk from the manifest.
+
+        :return: the requested file.
+        """
+        if not request.user.is_superuser:
+            return HttpResponse(status=403)
+        try:
+            file_path = get_export_file_path(export_id, file_name, int(request.query_params.get("storage_index", 0)))
+        except ValueError:
+            return HttpResponse(status=400)
+        if file_path is None:
+            return HttpResponse(status=404)
+        return create_download_response(request, file_path, file_name)
+
+
+class DownloadFileView(ViewSet):
+
+    @action(methods=['get'], detail=False, url_path='download', url_name='download')
+    def download(self, request, file_kind, object_id, *args, **kwargs):
+        """
+        Unified download of firmware archives, extracted apks, AECS build archives and export files. Files are sent
+        by nginx if offloading is enabled, otherwise by the wsgi server. Both support Range and If-Range requests,
+        so interrupted downloads can be resumed.
+
+        :param request: Django http get request. Export downloads use the query parameters file_name and
+        storage_index (default: 0).
+        :param file_kind: str - one of "firmware", "android_app", "aecs_build" or "export".
+        :param object_id: str - document id or the export id for exports.
+
+        :return: the requested file.
+        """
+        if not request.user.is_superuser:
+            return HttpResponse(status=403)
+        if file_kind == FILE_KIND_EXPORT:
+            file_name = request.query_params.get("file_name", MANIFEST_FILE_NAME)
+            try:
+                file_path = get_export_file_path(object_id, file_name,
+                                                 int(request.query_params.get("storage_index", 0)))
+            except ValueError:
+                return HttpResponse(status=400)
+        else:
+            try:
+                ObjectId(object_id)
+            except (InvalidId, TypeError):
+                return HttpResponse(status=400)
+            file_path, file_name = get_document_file(file_kind, object_id)
+        if not file_path:
+            return HttpResponse(status=404)
+        return create_download_response(request, file_path, file_name)
+
+
+class DownloadBundleView(ViewSet):
+
+    @action(methods=['post'], detail=False, url_path='download', url_name='download')
+    def download(self, request, *args, **kwargs):
+        """
+        Streams a zip archive of apks or firmware files. The archive is created while it is sent, so the download
+        starts immediately and neither memory nor disk usage grow with the number of files.
+
+        :param request: Django http post request with the following parameters in the json body:
+          - model_name: str - "AndroidApp" or "FirmwareFile".
+          - object_id_list: list(str) - document ids.
+
+        :return: class:'StreamingHttpResponse' - the zip archive.
+        """
+        if not request.user.is_superuser:
+            return HttpResponse(status=403)
+        model_name = request.data.get("model_name", "AndroidApp")
+        object_id_list = request.data.get("object_id_list") or []
+        if model_name not in BUNDLE_MODEL_DICT or not isinstance(object_id_list, list) \
+                or len(object_id_list) > MAX_BUNDLE_SIZE:
+            return HttpResponse(status=400)
+        try:
+            object_id_list = [ObjectId(object_id) for object_id in object_id_list]
+        except (InvalidId, TypeError):
+            return HttpResponse(status=400)
+        response = StreamingHttpResponse(iter_zip_stream(iter_bundle_entries(model_name, object_id_list)),
+                                         content_type="application/zip")
+        response["Content-Disposition"] = f"attachment; filename={model_name}_bundle_{uuid.uuid4()}.zip"
+        response["X-Accel-Buffering"] = "no"
+        return response
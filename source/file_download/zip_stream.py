@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import logging
+import os
+import time
+import zipfile
+
+ZIP_BLOCK_SIZE = 1024 * 1024
+ZIP_MIN_TIMESTAMP = 315619200
+TEXT_FILE_EXTENSIONS = {".xml", ".json", ".txt", ".prop", ".rc", ".sh", ".py", ".conf", ".cfg", ".ini", ".csv",
+                        ".html", ".js", ".smali", ".java", ".md", ".yml", ".yaml", ".mk", ".bp", ".policy"}
+
+
+class ZipStreamBuffer:
+    """
+    Collects the output of zipfile between two chunks of the response. The buffer has no tell and seek, so zipfile
+    writes data descriptors after each entry and does not go back to patch the local headers.
+    """
+
+    def __init__(self):
+        self.data_list = []
+
+    def write(self, data):
+        self.data_list.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """
+        :return: list(bytes) - the data written since the last drain.
+        """
+        data_list = self.data_list
+        self.data_list = []
+        return data_list
+
+
+def get_compress_type(archive_name):
+    """
+    Deflates text files. Apks, archives, images and other binary files are stored, because they are compressed
+    already or do not compress well enough to justify the cpu time.
+
+    :param archive_name: str - name of the entry in the archive.
+
+    :return: int - zipfile compression constant.
+    """
+    _, extension = os.path.splitext(archive_name.lower())
+    return zipfile.ZIP_DEFLATED if extension in TEXT_FILE_EXTENSIONS else zipfile.ZIP_STORED
+
+
+def create_zip_info(archive_name, file_stat):
+    """
+    :param archive_name: str - name of the entry in the archive.
+    :param file_stat: os.stat_result - stat of the source file.
+
+    :return: zipfile.ZipInfo - entry with the modification time and size of the source file. The size lets
+    zipfile decide if the entry needs ZIP64 headers.
+    """
+    zip_info = zipfile.ZipInfo(archive_name, date_time=time.localtime(max(file_stat.st_mtime, ZIP_MIN_TIMESTAMP))[:6])
+    zip_info.compress_type = get_compress_type(archive_name)
+    zip_info.file_size = file_stat.st_size
+    zip_info.external_attr = 0o644 << 16
+    return zip_info
+
+
+def iter_zip_stream(entry_iterator, block_size=ZIP_BLOCK_SIZE):
+    """
+    Creates a ZIP64 archive while it is sent. The CRC of every entry is computed while the data is read, the
+    sizes are written in data descriptors after each entry and the central directory at the end. Nothing is
+    staged on disk and only one block per entry is kept in memory.
+
+    :param entry_iterator: iterable((str, str)) - archive name and path of the files to add.
+    :param block_size: int - number of bytes read from the files at once.
+
+    :return: generator(bytes) - the archive.
+    """
+    buffer = ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, mode="w", allowZip64=True) as zip_file:
+        for archive_name, file_path in entry_iterator:
+            try:
+                source_file = open(file_path, "rb")
+            except OSError as err:
+                logging.warning(f"Skipping {archive_name} in zip stream: {err}")
+                continue
+            with source_file:
+                zip_info = create_zip_info(archive_name, os.fstat(source_file.fileno()))
+                with zip_file.open(zip_info, mode="w") as zip_entry:
+                    for block in iter(lambda: source_file.read(block_size), b""):
+                        zip_entry.write(block)
+                        yield from buffer.drain()
+            yield from buffer.drain()
+    yield from buffer.drain()
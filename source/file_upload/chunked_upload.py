@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import fcntl
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from hashing.upload_digest import update_hasher_dict, get_hexdigest_dict, hash_file_prefix, write_digest_record
+
+UPLOAD_SESSION_FOLDER_NAME = "sessions"
+UPLOAD_STATE_FILE_NAME = "state.json"
+UPLOAD_DATA_FILE_NAME = "data.part"
+UPLOAD_LOCK_FILE_NAME = "session.lock"
+UPLOAD_SESSION_EXPIRATION_SECONDS = 2 * 24 * 60 * 60
+SESSION_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+STREAM_BLOCK_SIZE = 1024 * 1024
+MAX_CACHED_HASHERS = 64
+_hasher_cache = OrderedDict()
+_hasher_cache_lock = threading.Lock()
+
+
+class UploadSessionError(Exception):
+    """
+    Raised if a request does not fit the state of an upload session. The received bytes are sent back, so the
+    client can resume at the right offset.
+    """
+
+    def __init__(self, message, received_bytes=None):
+        super().__init__(message)
+        self.received_bytes = received_bytes
+
+
+class UploadSessionNotFound(UploadSessionError):
+    pass
+
+
+class DuplicateUploadError(UploadSessionError):
+    pass
+
+
+def get_session_root(store_paths):
+    """
+    :param store_paths: dict(str, str) - paths of the store setting.
+
+    :return: str - folder that contains the upload sessions.
+    """
+    return os.path.join(store_paths["UPLOADS"], UPLOAD_SESSION_FOLDER_NAME)
+
+
+def get_session_folder(store_paths, session_id):
+    """
+    :param store_paths: dict(str, str) - paths of the store setting.
+    :param session_id: str - id of the upload session.
+
+    :return: str - folder of the upload session.
+    """
+    if not SESSION_ID_PATTERN.match(session_id or ""):
+        raise UploadSessionNotFound("Invalid upload session id.")
+    return os.path.join(get_session_root(store_paths), session_id)
+
+
+def read_session_state(session_folder):
+    try:
+        with open(os.path.join(session_folder, UPLOAD_STATE_FILE_NAME), "r") as state_file:
+            return json.load(state_file)
+    except FileNotFoundError:
+        raise UploadSessionNotFound("Upload session does not exist or has expired.")
+
+
+def write_session_state(session_folder, state):
+    """
+    Replaces the state file atomically, so an interrupted write never leaves a broken session.
+    """
+    state["updated"] = time.time()
+    state_path = os.path.join(session_folder, UPLOAD_STATE_FILE_NAME)
+    temporary_path = f"{state_path}.tmp"
+    with open(temporary_path, "w") as state_file:
+        json.dump(state, state_file)
+    os.replace(temporary_path, state_path)
+
+
+@contextmanager
+def lock_session(session_folder):
+    """
+    Locks an upload session across processes, so chunks of a session are written one after another.
+
+    :param session_folder: str - folder of the upload session.
+    """
+    if not os.path.isdir(session_folder):
+        raise UploadSessionNotFound("Upload session does not exist or has expired.")
+    with open(os.path.join(session_folder, UPLOAD_LOCK_FILE_NAME), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def remove_expired_sessions(store_paths, expiration_seconds=UPLOAD_SESSION_EXPIRATION_SECONDS):
+    """
+    Deletes upload sessions that did not receive data within the expiration time.
+
+    :param store_paths: dict(str, str) - paths of the store setting.
+    :param expiration_seconds: int - maximal age of the last update.
+    """
+    session_root = get_session_root(store_paths)
+    if not os.path.isdir(session_root):
+        return
+    expiration_time = time.time() - expiration_seconds
+    for session_id in os.listdir(session_root):
+        session_folder = os.path.join(session_root, session_id)
+        try:
+            if read_session_state(session_folder)["updated"] < expiration_time:
+                remove_session(session_id, session_folder)
+        except (UploadSessionError, OSError, ValueError, KeyError) as err:
+            logging.warning(f"Could not check upload session {session_id}: {err}")
+
+
+def remove_session(session_id, session_folder):
+    with _hasher_cache_lock:
+        _hasher_cache.pop(session_id, None)
+    shutil.rmtree(session_folder, ignore_errors=True)
+
+
+def create_upload_session(store_paths, file_type, filename, total_size, storage_index, user_id):
+    """
+    Creates an empty upload session.
+
+    :param store_paths: dict(str, str) - paths of the store setting.
+    :param file_type: str - type of the upload, for instance, "firmware".
+    :param filename: str - sanitized name of the file.
+    :param total_size: int - size of the complete file in bytes.
+    :param storage_index: int - index of the store setting.
+    :param user_id: int - id of the user that owns the session.
+
+    :return: dict - the state of the session.
+    """
+    remove_expired_sessions(store_paths)
+    session_id = uuid.uuid4().hex
+    session_folder = get_session_folder(store_paths, session_id)
+    os.makedirs(session_folder)
+    open(os.path.join(session_folder, UPLOAD_DATA_FILE_NAME), "wb").close()
+    state = {"session_id": session_id,
+             "file_type": file_type,
+             "filename": filename,
+             "total_size": total_size,
+             "received_bytes": 0,
+             "storage_index": storage_index,
+             "user_id": user_id,
+             "created": time.time()}
+    write_session_state(session_folder, state)
+    return state
+
+
+def get_upload_session(store_paths, session_id, user_id):
+    """
+    :param store_paths: dict(str, str) - paths of the store setting.
+    :param session_id: str - id of the upload session.
+    :param user_id: int - id of the requesting user.
+
+    :return: dict - the state of the session.
+    """
+    state = read_session_state(get_session_folder(store_paths, session_id))
+    if state["user_id"] != user_id:
+        raise UploadSessionNotFound("Upload session does not exist or has expired.")
+    return state
+
+
+def get_session_hashers(session_folder, state):
+    """
+    Gets the hashers of a session. The hashers are kept in memory between the chunks. If the chunk is received
+    by another process or after a restart, the hashers are restored from the received data.
+
+    :param session_folder: str - folder of the upload session.
+    :param state: dict - the state of the session.
+
+    :return: dict(str, hashlib object) - hashers that contain all received bytes.
+    """
+    with _hasher_cache_lock:
+        cached_hashers = _hasher_cache.pop(state["session_id"], None)
+    if cached_hashers and cached_hashers[0] == state["received_bytes"]:
+        return cached_hashers[1]
+    logging.info(f"Restoring hashes of upload session {state['session_id']} from {state['received_bytes']} bytes")
+    return hash_file_prefix(os.path.join(session_folder, UPLOAD_DATA_FILE_NAME), state["received_bytes"])
+
+
+def cache_session_hashers(session_id, received_bytes, hasher_dict):
+    with _hasher_cache_lock:
+        _hasher_cache[session_id] = (received_bytes, hasher_dict)
+        while len(_hasher_cache) > MAX_CACHED_HASHERS:
+            _hasher_cache.popitem(last=False)
+
+
+def write_upload_chunk(store_paths, session_id, user_id, offset, block_iterator):
+    """
+    Appends a chunk to the upload session and updates the hashes while the data is received. The offset has to
+    match the number of received bytes. If the connection breaks, the bytes written so far are kept.
+
+    :param store_paths: dict(str, str) - paths of the store setting.
+    :param session_id: str - id of the upload session.
+    :param user_id: int - id of the requesting user.
+    :param offset: int - position of the chunk in the file.
+    :param block_iterator: iterable(bytes) - the data of the chunk.
+
+    :return: dict - the state of the session.
+    """
+    session_folder = get_session_folder(store_paths, session_id)
+    with lock_session(session_folder):
+        state = get_upload_session(store_paths, session_id, user_id)
+        if offset != state["received_bytes"]:
+            raise UploadSessionError(f"Chunk offset {offset} does not match the received bytes.",
+                                     state["received_bytes"])
+        hasher_dict = get_session_hashers(session_folder, state)
+        received_bytes = offset
+        try:
+            with open(os.path.join(session_folder, UPLOAD_DATA_FILE_NAME), "r+b") as data_file:
+                data_file.seek(offset)
+                data_file.truncate()
+                try:
+                    for block in block_iterator:
+                        if received_bytes + len(block) > state["total_size"]:
+                            raise UploadSessionError("Chunk exceeds the size of the file.", received_bytes)
+                        data_file.write(block)
+                        update_hasher_dict(hasher_dict, block)
+                        received_bytes += len(block)
+                finally:
+                    data_file.flush()
+                    os.fsync(data_file.fileno())
+        finally:
+            state["received_bytes"] = received_bytes
+            write_session_state(session_folder, state)
+            cache_session_hashers(session_id, received_bytes, hasher_dict)
+    return state
+
+
+def finalize_upload_session(store_paths, session_id, user_id, upload_path, is_duplicate):
+    """
+    Moves a completely received file into the import folder and stores its digests for the importer.
+
+    :param store_paths: dict(str, str) - paths of the store setting.
+    :param session_id: str - id of the upload session.
+    :param user_id: int - id of the requesting user.
+    :param upload_path: str - destination folder of the file.
+    :param is_duplicate: function(dict) - checks the digests against the database. Duplicates are removed.
+
+    :return: dict(str, str) - hex digests by algorithm name.
+    """
+    session_folder = get_session_folder(store_paths, session_id)
+    with lock_session(session_folder):
+        state = get_upload_session(store_paths, session_id, user_id)
+        if state["received_bytes"] != state["total_size"]:
+            raise UploadSessionError("Upload is incomplete.", state["received_bytes"])
+        digest_dict = get_hexdigest_dict(get_session_hashers(session_folder, state))
+        if is_duplicate(digest_dict):
+            remove_session(session_id, session_folder)
+            raise DuplicateUploadError(f"File already exists in the database. MD5: {digest_dict['md5']}",
+                                       state["received_bytes"])
+        os.makedirs(upload_path, exist_ok=True)
+        file_path = os.path.join(upload_path, state["filename"])
+        shutil.move(os.path.join(session_folder, UPLOAD_DATA_FILE_NAME), file_path)
+        os.chmod(file_path, 0o600)
+        write_digest_record(store_paths, file_path, digest_dict)
+    remove_session(session_id, session_folder)
+    return digest_dict
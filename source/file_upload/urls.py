@@ -2,8 +2,12 @@
 # This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
 # See the file 'LICENSE' for copying permission.
 from django.urls import path
-from .views import FileUploadView
+from .views import FileUploadView, ChunkedUploadView
 
 urlpatterns = [
-    path("upload/file", FileUploadView.as_view({'post': 'upload'}))
+    path("upload/file", FileUploadView.as_view({'post': 'upload'})),
+    path("upload/session", ChunkedUploadView.as_view({'post': 'create_session'})),
+    path("upload/session/<str:session_id>", ChunkedUploadView.as_view({'get': 'session_status',
+                                                                       'put': 'upload_chunk'})),
+    path("upload/session/<str:session_id>/finalize", ChunkedUploadView.as_view({'post': 'finalize'})),
 ]
\ No newline at end of file
@@ -13,17 +13,87 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from model.StoreSetting import get_active_store_by_index
 from django.conf import settings
+from file_upload.chunked_upload import (create_upload_session, get_upload_session, write_upload_chunk,
+                                        finalize_upload_session, UploadSessionError, UploadSessionNotFound,
+                                        DuplicateUploadError, STREAM_BLOCK_SIZE)
 
 ALLOWED_EXTENSIONS = [".zip", ".tar", ".gz", ".bz2", ".md5", ".lz4", ".tgz", ".rar", ".7z", ".lzma", ".xz", ".ozip",
                       ".apk"]
 ALLOWED_TYPES = ["firmware", "apk"]
 MAX_FILE_SIZE = 1024 * 1024 * 1024 * 10 # 10GB
+MAX_CHUNK_SIZE = 1024 * 1024 * 256
+UPLOAD_OFFSET_HEADER = "Upload-Offset"
 
 def sanitize_filename(filename):
     valid_name = get_valid_filename(filename)
     safe_name = os.path.basename(valid_name)
     return safe_name
 
+
+def error_response(message, status_code):
+    return Response({'error': message}, status=status_code)
+
+
+def server_error_response(message, err):
+    if settings.DEBUG:
+        return error_response(f'{message}: {str(err)}', status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return error_response('Failed to save file', status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def validate_upload_parameters(file_type, storage_index_raw, filename, file_size):
+    """
+    Validates the parameters of an upload.
+
+    :param file_type: str - type of the upload, one of ALLOWED_TYPES.
+    :param storage_index_raw: str - index of the store setting.
+    :param filename: str - name of the uploaded file.
+    :param file_size: int - size of the file in bytes.
+
+    :return: (int, str, Response) - storage index, sanitized filename and an error response or None if the
+    parameters are valid.
+    """
+    if not file_type or str(file_type).strip() not in ALLOWED_TYPES:
+        return None, None, error_response(f'Invalid type parameter. Allowed types: {", ".join(ALLOWED_TYPES)}',
+                                          status.HTTP_400_BAD_REQUEST)
+    if not re.match(r'^\d+$', str(storage_index_raw)):
+        return None, None, error_response('Invalid storage_index. Must be a positive integer.',
+                                          status.HTTP_400_BAD_REQUEST)
+    storage_index = int(storage_index_raw)
+    if file_size == 0:
+        return None, None, error_response('Uploaded file is empty.', status.HTTP_400_BAD_REQUEST)
+    if file_size > MAX_FILE_SIZE:
+        return None, None, error_response(f'File too large. Max size is {MAX_FILE_SIZE // (1024 * 1024)}MB.',
+                                          status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    safe_filename = sanitize_filename(filename)
+    if not safe_filename or len(safe_filename.strip()) == 0:
+        return None, None, error_response('Invalid filename.', status.HTTP_400_BAD_REQUEST)
+    if not any(safe_filename.lower().endswith(ext.lower()) for ext in ALLOWED_EXTENSIONS):
+        return None, None, error_response(f'File type not supported. Allowed extensions: '
+                                          f'{", ".join(ALLOWED_EXTENSIONS)}', status.HTTP_400_BAD_REQUEST)
+    if safe_filename.lower().endswith('.apk') and file_type != 'apk':
+        return None, None, error_response('APK files must be uploaded with type "apk".',
+                                          status.HTTP_400_BAD_REQUEST)
+    return storage_index, safe_filename, None
+
+
+def get_upload_path(store_paths, file_type):
+    """
+    :param store_paths: dict(str, str) - paths of the store setting.
+    :param file_type: str - type of the upload, one of ALLOWED_TYPES.
+
+    :return: str - folder the uploaded file is stored in.
+    """
+    if file_type == ALLOWED_TYPES[0]:
+        return str(store_paths['FIRMWARE_FOLDER_IMPORT'])
+    elif file_type == ALLOWED_TYPES[1]:
+        return str(store_paths['ANDROID_APP_IMPORT'])
+    return str(os.path.join(store_paths['UPLOADS'], file_type, str(uuid.uuid4())))
+
+
+def is_duplicate_firmware(digest_dict):
+    from model import AndroidFirmware
+    return AndroidFirmware.objects(md5=digest_dict["md5"]).only("id").first() is not None
+
 class FileUploadView(ViewSet):
     permission_classes = [IsAuthenticated]
 
@@ -32,22 +102,6 @@ class FileUploadView(ViewSet):
         logging.info(f"Request Headers: {request.headers}")
         logging.info(f"Request Data: {request.data}")
         try:
-            file_type = request.data.get('type', None)
-            if not file_type or str(file_type).strip() not in ALLOWED_TYPES:
-                return Response(
-                    {'error': f'Invalid type parameter. Allowed types: {", ".join(ALLOWED_TYPES)}'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Validate storage_index
-            storage_index_raw = request.data.get('storage_index', 0)
-            if not re.match(r'^\d+$', str(storage_index_raw)):
-                return Response(
-                    {'error': 'Invalid storage_index. Must be a positive integer.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            storage_index = int(storage_index_raw)
-
             # Check if file was provided
             if 'file' not in request.FILES:
                 return Response(
@@ -55,64 +109,18 @@ class FileUploadView(ViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             file = request.FILES['file']
-
-            if file.size == 0:
-                return Response(
-                    {'error': 'Uploaded file is empty.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            if file.size > MAX_FILE_SIZE:
-                return Response(
-                    {'error': f'File too large. Max size is {MAX_FILE_SIZE // (1024 * 1024)}MB.'},
-                    status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
-                )
-
-            safe_filename = sanitize_filename(file.name)
-            if not safe_filename or len(safe_filename.strip()) == 0:
-                return Response(
-                    {'error': 'Invalid filename.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            file_extension = None
-            for ext in ALLOWED_EXTENSIONS:
-                if safe_filename.lower().endswith(ext.lower()):
-                    file_extension = ext
-                    break
-            if not file_extension:
-                return Response(
-                    {'error': f'File type not supported. Allowed extensions: {", ".join(ALLOWED_EXTENSIONS)}'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            if safe_filename.lower().endswith('.apk') and file_type != 'apk':
-                return Response(
-                    {'error': 'APK files must be uploaded with type "apk".'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            file_type = request.data.get('type', None)
+            storage_index, safe_filename, validation_error = validate_upload_parameters(
+                file_type, request.data.get('storage_index', 0), file.name, file.size)
+            if validation_error:
+                return validation_error
 
             try:
                 store_setting = get_active_store_by_index(storage_index)
-                store_paths = store_setting.get_store_paths()
-
-                if file_type == ALLOWED_TYPES[0]:
-                    upload_path = str(store_paths['FIRMWARE_FOLDER_IMPORT'])
-                elif file_type == ALLOWED_TYPES[1]:
-                    upload_path = str(store_paths['ANDROID_APP_IMPORT'])
-                else:
-                    upload_root_dir_path = store_paths['UPLOADS']
-                    type_dir = file_type
-                    unique_folder_name = str(uuid.uuid4())
-                    upload_path = str(os.path.join(upload_root_dir_path, type_dir, unique_folder_name))
-
+                upload_path = get_upload_path(store_setting.get_store_paths(), file_type)
             except (ValueError, KeyError) as e:
                 logging.error(f"Storage configuration error: {e}")
-                if settings.DEBUG:
-                    return Response(
-                        {'error': f'Storage configuration error: {str(e)}'},
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                    )
-                else:
-                    return Response({'error': 'Failed to save file'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                return server_error_response('Storage configuration error', e)
 
             os.makedirs(upload_path, exist_ok=True)
 
@@ -125,13 +133,7 @@ class FileUploadView(ViewSet):
                 os.chmod(file_path, 0o600)  # Restrict file permissions
             except IOError as e:
                 logging.error(f"Error writing file {file_path}: {e}")
-                if settings.DEBUG:
-                    return Response(
-                        {'error': f'Failed to save file: {str(e)}'},
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                    )
-                else:
-                    return Response({'error': 'Failed to save file'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                return server_error_response('Failed to save file', e)
 
             logging.info(f"File uploaded: {safe_filename} to {file_path}")
 
@@ -142,10 +144,107 @@ class FileUploadView(ViewSet):
 
         except Exception as e:
             logging.error(f"Error uploading file: {str(e)}")
-            if settings.DEBUG:
-                return Response(
-                    {'error': f'Internal server error: {str(e)}'},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-            else:
-                return Response({'error': 'Failed to save file'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return server_error_response('Internal server error', e)
+
+
+class ChunkedUploadView(ViewSet):
+    """
+    Resumable upload in three steps:
+
+    1. POST upload/session with type, filename, total_size and storage_index creates a session.
+    2. PUT upload/session/<session_id>?storage_index=<index> with the raw bytes of a chunk and the header
+       "Upload-Offset". GET on the same path returns the received bytes to resume an interrupted upload.
+    3. POST upload/session/<session_id>/finalize?storage_index=<index> checks the hashes against the database and moves the file to the
+       import folder.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @staticmethod
+    def get_store_paths(request):
+        storage_index_raw = request.query_params.get('storage_index', 0)
+        if not re.match(r'^\d+$', str(storage_index_raw)):
+            raise UploadSessionNotFound('Invalid storage_index. Must be a positive integer.')
+        return get_active_store_by_index(int(storage_index_raw)).get_store_paths()
+
+    @staticmethod
+    def session_error_response(err):
+        if isinstance(err, UploadSessionNotFound):
+            status_code = status.HTTP_404_NOT_FOUND
+        else:
+            status_code = status.HTTP_409_CONFLICT
+        return Response({'error': str(err), 'received_bytes': err.received_bytes}, status=status_code)
+
+    def create_session(self, request, *args, **kwargs):
+        try:
+            file_type = request.data.get('type', None)
+            total_size_raw = request.data.get('total_size', '')
+            if not re.match(r'^\d+$', str(total_size_raw)):
+                return error_response('Invalid total_size. Must be a positive integer.', status.HTTP_400_BAD_REQUEST)
+            storage_index, safe_filename, validation_error = validate_upload_parameters(
+                file_type, request.data.get('storage_index', 0), request.data.get('filename', ''),
+                int(total_size_raw))
+            if validation_error:
+                return validation_error
+            store_paths = get_active_store_by_index(storage_index).get_store_paths()
+            state = create_upload_session(store_paths, file_type, safe_filename, int(total_size_raw), storage_index,
+                                          request.user.id)
+            return Response({'session_id': state['session_id'],
+                             'received_bytes': state['received_bytes'],
+                             'max_chunk_size': MAX_CHUNK_SIZE}, status=status.HTTP_201_CREATED)
+        except Exception as e:
+            logging.error(f"Error creating upload session: {str(e)}")
+            return server_error_response('Internal server error', e)
+
+    def session_status(self, request, session_id, *args, **kwargs):
+        try:
+            state = get_upload_session(self.get_store_paths(request), session_id, request.user.id)
+        except UploadSessionError as err:
+            return self.session_error_response(err)
+        except Exception as e:
+            logging.error(f"Error reading upload session {session_id}: {str(e)}")
+            return server_error_response('Internal server error', e)
+        return Response({'session_id': session_id,
+                         'received_bytes': state['received_bytes'],
+                         'total_size': state['total_size']}, status=status.HTTP_200_OK)
+
+    def upload_chunk(self, request, session_id, *args, **kwargs):
+        offset_raw = request.headers.get(UPLOAD_OFFSET_HEADER, '')
+        content_length_raw = request.headers.get('Content-Length', '')
+        if not re.match(r'^\d+$', offset_raw) or not re.match(r'^\d+$', content_length_raw):
+            return error_response(f'The headers {UPLOAD_OFFSET_HEADER} and Content-Length are required.',
+                                  status.HTTP_400_BAD_REQUEST)
+        if int(content_length_raw) > MAX_CHUNK_SIZE:
+            return error_response(f'Chunk too large. Max size is {MAX_CHUNK_SIZE // (1024 * 1024)}MB.',
+                                  status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        try:
+            block_iterator = iter(lambda: request.stream.read(STREAM_BLOCK_SIZE), b'')
+            state = write_upload_chunk(self.get_store_paths(request), session_id, request.user.id, int(offset_raw),
+                                       block_iterator)
+        except UploadSessionError as err:
+            return self.session_error_response(err)
+        except Exception as e:
+            logging.error(f"Error writing chunk of upload session {session_id}: {str(e)}")
+            return server_error_response('Failed to save chunk', e)
+        return Response({'session_id': session_id,
+                         'received_bytes': state['received_bytes'],
+                         'total_size': state['total_size']}, status=status.HTTP_200_OK)
+
+    def finalize(self, request, session_id, *args, **kwargs):
+        try:
+            store_paths = self.get_store_paths(request)
+            state = get_upload_session(store_paths, session_id, request.user.id)
+            is_duplicate = is_duplicate_firmware if state['file_type'] == ALLOWED_TYPES[0] else lambda digests: False
+            digest_dict = finalize_upload_session(store_paths, session_id, request.user.id,
+                                                  get_upload_path(store_paths, state['file_type']), is_duplicate)
+        except DuplicateUploadError as err:
+            return Response({'error': str(err)}, status=status.HTTP_409_CONFLICT)
+        except UploadSessionError as err:
+            return self.session_error_response(err)
+        except Exception as e:
+            logging.error(f"Error finalizing upload session {session_id}: {str(e)}")
+            return server_error_response('Failed to save file', e)
+        logging.info(f"File uploaded: {state['filename']} md5: {digest_dict['md5']}")
+        return Response({'success': True,
+                         'message': 'File uploaded successfully.',
+                         'filename': state['filename'],
+                         **digest_dict}, status=status.HTTP_201_CREATED)
@@ -9,6 +9,7 @@ import tempfile
 import time
 import traceback
 from firmware_handler.image_repair import attempt_repair, attempt_repair_and_resize
+from app_metrics.tracing import start_span
 
 
 def mount_android_image(android_ext4_path, mount_folder_path):
@@ -33,10 +34,7 @@ def mount_android_image(android_ext4_path, mount_folder_path):
     for mount_option in mount_option_list:
         if is_mounted:
             break
-        if attempt_simg2img_mount(android_ext4_path, mount_folder_path, mount_option) \
-                or attempt_ext4_mount(android_ext4_path, mount_folder_path, mount_option) \
-                or attempt_repair_and_mount(android_ext4_path, mount_folder_path, mount_option) \
-                or attempt_resize_and_mount(android_ext4_path, mount_folder_path, mount_option):
+        if attempt_mount_strategies(android_ext4_path, mount_folder_path, mount_option):
             if not has_files_in_folder(mount_folder_path):
                 logging.debug("Overwrite chown of mount folders.")
                 execute_chown(mount_folder_path)
@@ -52,6 +50,29 @@ def mount_android_image(android_ext4_path, mount_folder_path):
     return is_mounted
 
 
+def attempt_mount_strategies(android_ext4_path, mount_folder_path, mount_option):
+    """
+    Tries the mount strategies in order until one succeeds. Every attempt is traced as span.
+
+    :param android_ext4_path: str path to the image file to mount.
+    :param mount_folder_path: str path to the folder in which the partition will be mounted.
+    :param mount_option: str - mount options flags.
+
+    :return: bool - true if one strategy mounted the image.
+    """
+    strategy_list = [("simg2img", attempt_simg2img_mount),
+                     ("ext4", attempt_ext4_mount),
+                     ("repair", attempt_repair_and_mount),
+                     ("resize", attempt_resize_and_mount)]
+    for strategy, attempt_function in strategy_list:
+        with start_span("mount_strategy", strategy=strategy, mount_option=mount_option) as span:
+            is_mounted = attempt_function(android_ext4_path, mount_folder_path, mount_option)
+            span.set_attribute("is_success", bool(is_mounted))
+        if is_mounted:
+            return True
+    return False
+
+
 def execute_chown(path):
     """
     Overtakes the ownership of a directory.
@@ -7,6 +7,7 @@ from multiprocessing import Lock
 from model import FirmwareFile
 from hashing import md5_from_file
 from utils.file_utils.file_util import get_file_libmagic
+from app_metrics.tracing import start_span
 
 lock = Lock()
 
@@ -21,17 +22,19 @@ def create_firmware_file_list(scan_directory, partition_name):
 
     """
     result_firmware_file_list = []
-    for root, dir_list, file_list in os.walk(scan_directory, followlinks=False):
-        result_firmware_file_list = process_directories(dir_list,
-                                                        root,
-                                                        scan_directory,
-                                                        partition_name,
-                                                        result_firmware_file_list)
-        result_firmware_file_list = process_files(file_list,
-                                                  root,
-                                                  scan_directory,
-                                                  partition_name,
-                                                  result_firmware_file_list)
+    with start_span("create_firmware_file_list", partition=partition_name) as span:
+        for root, dir_list, file_list in os.walk(scan_directory, followlinks=False):
+            result_firmware_file_list = process_directories(dir_list,
+                                                            root,
+                                                            scan_directory,
+                                                            partition_name,
+                                                            result_firmware_file_list)
+            result_firmware_file_list = process_files(file_list,
+                                                      root,
+                                                      scan_directory,
+                                                      partition_name,
+                                                      result_firmware_file_list)
+        span.set_attribute("file_count", len(result_firmware_file_list))
     return result_firmware_file_list
 
 
@@ -8,6 +8,8 @@ import threading
 import logging
 import os
 import shutil
+import redis_lock
+from contextlib import contextmanager
 from queue import Empty
 from pathlib import Path
 from hashing.fuzzy_hash_creator import add_fuzzy_hashes
@@ -20,12 +22,17 @@ from firmware_handler.const_regex_patterns import BUILD_PROP_PATTERN_LIST, EXT_I
 from android_app_importer.android_app_import import store_android_apps_from_firmware
 from firmware_handler.build_prop_parser import BuildPropParser
 from hashing.standard_hash_generator import md5_from_file, sha1_from_file, sha256_from_file
+from hashing.upload_digest import read_digest_record, remove_digest_record
 from extractor.expand_archives import extract_first_layer, extract_second_layer, extract_third_layer
 from model.FirmwareImporterSetting import get_firmware_importer_setting
 from model.StoreSetting import get_active_store_by_index
 from utils.file_utils.file_util import get_filenames
 from firmware_handler.firmware_version_detect import detect_by_build_prop
 from processing.standalone_python_worker import create_multi_threading_queue
+from processing.job_progress import get_job_progress, get_current_rq_job, get_redis_connection
+from app_metrics.recorder import time_import_stage, increment_counter
+from app_metrics.tracing import start_span, get_timing_summary
+from app_metrics.profiler import get_profile_request, profile_job
 from bson import ObjectId
 from firmware_handler.firmware_os_detect import detect_vendor_by_build_prop
 from typing import List
@@ -34,6 +41,9 @@ ALLOWED_ARCHIVE_FILE_EXTENSIONS = [".zip", ".tar", ".gz", ".bz2", ".md5", ".lz4"
                                    ".ozip"]
 NAME_PARTITION_EXPORT_FOLDER = "firmware_extract"
 NAME_INTERMEDIATE_EXPORT_FOLDER = "intermediate_extractions"
+IMPORT_TIMING_KEY = "import_timing"
+FIRMWARE_IMPORT_LOCK_PREFIX = "fmd_firmware_import:"
+FIRMWARE_IMPORT_LOCK_EXPIRE_SECONDS = 60
 lock = threading.Lock()
 
 
@@ -55,9 +65,39 @@ def start_firmware_mass_import(create_fuzzy_hashes, storage_index=0, keep_files_
     import_firmware_from_store(store_setting, create_fuzzy_hashes, keep_files_on_disk)
 
 
+@contextmanager
+def lock_store_import(store_setting):
+    """
+    Makes the import runs of a store mutually exclusive across all workers. A run waits until the run that holds
+    the lock ended. The lock is renewed while the import runs and expires if the worker dies.
+
+    :param store_setting: class:'StoreSetting' - the store to import into.
+    """
+    job = get_current_rq_job()
+    connection = job.connection if job else get_redis_connection()
+    import_lock = redis_lock.Lock(connection,
+                                  f"{FIRMWARE_IMPORT_LOCK_PREFIX}{store_setting.uuid}",
+                                  expire=FIRMWARE_IMPORT_LOCK_EXPIRE_SECONDS,
+                                  auto_renewal=True)
+    if not import_lock.acquire(blocking=False):
+        logging.info(f"Waiting for the running import of store {store_setting.uuid} to end.")
+        import_lock.acquire()
+    try:
+        yield
+    finally:
+        import_lock.release()
+
+
 def import_firmware_from_store(store_setting, create_fuzzy_hashes, keep_files_on_disk):
-    store_path, firmware_archives_queue, num_threads = pre_process_firmware_import(store_setting)
-    start_import_threads(num_threads, firmware_archives_queue, create_fuzzy_hashes, store_path, keep_files_on_disk)
+    with lock_store_import(store_setting):
+        store_path, firmware_archives_queue, num_threads = pre_process_firmware_import(store_setting)
+        progress = get_job_progress()
+        if progress:
+            progress.start(stage="import", items_total=firmware_archives_queue.qsize())
+        start_import_threads(num_threads, firmware_archives_queue, create_fuzzy_hashes, store_path,
+                             keep_files_on_disk, progress)
+        if progress:
+            progress.finish()
 
 
 def pre_process_firmware_import(store_setting):
@@ -71,13 +111,31 @@ def pre_process_firmware_import(store_setting):
     return store_path, firmware_archives_queue, num_threads
 
 
-def start_import_threads(num_threads, firmware_archives_queue, create_fuzzy_hashes, store_path, keep_files_on_disk):
+def start_import_threads(num_threads, firmware_archives_queue, create_fuzzy_hashes, store_path, keep_files_on_disk,
+                         progress=None):
+    profile_request = get_profile_request()
+    worker_list = []
     for i in range(num_threads):
         logging.debug(f"Start importer thread {i} of {num_threads}")
-        worker = Thread(target=prepare_firmware_import, args=(firmware_archives_queue, create_fuzzy_hashes, store_path, keep_files_on_disk))
+        worker = Thread(target=run_import_thread, args=(profile_request, firmware_archives_queue, create_fuzzy_hashes, store_path, keep_files_on_disk, progress))
         worker.daemon = True
         worker.start()
+        worker_list.append(worker)
     firmware_archives_queue.join()
+    for worker in worker_list:
+        worker.join()
+
+
+def run_import_thread(profile_request, *args):
+    """
+    Runs an importer thread. The threads do not see the rq job, so the profiling request of the job is handed
+    over. cProfile only profiles the thread that starts it, so every importer thread stores an own profile.
+
+    :param profile_request: dict or None - request of get_profile_request.
+    :param args: arguments of prepare_firmware_import.
+    """
+    with profile_job("prepare_firmware_import", profile_request):
+        prepare_firmware_import(*args)
 
 
 def create_file_import_queue(store_path):
@@ -124,7 +182,7 @@ def allow_import(firmware_file_path, md5):
 
 
 @create_db_context
-def prepare_firmware_import(firmware_file_queue, create_fuzzy_hashes, store_path, keep_files_on_disk):
+def prepare_firmware_import(firmware_file_queue, create_fuzzy_hashes, store_path, keep_files_on_disk, progress=None):
     """
     A multithreaded import script that extracts meta information of a firmware file from the system.img.
     Stores a firmware into the database if it is not already stored.
@@ -132,6 +190,7 @@ def prepare_firmware_import(firmware_file_queue, create_fuzzy_hashes, store_path
     :param store_path: dict(str, str) - paths of the store setting.
     :param create_fuzzy_hashes: bool - true if fuzzy hash index should be created.
     :param firmware_file_queue: The queue of files to import.
+    :param progress: class:'JobProgress' - optional progress of the import job.
 
     :return: A dict of the errors and success messages for every file.
 
@@ -144,17 +203,26 @@ def prepare_firmware_import(firmware_file_queue, create_fuzzy_hashes, store_path
             break
 
         logging.info(f"Attempt to import: {str(filename)}")
+        firmware_file_path = os.path.join(store_path["FIRMWARE_FOLDER_IMPORT"], filename)
+        file_size = 0
         try:
-            firmware_file_path = os.path.join(store_path["FIRMWARE_FOLDER_IMPORT"], filename)
-            md5 = md5_from_file(firmware_file_path)
+            file_size = os.path.getsize(firmware_file_path)
+            digest_dict = read_digest_record(store_path, firmware_file_path) or {}
+            md5 = digest_dict.get("md5") or md5_from_file(firmware_file_path)
             is_allowed, reason = allow_import(firmware_file_path, md5)
             if is_allowed:
-                import_firmware(filename, md5, firmware_file_path, create_fuzzy_hashes, store_path, keep_files_on_disk)
+                import_firmware(filename, md5, firmware_file_path, create_fuzzy_hashes, store_path, keep_files_on_disk,
+                                sha1=digest_dict.get("sha1"), sha256=digest_dict.get("sha256"))
             else:
                 shutil.move(str(firmware_file_path), store_path["FIRMWARE_FOLDER_IMPORT_FAILED"])
                 raise ValueError(reason)
+            if progress:
+                progress.item_done(file_size)
         except Exception as err:
             logging.error(str(err))
+            if progress:
+                progress.item_failed(file_size)
+        remove_digest_record(store_path, firmware_file_path)
         firmware_file_queue.task_done()
 
 
@@ -168,11 +236,25 @@ def open_firmware(firmware_archive_file_path, temp_extract_dir):
     :return: list(class:FirmwareFile)
 
     """
-    extract_first_layer(firmware_archive_file_path, temp_extract_dir)
-    archive_firmware_file_list = get_firmware_archive_content(temp_extract_dir)
+    with start_span("open_firmware", archive_size_bytes=get_file_size_or_none(firmware_archive_file_path)) as span:
+        with start_span("extract_first_layer") as layer_span:
+            extracted_file_list = extract_first_layer(firmware_archive_file_path, temp_extract_dir)
+            layer_span.set_attribute("file_count", len(extracted_file_list))
+        archive_firmware_file_list = get_firmware_archive_content(temp_extract_dir)
+        span.set_attribute("archive_file_count", len(archive_firmware_file_list))
     return archive_firmware_file_list
 
 
+def get_file_size_or_none(file_path):
+    """
+    :return: int or None - size of the file or None if it can not be read.
+    """
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return None
+
+
 def create_partition_file_index(partition_name,
                                 file_pattern_list,
                                 archive_firmware_file_list,
@@ -190,14 +272,27 @@ def create_partition_file_index(partition_name,
 
     :return: list(class:'FirmwareFile') - with all found firmware files within a particular partition.
     """
-    partition_firmware_file_list, is_successful = create_partition_firmware_files(archive_firmware_file_list=archive_firmware_file_list,
-                                                                                  extracted_archive_dir_path=temp_extract_dir,
-                                                                                  file_pattern_list=file_pattern_list,
-                                                                                  partition_name=partition_name,
-                                                                                  temp_dir_path=partition_temp_dir)
+    with start_span("create_partition_file_index", partition=partition_name) as span:
+        partition_firmware_file_list, is_successful = create_partition_firmware_files(archive_firmware_file_list=archive_firmware_file_list,
+                                                                                      extracted_archive_dir_path=temp_extract_dir,
+                                                                                      file_pattern_list=file_pattern_list,
+                                                                                      partition_name=partition_name,
+                                                                                      temp_dir_path=partition_temp_dir)
+        span.set_attributes(is_successful=is_successful, file_count=len(partition_firmware_file_list))
     return partition_firmware_file_list, is_successful
 
 
+def record_indexed_files(firmware_file_list):
+    """
+    Counts the indexed files and their bytes for the metrics of the import.
+
+    :param firmware_file_list: list(class:'FirmwareFile') - files found in a partition.
+    """
+    increment_counter("fmd_firmware_files_indexed_total", len(firmware_file_list))
+    byte_count = sum(firmware_file.file_size_bytes or 0 for firmware_file in firmware_file_list)
+    increment_counter("fmd_extracted_bytes_total", byte_count)
+
+
 def index_partitions(temp_extract_dir, files_dict, create_fuzzy_hashes, md5, store_paths, keep_files_on_disk):
     """
     Creates for every readable partition an index of all files. Special files (apk, build_properties, etc.)
@@ -216,53 +311,63 @@ def index_partitions(temp_extract_dir, files_dict, create_fuzzy_hashes, md5, sto
     for partition_name, file_pattern_list in EXT_IMAGE_PATTERNS_DICT.items():
         firmware_app_list = []
         build_prop_list = []
-        with tempfile.TemporaryDirectory(dir=store_paths["FIRMWARE_FOLDER_CACHE"],
-                                         suffix=f"fmd_extract_root_{partition_name}") as partition_temp_dir:
-            partition_firmware_file_list, is_successful = create_partition_file_index(partition_name=partition_name,
-                                                                                      file_pattern_list=file_pattern_list,
-                                                                                      archive_firmware_file_list=files_dict[
-                                                                                          "archive_firmware_file_list"],
-                                                                                      temp_extract_dir=temp_extract_dir,
-                                                                                      partition_temp_dir=partition_temp_dir)
-            if is_successful:
-                if partition_name == "super":
-                    files_dict["archive_firmware_file_list"].extend(partition_firmware_file_list)
-                else:
-                    files_dict["firmware_file_list"].extend(partition_firmware_file_list)
-                    if len(partition_firmware_file_list) > 0:
-                        firmware_app_store = os.path.join(store_paths["FIRMWARE_FOLDER_APP_EXTRACT"],
-                                                          md5,
-                                                          partition_name)
-                        firmware_app_list = store_android_apps_from_firmware(partition_temp_dir,
-                                                                             firmware_app_store,
-                                                                             files_dict["firmware_file_list"],
-                                                                             partition_name)
-                        files_dict["firmware_app_list"].extend(firmware_app_list)
-                        build_prop_list = extract_build_prop(partition_firmware_file_list, partition_temp_dir)
-                        files_dict["build_prop_file_list"].extend(build_prop_list)
-                    if create_fuzzy_hashes:
-                        add_fuzzy_hashes(partition_firmware_file_list)
-
-                    if keep_files_on_disk:
-                        try:
-                            partition_store_path = os.path.join(store_paths["FIRMWARE_FOLDER_FILE_EXTRACT"],
-                                                                NAME_PARTITION_EXPORT_FOLDER,
-                                                                md5,
-                                                                partition_name)
-                            shutil.copytree(partition_temp_dir,
-                                            partition_store_path,
-                                            dirs_exist_ok=True,
-                                            symlinks=True,
-                                            ignore_dangling_symlinks=True
-                                            )
-                            logging.info(f"Partition stored at {partition_store_path}: {partition_name}")
-                        except Exception as e:
-                            logging.error(f"Partition storing error for {partition_store_path} - {partition_name} with error: {e}")
-
-            partition_info_dict[partition_name] = {"is_import_success": is_successful,
-                                                   "firmware_file_count": len(partition_firmware_file_list),
-                                                   "android_app_count": len(firmware_app_list),
-                                                   "build_prop_count": len(build_prop_list)}
+        with start_span("index_partition", partition=partition_name) as partition_span:
+            with tempfile.TemporaryDirectory(dir=store_paths["FIRMWARE_FOLDER_CACHE"],
+                                             suffix=f"fmd_extract_root_{partition_name}") as partition_temp_dir:
+                partition_firmware_file_list, is_successful = create_partition_file_index(partition_name=partition_name,
+                                                                                          file_pattern_list=file_pattern_list,
+                                                                                          archive_firmware_file_list=files_dict[
+                                                                                              "archive_firmware_file_list"],
+                                                                                          temp_extract_dir=temp_extract_dir,
+                                                                                          partition_temp_dir=partition_temp_dir)
+                if is_successful:
+                    record_indexed_files(partition_firmware_file_list)
+                    if partition_name == "super":
+                        files_dict["archive_firmware_file_list"].extend(partition_firmware_file_list)
+                    else:
+                        files_dict["firmware_file_list"].extend(partition_firmware_file_list)
+                        if len(partition_firmware_file_list) > 0:
+                            firmware_app_store = os.path.join(store_paths["FIRMWARE_FOLDER_APP_EXTRACT"],
+                                                              md5,
+                                                              partition_name)
+                            with time_import_stage("apps"):
+                                firmware_app_list = store_android_apps_from_firmware(partition_temp_dir,
+                                                                                     firmware_app_store,
+                                                                                     files_dict["firmware_file_list"],
+                                                                                     partition_name)
+                            files_dict["firmware_app_list"].extend(firmware_app_list)
+                            with start_span("extract_build_prop"):
+                                build_prop_list = extract_build_prop(partition_firmware_file_list, partition_temp_dir)
+                            files_dict["build_prop_file_list"].extend(build_prop_list)
+                        if create_fuzzy_hashes:
+                            with start_span("add_fuzzy_hashes", file_count=len(partition_firmware_file_list)):
+                                add_fuzzy_hashes(partition_firmware_file_list)
+
+                        if keep_files_on_disk:
+                            try:
+                                partition_store_path = os.path.join(store_paths["FIRMWARE_FOLDER_FILE_EXTRACT"],
+                                                                    NAME_PARTITION_EXPORT_FOLDER,
+                                                                    md5,
+                                                                    partition_name)
+                                with start_span("keep_files_on_disk"):
+                                    shutil.copytree(partition_temp_dir,
+                                                    partition_store_path,
+                                                    dirs_exist_ok=True,
+                                                    symlinks=True,
+                                                    ignore_dangling_symlinks=True
+                                                    )
+                                logging.info(f"Partition stored at {partition_store_path}: {partition_name}")
+                            except Exception as e:
+                                logging.error(f"Partition storing error for {partition_store_path} - {partition_name} with error: {e}")
+
+                partition_span.set_attributes(is_successful=is_successful,
+                                              file_count=len(partition_firmware_file_list),
+                                              android_app_count=len(firmware_app_list))
+        partition_info_dict[partition_name] = {"is_import_success": is_successful,
+                                               "firmware_file_count": len(partition_firmware_file_list),
+                                               "android_app_count": len(firmware_app_list),
+                                               "build_prop_count": len(build_prop_list),
+                                               "timing": get_timing_summary(partition_span)}
     return files_dict, partition_info_dict
 
 
@@ -315,11 +420,27 @@ def check_if_successful_import(partition_info_dict):
     :return: bool - true if at least one partition was successfully imported.
     """
     for partition_name, partition_info in partition_info_dict.items():
-        if partition_info["is_import_success"]:
+        if partition_info.get("is_import_success"):
             return True
     return False
 
 
+def store_import_timing(firmware, import_span):
+    """
+    Adds the timing summary of the import stages to the partition info of the firmware. The summary is written
+    after the firmware object was stored, so it includes the store stage. Errors do not fail the import.
+
+    :param firmware: class:'AndroidFirmware' - the imported firmware.
+    :param import_span: class:'Span' - span of the firmware import.
+    """
+    try:
+        timing_summary = get_timing_summary(import_span)
+        firmware.update(**{f"set__partition_info_dict__{IMPORT_TIMING_KEY}": timing_summary})
+        logging.info(f"Import timing of {firmware.id}: {timing_summary}")
+    except Exception as err:
+        logging.warning(f"Could not store import timing of {firmware.id}: {err}")
+
+
 def ensure_file_readable(file_path):
     try:
         if not os.access(file_path, os.R_OK):
@@ -347,7 +468,9 @@ def import_firmware(original_filename,
                     firmware_archive_file_path,
                     create_fuzzy_hashes,
                     store_paths,
-                    keep_files_on_disk):
+                    keep_files_on_disk,
+                    sha1=None,
+                    sha256=None):
     """
     Attempts to store a firmware archive into the database.
 
@@ -357,10 +480,13 @@ def import_firmware(original_filename,
     :param original_filename: str - name of the file to import.
     :param md5: md5 - checksum of the file to check.
     :param firmware_archive_file_path: str - path of the firmware archive.
+    :param sha1: str - checksum of the file if it was computed during the upload.
+    :param sha256: str - checksum of the file if it was computed during the upload.
 
     """
-    with tempfile.TemporaryDirectory(dir=store_paths["FIRMWARE_FOLDER_CACHE"],
-                                     suffix="_extract") as temp_extract_dir:
+    with start_span("import_firmware", file_name=original_filename, md5=md5) as import_span, \
+            tempfile.TemporaryDirectory(dir=store_paths["FIRMWARE_FOLDER_CACHE"],
+                                        suffix="_extract") as temp_extract_dir:
         temp_extract_dir = os.path.abspath(temp_extract_dir)
         files_dict = {
             "firmware_app_list": [],
@@ -377,54 +503,63 @@ def import_firmware(original_filename,
             except Exception as e:
                 logging.error(f"Failed to remove {firmware_extract_path}: {e}")
         try:
-            sha1 = sha1_from_file(firmware_archive_file_path)
-            sha256 = sha256_from_file(firmware_archive_file_path)
+            with time_import_stage("hash"):
+                sha1 = sha1 or sha1_from_file(firmware_archive_file_path)
+                sha256 = sha256 or sha256_from_file(firmware_archive_file_path)
             ensure_file_readable(firmware_archive_file_path)
             try:
                 file_size = os.stat(firmware_archive_file_path).st_size
             except PermissionError as e:
                 file_size = -1
                 logging.warning(f"Failed to get file size for {firmware_archive_file_path}: {e}")
+            import_span.set_attribute("file_size_bytes", file_size)
 
-            shutil.copy(firmware_archive_file_path, temp_extract_dir, follow_symlinks=False)
-            archive_copy_file_path = os.path.join(temp_extract_dir, original_filename)
-            archive_firmware_file_list = open_firmware(archive_copy_file_path, temp_extract_dir)
+            with time_import_stage("extract"):
+                shutil.copy(firmware_archive_file_path, temp_extract_dir, follow_symlinks=False)
+                archive_copy_file_path = os.path.join(temp_extract_dir, original_filename)
+                archive_firmware_file_list = open_firmware(archive_copy_file_path, temp_extract_dir)
             files_dict["archive_firmware_file_list"].extend(archive_firmware_file_list)
             files_dict["firmware_file_list"].extend(archive_firmware_file_list)
 
             temp_extract_dir = os.path.abspath(temp_extract_dir)
-            files_dict, partition_info_dict = index_partitions(temp_extract_dir,
-                                                               files_dict,
-                                                               create_fuzzy_hashes,
-                                                               md5,
-                                                               store_paths,
-                                                               keep_files_on_disk)
-
-            version_detected = detect_by_build_prop(files_dict["build_prop_file_list"])
-            os_vendor = detect_vendor_by_build_prop(files_dict["build_prop_file_list"])
+            with time_import_stage("index"):
+                files_dict, partition_info_dict = index_partitions(temp_extract_dir,
+                                                                   files_dict,
+                                                                   create_fuzzy_hashes,
+                                                                   md5,
+                                                                   store_paths,
+                                                                   keep_files_on_disk)
+
+            with time_import_stage("build_prop"):
+                version_detected = detect_by_build_prop(files_dict["build_prop_file_list"])
+                os_vendor = detect_vendor_by_build_prop(files_dict["build_prop_file_list"])
 
             if not check_if_successful_import(partition_info_dict):
                 raise ValueError("No partition was successfully imported.")
 
-            store_filename, firmware_store_path = store_firmware_archive(firmware_archive_file_path,
-                                                                         md5,
-                                                                         version_detected,
-                                                                         store_paths)
-            store_firmware_object(store_filename=store_filename,
-                                  original_filename=original_filename,
-                                  firmware_store_path=firmware_store_path,
-                                  md5=md5,
-                                  sha256=sha256,
-                                  sha1=sha1,
-                                  android_app_list=files_dict["firmware_app_list"],
-                                  file_size=file_size,
-                                  build_prop_file_id_list=files_dict["build_prop_file_list"],
-                                  version_detected=version_detected,
-                                  os_vendor=os_vendor,
-                                  firmware_file_list=files_dict["firmware_file_list"],
-                                  has_fuzzy_hash_index=create_fuzzy_hashes,
-                                  partition_info_dict=partition_info_dict)
+            with time_import_stage("store"):
+                store_filename, firmware_store_path = store_firmware_archive(firmware_archive_file_path,
+                                                                             md5,
+                                                                             version_detected,
+                                                                             store_paths)
+                firmware = store_firmware_object(store_filename=store_filename,
+                                                 original_filename=original_filename,
+                                                 firmware_store_path=firmware_store_path,
+                                                 md5=md5,
+                                                 sha256=sha256,
+                                                 sha1=sha1,
+                                                 android_app_list=files_dict["firmware_app_list"],
+                                                 file_size=file_size,
+                                                 build_prop_file_id_list=files_dict["build_prop_file_list"],
+                                                 version_detected=version_detected,
+                                                 os_vendor=os_vendor,
+                                                 firmware_file_list=files_dict["firmware_file_list"],
+                                                 has_fuzzy_hash_index=create_fuzzy_hashes,
+                                                 partition_info_dict=partition_info_dict)
+            store_import_timing(firmware, import_span)
             logging.info(f"Firmware import success for file: {original_filename}")
+            increment_counter("fmd_firmware_imports_total", outcome="success")
+            import_span.set_attribute("outcome", "success")
 
             if keep_files_on_disk:
                 try:
@@ -440,6 +575,8 @@ def import_firmware(original_filename,
 
         except Exception as error:
             logging.exception(f"Firmware Import failed: {original_filename} error: {str(error)}")
+            increment_counter("fmd_firmware_imports_total", outcome="failed")
+            import_span.record_exception(error)
 
             try:
                 if files_dict["firmware_file_list"] and len(files_dict["firmware_file_list"]) > 0:
@@ -630,16 +767,18 @@ def create_partition_firmware_files(archive_firmware_file_list,
     partition_firmware_files = []
     try:
         partition_folder = is_already_extracted(extracted_archive_dir_path, partition_name)
+        increment_counter("fmd_extraction_cache_requests_total", result="hit" if partition_folder else "miss")
         if (partition_folder
                 and os.path.exists(partition_folder)
                 and os.path.isdir(partition_folder)
                 and any(os.scandir(partition_folder))):
             logging.info(f"Partition {partition_name} already extracted at {partition_folder}. Skipping extraction.")
-            shutil.copytree(partition_folder,
-                            temp_dir_path,
-                            dirs_exist_ok=True,
-                            symlinks=True,
-                            ignore_dangling_symlinks=True)
+            with start_span("copy_extracted_partition", partition=partition_name):
+                shutil.copytree(partition_folder,
+                                temp_dir_path,
+                                dirs_exist_ok=True,
+                                symlinks=True,
+                                ignore_dangling_symlinks=True)
             firmware_file_list = create_firmware_file_list(temp_dir_path, partition_name)
             partition_firmware_files.extend(firmware_file_list)
             is_successful = True
@@ -649,14 +788,18 @@ def create_partition_firmware_files(archive_firmware_file_list,
                 try:
                     logging.info(
                         f"Extracting partition {partition_name} from {image_firmware_file.absolute_store_path}")
-                    firmware_file_list = extract_second_layer(image_firmware_file.absolute_store_path,
-                                                              temp_dir_path,
-                                                              extracted_archive_dir_path,
-                                                              partition_name)
-                    third_layer_firmware_file_list = extract_third_layer(firmware_file_list,
-                                                                         temp_dir_path,
-                                                                         extracted_archive_dir_path,
-                                                                         partition_name)
+                    with start_span("extract_second_layer",
+                                    image_name=image_firmware_file.name,
+                                    image_size_bytes=get_file_size_or_none(image_firmware_file.absolute_store_path)):
+                        firmware_file_list = extract_second_layer(image_firmware_file.absolute_store_path,
+                                                                  temp_dir_path,
+                                                                  extracted_archive_dir_path,
+                                                                  partition_name)
+                    with start_span("extract_third_layer"):
+                        third_layer_firmware_file_list = extract_third_layer(firmware_file_list,
+                                                                             temp_dir_path,
+                                                                             extracted_archive_dir_path,
+                                                                             partition_name)
                     partition_firmware_files.extend(firmware_file_list)
                     partition_firmware_files.extend(third_layer_firmware_file_list)
                     if len(firmware_file_list) > 0:
@@ -709,10 +852,13 @@ def store_firmware_object(store_filename, original_filename, firmware_store_path
                                has_fuzzy_hash_index=has_fuzzy_hash_index,
                                build_prop_file_id_list=build_prop_file_id_list,
                                partition_info_dict=partition_info_dict)
-    firmware.save()
+    with start_span("save_firmware"):
+        firmware.save()
     logging.debug(f"Stored firmware with id {str(firmware.id)} and vendor '{os_vendor}' in database.")
-    add_firmware_file_references(firmware, firmware_file_list)
-    add_app_firmware_references(firmware, android_app_list)
+    with start_span("add_firmware_file_references", file_count=len(firmware_file_list)):
+        add_firmware_file_references(firmware, firmware_file_list)
+    with start_span("add_app_firmware_references", android_app_count=len(android_app_list)):
+        add_app_firmware_references(firmware, android_app_list)
     add_build_prop_references(firmware, build_prop_file_id_list)
     return firmware
 
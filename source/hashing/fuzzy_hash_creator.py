@@ -7,11 +7,13 @@ import traceback
 from queue import Empty
 from threading import Thread
 from hashing.tlsh.tlsh_hasher import create_tlsh_hash
-from model import AndroidFirmware
+from database.query_document import iter_documents_by_ids
+from model import AndroidFirmware, FirmwareFile
 from firmware_handler.firmware_file_exporter import extract_firmware
 from context.context_creator import create_db_context, create_log_context, create_multithread_log_context
 from model.StoreSetting import get_active_store_by_index
 from processing.standalone_python_worker import create_multi_threading_queue
+from processing.job_progress import get_job_progress
 
 NUMBER_OF_FUZZY_HASH_THREADS = 4
 
@@ -27,10 +29,15 @@ def start_fuzzy_hasher(firmware_id_list, storage_index):
 
     """
     logging.info(f"Fuzzy hashing started with {len(firmware_id_list)} firmware ids.")
-    start_fuzzy_hash_multithreading(firmware_id_list, storage_index)
+    progress = get_job_progress()
+    if progress:
+        progress.start(stage="fuzzy_hash", items_total=len(firmware_id_list))
+    start_fuzzy_hash_multithreading(firmware_id_list, storage_index, progress)
+    if progress:
+        progress.finish()
 
 
-def start_fuzzy_hash_multithreading(firmware_id_list, storage_index):
+def start_fuzzy_hash_multithreading(firmware_id_list, storage_index, progress=None):
     """
     Starts to export firmware files to the filesystem.
 
@@ -39,7 +46,7 @@ def start_fuzzy_hash_multithreading(firmware_id_list, storage_index):
     """
     firmware_id_queue = create_multi_threading_queue(firmware_id_list)
     for i in range(NUMBER_OF_FUZZY_HASH_THREADS):
-        worker = Thread(target=fuzzy_hash_worker_multithreading, args=(firmware_id_queue, storage_index))
+        worker = Thread(target=fuzzy_hash_worker_multithreading, args=(firmware_id_queue, storage_index, progress))
         worker.setDaemon(True)
         worker.start()
     firmware_id_queue.join()
@@ -47,12 +54,13 @@ def start_fuzzy_hash_multithreading(firmware_id_list, storage_index):
 
 @create_multithread_log_context
 @create_db_context
-def fuzzy_hash_worker_multithreading(firmware_id_queue, storage_index):
+def fuzzy_hash_worker_multithreading(firmware_id_queue, storage_index, progress=None):
     """
     Create fuzzy hashes for all firmware files. Extracts and mounts the firmware.
 
     :param storage_index: int - index of the storage.
     :param firmware_id_queue: class:'Queue' - queue of firmware-id's.
+    :param progress: class:'JobProgress' - optional progress of the fuzzy hash job.
 
     """
     while True:
@@ -62,8 +70,10 @@ def fuzzy_hash_worker_multithreading(firmware_id_queue, storage_index):
                          f"estimated queue size {firmware_id_queue.qsize()}")
         except Empty:
             break
+        file_size = 0
         try:
             firmware = AndroidFirmware.objects.get(pk=firmware_id)
+            file_size = firmware.file_size_bytes or 0
             store_setting = get_active_store_by_index(storage_index)
             if not store_setting:
                 raise ValueError(f"Store settings not found for index: {storage_index}")
@@ -74,9 +84,13 @@ def fuzzy_hash_worker_multithreading(firmware_id_queue, storage_index):
                 add_fuzzy_hashes_by_reference(firmware.firmware_file_id_list)
                 firmware.has_fuzzy_hash_index = True
                 firmware.save()
+            if progress:
+                progress.item_done(file_size)
         except Exception as err:
             logging.error(err)
             traceback.print_exc()
+            if progress:
+                progress.item_failed(file_size)
         finally:
             firmware_id_queue.task_done()
 
@@ -115,8 +129,7 @@ def add_fuzzy_hashes_by_reference(firmware_file_id_list):
     :param firmware_file_id_list: list(class:'FirmwareFile') - list of lazy firmware files to be hashed.
 
     """
-    for firmware_file_lazy in firmware_file_id_list:
-        firmware_file = firmware_file_lazy.fetch()
+    for firmware_file in iter_documents_by_ids(firmware_file_id_list, FirmwareFile):
         if not firmware_file.is_directory:
             logging.info(f"Creating fuzzy hashes for: {firmware_file.absolute_store_path}")
             try:
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import hashlib
+import json
+import logging
+import os
+
+DIGEST_ALGORITHM_LIST = ["md5", "sha1", "sha256"]
+DIGEST_RECORD_FOLDER_NAME = "import_digests"
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+def create_hasher_dict():
+    """
+    :return: dict(str, hashlib object) - empty md5, sha1 and sha256 hashers.
+    """
+    return {algorithm: hashlib.new(algorithm) for algorithm in DIGEST_ALGORITHM_LIST}
+
+
+def update_hasher_dict(hasher_dict, data):
+    """
+    Adds the data to all hashers.
+
+    :param hasher_dict: dict(str, hashlib object) - hashers by algorithm name.
+    :param data: bytes - the next block of the file.
+    """
+    for hasher in hasher_dict.values():
+        hasher.update(data)
+
+
+def get_hexdigest_dict(hasher_dict):
+    """
+    :param hasher_dict: dict(str, hashlib object) - hashers by algorithm name.
+
+    :return: dict(str, str) - hex digests by algorithm name.
+    """
+    return {algorithm: hasher.hexdigest() for algorithm, hasher in hasher_dict.items()}
+
+
+def hash_file_prefix(file_path, size):
+    """
+    Hashes the first bytes of a file. Used to restore the hashers of an interrupted upload, because the state of
+    hashlib objects can not be stored.
+
+    :param file_path: str - path of the partially written file.
+    :param size: int - number of bytes to hash.
+
+    :return: dict(str, hashlib object) - hashers that contain the first size bytes of the file.
+    """
+    hasher_dict = create_hasher_dict()
+    remaining_bytes = size
+    with open(file_path, "rb") as file:
+        while remaining_bytes > 0:
+            data = file.read(min(READ_BLOCK_SIZE, remaining_bytes))
+            if not data:
+                raise ValueError(f"File {file_path} is shorter than {size} bytes.")
+            update_hasher_dict(hasher_dict, data)
+            remaining_bytes -= len(data)
+    return hasher_dict
+
+
+def get_digest_record_path(store_paths, file_path):
+    """
+    :param store_paths: dict(str, str) - paths of the store setting.
+    :param file_path: str - path of the file in an import folder.
+
+    :return: str - path of the digest record of the file.
+    """
+    return os.path.join(store_paths["UPLOADS"], DIGEST_RECORD_FOLDER_NAME, f"{os.path.basename(file_path)}.json")
+
+
+def write_digest_record(store_paths, file_path, digest_dict):
+    """
+    Stores the digests of a file in the import folder, so the importer does not have to hash the file again. The
+    record is bound to the size and modification time of the file.
+
+    :param store_paths: dict(str, str) - paths of the store setting.
+    :param file_path: str - path of the file in an import folder.
+    :param digest_dict: dict(str, str) - hex digests by algorithm name.
+    """
+    record_path = get_digest_record_path(store_paths, file_path)
+    os.makedirs(os.path.dirname(record_path), exist_ok=True)
+    file_stat = os.stat(file_path)
+    record = dict(digest_dict, size=file_stat.st_size, mtime_ns=file_stat.st_mtime_ns)
+    temporary_path = f"{record_path}.tmp"
+    with open(temporary_path, "w") as record_file:
+        json.dump(record, record_file)
+    os.replace(temporary_path, record_path)
+
+
+def read_digest_record(store_paths, file_path):
+    """
+    Gets the stored digests of a file in the import folder.
+
+    :param store_paths: dict(str, str) - paths of the store setting.
+    :param file_path: str - path of the file in an import folder.
+
+    :return: dict(str, str) or None - hex digests by algorithm name or None if no record exists or the file was
+    changed after the record was written.
+    """
+    record_path = get_digest_record_path(store_paths, file_path)
+    try:
+        with open(record_path, "r") as record_file:
+            record = json.load(record_file)
+        file_stat = os.stat(file_path)
+    except (OSError, ValueError):
+        return None
+    if record.get("size") != file_stat.st_size or record.get("mtime_ns") != file_stat.st_mtime_ns:
+        logging.warning(f"Ignoring outdated digest record of {file_path}")
+        return None
+    if not all(record.get(algorithm) for algorithm in DIGEST_ALGORITHM_LIST):
+        return None
+    return {algorithm: record[algorithm] for algorithm in DIGEST_ALGORITHM_LIST}
+
+
+def remove_digest_record(store_paths, file_path):
+    """
+    :param store_paths: dict(str, str) - paths of the store setting.
+    :param file_path: str - path of the file in an import folder.
+    """
+    try:
+        os.remove(get_digest_record_path(store_paths, file_path))
+    except FileNotFoundError:
+        pass
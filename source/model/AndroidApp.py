@@ -11,9 +11,11 @@ from model import AndroidFirmware
 
 class AndroidApp(Document):
     meta = {
+        'index_background': True,
         'indexes': ['packagename',
                     'original_filename',
-                    'filename'
+                    'filename',
+                    {'fields': ['firmware_id_reference']}
                     ]
     }
     firmware_id_reference = LazyReferenceField(AndroidFirmware, reverse_delete_rule=CASCADE, required=False)
@@ -2,14 +2,25 @@
 # This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
 # See the file 'LICENSE' for copying permission.
 import datetime
-from mongoengine import LazyReferenceField, CASCADE, StringField, DateTimeField, Document, GenericLazyReferenceField
+from mongoengine import LazyReferenceField, CASCADE, StringField, DateTimeField, Document, GenericLazyReferenceField, \
+    EmbeddedDocumentField
 from model import AndroidApp
+from model.ScanTaskMetrics import ScanTaskMetrics
 
 
 class ApkScannerReport(Document):
-    meta = {'allow_inheritance': True}
+    meta = {
+        'index_background': True,
+        'allow_inheritance': True,
+        'indexes': [
+            {'fields': ['scanner_name', 'scanner_version', 'android_app_id_reference', 'scan_status'], 'cls': False},
+            {'fields': ['scanner_name', 'task_metrics.wall_time_seconds'], 'cls': False},
+            {'fields': ['android_app_id_reference', 'scanner_name'], 'cls': False}
+        ]
+    }
     report_date = DateTimeField(required=True, default=datetime.datetime.now)
     android_app_id_reference = LazyReferenceField(AndroidApp, reverse_delete_rule=CASCADE, required=True)
     scanner_version = StringField(required=True)
     scanner_name = StringField(required=True)
     scan_status = StringField(required=True, default="completed")
+    task_metrics = EmbeddedDocumentField(ScanTaskMetrics, required=False)
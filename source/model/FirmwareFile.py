@@ -10,9 +10,10 @@ FUZZY_HASH_ATTRIBUTE_NAMES = ["ssdeep_reference", "tlsh_reference"]
 
 class FirmwareFile(Document):
     meta = {
+        'index_background': True,
         'indexes': ['name',
-                    'firmware_id_reference',
-                    'md5'
+                    {'fields': ['firmware_id_reference', 'name']},
+                    {'fields': ['md5', 'firmware_id_reference']}
                     ]
     }
     indexed_date = DateTimeField(default=datetime.datetime.now)
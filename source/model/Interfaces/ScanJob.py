@@ -1,10 +1,66 @@
 # -*- coding: utf-8 -*-
 # This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
 # See the file 'LICENSE' for copying permission.
+import logging
+import subprocess
 from abc import abstractmethod
+from bson import ObjectId
+
+SCAN_STATUS_COMPLETED = "completed"
+SCAN_STATUS_FAILED = "failed"
+
+
+def get_app_scan_status_dict(object_id_list, scanner_name, scanner_version=None):
+    """
+    Resolves the scan states of the given apps for one scanner with a single aggregation over the
+    ApkScannerReport collection.
+
+    :param object_id_list: list(str) - object-ids of class:'AndroidApp'.
+    :param scanner_name: str - name of the scanner as stored in the reports.
+    :param scanner_version: str - optional version of the scanner. If not set, reports of all versions match.
+
+    :return: dict(str, set(str)) - object-id of the app mapped to the set of scan states found.
+    """
+    from model import ApkScannerReport
+    match_filter = {
+        "scanner_name": scanner_name,
+        "android_app_id_reference": {"$in": [ObjectId(object_id) for object_id in object_id_list]},
+        "scan_status": {"$in": [SCAN_STATUS_COMPLETED, SCAN_STATUS_FAILED]},
+    }
+    if scanner_version:
+        match_filter["scanner_version"] = scanner_version
+    pipeline = [
+        {"$match": match_filter},
+        {"$group": {"_id": "$android_app_id_reference", "scan_status_list": {"$addToSet": "$scan_status"}}},
+    ]
+    cursor = ApkScannerReport._get_collection().aggregate(pipeline, allowDiskUse=True)
+    return {str(document["_id"]): set(document["scan_status_list"]) for document in cursor}
+
+
+def filter_scan_id_list(object_id_list, scan_status_dict, rescan_failed_only=False):
+    """
+    Filters the object-ids of an incremental scan.
+
+    :param object_id_list: list(str) - object-ids of class:'AndroidApp'.
+    :param scan_status_dict: dict(str, set(str)) - scan states per app from get_app_scan_status_dict.
+    :param rescan_failed_only: bool - if true, only apps with a failed and without a completed report are kept.
+
+    :return: list(str) - object-ids that need to be scanned in input order.
+    """
+    if rescan_failed_only:
+        return [object_id for object_id in object_id_list
+                if scan_status_dict.get(str(object_id)) == {SCAN_STATUS_FAILED}]
+    return [object_id for object_id in object_id_list
+            if SCAN_STATUS_COMPLETED not in scan_status_dict.get(str(object_id), set())]
 
 
 class ScanJob:
+    SCANNER_NAME = None
+    SCANNER_VERSION = None
+    SCANNER_VERSION_CODE = None
+    INTERPRETER_PATH = None
+    incremental = False
+    rescan_failed_only = False
 
     @abstractmethod
     def __init__(self, object_id_list, kwargs):
@@ -14,6 +70,51 @@ class ScanJob:
     def start_scan(self):
         pass
 
+    def set_scan_mode(self, incremental=False, rescan_failed_only=False):
+        """
+        Enables the incremental mode. Apps that already have a completed report of the same scanner version are
+        skipped. With rescan_failed_only only apps with failed reports are scanned again.
+
+        :param incremental: bool - skip apps with a completed report.
+        :param rescan_failed_only: bool - scan only apps with a failed report.
+        """
+        self.incremental = incremental or rescan_failed_only
+        self.rescan_failed_only = rescan_failed_only
+
+    def get_scanner_version(self):
+        """
+        Gets the version of the scanner. Uses the static version if set, otherwise SCANNER_VERSION_CODE is run with
+        the scanner interpreter to print the same version that is stored in the reports.
 
+        :return: str or None - scanner version.
+        """
+        if self.SCANNER_VERSION:
+            return self.SCANNER_VERSION
+        if not self.SCANNER_VERSION_CODE or not self.INTERPRETER_PATH:
+            return None
+        command = [self.INTERPRETER_PATH, "-c", self.SCANNER_VERSION_CODE]
+        try:
+            result = subprocess.run(command, check=True, capture_output=True, text=True, timeout=60)
+            return result.stdout.strip() or None
+        except (OSError, subprocess.SubprocessError) as err:
+            logging.warning(f"Could not detect version of {self.SCANNER_NAME}: {err}")
+            return None
 
+    def get_scan_id_list(self):
+        """
+        Gets the object-ids to scan. In incremental mode, apps that were already scanned are removed.
 
+        :return: list(str) - object-ids of class:'AndroidApp'.
+        """
+        object_id_list = self.object_id_list
+        if not self.incremental or not object_id_list:
+            return object_id_list
+        if not self.SCANNER_NAME:
+            logging.warning(f"{self.__class__.__name__} does not support incremental scans. Scanning all apps.")
+            return object_id_list
+        scanner_version = self.get_scanner_version()
+        scan_status_dict = get_app_scan_status_dict(object_id_list, self.SCANNER_NAME, scanner_version)
+        scan_id_list = filter_scan_id_list(object_id_list, scan_status_dict, self.rescan_failed_only)
+        logging.info(f"Incremental scan {self.SCANNER_NAME} {scanner_version}: "
+                     f"{len(scan_id_list)} of {len(object_id_list)} apps need to be scanned.")
+        return scan_id_list
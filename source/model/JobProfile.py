@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import datetime
+from mongoengine import Document, DateTimeField, StringField, FloatField, IntField, LazyReferenceField, CASCADE
+from model import JsonFile
+
+
+class JobProfile(Document):
+    meta = {
+        'indexes': ['job_id', 'parent_job_id']
+    }
+    job_id = StringField(required=True)
+    parent_job_id = StringField(required=False)
+    label = StringField(required=True)
+    profile_mode = StringField(required=True)
+    hostname = StringField(required=False)
+    pid = IntField(required=False)
+    duration_seconds = FloatField(required=False)
+    function_count = IntField(required=False)
+    create_date = DateTimeField(required=True, default=datetime.datetime.now)
+    profile_file_reference = LazyReferenceField(JsonFile, reverse_delete_rule=CASCADE, required=True)
@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+from mongoengine import EmbeddedDocument, FloatField, LongField, BooleanField, IntField
+
+
+class ScanTaskMetrics(EmbeddedDocument):
+    wall_time_seconds = FloatField(required=True)
+    cpu_time_seconds = FloatField(required=True)
+    peak_rss_bytes = LongField(required=True)
+    input_size_bytes = LongField(required=False, default=0)
+    timeout_seconds = IntField(required=False)
+    timed_out = BooleanField(required=True, default=False)
+    exit_code = IntField(required=False)
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import datetime
+from mongoengine import Document, DateTimeField, StringField, FloatField, LongField, IntField
+from database.query_profiler import SLOW_OPERATION_LOG_COLLECTION
+
+SLOW_OPERATION_LOG_MAX_BYTES = 64 * 1024 * 1024
+
+
+class SlowOperationLog(Document):
+    meta = {
+        'collection': SLOW_OPERATION_LOG_COLLECTION,
+        'max_size': SLOW_OPERATION_LOG_MAX_BYTES
+    }
+    timestamp = DateTimeField(required=True, default=datetime.datetime.now)
+    database_name = StringField(required=True)
+    collection_name = StringField(required=True)
+    command_name = StringField(required=True)
+    shape = StringField(required=True)
+    duration_ms = FloatField(required=True)
+    docs_examined = LongField(required=False)
+    docs_returned = LongField(required=False)
+    pid = IntField(required=False)
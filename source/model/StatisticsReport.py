@@ -2,7 +2,8 @@
 # This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
 # See the file 'LICENSE' for copying permission.
 import datetime
-from mongoengine import StringField, DateTimeField, LazyReferenceField, CASCADE, LongField, Document
+from mongoengine import StringField, DateTimeField, LazyReferenceField, CASCADE, LongField, Document, \
+    ObjectIdField, DictField
 
 from model import JsonFile
 
@@ -13,4 +14,6 @@ class StatisticsReport(Document):
     report_date = DateTimeField(default=datetime.datetime.now, required=True)
     report_count = LongField(required=True, min_value=1)
     android_app_reference_file = LazyReferenceField(JsonFile, reverse_delete_rule=CASCADE, required=False)
-    android_app_count = LongField(required=True, min_value=1)
+    android_app_count = LongField(required=True, min_value=0)
+    last_source_object_id = ObjectIdField(required=False)
+    spill_reference_dict = DictField(required=False)
@@ -46,7 +46,10 @@ from .FirmwareImporterSetting import FirmwareImporterSetting
 from .ServerSetting import ServerSetting
 from .FlowDroidReport import FlowDroidReport
 from .TrueseeingReport import TrueseeingReport
+from .ScanTaskMetrics import ScanTaskMetrics
 from .ApkScannerReport import ApkScannerReport
 from .ApkScannerLog import ApkScannerLog
 from .FirmwareFileSet import FirmwareFileSet
+from .SlowOperationLog import SlowOperationLog
+from .JobProfile import JobProfile
 from . import *
@@ -0,0 +1,394 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import base64
+import datetime
+import hashlib
+import json
+import logging
+import os
+import uuid
+from bson import ObjectId, DBRef
+from mongoengine import Document, StringField, IntField, LongField, FloatField, BooleanField, DateTimeField
+from mongoengine.base import get_document
+from rq import get_current_job
+from context.context_creator import create_db_context, create_log_context
+from model.StoreSetting import get_active_store_by_index
+from processing.job_progress import get_job_progress
+
+EXPORT_FOLDER_NAME = "exports"
+MANIFEST_FILE_NAME = "manifest.json"
+EXPORT_FORMAT_NDJSON = "ndjson"
+EXPORT_FORMAT_PARQUET = "parquet"
+EXPORT_FORMAT_LIST = [EXPORT_FORMAT_NDJSON, EXPORT_FORMAT_PARQUET]
+EXPORT_STATUS_RUNNING = "running"
+EXPORT_STATUS_FINISHED = "finished"
+DEFAULT_ROWS_PER_CHUNK = 100000
+PARQUET_ROW_GROUP_SIZE = 10000
+CURSOR_BATCH_SIZE = 1000
+ZSTD_COMPRESSION_LEVEL = 3
+CHECKSUM_BLOCK_SIZE = 1024 * 1024
+
+
+def get_export_folder(export_id, storage_index=0):
+    """
+    Gets the folder of an export in the file storage.
+
+    :param export_id: str - uuid of the export.
+    :param storage_index: int - index of the file storage.
+
+    :return: str - absolute path of the export folder.
+    """
+    export_id = str(uuid.UUID(str(export_id)))
+    store_paths = get_active_store_by_index(storage_index).get_store_paths()
+    return os.path.join(os.path.abspath(store_paths["FILE_STORAGE_FOLDER"]), EXPORT_FOLDER_NAME, export_id)
+
+
+def get_export_model(model_name):
+    """
+    :param model_name: str - class name of the document, for instance, "FirmwareFile".
+
+    :raises: ValueError: If the name is not a document class.
+
+    :return: document class
+    """
+    try:
+        model = get_document(model_name)
+    except Exception:
+        raise ValueError(f"Unknown document class: {model_name}")
+    if not issubclass(model, Document) or model._meta.get("abstract"):
+        raise ValueError(f"Class {model_name} is not exportable.")
+    return model
+
+
+def create_export_filter(model, field_filter=None):
+    """
+    Creates the query filter of an export with the semantics of the graphql filters created by generate_filter:
+    fields are compared for equality and None values are ignored. Query operators are not accepted.
+
+    :param model: document class
+    :param field_filter: dict(str, object) - field names/values to filter by.
+
+    :raises: ValueError: If a key is not a field of the model.
+
+    :return: dict - keyword arguments for the queryset.
+    """
+    filter_dict = {}
+    for field_name, value in (field_filter or {}).items():
+        if field_name.startswith("_") or field_name not in model._fields:
+            raise ValueError(f"Invalid filter field for {model.__name__}: {field_name}")
+        if value is not None:
+            filter_dict[field_name] = value
+    return filter_dict
+
+
+def get_export_field_list(model, field_name_list=None):
+    """
+    :param model: document class
+    :param field_name_list: list(str) - fields to export or None for all fields.
+
+    :raises: ValueError: If a name is not a field of the model.
+
+    :return: list(str) - field names with "id" as first field.
+    """
+    if not field_name_list:
+        field_name_list = [field_name for field_name in model._fields if not field_name.startswith("_")]
+    for field_name in field_name_list:
+        if field_name.startswith("_") or field_name not in model._fields:
+            raise ValueError(f"Invalid export field for {model.__name__}: {field_name}")
+    return ["id"] + [field_name for field_name in field_name_list if field_name != "id"]
+
+
+def to_export_value(value):
+    """
+    Converts a raw mongodb value to a json compatible value.
+
+    :param value: object - value of a document from pymongo.
+
+    :return: object - json serializable value.
+    """
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, DBRef):
+        return str(value.id)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    if isinstance(value, dict):
+        return {str(key): to_export_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [to_export_value(item) for item in value]
+    return value
+
+
+def get_parquet_schema(model, field_list):
+    """
+    Creates the parquet schema from the field types of the model. Scalar fields are stored as typed columns,
+    all other fields as json strings.
+
+    :return: pyarrow.Schema
+    """
+    import pyarrow
+    type_map = {
+        StringField: pyarrow.string(),
+        IntField: pyarrow.int64(),
+        LongField: pyarrow.int64(),
+        FloatField: pyarrow.float64(),
+        BooleanField: pyarrow.bool_(),
+        DateTimeField: pyarrow.timestamp("ms"),
+    }
+    return pyarrow.schema([(field_name, type_map.get(type(model._fields[field_name]), pyarrow.string()))
+                           for field_name in field_list])
+
+
+class NdjsonChunkWriter:
+    """
+    Writes rows as zstd compressed newline delimited json.
+    """
+    file_extension = "ndjson.zst"
+
+    def __init__(self, file_path, model, field_list):
+        import zstandard
+        self.field_list = field_list
+        self.file = open(file_path, "wb")
+        self.writer = zstandard.ZstdCompressor(level=ZSTD_COMPRESSION_LEVEL).stream_writer(self.file)
+
+    def write(self, row):
+        line = json.dumps({field_name: to_export_value(value) for field_name, value in row.items()})
+        self.writer.write(line.encode("utf-8") + b"\n")
+
+    def close(self):
+        self.writer.close()
+
+
+class ParquetChunkWriter:
+    """
+    Writes rows as zstd compressed parquet. Rows are buffered and written as row groups of PARQUET_ROW_GROUP_SIZE.
+    """
+    file_extension = "parquet"
+
+    def __init__(self, file_path, model, field_list):
+        import pyarrow.parquet
+        self.schema = get_parquet_schema(model, field_list)
+        self.writer = pyarrow.parquet.ParquetWriter(file_path, self.schema, compression="zstd")
+        self.row_buffer = []
+
+    def to_column_value(self, field_type, value):
+        import pyarrow
+        if value is None:
+            return None
+        if field_type == pyarrow.string() and not isinstance(value, str):
+            value = to_export_value(value)
+            return value if isinstance(value, str) else json.dumps(value)
+        return value
+
+    def write(self, row):
+        self.row_buffer.append({field.name: self.to_column_value(field.type, row.get(field.name))
+                                for field in self.schema})
+        if len(self.row_buffer) >= PARQUET_ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        import pyarrow
+        if self.row_buffer:
+            self.writer.write_table(pyarrow.Table.from_pylist(self.row_buffer, schema=self.schema))
+            self.row_buffer = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+CHUNK_WRITER_DICT = {
+    EXPORT_FORMAT_NDJSON: NdjsonChunkWriter,
+    EXPORT_FORMAT_PARQUET: ParquetChunkWriter,
+}
+
+
+def read_manifest(export_folder):
+    """
+    :param export_folder: str - path of the export folder.
+
+    :return: dict - the manifest or None if the export does not exist.
+    """
+    manifest_path = os.path.join(export_folder, MANIFEST_FILE_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r") as manifest_file:
+        return json.load(manifest_file)
+
+
+def write_manifest(export_folder, manifest):
+    """
+    Replaces the manifest atomically, so a crash never leaves a partial manifest behind.
+    """
+    manifest["update_date"] = datetime.datetime.now().isoformat()
+    manifest_path = os.path.join(export_folder, MANIFEST_FILE_NAME)
+    temp_manifest_path = f"{manifest_path}.tmp"
+    with open(temp_manifest_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=4)
+    os.replace(temp_manifest_path, manifest_path)
+
+
+def get_file_sha256(file_path):
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as export_file:
+        for block in iter(lambda: export_file.read(CHECKSUM_BLOCK_SIZE), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def iter_export_rows(model, manifest):
+    """
+    Streams the rows of the export with a cursor in _id order, starting after the last exported document of the
+    manifest. Only the exported fields are loaded.
+
+    :return: generator(dict) - rows keyed by field name.
+    """
+    queryset = model.objects(**manifest["query_filter"])
+    if manifest["object_id_list"]:
+        queryset = queryset.filter(pk__in=manifest["object_id_list"])
+    if manifest["last_object_id"]:
+        queryset = queryset.filter(pk__gt=ObjectId(manifest["last_object_id"]))
+    field_list = manifest["field_list"]
+    db_field_dict = {field_name: model._fields[field_name].db_field for field_name in field_list}
+    cursor = queryset.only(*field_list).order_by("pk").no_cache().batch_size(CURSOR_BATCH_SIZE).as_pymongo()
+    for document in cursor:
+        yield {field_name: document.get(db_field) for field_name, db_field in db_field_dict.items()}
+
+
+def write_chunk(export_folder, model, manifest, row_iterator):
+    """
+    Writes the next chunk of the export. The chunk is written to a temporary file and only renamed and added to the
+    manifest when it is complete.
+
+    :return: dict - the chunk entry of the manifest or None if there are no rows left.
+    """
+    chunk_index = len(manifest["chunk_list"])
+    writer_class = CHUNK_WRITER_DICT[manifest["export_format"]]
+    file_name = f"part-{chunk_index:05d}.{writer_class.file_extension}"
+    file_path = os.path.join(export_folder, file_name)
+    temp_file_path = f"{file_path}.tmp"
+    writer = writer_class(temp_file_path, model, manifest["field_list"])
+    row_count = 0
+    last_object_id = None
+    try:
+        for row in row_iterator:
+            writer.write(row)
+            row_count += 1
+            last_object_id = row["id"]
+            if row_count >= manifest["rows_per_chunk"]:
+                break
+    finally:
+        writer.close()
+    if row_count == 0:
+        os.remove(temp_file_path)
+        return None
+    os.replace(temp_file_path, file_path)
+    return {"file_name": file_name,
+            "row_count": row_count,
+            "last_object_id": str(last_object_id),
+            "byte_size": os.path.getsize(file_path),
+            "sha256": get_file_sha256(file_path)}
+
+
+def create_manifest(export_id, model, query_filter, object_id_list, field_list, export_format, rows_per_chunk):
+    return {"export_id": export_id,
+            "model_name": model.__name__,
+            "query_filter": to_export_value(query_filter),
+            "object_id_list": object_id_list or [],
+            "field_list": field_list,
+            "export_format": export_format,
+            "compression": "zstd",
+            "rows_per_chunk": rows_per_chunk,
+            "status": EXPORT_STATUS_RUNNING,
+            "row_count": 0,
+            "last_object_id": None,
+            "chunk_list": [],
+            "create_date": datetime.datetime.now().isoformat()}
+
+
+def update_job_progress(manifest):
+    job = get_current_job()
+    if job:
+        job.meta.update({"export_id": manifest["export_id"],
+                         "row_count": manifest["row_count"],
+                         "chunk_count": len(manifest["chunk_list"]),
+                         "status": manifest["status"]})
+        job.save_meta()
+
+
+@create_log_context
+@create_db_context
+def start_corpus_export(export_id,
+                        model_name,
+                        field_filter=None,
+                        object_id_list=None,
+                        field_name_list=None,
+                        export_format=EXPORT_FORMAT_NDJSON,
+                        rows_per_chunk=DEFAULT_ROWS_PER_CHUNK,
+                        storage_index=0):
+    """
+    Exports a filtered collection to chunked NDJSON or Parquet files with zstd compression. The documents are
+    streamed with a cursor, so the memory usage does not depend on the export size. After every chunk the manifest
+    is updated with the last exported object-id. Running the job again with the same export-id resumes after the
+    last complete chunk; the arguments of the first run are taken from the manifest.
+
+    :param export_id: str - uuid of the export.
+    :param model_name: str - class name of the document, for instance, "FirmwareFile".
+    :param field_filter: dict - field names/values to filter by.
+    :param object_id_list: list(str) - optional object-ids to export.
+    :param field_name_list: list(str) - fields to export or None for all fields.
+    :param export_format: str - "ndjson" or "parquet".
+    :param rows_per_chunk: int - maximal number of rows per chunk file.
+    :param storage_index: int - index of the file storage the export is written to.
+
+    :return: dict - the manifest of the export.
+    """
+    export_folder = get_export_folder(export_id, storage_index)
+    os.makedirs(export_folder, exist_ok=True)
+    manifest = read_manifest(export_folder)
+    items_total = None
+    if manifest is None:
+        if export_format not in EXPORT_FORMAT_LIST:
+            raise ValueError(f"Invalid export format: {export_format}. Must be one of {EXPORT_FORMAT_LIST}")
+        model = get_export_model(model_name)
+        manifest = create_manifest(str(export_id),
+                                   model,
+                                   create_export_filter(model, field_filter),
+                                   object_id_list,
+                                   get_export_field_list(model, field_name_list),
+                                   export_format,
+                                   rows_per_chunk)
+        write_manifest(export_folder, manifest)
+        items_total = len(manifest["object_id_list"])
+    else:
+        model = get_export_model(manifest["model_name"])
+        logging.info(f"Resuming export {export_id} after {manifest['row_count']} rows.")
+    if manifest["status"] == EXPORT_STATUS_FINISHED:
+        return manifest
+
+    # A resumed export keeps the counters of its earlier run, so the total is only added by the first run.
+    progress = get_job_progress()
+    if progress:
+        progress.start(stage="export", items_total=items_total)
+    row_iterator = iter_export_rows(model, manifest)
+    while True:
+        chunk = write_chunk(export_folder, model, manifest, row_iterator)
+        if chunk is None:
+            break
+        manifest["chunk_list"].append(chunk)
+        manifest["row_count"] += chunk["row_count"]
+        manifest["last_object_id"] = chunk["last_object_id"]
+        write_manifest(export_folder, manifest)
+        update_job_progress(manifest)
+        if progress:
+            progress.item_done(chunk["byte_size"], count=chunk["row_count"])
+        logging.info(f"Export {export_id}: wrote {chunk['file_name']} ({manifest['row_count']} rows).")
+    manifest["status"] = EXPORT_STATUS_FINISHED
+    write_manifest(export_folder, manifest)
+    update_job_progress(manifest)
+    if progress:
+        progress.finish()
+    return manifest
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import hashlib
+import json
+import logging
+import redis_lock
+from rq.job import Job, JobStatus
+from rq.exceptions import NoSuchJobError
+
+JOB_FINGERPRINT_KEY_PREFIX = "fmd:job_fingerprint:"
+JOB_FINGERPRINT_LOCK_PREFIX = "fmd_job_fingerprint:"
+JOB_FINGERPRINT_LOCK_EXPIRE_SECONDS = 60
+# Time a job may wait in the queue. The fingerprint expires after this time plus the job timeout.
+DEFAULT_FINGERPRINT_TTL_SECONDS = 60 * 60 * 24 * 7
+IN_FLIGHT_STATUS_LIST = [JobStatus.QUEUED, JobStatus.STARTED, JobStatus.DEFERRED, JobStatus.SCHEDULED]
+
+
+def create_job_fingerprint(operation, id_list=None, argument_dict=None):
+    """
+    Creates the fingerprint of a job request. The id list is sorted and deduplicated, so the same ids in another
+    order have the same fingerprint.
+
+    :param operation: str - name of the operation, for instance, "scan:APKID".
+    :param id_list: list(str) - object-ids the job works on.
+    :param argument_dict: dict - further arguments that change the result of the job.
+
+    :return: str - sha256 hex digest of the canonical request.
+    """
+    canonical_request = {"operation": operation,
+                         "id_list": sorted({str(object_id) for object_id in id_list or []}),
+                         "arguments": argument_dict or {}}
+    canonical_json = json.dumps(canonical_request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical_json.encode("utf-8")).hexdigest()
+
+
+def get_in_flight_job(connection, fingerprint):
+    """
+    :param connection: redis connection.
+    :param fingerprint: str - fingerprint of the job request.
+
+    :return: class:'Job' or None - the queued or running job with the fingerprint.
+    """
+    job_id = connection.get(f"{JOB_FINGERPRINT_KEY_PREFIX}{fingerprint}")
+    if not job_id:
+        return None
+    try:
+        job = Job.fetch(job_id.decode(), connection=connection)
+    except NoSuchJobError:
+        return None
+    return job if job.get_status() in IN_FLIGHT_STATUS_LIST else None
+
+
+def enqueue_unique(queue, fingerprint, func, *args, **kwargs):
+    """
+    Enqueues a job unless a job with the same fingerprint is queued or running. The check and the enqueue run
+    under a redis lock, so two concurrent submissions do not both enqueue.
+
+    :param queue: class:'Queue' - rq queue to enqueue on.
+    :param fingerprint: str - fingerprint of the job request.
+    :param func: function - the job function.
+    :param args: arguments of the job function.
+    :param kwargs: keyword arguments of queue.enqueue, for instance, job_timeout and meta.
+
+    :return: class:'Job' - the existing or the new job.
+    """
+    connection = queue.connection
+    with redis_lock.Lock(connection, f"{JOB_FINGERPRINT_LOCK_PREFIX}{fingerprint}",
+                         expire=JOB_FINGERPRINT_LOCK_EXPIRE_SECONDS):
+        job = get_in_flight_job(connection, fingerprint)
+        if job:
+            logging.info(f"Coalesced request {fingerprint} into job {job.id}.")
+            return job
+        meta = dict(kwargs.pop("meta", None) or {}, fingerprint=fingerprint)
+        job = queue.enqueue(func, *args, meta=meta, **kwargs)
+        ttl = (kwargs.get("job_timeout") or 0) + DEFAULT_FINGERPRINT_TTL_SECONDS
+        connection.set(f"{JOB_FINGERPRINT_KEY_PREFIX}{fingerprint}", job.id, ex=ttl)
+    return job
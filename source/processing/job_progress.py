@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import logging
+import os
+import threading
+import time
+
+JOB_PROGRESS_KEY_PREFIX = "fmd:job_progress:"
+JOB_PROGRESS_JOB_ID_ENV = "FMD_PROGRESS_JOB_ID"
+JOB_PROGRESS_TTL_SECONDS = 60 * 60 * 24 * 3
+JOB_PROGRESS_FLUSH_INTERVAL_SECONDS = 2.0
+COUNTER_FIELD_LIST = ["items_total", "items_done", "items_failed", "bytes_processed"]
+
+
+def get_progress_key(job_id):
+    return f"{JOB_PROGRESS_KEY_PREFIX}{job_id}"
+
+
+def get_redis_connection():
+    """
+    Creates a redis connection from the first rq queue setting. Used by processes that run outside an rq worker,
+    for instance, the standalone python worker of the scanners.
+
+    :return: redis connection.
+    """
+    from redis import Redis
+    from webserver.settings import RQ_QUEUES
+    queue_setting = list(RQ_QUEUES.values())[0]
+    return Redis(host=queue_setting["HOST"],
+                 port=queue_setting["PORT"],
+                 db=queue_setting["DB"],
+                 password=queue_setting["PASSWORD"])
+
+
+class JobProgress:
+    """
+    Collects the progress of a job and writes it into a redis hash. The counters are summed up in memory and sent
+    with HINCRBY in one pipeline at most every flush interval, so the reporter can be called for every item from
+    several threads without a redis round-trip per item. Errors of redis are logged and never fail the job.
+    """
+
+    def __init__(self, job_id, connection, flush_interval=JOB_PROGRESS_FLUSH_INTERVAL_SECONDS):
+        self.job_id = job_id
+        self.connection = connection
+        self.key = get_progress_key(job_id)
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.counter_dict = dict.fromkeys(COUNTER_FIELD_LIST, 0)
+        self.field_dict = {}
+        self.last_flush_time = 0.0
+
+    def start(self, stage=None, items_total=None):
+        """
+        Sets the start time of the progress. Counters of an earlier run of the same job are kept, so a resumed job
+        continues counting.
+
+        :param stage: str - name of the current stage.
+        :param items_total: int - number of items the job will process.
+        """
+        try:
+            self.connection.hsetnx(self.key, "started_at", time.time())
+        except Exception as err:
+            logging.warning(f"Could not start progress of job {self.job_id}: {err}")
+        if stage:
+            self.set_stage(stage)
+        if items_total:
+            self.add_total(items_total)
+        self.flush()
+
+    def set_stage(self, stage):
+        with self.lock:
+            self.field_dict["stage"] = stage
+        self.flush(force=True)
+
+    def add_total(self, count):
+        self._add("items_total", count)
+
+    def item_done(self, byte_count=0, count=1):
+        self._add("items_done", count, byte_count)
+
+    def item_failed(self, byte_count=0, count=1):
+        self._add("items_failed", count, byte_count)
+
+    def finish(self, status="finished"):
+        with self.lock:
+            self.field_dict["status"] = status
+        self.flush(force=True)
+
+    def _add(self, field_name, count, byte_count=0):
+        with self.lock:
+            self.counter_dict[field_name] += count
+            self.counter_dict["bytes_processed"] += byte_count or 0
+        self.flush()
+
+    def flush(self, force=False):
+        """
+        Sends the collected counters to redis if the flush interval passed.
+
+        :param force: bool - send the counters regardless of the interval.
+        """
+        with self.lock:
+            now = time.time()
+            if not force and now - self.last_flush_time < self.flush_interval:
+                return
+            counter_dict = {name: value for name, value in self.counter_dict.items() if value}
+            field_dict = dict(self.field_dict, updated_at=now)
+            self.counter_dict = dict.fromkeys(COUNTER_FIELD_LIST, 0)
+            self.field_dict = {}
+            self.last_flush_time = now
+        try:
+            pipeline = self.connection.pipeline(transaction=False)
+            for name, value in counter_dict.items():
+                pipeline.hincrby(self.key, name, value)
+            pipeline.hset(self.key, mapping=field_dict)
+            pipeline.expire(self.key, JOB_PROGRESS_TTL_SECONDS)
+            pipeline.execute()
+        except Exception as err:
+            logging.warning(f"Could not write progress of job {self.job_id}: {err}")
+            with self.lock:
+                for name, value in counter_dict.items():
+                    self.counter_dict[name] += value
+                field_dict.pop("updated_at")
+                self.field_dict = dict(field_dict, **self.field_dict)
+
+
+def get_current_rq_job():
+    """
+    :return: class:'Job' or None - the job of the rq worker. The scanner interpreters do not need rq installed.
+    """
+    try:
+        from rq import get_current_job
+    except ImportError:
+        return None
+    return get_current_job()
+
+
+def get_job_progress():
+    """
+    Creates the progress reporter of the current rq job. In processes without rq job, for instance, the standalone
+    python worker, the job-id is taken from the environment.
+
+    :return: class:'JobProgress' or None - None if the process does not run for a job.
+    """
+    job = get_current_rq_job()
+    if job:
+        return JobProgress(job.id, job.connection)
+    job_id = os.environ.get(JOB_PROGRESS_JOB_ID_ENV)
+    if job_id:
+        try:
+            return JobProgress(job_id, get_redis_connection())
+        except Exception as err:
+            logging.warning(f"Could not connect progress of job {job_id}: {err}")
+    return None
+
+
+def get_job_progress_environment():
+    """
+    :return: dict(str, str) - environment of a subprocess that reports into the progress of the current job.
+    """
+    job = get_current_rq_job()
+    job_id = job.id if job else os.environ.get(JOB_PROGRESS_JOB_ID_ENV)
+    if not job_id:
+        return dict(os.environ)
+    return dict(os.environ, **{JOB_PROGRESS_JOB_ID_ENV: job_id})
+
+
+def decode_value(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def parse_job_progress(job_id, raw_dict):
+    """
+    Converts the redis hash of a job into the progress record. The throughput is measured between the start and
+    the last update of the progress.
+
+    :param job_id: str - id of the job.
+    :param raw_dict: dict(bytes, bytes) - content of the redis hash.
+
+    :return: dict or None - the progress or None if the job did not report progress.
+    """
+    if not raw_dict:
+        return None
+    value_dict = {decode_value(key): decode_value(value) for key, value in raw_dict.items()}
+    progress = {"job_id": job_id,
+                "stage": value_dict.get("stage"),
+                "status": value_dict.get("status")}
+    for name in COUNTER_FIELD_LIST:
+        progress[name] = int(value_dict.get(name, 0))
+    started_at = float(value_dict.get("started_at", 0)) or None
+    updated_at = float(value_dict.get("updated_at", 0)) or None
+    elapsed_seconds = (updated_at - started_at) if started_at and updated_at else 0
+    processed_count = progress["items_done"] + progress["items_failed"]
+    progress["started_at"] = started_at
+    progress["updated_at"] = updated_at
+    progress["elapsed_seconds"] = round(elapsed_seconds, 3)
+    progress["items_per_second"] = round(processed_count / elapsed_seconds, 3) if elapsed_seconds > 0 else 0.0
+    progress["bytes_per_second"] = round(progress["bytes_processed"] / elapsed_seconds, 3) \
+        if elapsed_seconds > 0 else 0.0
+    progress["percent"] = round(100 * processed_count / progress["items_total"], 2) \
+        if progress["items_total"] else None
+    return progress
+
+
+def get_job_progress_list(job_id_list, connection):
+    """
+    Reads the progress of many jobs with one pipelined redis round-trip.
+
+    :param job_id_list: list(str) - ids of the jobs.
+    :param connection: redis connection.
+
+    :return: list(dict) - progress of the jobs that reported progress in input order.
+    """
+    pipeline = connection.pipeline(transaction=False)
+    for job_id in job_id_list:
+        pipeline.hgetall(get_progress_key(job_id))
+    progress_list = []
+    for job_id, raw_dict in zip(job_id_list, pipeline.execute()):
+        progress = parse_job_progress(job_id, raw_dict)
+        if progress:
+            progress_list.append(progress)
+    return progress_list
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+LANE_INTERACTIVE = "interactive"
+LANE_NORMAL = "normal"
+LANE_BULK = "bulk"
+LANE_LIST = [LANE_INTERACTIVE, LANE_NORMAL, LANE_BULK]
+# Upper limit of items for the interactive lane and lower limit for the bulk lane per queue class.
+LANE_ITEM_LIMIT_DICT = {
+    "extractor": (5, 500),
+    "scanner": (100, 10000),
+}
+
+
+def get_base_queue_name(queue_name):
+    """
+    :param queue_name: str - name of a queue or a lane of a queue, for instance, "scanner_bulk".
+
+    :return: str - name of the queue class, for instance, "scanner".
+    """
+    for lane in LANE_LIST:
+        if queue_name.endswith(f"_{lane}"):
+            return queue_name[:-len(lane) - 1]
+    return queue_name
+
+
+def get_lane_queue_name(base_queue_name, lane):
+    """
+    :param base_queue_name: str - name of the queue class, for instance, "scanner".
+    :param lane: str - one of LANE_LIST. The normal lane is the queue class itself.
+
+    :return: str - name of the queue of the lane.
+    """
+    if lane == LANE_NORMAL:
+        return base_queue_name
+    return f"{base_queue_name}_{lane}"
+
+
+def get_default_lane(base_queue_name, item_count):
+    """
+    Selects the lane by the size of the job. Small jobs go to the interactive lane, so an analyst does not wait
+    behind a large scan, and large jobs go to the bulk lane.
+
+    :param base_queue_name: str - name of the queue class.
+    :param item_count: int or None - number of items of the job. None if the size is unknown.
+
+    :return: str - one of LANE_LIST.
+    """
+    if item_count is None or base_queue_name not in LANE_ITEM_LIMIT_DICT:
+        return LANE_NORMAL
+    interactive_limit, bulk_limit = LANE_ITEM_LIMIT_DICT[base_queue_name]
+    if item_count <= interactive_limit:
+        return LANE_INTERACTIVE
+    if item_count >= bulk_limit:
+        return LANE_BULK
+    return LANE_NORMAL
+
+
+def resolve_lane_queue_name(queue_name, item_count=None, lane=None, queue_name_list=None):
+    """
+    Gets the queue a job is enqueued on. A queue that is already a lane is used as it is. For a queue class the
+    lane is taken from the argument or selected by the size of the job.
+
+    :param queue_name: str - queue requested by the client.
+    :param item_count: int or None - number of items of the job.
+    :param lane: str or None - lane requested by the client.
+    :param queue_name_list: list(str) - configured queues. Defaults to the keys of RQ_QUEUES.
+
+    :return: str - name of the queue.
+    """
+    if queue_name_list is None:
+        from webserver.settings import RQ_QUEUES
+        queue_name_list = list(RQ_QUEUES.keys())
+    base_queue_name = get_base_queue_name(queue_name)
+    if base_queue_name != queue_name and not lane:
+        return queue_name
+    lane_queue_name = get_lane_queue_name(base_queue_name, lane or get_default_lane(base_queue_name, item_count))
+    return lane_queue_name if lane_queue_name in queue_name_list else queue_name
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import logging
+import math
+import os
+
+MB = 1024 * 1024
+CGROUP_V2_ROOT = "/sys/fs/cgroup"
+CGROUP_V1_MEMORY_ROOT = "/sys/fs/cgroup/memory"
+CGROUP_V1_CPU_ROOT = "/sys/fs/cgroup/cpu"
+PROC_MEMINFO_PATH = "/proc/meminfo"
+
+# Share of the container memory limit the scheduler is allowed to plan with.
+MEMORY_BUDGET_RATIO = float(os.environ.get("SCAN_MEMORY_BUDGET_RATIO", 0.85))
+# Above this share of the memory limit no new task is admitted until pressure drops.
+MEMORY_HIGH_WATERMARK = float(os.environ.get("SCAN_MEMORY_HIGH_WATERMARK", 0.90))
+BACKOFF_MIN_SECONDS = 1
+BACKOFF_MAX_SECONDS = 30
+
+# Resource profiles per scanner module. Memory is estimated as
+# base_memory_mb + apk_size_factor * file_size_bytes and cpu_per_task is the number of cores a task keeps busy.
+# A cpu_per_task below 1 allows more processes than cores for I/O bound scanners. timeout_seconds limits the runtime
+# of a single task (see processing.task_harness).
+DEFAULT_RESOURCE_PROFILE = {"base_memory_mb": 1024, "apk_size_factor": 10, "cpu_per_task": 1}
+SCANNER_RESOURCE_PROFILES = {
+    "static_analysis.APKiD.apkid_wrapper": {"base_memory_mb": 256, "apk_size_factor": 2, "cpu_per_task": 0.5},
+    "static_analysis.APKLeaks.apkleaks_wrapper": {"base_memory_mb": 1536, "apk_size_factor": 15, "cpu_per_task": 1},
+    "static_analysis.APKscan.apkscan_wrapper": {"base_memory_mb": 1536, "apk_size_factor": 15, "cpu_per_task": 1},
+    "static_analysis.AndroGuard.androguard_wrapper": {"base_memory_mb": 1024, "apk_size_factor": 20, "cpu_per_task": 1},
+    "static_analysis.Androwarn.androwarn_wrapper": {"base_memory_mb": 1024, "apk_size_factor": 20, "cpu_per_task": 1},
+    "static_analysis.Exodus.exodus_wrapper": {"base_memory_mb": 512, "apk_size_factor": 5, "cpu_per_task": 1},
+    "static_analysis.FlowDroid.flowdroid_wrapper": {"base_memory_mb": 4096, "apk_size_factor": 40, "cpu_per_task": 2,
+                                                    "timeout_seconds": 60 * 60 * 4},
+    "static_analysis.ManifestParser.android_manifest_parser": {"base_memory_mb": 256, "apk_size_factor": 2,
+                                                               "cpu_per_task": 0.5},
+    "static_analysis.MobSFScan.mobsfscan_wrapper": {"base_memory_mb": 1536, "apk_size_factor": 15, "cpu_per_task": 1},
+    "static_analysis.Qark.qark_wrapper": {"base_memory_mb": 2048, "apk_size_factor": 20, "cpu_per_task": 1,
+                                          "timeout_seconds": 60 * 60 * 2},
+    "static_analysis.QuarkEngine.quark_engine_wrapper": {"base_memory_mb": 3072, "apk_size_factor": 30,
+                                                         "cpu_per_task": 1, "timeout_seconds": 60 * 60 * 2},
+    "static_analysis.SuperAndroidAnalyzer.super_android_analyzer_wrapper": {"base_memory_mb": 2048,
+                                                                            "apk_size_factor": 20,
+                                                                            "cpu_per_task": 1},
+    "static_analysis.Trueseeing.trueseeing_wrapper": {"base_memory_mb": 1024, "apk_size_factor": 10,
+                                                      "cpu_per_task": 1},
+    "external_analysis.VirusTotal.virustotal_wrapper": {"base_memory_mb": 128, "apk_size_factor": 1,
+                                                        "cpu_per_task": 0.25},
+}
+
+
+def get_resource_profile(module_name):
+    """
+    Gets the resource profile of a scanner module.
+
+    :param module_name: str - name of the fmd scanner module.
+
+    :return: dict - resource profile with the keys base_memory_mb, apk_size_factor and cpu_per_task.
+    """
+    profile = dict(DEFAULT_RESOURCE_PROFILE)
+    profile.update(SCANNER_RESOURCE_PROFILES.get(module_name, {}))
+    return profile
+
+
+def read_int_from_file(file_path):
+    """
+    Reads a single integer value from a (cgroup) file.
+
+    :param file_path: str - path of the file to read.
+
+    :return: int or None - the value or None in case the file does not exist or has no numeric value.
+    """
+    try:
+        with open(file_path, "r") as file:
+            value = file.read().strip()
+        return int(value)
+    except (OSError, ValueError):
+        return None
+
+
+def read_meminfo():
+    """
+    Parses /proc/meminfo.
+
+    :return: dict(str, int) - meminfo values in bytes.
+    """
+    meminfo = {}
+    try:
+        with open(PROC_MEMINFO_PATH, "r") as file:
+            for line in file:
+                key, _, value = line.partition(":")
+                parts = value.split()
+                if parts and parts[0].isdigit():
+                    meminfo[key.strip()] = int(parts[0]) * 1024
+    except OSError:
+        pass
+    return meminfo
+
+
+def get_memory_limit_bytes():
+    """
+    Gets the memory limit of the current container. Uses the cgroup v2 or v1 limit and falls back to the
+    host memory in case no limit is set.
+
+    :return: int - memory limit in bytes.
+    """
+    host_memory = read_meminfo().get("MemTotal")
+    limit = read_int_from_file(os.path.join(CGROUP_V2_ROOT, "memory.max"))
+    if limit is None:
+        limit = read_int_from_file(os.path.join(CGROUP_V1_MEMORY_ROOT, "memory.limit_in_bytes"))
+    if host_memory and (limit is None or limit > host_memory):
+        limit = host_memory
+    return limit or 0
+
+
+def get_memory_usage_bytes():
+    """
+    Gets the current memory usage of the container without the reclaimable page cache.
+
+    :return: int - memory usage in bytes.
+    """
+    usage = read_int_from_file(os.path.join(CGROUP_V2_ROOT, "memory.current"))
+    stat_file_path = os.path.join(CGROUP_V2_ROOT, "memory.stat")
+    cache_key = "inactive_file"
+    if usage is None:
+        usage = read_int_from_file(os.path.join(CGROUP_V1_MEMORY_ROOT, "memory.usage_in_bytes"))
+        stat_file_path = os.path.join(CGROUP_V1_MEMORY_ROOT, "memory.stat")
+        cache_key = "total_inactive_file"
+    if usage is None:
+        meminfo = read_meminfo()
+        return max(meminfo.get("MemTotal", 0) - meminfo.get("MemAvailable", 0), 0)
+    try:
+        with open(stat_file_path, "r") as file:
+            for line in file:
+                key, _, value = line.partition(" ")
+                if key == cache_key:
+                    usage -= int(value)
+                    break
+    except (OSError, ValueError):
+        pass
+    return max(usage, 0)
+
+
+def get_available_cpu_count():
+    """
+    Gets the number of cpus this process may use. Respects the cgroup cpu quota and the cpu affinity.
+
+    :return: float - number of usable cpus.
+    """
+    try:
+        cpu_count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpu_count = os.cpu_count() or 1
+    quota = None
+    try:
+        with open(os.path.join(CGROUP_V2_ROOT, "cpu.max"), "r") as file:
+            max_value, period = file.read().split()
+            if max_value != "max":
+                quota = int(max_value) / int(period)
+    except (OSError, ValueError):
+        cfs_quota = read_int_from_file(os.path.join(CGROUP_V1_CPU_ROOT, "cpu.cfs_quota_us"))
+        cfs_period = read_int_from_file(os.path.join(CGROUP_V1_CPU_ROOT, "cpu.cfs_period_us"))
+        if cfs_quota and cfs_quota > 0 and cfs_period:
+            quota = cfs_quota / cfs_period
+    if quota:
+        return min(cpu_count, quota)
+    return cpu_count
+
+
+def estimate_task_memory_bytes(profile, file_size_bytes=0):
+    """
+    Estimates the peak memory of a single scan task.
+
+    :param profile: dict - resource profile of the scanner.
+    :param file_size_bytes: int - size of the apk file.
+
+    :return: int - estimated memory in bytes.
+    """
+    return int(profile["base_memory_mb"] * MB + profile["apk_size_factor"] * (file_size_bytes or 0))
+
+
+def get_max_number_of_processes(profile, number_of_processes=None):
+    """
+    Gets the upper limit of concurrent tasks for a scanner profile.
+
+    :param profile: dict - resource profile of the scanner.
+    :param number_of_processes: int - optional hard limit set by the caller.
+
+    :return: int - max number of concurrent processes.
+    """
+    cpu_limit = max(int(get_available_cpu_count() / profile["cpu_per_task"]), 1)
+    memory_limit = get_memory_limit_bytes()
+    if memory_limit:
+        memory_slots = int(memory_limit * MEMORY_BUDGET_RATIO // estimate_task_memory_bytes(profile))
+        cpu_limit = min(cpu_limit, max(memory_slots, 1))
+    if number_of_processes:
+        cpu_limit = min(cpu_limit, int(number_of_processes))
+    return cpu_limit
+
+
+class AdaptiveTaskScheduler:
+    """
+    Admission control for scan tasks. A task is admitted if its estimated memory fits into the remaining budget and
+    the live memory usage of the container is below the high watermark. One task is always admitted when nothing is
+    running, so that a single oversized task cannot stall the job.
+    """
+
+    def __init__(self, profile, max_workers):
+        self.profile = profile
+        self.max_workers = max_workers
+        self.memory_budget = int(get_memory_limit_bytes() * MEMORY_BUDGET_RATIO)
+        self.reserved_bytes = 0
+        self.running_count = 0
+        self._backoff_seconds = BACKOFF_MIN_SECONDS
+
+    def is_under_pressure(self):
+        memory_limit = get_memory_limit_bytes()
+        if not memory_limit:
+            return False
+        return get_memory_usage_bytes() >= memory_limit * MEMORY_HIGH_WATERMARK
+
+    def can_admit(self, task_bytes):
+        if self.running_count == 0:
+            return True
+        if self.running_count >= self.max_workers:
+            return False
+        if self.memory_budget and self.reserved_bytes + task_bytes > self.memory_budget:
+            return False
+        return not self.is_under_pressure()
+
+    def admit(self, task_bytes):
+        self.reserved_bytes += task_bytes
+        self.running_count += 1
+        self._backoff_seconds = BACKOFF_MIN_SECONDS
+
+    def release(self, task_bytes):
+        self.reserved_bytes = max(self.reserved_bytes - task_bytes, 0)
+        self.running_count = max(self.running_count - 1, 0)
+
+    def next_backoff(self):
+        """
+        Gets the wait time before the next admission attempt. Grows exponentially while no task can be admitted.
+
+        :return: float - seconds to wait.
+        """
+        backoff_seconds = self._backoff_seconds
+        self._backoff_seconds = min(self._backoff_seconds * 2, BACKOFF_MAX_SECONDS)
+        return backoff_seconds
+
+
+def get_task_size_bytes(item):
+    """
+    Gets the input size of a scan task.
+
+    :param item: document or str - AndroidApp document or object-id.
+
+    :return: int - size of the apk in bytes or 0 if unknown.
+    """
+    return getattr(item, "file_size_bytes", 0) or 0
+
+
+def log_scheduler_state(scheduler, pending_count):
+    logging.debug(f"Scheduler: running={scheduler.running_count}/{scheduler.max_workers} "
+                  f"reserved={math.ceil(scheduler.reserved_bytes / MB)}MB "
+                  f"budget={math.ceil(scheduler.memory_budget / MB)}MB pending={pending_count}")
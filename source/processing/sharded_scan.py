@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import importlib
+import logging
+import math
+from rq import get_current_job, Queue, Worker
+from rq.job import Job, Dependency, JobStatus
+from context.context_creator import create_db_context, create_log_context
+from model import AndroidApp
+from processing.resource_scheduler import get_resource_profile, estimate_task_memory_bytes
+from app_metrics.profiler import create_profile_meta, PROFILE_MODE_META_KEY
+
+MAX_SHARD_SIZE = 1000
+SHARDS_PER_WORKER = 4
+COST_QUERY_CHUNK_SIZE = 5000
+SHARD_JOB_TIMEOUT = 60 * 60 * 24 * 7
+FAILED_SHARD_STATUS_LIST = [JobStatus.FAILED, JobStatus.STOPPED, JobStatus.CANCELED]
+
+
+def get_app_cost_list(object_id_list, scanner_module_path):
+    """
+    Estimates the cost of every app from the apk size and the resource profile of the scanner.
+
+    :param object_id_list: list(str) - object-ids of class:'AndroidApp'.
+    :param scanner_module_path: str - module path of the scanner.
+
+    :return: list(tuple(str, int)) - object-id and estimated cost in input order.
+    """
+    profile = get_resource_profile(scanner_module_path)
+    cost_list = []
+    for i in range(0, len(object_id_list), COST_QUERY_CHUNK_SIZE):
+        id_chunk = object_id_list[i:i + COST_QUERY_CHUNK_SIZE]
+        size_dict = {str(document["_id"]): document.get("file_size_bytes", 0)
+                     for document in AndroidApp.objects(pk__in=id_chunk).only("file_size_bytes").as_pymongo()}
+        for object_id in id_chunk:
+            if str(object_id) in size_dict:
+                cost_list.append((str(object_id), estimate_task_memory_bytes(profile, size_dict[str(object_id)])))
+    return cost_list
+
+
+def create_cost_balanced_shards(cost_list, number_of_shards, max_shard_size=MAX_SHARD_SIZE):
+    """
+    Splits the apps into shards with roughly the same total cost. The input order is kept within and across shards.
+
+    :param cost_list: list(tuple(str, int)) - object-id and estimated cost.
+    :param number_of_shards: int - number of shards to aim for.
+    :param max_shard_size: int - maximal number of apps per shard.
+
+    :return: list(list(str)) - shards of object-ids.
+    """
+    if not cost_list:
+        return []
+    total_cost = sum(cost for _, cost in cost_list)
+    target_cost = total_cost / max(number_of_shards, 1)
+    shard_list = []
+    shard = []
+    shard_cost = 0
+    for object_id, cost in cost_list:
+        if shard and (shard_cost + cost > target_cost or len(shard) >= max_shard_size):
+            shard_list.append(shard)
+            shard = []
+            shard_cost = 0
+        shard.append(object_id)
+        shard_cost += cost
+    if shard:
+        shard_list.append(shard)
+    return shard_list
+
+
+def get_number_of_shards(queue, number_of_items):
+    """
+    Gets the number of shards for a scan. Every worker listening on the queue gets several shards so that hosts that
+    finish early can pick up more work.
+
+    :param queue: class:'Queue' - rq queue the shards will be enqueued on.
+    :param number_of_items: int - number of apps to scan.
+
+    :return: int - number of shards.
+    """
+    worker_count = max(Worker.count(queue=queue), 1)
+    return max(worker_count * SHARDS_PER_WORKER, math.ceil(number_of_items / MAX_SHARD_SIZE))
+
+
+def create_scan_job_instance(scanner_module_path, scanner_class_name, object_id_list, init_args=None):
+    scanner_module = importlib.import_module(scanner_module_path)
+    class_obj = getattr(scanner_module, scanner_class_name)
+    if init_args:
+        return class_obj(object_id_list, **init_args)
+    return class_obj(object_id_list)
+
+
+def resolve_incremental_id_list(scanner_module_path,
+                                scanner_class_name,
+                                object_id_list,
+                                init_args=None,
+                                rescan_failed_only=False):
+    """
+    Removes the apps that were already scanned before the list is sharded.
+
+    :return: list(str) - object-ids that need to be scanned.
+    """
+    scan_job = create_scan_job_instance(scanner_module_path, scanner_class_name, object_id_list, init_args)
+    scan_job.set_scan_mode(incremental=True, rescan_failed_only=rescan_failed_only)
+    return scan_job.get_scan_id_list()
+
+
+def enqueue_finalizer(queue, parent_job_id, shard_job_list):
+    dependency = Dependency(jobs=shard_job_list, allow_failure=True)
+    return queue.enqueue(finalize_sharded_scan,
+                         parent_job_id,
+                         depends_on=dependency,
+                         meta={"parent_job_id": parent_job_id})
+
+
+@create_log_context
+@create_db_context
+def start_sharded_scan(module_name,
+                       scanner_module_path,
+                       scanner_class_name,
+                       object_id_list,
+                       init_args=None,
+                       job_timeout=SHARD_JOB_TIMEOUT,
+                       incremental=False,
+                       rescan_failed_only=False):
+    """
+    Parent job of a sharded scan. Splits the object-id list into cost balanced shards, enqueues every shard as own
+    scan job on the queue of the parent and a finalizer job that depends on all shards. The shard job-ids are stored
+    in the meta-data of the parent job.
+
+    :param module_name: str - name of the scanner, for instance, "FLOWDROID".
+    :param scanner_module_path: str - module path of the scanner.
+    :param scanner_class_name: str - class name of the class:'ScanJob' implementation.
+    :param object_id_list: list(str) - object-ids of class:'AndroidApp' to scan.
+    :param init_args: dict - additional arguments to create the scan job instance.
+    :param job_timeout: int - timeout of a single shard in seconds.
+    :param incremental: bool - skip apps that already have a completed report of the same scanner version.
+    :param rescan_failed_only: bool - only scan apps with a failed report.
+
+    :return: list(str) - job-ids of the shards.
+    """
+    parent_job = get_current_job()
+    if incremental or rescan_failed_only:
+        object_id_list = resolve_incremental_id_list(scanner_module_path,
+                                                     scanner_class_name,
+                                                     object_id_list,
+                                                     init_args,
+                                                     rescan_failed_only)
+    queue = Queue(parent_job.origin, connection=parent_job.connection)
+    cost_list = get_app_cost_list(object_id_list, scanner_module_path)
+    shard_list = create_cost_balanced_shards(cost_list, get_number_of_shards(queue, len(cost_list)))
+    logging.info(f"Sharded scan {parent_job.id}: {len(cost_list)} apps in {len(shard_list)} shards.")
+
+    shard_job_list = []
+    for shard_index, shard in enumerate(shard_list):
+        scan_job = create_scan_job_instance(scanner_module_path, scanner_class_name, shard, init_args)
+        shard_job = queue.enqueue(scan_job.start_scan,
+                                  job_timeout=job_timeout,
+                                  meta=create_profile_meta(parent_job.meta.get(PROFILE_MODE_META_KEY),
+                                                           module_name=module_name,
+                                                           parent_job_id=parent_job.id,
+                                                           shard_index=shard_index,
+                                                           item_count=len(shard)))
+        shard_job_list.append(shard_job)
+
+    shard_job_id_list = [shard_job.id for shard_job in shard_job_list]
+    parent_job.meta.update({"sharded_scan": True,
+                            "module_name": module_name,
+                            "item_count": len(cost_list),
+                            "shard_count": len(shard_job_list),
+                            "shard_job_id_list": shard_job_id_list,
+                            "status": "running"})
+    parent_job.save_meta()
+    if shard_job_list:
+        enqueue_finalizer(queue, parent_job.id, shard_job_list)
+    return shard_job_id_list
+
+
+def get_sharded_scan_summary(parent_job_id, connection):
+    """
+    Aggregates the status of all shards of a sharded scan.
+
+    :param parent_job_id: str - job-id of the parent job.
+    :param connection: redis connection.
+
+    :return: dict - shard and item counts per status.
+    """
+    parent_job = Job.fetch(parent_job_id, connection=connection)
+    shard_job_id_list = parent_job.meta.get("shard_job_id_list", [])
+    summary = {"parent_job_id": parent_job_id,
+               "module_name": parent_job.meta.get("module_name"),
+               "shard_count": len(shard_job_id_list),
+               "item_count": parent_job.meta.get("item_count", 0),
+               "finished_shard_count": 0,
+               "failed_shard_count": 0,
+               "pending_shard_count": 0,
+               "finished_item_count": 0,
+               "failed_shard_job_id_list": []}
+    for shard_job in Job.fetch_many(shard_job_id_list, connection=connection):
+        if shard_job is None:
+            continue
+        status = shard_job.get_status()
+        if status == JobStatus.FINISHED:
+            summary["finished_shard_count"] += 1
+            summary["finished_item_count"] += shard_job.meta.get("item_count", 0)
+        elif status in FAILED_SHARD_STATUS_LIST:
+            summary["failed_shard_count"] += 1
+            summary["failed_shard_job_id_list"].append(shard_job.id)
+        else:
+            summary["pending_shard_count"] += 1
+    if summary["pending_shard_count"] > 0:
+        summary["status"] = "running"
+    elif summary["failed_shard_count"] > 0:
+        summary["status"] = "failed"
+    else:
+        summary["status"] = "finished"
+    return summary
+
+
+def finalize_sharded_scan(parent_job_id):
+    """
+    Runs after all shards of a sharded scan ended and stores the aggregated result on the parent job.
+
+    :param parent_job_id: str - job-id of the parent job.
+
+    :return: dict - the aggregated summary.
+    """
+    current_job = get_current_job()
+    summary = get_sharded_scan_summary(parent_job_id, current_job.connection)
+    parent_job = Job.fetch(parent_job_id, connection=current_job.connection)
+    parent_job.meta.update({"status": summary["status"],
+                            "finished_shard_count": summary["finished_shard_count"],
+                            "failed_shard_count": summary["failed_shard_count"]})
+    parent_job.save_meta()
+    logging.info(f"Sharded scan {parent_job_id} ended with status {summary['status']}.")
+    return summary
+
+
+def requeue_shard_job(shard_job, queue):
+    """
+    Enqueues an ended shard again. Only failed jobs can be requeued from the failed job registry, so stopped and
+    canceled shards are removed from their registries and enqueued on the queue.
+
+    :param shard_job: class:'Job' - failed, stopped or canceled shard.
+    :param queue: class:'Queue' - rq queue of the sharded scan.
+    """
+    if shard_job.get_status() == JobStatus.FAILED:
+        shard_job.requeue()
+    else:
+        queue.failed_job_registry.remove(shard_job)
+        queue.canceled_job_registry.remove(shard_job)
+        queue.enqueue_job(shard_job)
+
+
+def retry_failed_shards(parent_job_id, queue):
+    """
+    Requeues the failed, stopped and canceled shards of a sharded scan. Finished shards are not touched.
+
+    :param parent_job_id: str - job-id of the parent job.
+    :param queue: class:'Queue' - rq queue of the sharded scan.
+
+    :return: list(str) - job-ids of the requeued shards.
+    """
+    summary = get_sharded_scan_summary(parent_job_id, queue.connection)
+    requeued_job_list = []
+    for shard_job_id in summary["failed_shard_job_id_list"]:
+        shard_job = Job.fetch(shard_job_id, connection=queue.connection)
+        requeue_shard_job(shard_job, queue)
+        requeued_job_list.append(shard_job)
+    if requeued_job_list:
+        parent_job = Job.fetch(parent_job_id, connection=queue.connection)
+        parent_job.meta["status"] = "running"
+        parent_job.save_meta()
+        enqueue_finalizer(queue, parent_job_id, requeued_job_list)
+    return [shard_job.id for shard_job in requeued_job_list]
@@ -1,11 +1,11 @@
 # -*- coding: utf-8 -*-
 # This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
 # See the file 'LICENSE' for copying permission.
+import collections
 import logging
 import sys
 import concurrent.futures
 sys.path.append("/var/www/source/")
-from database.query_document import fetch_document_by_id_list
 from model import AndroidApp
 import importlib
 import os
@@ -16,10 +16,19 @@ import threading
 import time
 from threading import Thread
 from context.context_creator import create_app_context, setup_logging
+from database.query_document import iter_documents_by_ids
+from processing.resource_scheduler import get_resource_profile, get_max_number_of_processes, \
+    AdaptiveTaskScheduler, estimate_task_memory_bytes, get_task_size_bytes, log_scheduler_state
+from processing.task_harness import run_scan_task, get_task_timeout
+from processing.job_progress import get_job_progress, get_job_progress_environment
+from app_metrics.profiler import get_profile_environment
+from processing.work_manifest import create_work_manifest, read_work_manifest, remove_work_manifest, \
+    DEFAULT_PREFETCH_SIZE
 import multiprocessing
 from logging.handlers import QueueHandler, QueueListener
 
 MAX_PROCESS_TIME = 60 * 60 * 24
+TASK_PROJECTION_FIELDS = ["id", "file_size_bytes"]
 
 
 def create_multi_threading_queue(document_list):
@@ -62,21 +71,23 @@ def start_threads(item_list, target_function, number_of_threads):
 
 def start_python_interpreter(item_list,
                              worker_function,
-                             number_of_processes=os.cpu_count(),
+                             number_of_processes=None,
                              use_id_list=True,
                              module_name=None,
                              interpreter_path=None,
                              worker_args_list=None):
     """
     Starts this script file in a new process with the given python interpreter. Executes the main function of this
-    file and passes the given arguments to the new process.
+    file and passes the given arguments to the new process. The object-ids are handed over in a work manifest file
+    that the new process streams and removes when it is done.
 
     :param worker_args_list: list - list of arguments to pass to the worker function.
     :param module_name: str - Name of the fmd module to use.
     :param interpreter_path: string - Path to the python interpreter used for spawning the processes.
     :param use_id_list: boolean - if true: list of object-ids instead of object instances is used to create a queue
     for processing. Set to false in case you provide an instance list of documents that have an id attribute.
-    :param number_of_processes: int - number of processes to start.
+    :param number_of_processes: int - upper limit of processes to start. If not set, the limit is derived from the
+    resource profile of the module and the cgroup limits.
     :param worker_function: function - which will be executed by the pool of worker processes.
     :param item_list: list(documents or str) - list of object instances or list of object-id (strings) to process.
 
@@ -85,22 +96,26 @@ def start_python_interpreter(item_list,
         worker_args_list = []
     worker_args_list = [str(x) for x in (worker_args_list or [])]
 
-    serialized_list_str = ",".join(map(str, item_list))
+    manifest_path = create_work_manifest(item_list)
+    progress = get_job_progress()
+    if progress:
+        progress.start(stage=f"scan:{module_name}", items_total=len(item_list))
     current_file = os.path.abspath(__file__)
 
     logging.debug(f"Worker args list: {worker_args_list}")
     # Starting the python interpreter with the given script and arguments
     command = [interpreter_path,
                current_file,
-               serialized_list_str,
+               manifest_path,
                worker_function.__name__,
-               str(number_of_processes),
+               str(number_of_processes or 0),
                str(use_id_list),
                module_name,
                *worker_args_list
                ]
     process = subprocess.Popen(command,
                                cwd="/var/www/source/",
+                               env=get_profile_environment(get_job_progress_environment()),
                                stdout=subprocess.PIPE,
                                stderr=subprocess.PIPE,
                                text=True,
@@ -191,6 +206,147 @@ def start_mp_process_pool_executor(item_list,
     return result_list
 
 
+def iter_manifest_documents(manifest_path,
+                            document_class,
+                            only_fields=None,
+                            prefetch_size=DEFAULT_PREFETCH_SIZE):
+    """
+    Streams the documents of a work manifest. Every chunk of object-ids is loaded with one $in query that only
+    fetches the given fields. The worker function loads the full document when it starts the task.
+
+    :param manifest_path: str - path of the manifest file.
+    :param document_class: document - type of the documents to load.
+    :param only_fields: list(str) - fields to load.
+    :param prefetch_size: int - number of documents loaded per query.
+
+    :return: generator(document) - documents in manifest order.
+    """
+    for id_chunk in read_work_manifest(manifest_path, prefetch_size):
+        yield from iter_documents_by_ids(id_chunk, document_class, only_fields=only_fields, batch_size=prefetch_size)
+
+
+def start_adaptive_process_pool_executor(item_list,
+                                         worker_function,
+                                         module_name,
+                                         number_of_processes=None,
+                                         create_id_list=True,
+                                         worker_args_list=None,
+                                         scanner_name=None):
+    """
+    Processes the items with a process pool that admits tasks based on the resource profile of the scanner module
+    and the live memory usage of the container. Tasks are sized by the apk size (file_size_bytes) and new tasks are
+    held back while the memory usage is above the high watermark. Every task runs in the task harness that
+    enforces the scanner timeout and stores the task metrics on the report.
+
+    :param item_list: iterable(object) - items to work on. Consumed lazily with a small prefetch window.
+    :param worker_function: function - which will be executed by the pool.
+    :param module_name: str - name of the fmd module used to select the resource profile.
+    :param number_of_processes: int - optional upper limit of processes.
+    :param create_id_list: boolean - if true, the object-id of the item is passed to the worker function.
+    :param worker_args_list: list - list of arguments to pass to the worker function.
+    :param scanner_name: str - scanner name of the reports created by the worker function.
+
+    :return: list - list of task metrics.
+    """
+    profile = get_resource_profile(module_name)
+    task_timeout = get_task_timeout(profile, module_name)
+    max_workers = get_max_number_of_processes(profile, number_of_processes)
+    scheduler = AdaptiveTaskScheduler(profile, max_workers)
+    item_iterator = iter(item_list)
+    pending_tasks = collections.deque()
+    result_list = []
+    progress = get_job_progress()
+
+    def refill_pending_tasks():
+        while len(pending_tasks) < max_workers * 2:
+            item = next(item_iterator, None)
+            if item is None:
+                break
+            pending_tasks.append(item)
+
+    log_queue = multiprocessing.Queue(-1)
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(processName)s/%(process)d - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+
+    logging.info(f"Starting adaptive pool with up to {max_workers} processes for function {worker_function} "
+                 f"with profile {profile}")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers,
+                                                initializer=worker_init,
+                                                initargs=(log_queue,)) as executor:
+        running_futures = {}
+        refill_pending_tasks()
+        while pending_tasks or running_futures:
+            while pending_tasks:
+                item = pending_tasks[0]
+                input_size_bytes = get_task_size_bytes(item)
+                task_bytes = estimate_task_memory_bytes(profile, input_size_bytes)
+                if not scheduler.can_admit(task_bytes):
+                    break
+                pending_tasks.popleft()
+                task = item.id if create_id_list else item
+                scheduler.admit(task_bytes)
+                future = executor.submit(run_scan_task,
+                                         worker_function,
+                                         task,
+                                         worker_args_list,
+                                         task_timeout,
+                                         scanner_name,
+                                         input_size_bytes)
+                running_futures[future] = (task_bytes, input_size_bytes)
+                refill_pending_tasks()
+            log_scheduler_state(scheduler, len(pending_tasks))
+            timeout = scheduler.next_backoff() if pending_tasks else None
+            done, _ = concurrent.futures.wait(running_futures,
+                                              timeout=timeout,
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                task_bytes, input_size_bytes = running_futures.pop(future)
+                scheduler.release(task_bytes)
+                try:
+                    metrics = future.result()
+                    result_list.append(metrics)
+                    report_task_progress(progress, metrics)
+                except Exception as err:
+                    logging.error(f"Worker task failed: {err}")
+                    if progress:
+                        progress.item_failed(input_size_bytes)
+
+    if progress:
+        progress.flush(force=True)
+    listener.stop()
+    return result_list
+
+
+def report_task_progress(progress, metrics):
+    """
+    Counts a finished scan task. Tasks that timed out or exited with an error count as failed.
+
+    :param progress: class:'JobProgress' or None - progress of the scan job.
+    :param metrics: dict - task metrics of the task harness.
+    """
+    if not progress:
+        return
+    if metrics.get("timed_out") or metrics.get("exit_code"):
+        progress.item_failed(metrics.get("input_size_bytes", 0))
+    else:
+        progress.item_done(metrics.get("input_size_bytes", 0))
+
+
+def get_scanner_name(scanner_module, module_name):
+    """
+    Gets the scanner name of the class:'ScanJob' implementation of a scanner module.
+
+    :return: str or None - scanner name as stored in the reports.
+    """
+    for attribute in vars(scanner_module).values():
+        if isinstance(attribute, type) and getattr(attribute, "MODULE_NAME", None) == module_name:
+            return getattr(attribute, "SCANNER_NAME", None)
+    return None
+
+
 def multiprocess_initializer():
     create_app_context()
     setup_logging()
@@ -205,32 +361,38 @@ def main():
     setup_logging()
     create_app_context()
     logging.debug(f"Starting standalone python worker - PID: {pid}")
-    id_list = sys.argv[1].split(",")
-    if len(id_list) <= 0:
+    manifest_path = sys.argv[1]
+    if not os.path.isfile(manifest_path):
+        logging.error(f"Work manifest does not exist: {manifest_path}")
         sys.exit(-1)
     module_name = sys.argv[5]
-    item_list = fetch_document_by_id_list(id_list, AndroidApp)
-    if len(item_list) <= 0:
-        logging.info("No items to process. Exiting.")
-        sys.exit(0)
-
     worker_function_name = sys.argv[2]
     scanner_module = importlib.import_module(module_name)
     worker_function = getattr(scanner_module, worker_function_name)
-    number_of_processes = int(sys.argv[3])
-    use_id_list = bool(sys.argv[4])
+    number_of_processes = int(sys.argv[3]) or None
+    use_id_list = sys.argv[4] == "True"
     logging.debug(f"Standalone worker - Using module: {module_name}, "
                  f"function: {worker_function_name}, "
                  f"number of processes: {number_of_processes}, "
                  f"use_id_list: {use_id_list}, "
-                 f", items to process: {len(item_list)}, "
+                 f"work manifest: {manifest_path}, "
                  f"arguments: {sys.argv}, ")
     if len(sys.argv) >= 7:
         worker_args_list = sys.argv[6:]
         logging.debug(f"Standalone worker - Using arguments: {worker_args_list}")
     else:
         worker_args_list = []
-    start_mp_process_pool_executor(item_list, worker_function, number_of_processes, use_id_list, worker_args_list)
+    try:
+        item_iterator = iter_manifest_documents(manifest_path, AndroidApp, only_fields=TASK_PROJECTION_FIELDS)
+        start_adaptive_process_pool_executor(item_iterator,
+                                             worker_function,
+                                             module_name,
+                                             number_of_processes,
+                                             use_id_list,
+                                             worker_args_list,
+                                             get_scanner_name(scanner_module, module_name))
+    finally:
+        remove_work_manifest(manifest_path)
 
 
 if __name__ == "__main__":
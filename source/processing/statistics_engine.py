@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import json
+import logging
+from context.context_creator import create_db_context, create_log_context
+from model import (ApkidReport, AndroGuardReport, AppCertificate, ExodusReport, AndroidFirmware, JsonFile,
+                   QuarkEngineReport, AndroGuardStatisticsReport, AppCertificateStatisticsReport,
+                   ExodusStatisticsReport, FirmwareStatisticsReport, QuarkEngineStatisticsReport)
+from model.ApkidStatisticsReport import ApkidStatisticsReport, ATTRIBUTE_MAP as APKID_ATTRIBUTE_MAP
+from model.AndroGuardStatisticsReport import (ATTRIBUTE_MAP_ATOMIC as ANDROGUARD_ATTRIBUTE_MAP_ATOMIC,
+                                              ATTRIBUTE_MAP_LIST as ANDROGUARD_ATTRIBUTE_MAP_LIST,
+                                              ATTRIBUTE_MAP_BOOLEAN as ANDROGUARD_ATTRIBUTE_MAP_BOOLEAN)
+from model.AppCertificateStatisticsReport import ATTRIBUTE_MAP_ATOMIC as CERTIFICATE_ATTRIBUTE_MAP_ATOMIC
+from model.FirmwareStatisticsReport import ATTRIBUTE_MAP_ATOMIC as FIRMWARE_ATTRIBUTE_MAP_ATOMIC
+from processing.statistics_pipeline import (create_value_count_pipeline, create_size_expression, create_count_facet,
+                                            create_sum_facet, create_max_facet, create_group_facet,
+                                            create_bucket_facet, create_facet_stage, add_value_count,
+                                            parse_facet_result, merge_count_dicts, merge_facet_results,
+                                            FACET_RESULT_COUNT, FACET_RESULT_VALUE_COUNTS)
+from utils.file_utils.file_util import object_to_temporary_json_file
+
+AGGREGATION_BATCH_SIZE = 10000
+MAX_INLINE_DICT_SIZE = 10000
+COMPLETED_SCAN_FILTER = {"scan_status": "completed"}
+PERMISSION_COUNT_BOUNDARY_LIST = [0, 1, 5, 10, 20, 50, 100, 200, 500]
+REPORT_COUNT_FACET = "report_count"
+LAST_OBJECT_ID_FACET = "last_source_object_id"
+ANDROID_APP_COUNT_FACET = "android_app_count"
+CERTIFICATE_LIST_FIELDS = {"ocsp_urls_list"}
+
+
+def get_atomic_value_counts(attribute_map):
+    """
+    :param attribute_map: dict(str, str) - source field mapped to the count dict field of the report.
+
+    :return: dict(str, tuple(str, list(str))) - value count definitions for scalar fields.
+    """
+    return {count_field: (source_field, []) for source_field, count_field in attribute_map.items()}
+
+
+def get_list_value_counts(attribute_map):
+    """
+    :param attribute_map: dict(str, str) - source array field mapped to the count dict field of the report.
+
+    :return: dict(str, tuple(str, list(str))) - value count definitions that unwind the array fields.
+    """
+    return {count_field: (source_field, [source_field]) for source_field, count_field in attribute_map.items()}
+
+
+def get_certificate_value_counts():
+    value_count_dict = {}
+    for source_field, count_field in CERTIFICATE_ATTRIBUTE_MAP_ATOMIC.items():
+        unwind_path_list = [source_field] if source_field in CERTIFICATE_LIST_FIELDS else []
+        value_count_dict[count_field] = (source_field, unwind_path_list)
+    return value_count_dict
+
+
+def get_androguard_facets():
+    facet_dict = {"number_of_permissions_per_app_dict":
+                  create_bucket_facet(create_size_expression("permissions"), PERMISSION_COUNT_BOUNDARY_LIST)}
+    for source_field, target_field in ANDROGUARD_ATTRIBUTE_MAP_BOOLEAN.items():
+        facet_dict[target_field] = create_group_facet({"$gt": [create_size_expression(source_field), 0]})
+    return facet_dict
+
+
+STATISTICS_DEFINITION_DICT = {
+    "ApkidStatisticsReport": {
+        "report_class": ApkidStatisticsReport,
+        "source_class": ApkidReport,
+        "source_filter": COMPLETED_SCAN_FILTER,
+        "app_field": "android_app_id_reference",
+        "value_counts": {count_field: (f"results.files.matches.{source_field}",
+                                       ["results.files", f"results.files.matches.{source_field}"])
+                         for source_field, count_field in APKID_ATTRIBUTE_MAP.items()},
+        "facets": {},
+    },
+    "AndroGuardStatisticsReport": {
+        "report_class": AndroGuardStatisticsReport,
+        "source_class": AndroGuardReport,
+        "source_filter": COMPLETED_SCAN_FILTER,
+        "app_field": "android_app_id_reference",
+        "value_counts": {**get_atomic_value_counts(ANDROGUARD_ATTRIBUTE_MAP_ATOMIC),
+                         **get_list_value_counts(ANDROGUARD_ATTRIBUTE_MAP_LIST)},
+        "facets": get_androguard_facets(),
+    },
+    "AppCertificateStatisticsReport": {
+        "report_class": AppCertificateStatisticsReport,
+        "source_class": AppCertificate,
+        "source_filter": {},
+        "app_field": "android_app_id_reference",
+        "value_counts": get_certificate_value_counts(),
+        "facets": {},
+    },
+    "ExodusStatisticsReport": {
+        "report_class": ExodusStatisticsReport,
+        "source_class": ExodusReport,
+        "source_filter": COMPLETED_SCAN_FILTER,
+        "app_field": "android_app_id_reference",
+        "value_counts": {"tracker_count_dict": ("results.trackers.name", ["results.trackers"])},
+        "facets": {
+            "number_of_apps_with_trackers": {
+                "pipeline": [{"$match": {"results.trackers.0": {"$exists": True}}}, {"$count": "value"}],
+                "result": FACET_RESULT_COUNT},
+            "number_of_apps_with_no_trackers": {
+                "pipeline": [{"$match": {"results.trackers.0": {"$exists": False}}}, {"$count": "value"}],
+                "result": FACET_RESULT_COUNT},
+        },
+    },
+    "QuarkEngineStatisticsReport": {
+        "report_class": QuarkEngineStatisticsReport,
+        "source_class": QuarkEngineReport,
+        "source_filter": COMPLETED_SCAN_FILTER,
+        "app_field": "android_app_id_reference",
+        "value_counts": {"threat_level_count_dict": ("results.malware.threat_level", [])},
+        "facets": {},
+    },
+    "FirmwareStatisticsReport": {
+        "report_class": FirmwareStatisticsReport,
+        "source_class": AndroidFirmware,
+        "source_filter": {},
+        "app_field": None,
+        "value_counts": get_atomic_value_counts(FIRMWARE_ATTRIBUTE_MAP_ATOMIC),
+        "facets": {
+            "number_of_firmware_samples": create_count_facet(),
+            "total_firmware_byte_size": create_sum_facet("$file_size_bytes"),
+            ANDROID_APP_COUNT_FACET: create_sum_facet(create_size_expression("android_app_id_list")),
+        },
+    },
+}
+
+
+def get_source_queryset(definition, last_source_object_id=None):
+    """
+    Gets the source documents of a report. For incremental runs only documents created after the last run are
+    selected. The object-id contains the creation time, so the _id index is used instead of a date field.
+
+    :param definition: dict - statistics definition.
+    :param last_source_object_id: ObjectId - last source document of the previous run.
+
+    :return: queryset of the source documents.
+    """
+    queryset = definition["source_class"].objects(**definition["source_filter"])
+    if last_source_object_id:
+        queryset = queryset.filter(pk__gt=last_source_object_id)
+    return queryset
+
+
+def aggregate(queryset, pipeline):
+    """
+    Runs an aggregation on the documents of the queryset. Stages that exceed the memory limit of the server spill
+    to disk and the result is streamed with a cursor, so the output is not limited to one document.
+
+    :return: cursor of the result documents.
+    """
+    return queryset.aggregate(pipeline, allowDiskUse=True, batchSize=AGGREGATION_BATCH_SIZE)
+
+
+def aggregate_value_counts(queryset, field_path, unwind_path_list):
+    """
+    Counts the values of a field with a $group pipeline.
+
+    :return: dict(str, int) - count by value.
+    """
+    count_dict = {}
+    for group_result in aggregate(queryset, create_value_count_pipeline(field_path, unwind_path_list)):
+        add_value_count(count_dict, group_result["_id"], group_result["count"])
+    return count_dict
+
+
+def aggregate_facets(queryset, facet_dict):
+    """
+    Runs all small summary statistics of a report in a single $facet stage, so the documents are scanned once.
+
+    :param facet_dict: dict(str, dict) - facet definitions by name.
+
+    :return: dict(str, object) - parsed facet results.
+    """
+    facet_dict = {**facet_dict,
+                  REPORT_COUNT_FACET: create_count_facet(),
+                  LAST_OBJECT_ID_FACET: create_max_facet("$_id")}
+    facet_result_list = list(aggregate(queryset, [create_facet_stage(facet_dict)]))
+    return parse_facet_result(facet_dict, facet_result_list[0] if facet_result_list else {})
+
+
+def aggregate_app_id_set(queryset, app_field):
+    """
+    Gets the distinct app references of the source documents.
+
+    :return: set(str) - object-ids of class:'AndroidApp'.
+    """
+    pipeline = [{"$group": {"_id": f"${app_field}"}}]
+    return {str(group_result["_id"]) for group_result in aggregate(queryset, pipeline)
+            if group_result["_id"] is not None}
+
+
+def read_json_file(json_file_reference):
+    """
+    :param json_file_reference: LazyReference or str - reference to a class:'JsonFile'.
+
+    :return: object - parsed json content.
+    """
+    object_id = getattr(json_file_reference, "pk", json_file_reference)
+    json_file = JsonFile.objects.get(pk=object_id)
+    return json.loads(json_file.file.read())
+
+
+def create_json_file(obj):
+    """
+    :param obj: object - json serializable object.
+
+    :return: class:'JsonFile'
+    """
+    json_tmp_file = object_to_temporary_json_file(obj)
+    return JsonFile(file=json_tmp_file.read()).save()
+
+
+def load_count_dict(report, field_name):
+    """
+    Gets a count dict of a report. Spilled dicts are loaded from their class:'JsonFile'.
+
+    :param report: class:'StatisticsReport'
+    :param field_name: str - name of the count dict field.
+
+    :return: dict(str, int)
+    """
+    spill_reference_dict = report.spill_reference_dict or {}
+    if field_name in spill_reference_dict:
+        return read_json_file(spill_reference_dict[field_name])
+    return getattr(report, field_name, None) or {}
+
+
+def store_count_dict(report, field_name, count_dict):
+    """
+    Sets a count dict on a report. Dicts with more than MAX_INLINE_DICT_SIZE keys would bring the report close to
+    the document size limit. They are written to a class:'JsonFile' and only the MAX_INLINE_DICT_SIZE most frequent
+    values are kept on the report.
+
+    :param report: class:'StatisticsReport'
+    :param field_name: str - name of the count dict field.
+    :param count_dict: dict(str, int)
+    """
+    if len(count_dict) > MAX_INLINE_DICT_SIZE:
+        json_file = create_json_file(count_dict)
+        report.spill_reference_dict[field_name] = str(json_file.id)
+        top_value_list = sorted(count_dict.items(), key=lambda item: item[1], reverse=True)[:MAX_INLINE_DICT_SIZE]
+        count_dict = dict(top_value_list)
+        logging.info(f"Spilled {field_name} of {report.report_name} to json file {json_file.id}.")
+    setattr(report, field_name, count_dict)
+
+
+def get_previous_report(definition):
+    """
+    :return: class:'StatisticsReport' - the last report with a refresh marker or None.
+    """
+    return definition["report_class"].objects(last_source_object_id__exists=True) \
+        .order_by("-last_source_object_id").first()
+
+
+def get_previous_facet_results(previous_report, facet_dict):
+    """
+    Gets the facet results stored on the previous report.
+
+    :return: dict(str, object) - facet results by name.
+    """
+    result_dict = {}
+    for name, facet in facet_dict.items():
+        if name == ANDROID_APP_COUNT_FACET:
+            result_dict[name] = previous_report.android_app_count
+        elif facet["result"] == FACET_RESULT_VALUE_COUNTS:
+            result_dict[name] = load_count_dict(previous_report, name)
+        else:
+            result_dict[name] = getattr(previous_report, name, None)
+    return result_dict
+
+
+def create_statistics_report(report_name, incremental=True):
+    """
+    Computes a statistics report with aggregation pipelines. Incremental runs only aggregate the source documents
+    created since the last report and add the counts of the last report.
+
+    :param report_name: str - key of STATISTICS_DEFINITION_DICT, for instance, "ExodusStatisticsReport".
+    :param incremental: bool - merge with the last report instead of aggregating all documents.
+
+    :return: class:'StatisticsReport' - the new report or None if there is no new source document.
+    """
+    definition = STATISTICS_DEFINITION_DICT[report_name]
+    previous_report = get_previous_report(definition) if incremental else None
+    last_source_object_id = previous_report.last_source_object_id if previous_report else None
+    queryset = get_source_queryset(definition, last_source_object_id)
+
+    facet_result_dict = aggregate_facets(queryset, definition["facets"])
+    if facet_result_dict[REPORT_COUNT_FACET] == 0:
+        logging.info(f"{report_name}: no new source documents since {last_source_object_id}.")
+        return None
+    report = definition["report_class"](report_name=report_name, spill_reference_dict={})
+    report.last_source_object_id = facet_result_dict.pop(LAST_OBJECT_ID_FACET)
+    report.report_count = facet_result_dict.pop(REPORT_COUNT_FACET)
+    if previous_report:
+        report.report_count += previous_report.report_count
+        facet_result_dict = merge_facet_results(definition["facets"],
+                                                get_previous_facet_results(previous_report, definition["facets"]),
+                                                facet_result_dict)
+    for name, value in facet_result_dict.items():
+        if isinstance(value, dict):
+            store_count_dict(report, name, value)
+        else:
+            setattr(report, name, value)
+
+    for count_field, (field_path, unwind_path_list) in definition["value_counts"].items():
+        count_dict = aggregate_value_counts(queryset, field_path, unwind_path_list)
+        if previous_report:
+            count_dict = merge_count_dicts(load_count_dict(previous_report, count_field), count_dict)
+        store_count_dict(report, count_field, count_dict)
+
+    app_field = definition["app_field"]
+    if app_field:
+        app_id_set = aggregate_app_id_set(queryset, app_field)
+        if previous_report and previous_report.android_app_reference_file:
+            app_id_set.update(read_json_file(previous_report.android_app_reference_file))
+        report.android_app_reference_file = create_json_file(sorted(app_id_set))
+        report.android_app_count = len(app_id_set)
+    set_derived_fields(report)
+    report.save()
+    logging.info(f"{report_name}: aggregated {report.report_count} documents "
+                 f"({'incremental' if previous_report else 'full'} refresh).")
+    return report
+
+
+def set_derived_fields(report):
+    """
+    Sets the fields that are derived from other fields of the report and can't be merged incrementally.
+
+    :param report: class:'StatisticsReport'
+    """
+    if isinstance(report, AppCertificateStatisticsReport):
+        report.certificate_count = report.report_count
+    elif isinstance(report, AndroGuardStatisticsReport):
+        report.unique_packagename_count = len(load_count_dict(report, "packagename_count_dict"))
+
+
+@create_log_context
+@create_db_context
+def start_statistics_aggregation(report_name_list, incremental=True):
+    """
+    Computes the given statistics reports.
+
+    :param report_name_list: list(str) - keys of STATISTICS_DEFINITION_DICT.
+    :param incremental: bool - only aggregate source documents created since the last report.
+
+    :return: list(str) - object-ids of the created reports.
+    """
+    report_id_list = []
+    for report_name in report_name_list:
+        try:
+            report = create_statistics_report(report_name, incremental)
+            if report:
+                report_id_list.append(str(report.id))
+        except Exception as err:
+            logging.error(f"Could not create {report_name}: {err}")
+    return report_id_list
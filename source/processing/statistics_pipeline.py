@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+from database.mongodb_key_replacer import filter_mongodb_key
+
+FACET_RESULT_COUNT = "count"
+FACET_RESULT_SUM = "sum"
+FACET_RESULT_VALUE_COUNTS = "value_counts"
+FACET_RESULT_MAX = "max"
+BUCKET_DEFAULT_KEY = "other"
+
+
+def create_value_count_pipeline(field_path, unwind_path_list=None):
+    """
+    Creates a pipeline that counts the occurrences of every value of a field. Array fields on the path have to be
+    unwound first, for instance, ["results.trackers"] to count "results.trackers.name".
+
+    :param field_path: str - dotted path of the field to count.
+    :param unwind_path_list: list(str) - dotted paths of the arrays to unwind in order.
+
+    :return: list(dict) - aggregation stages.
+    """
+    pipeline = [{"$unwind": f"${unwind_path}"} for unwind_path in unwind_path_list or []]
+    pipeline.append({"$group": {"_id": f"${field_path}", "count": {"$sum": 1}}})
+    return pipeline
+
+
+def create_size_expression(field_path):
+    """
+    Creates an expression for the length of an array field. Missing fields have the length 0.
+
+    :param field_path: str - dotted path of the array field.
+
+    :return: dict - aggregation expression.
+    """
+    return {"$size": {"$ifNull": [f"${field_path}", []]}}
+
+
+def create_count_facet():
+    """
+    :return: dict - facet definition that counts the documents.
+    """
+    return {"pipeline": [{"$count": "value"}], "result": FACET_RESULT_COUNT}
+
+
+def create_sum_facet(expression):
+    """
+    :param expression: str or dict - aggregation expression to sum up, for instance, "$file_size_bytes".
+
+    :return: dict - facet definition that sums the expression over all documents.
+    """
+    return {"pipeline": [{"$group": {"_id": None, "value": {"$sum": expression}}}], "result": FACET_RESULT_SUM}
+
+
+def create_max_facet(expression):
+    """
+    :param expression: str or dict - aggregation expression, for instance, "$_id".
+
+    :return: dict - facet definition that gets the maximum of the expression.
+    """
+    return {"pipeline": [{"$group": {"_id": None, "value": {"$max": expression}}}], "result": FACET_RESULT_MAX}
+
+
+def create_group_facet(expression):
+    """
+    :param expression: str or dict - aggregation expression to group by.
+
+    :return: dict - facet definition that counts the documents per value of the expression.
+    """
+    return {"pipeline": [{"$group": {"_id": expression, "count": {"$sum": 1}}}], "result": FACET_RESULT_VALUE_COUNTS}
+
+
+def create_bucket_facet(expression, boundary_list, default_key=BUCKET_DEFAULT_KEY):
+    """
+    Creates a $bucket facet that counts the documents per range of the expression. The buckets are keyed by
+    their lower boundary.
+
+    :param expression: str or dict - aggregation expression, for instance, the size of an array.
+    :param boundary_list: list(int) - sorted lower boundaries of the buckets.
+    :param default_key: str - bucket for values outside the boundaries.
+
+    :return: dict - facet definition.
+    """
+    return {"pipeline": [{"$bucket": {"groupBy": expression,
+                                      "boundaries": boundary_list,
+                                      "default": default_key,
+                                      "output": {"count": {"$sum": 1}}}}],
+            "result": FACET_RESULT_VALUE_COUNTS}
+
+
+def create_facet_stage(facet_dict):
+    """
+    Combines facet definitions into one $facet stage.
+
+    :param facet_dict: dict(str, dict) - facet definitions by name.
+
+    :return: dict - $facet stage.
+    """
+    return {"$facet": {name: facet["pipeline"] for name, facet in facet_dict.items()}}
+
+
+def add_value_count(count_dict, value, count):
+    """
+    Adds a group result to a count dict. The value is converted to a valid mongodb key, so values that only differ
+    in invalid chars are summed up.
+
+    :param count_dict: dict(str, int) - count dict to update.
+    :param value: object - grouped value.
+    :param count: int - number of occurrences.
+    """
+    key = filter_mongodb_key(value)
+    count_dict[key] = count_dict.get(key, 0) + count
+
+
+def group_results_to_count_dict(group_result_list):
+    """
+    Converts the results of a $group or $bucket stage to a count dict.
+
+    :param group_result_list: iterable(dict) - documents with "_id" and "count".
+
+    :return: dict(str, int) - count by value.
+    """
+    count_dict = {}
+    for group_result in group_result_list:
+        add_value_count(count_dict, group_result["_id"], group_result["count"])
+    return count_dict
+
+
+def parse_facet_result(facet_dict, facet_result):
+    """
+    Converts the output document of a $facet stage to python values.
+
+    :param facet_dict: dict(str, dict) - facet definitions by name.
+    :param facet_result: dict(str, list) - output document of the $facet stage.
+
+    :return: dict(str, object) - int for count and sum facets, dict for value count facets and the raw value
+    for max facets.
+    """
+    result_dict = {}
+    for name, facet in facet_dict.items():
+        document_list = facet_result.get(name, [])
+        if facet["result"] == FACET_RESULT_VALUE_COUNTS:
+            result_dict[name] = group_results_to_count_dict(document_list)
+        elif facet["result"] == FACET_RESULT_MAX:
+            result_dict[name] = document_list[0]["value"] if document_list else None
+        else:
+            result_dict[name] = document_list[0]["value"] if document_list else 0
+    return result_dict
+
+
+def merge_count_dicts(previous_count_dict, count_dict):
+    """
+    Adds the counts of two count dicts.
+
+    :param previous_count_dict: dict(str, int) - counts of the previous run.
+    :param count_dict: dict(str, int) - counts of the current run.
+
+    :return: dict(str, int) - merged counts.
+    """
+    merged_dict = dict(previous_count_dict or {})
+    for key, count in (count_dict or {}).items():
+        merged_dict[key] = merged_dict.get(key, 0) + count
+    return merged_dict
+
+
+def merge_facet_results(facet_dict, previous_result_dict, result_dict):
+    """
+    Merges the facet results of an incremental run with the results of the previous run.
+
+    :param facet_dict: dict(str, dict) - facet definitions by name.
+    :param previous_result_dict: dict(str, object) - facet results of the previous run.
+    :param result_dict: dict(str, object) - facet results of the current run.
+
+    :return: dict(str, object) - merged facet results.
+    """
+    merged_dict = {}
+    for name, facet in facet_dict.items():
+        previous_value = previous_result_dict.get(name)
+        value = result_dict.get(name)
+        if facet["result"] == FACET_RESULT_VALUE_COUNTS:
+            merged_dict[name] = merge_count_dicts(previous_value, value)
+        elif facet["result"] == FACET_RESULT_MAX:
+            merged_dict[name] = value if value is not None else previous_value
+        else:
+            merged_dict[name] = (previous_value or 0) + (value or 0)
+    return merged_dict
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import datetime
+import logging
+import os
+import signal
+import time
+import traceback
+from app_metrics.recorder import observe_histogram, flush_metrics
+from app_metrics.profiler import get_profile_request, profile_job, create_task_profile_path, write_task_profile, \
+    collect_task_profile
+
+DEFAULT_TASK_TIMEOUT = int(os.environ.get("SCAN_TASK_TIMEOUT", 60 * 60 * 24))
+WAIT_POLL_MIN_INTERVAL = 0.01
+WAIT_POLL_MAX_INTERVAL = 0.5
+EXIT_CODE_TIMEOUT = -signal.SIGKILL
+UNKNOWN_SCANNER_VERSION = "unknown"
+
+
+def get_task_timeout(profile, module_name=None):
+    """
+    Gets the timeout of a single scan task. The environment variable SCAN_TASK_TIMEOUT_<SCANNER>, for instance,
+    SCAN_TASK_TIMEOUT_FLOWDROID, overrides the timeout of the resource profile.
+
+    :param profile: dict - resource profile of the scanner.
+    :param module_name: str - name of the fmd scanner module.
+
+    :return: int - timeout in seconds.
+    """
+    if module_name and "." in module_name:
+        scanner_key = module_name.split(".")[-2].upper()
+        env_timeout = os.environ.get(f"SCAN_TASK_TIMEOUT_{scanner_key}")
+        if env_timeout:
+            return int(env_timeout)
+    return int(profile.get("timeout_seconds") or DEFAULT_TASK_TIMEOUT)
+
+
+def run_in_child_process(worker_function, task, worker_args_list, profile_path=None):
+    """
+    Executes the worker function in a forked child process. The child runs in an own process group so that
+    tools started by the scanner can be killed together with it.
+
+    :param profile_path: str - file the child writes its profile to. Nothing is profiled if not set.
+
+    :return: int - pid of the child process.
+    """
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            os.setpgid(0, 0)
+            if profile_path:
+                with profile_job(worker_function.__name__, save_function=write_task_profile(profile_path)):
+                    worker_function(task, *worker_args_list)
+            else:
+                worker_function(task, *worker_args_list)
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            flush_metrics()
+            logging.shutdown()
+            os._exit(exit_code)
+    return pid
+
+
+def wait_for_child_process(pid, timeout):
+    """
+    Waits until the child process exits or kills its process group after the timeout.
+
+    :return: tuple(int, resource.struct_rusage, bool) - exit code, resource usage and timeout flag.
+    """
+    deadline = time.monotonic() + timeout
+    poll_interval = WAIT_POLL_MIN_INTERVAL
+    while True:
+        waited_pid, status, rusage = os.wait4(pid, os.WNOHANG)
+        if waited_pid == pid:
+            return os.waitstatus_to_exitcode(status), rusage, False
+        if time.monotonic() >= deadline:
+            logging.error(f"Scan task pid {pid} exceeded timeout of {timeout}s. Killing process group.")
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            _, status, rusage = os.wait4(pid, 0)
+            return EXIT_CODE_TIMEOUT, rusage, True
+        time.sleep(poll_interval)
+        poll_interval = min(poll_interval * 2, WAIT_POLL_MAX_INTERVAL)
+
+
+def store_task_metrics(android_app_id, scanner_name, start_date, metrics):
+    """
+    Stores the metrics on the reports the task created for the app. A task that timed out or crashed did not write
+    a report, so a failed report is created to keep its metrics.
+
+    :param android_app_id: str - object-id of class:'AndroidApp'.
+    :param scanner_name: str - name of the scanner or None to match any scanner.
+    :param start_date: datetime - start of the task.
+    :param metrics: dict - task metrics.
+    """
+    from model import ApkScannerReport, ScanTaskMetrics
+    from model.Interfaces.ScanJob import SCAN_STATUS_FAILED
+    query_filter = {"android_app_id_reference": android_app_id,
+                    "report_date__gte": start_date,
+                    "task_metrics__exists": False}
+    if scanner_name:
+        query_filter["scanner_name"] = scanner_name
+    updated_count = ApkScannerReport.objects(**query_filter).update(set__task_metrics=ScanTaskMetrics(**metrics))
+    if updated_count > 0:
+        return
+    if scanner_name and get_task_outcome(metrics) != "success":
+        ApkScannerReport(android_app_id_reference=android_app_id,
+                         scanner_name=scanner_name,
+                         scanner_version=UNKNOWN_SCANNER_VERSION,
+                         scan_status=SCAN_STATUS_FAILED,
+                         task_metrics=ScanTaskMetrics(**metrics)).save()
+    else:
+        logging.warning(f"No report found to store task metrics for app {android_app_id}: {metrics}")
+
+
+def get_task_outcome(metrics):
+    """
+    :param metrics: dict - task metrics of run_scan_task.
+
+    :return: str - "timeout", "failed" or "success".
+    """
+    if metrics["timed_out"]:
+        return "timeout"
+    return "failed" if metrics["exit_code"] != 0 else "success"
+
+
+def record_task_metrics(scanner_name, metrics):
+    """
+    Adds the duration and outcome of a task to the pipeline metrics. The metrics are flushed after every task,
+    because the processes of the pool exit without running exit handlers.
+
+    :param scanner_name: str - scanner name of the task.
+    :param metrics: dict - task metrics of run_scan_task.
+    """
+    observe_histogram("fmd_scan_task_duration_seconds", metrics["wall_time_seconds"],
+                      scanner=scanner_name or "", outcome=get_task_outcome(metrics))
+    flush_metrics()
+
+
+def run_scan_task(worker_function,
+                  task,
+                  worker_args_list=None,
+                  timeout=DEFAULT_TASK_TIMEOUT,
+                  scanner_name=None,
+                  input_size_bytes=0):
+    """
+    Task harness for *_worker_multiprocessing functions. Runs the function in a child process, measures wall time,
+    cpu time and peak rss, enforces the timeout with a hard kill and stores the metrics on the ApkScannerReport.
+    If profiling is requested for the job, the profile of the child is added to the profile of the pool process.
+
+    :param worker_function: function - the scanner worker function.
+    :param task: str - object-id of the class:'AndroidApp' to scan.
+    :param worker_args_list: list - additional arguments of the worker function.
+    :param timeout: int - timeout in seconds.
+    :param scanner_name: str - scanner name of the reports created by the function.
+    :param input_size_bytes: int - size of the apk.
+
+    :return: dict - task metrics.
+    """
+    start_date = datetime.datetime.now()
+    start_time = time.monotonic()
+    profile_path = create_task_profile_path() if get_profile_request() else None
+    pid = run_in_child_process(worker_function, task, worker_args_list or [], profile_path)
+    exit_code, rusage, timed_out = wait_for_child_process(pid, timeout)
+    if profile_path:
+        collect_task_profile(worker_function.__name__, profile_path)
+    metrics = {
+        "wall_time_seconds": round(time.monotonic() - start_time, 3),
+        "cpu_time_seconds": round(rusage.ru_utime + rusage.ru_stime, 3),
+        "peak_rss_bytes": rusage.ru_maxrss * 1024,
+        "input_size_bytes": input_size_bytes or 0,
+        "timeout_seconds": timeout,
+        "timed_out": timed_out,
+        "exit_code": exit_code,
+    }
+    logging.info(f"Scan task {task} finished: {metrics}")
+    record_task_metrics(scanner_name, metrics)
+    try:
+        from context.context_creator import create_app_context
+        create_app_context()
+        store_task_metrics(task, scanner_name, start_date, metrics)
+    except Exception as err:
+        logging.error(f"Could not store task metrics for {task}: {err}")
+    return metrics
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import logging
+import os
+import tempfile
+
+WORK_MANIFEST_DIR = os.environ.get("WORK_MANIFEST_DIR", tempfile.gettempdir())
+WORK_MANIFEST_PREFIX = "fmd_work_manifest_"
+DEFAULT_PREFETCH_SIZE = 500
+
+
+def create_work_manifest(item_list):
+    """
+    Writes the object-ids of the items into a manifest file with one id per line. The manifest replaces the
+    comma-separated argv string, so the size of a job is not limited by ARG_MAX.
+
+    :param item_list: iterable(document or str) - documents with an id attribute or object-ids.
+
+    :return: str - path of the manifest file.
+    """
+    with tempfile.NamedTemporaryFile(mode="w",
+                                     prefix=WORK_MANIFEST_PREFIX,
+                                     suffix=".txt",
+                                     dir=WORK_MANIFEST_DIR,
+                                     delete=False) as manifest_file:
+        count = 0
+        for item in item_list:
+            manifest_file.write(f"{getattr(item, 'id', item)}\n")
+            count += 1
+    logging.debug(f"Created work manifest {manifest_file.name} with {count} items.")
+    return manifest_file.name
+
+
+def read_work_manifest(manifest_path, chunk_size=DEFAULT_PREFETCH_SIZE):
+    """
+    Streams the object-ids of a manifest file in chunks.
+
+    :param manifest_path: str - path of the manifest file.
+    :param chunk_size: int - number of ids per chunk.
+
+    :return: generator(list(str)) - chunks of object-ids in manifest order.
+    """
+    chunk = []
+    with open(manifest_path, "r") as manifest_file:
+        for line in manifest_file:
+            object_id = line.strip()
+            if not object_id:
+                continue
+            chunk.append(object_id)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def remove_work_manifest(manifest_path):
+    """
+    Deletes a manifest file. Only files created by create_work_manifest are removed.
+
+    :param manifest_path: str - path of the manifest file.
+    """
+    if not os.path.basename(manifest_path).startswith(WORK_MANIFEST_PREFIX):
+        logging.warning(f"Refusing to remove file that is not a work manifest: {manifest_path}")
+        return
+    try:
+        os.remove(manifest_path)
+    except FileNotFoundError:
+        pass
@@ -134,6 +134,8 @@ class APKiDScanJob(ScanJob):
     SOURCE_DIR = "/var/www/source"
     MODULE_NAME = "static_analysis.APKiD.apkid_wrapper"
     INTERPRETER_PATH = "/opt/firmwaredroid/python/apkid/bin/python"
+    SCANNER_NAME = "APKiD"
+    SCANNER_VERSION_CODE = "import apkid; print(apkid.__version__)"
 
     def __init__(self, object_id_list, **kwargs):
         self.object_id_list = object_id_list
@@ -151,12 +153,11 @@ class APKiDScanJob(ScanJob):
         if job_id:
             worker_args_list = [job_id]
             DB_LOGGER.info(f"APKiD Scan Job started", extra={'details': {'job_id': job_id}})
-        android_app_id_list = self.object_id_list
+        android_app_id_list = self.get_scan_id_list()
         logging.info(f"APKiD analysis started! With {str(len(android_app_id_list))} apps. ID List: {android_app_id_list}")
         if len(android_app_id_list) > 0:
             python_process = start_python_interpreter(item_list=android_app_id_list,
                                                       worker_function=apkid_worker_multiprocessing,
-                                                      number_of_processes=os.cpu_count(),
                                                       use_id_list=True,
                                                       module_name=self.MODULE_NAME,
                                                       interpreter_path=self.INTERPRETER_PATH,
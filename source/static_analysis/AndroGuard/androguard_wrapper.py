@@ -505,6 +505,8 @@ class AndroGuardScanJob(ScanJob):
     SOURCE_DIR = "/var/www/source"
     MODULE_NAME = "static_analysis.AndroGuard.androguard_wrapper"
     INTERPRETER_PATH = "/opt/firmwaredroid/python/androguard/bin/python"
+    SCANNER_NAME = SCANNER_NAME
+    SCANNER_VERSION_CODE = "from androguard import __version__; print(__version__)"
 
     def __init__(self, object_id_list, **kwargs):
         self.object_id_list = object_id_list
@@ -516,12 +518,11 @@ class AndroGuardScanJob(ScanJob):
         """
         Starts multiple instances of AndroGuard to analyse a list of Android apps on multiple processors.
         """
-        android_app_id_list = self.object_id_list
+        android_app_id_list = self.get_scan_id_list()
         logging.info(f"Androguard analysis started! With {str(len(android_app_id_list))} apps.")
         if len(android_app_id_list) > 0:
             python_process = start_python_interpreter(item_list=android_app_id_list,
                                                       worker_function=androguard_worker_multiprocessing,
-                                                      number_of_processes=os.cpu_count(),
                                                       use_id_list=True,
                                                       module_name=self.MODULE_NAME,
                                                       interpreter_path=self.INTERPRETER_PATH)
@@ -73,13 +73,12 @@ class YourAnalyzerJob(ScanJob):
         """
         Starts multiple instances of the scanner to analyse a list of Android apps on multiple processors.
         """
-        android_app_id_list = self.object_id_list
+        android_app_id_list = self.get_scan_id_list()
         logging.info(f"Analysis started! With {str(len(android_app_id_list))} apps.")
         if len(android_app_id_list) > 0:
             # TODO: Change the worker function to your own worker function
             python_process = start_python_interpreter(item_list=android_app_id_list,
                                                       worker_function=your_analyzer_worker_multiprocessing,
-                                                      number_of_processes=os.cpu_count(),
                                                       use_id_list=True,
                                                       module_name=self.MODULE_NAME,
                                                       report_reference_name="your_analyzer_report_reference",
@@ -215,6 +215,8 @@ class FlowDroidScanJob(ScanJob):
     SOURCE_DIR = "/var/www/source"
     MODULE_NAME = "static_analysis.FlowDroid.flowdroid_wrapper"
     INTERPRETER_PATH = "/opt/firmwaredroid/python/flowdroid/bin/python"
+    SCANNER_NAME = "FlowDroid"
+    SCANNER_VERSION = "2.13.0"
 
     def __init__(self, object_id_list, android_api_version, flowdroid_cmd_arg_list, rule_filename=None, **kwargs):
         self.object_id_list = object_id_list
@@ -231,13 +233,12 @@ class FlowDroidScanJob(ScanJob):
         """
         Starts multiple instances of the scanner to analyse a list of Android apps on multiple processors.
         """
-        android_app_id_list = self.object_id_list
+        android_app_id_list = self.get_scan_id_list()
         logging.info(f"Analysis started! With {str(len(android_app_id_list))} apps.")
         logging.info(f"worker_args_list: {self.worker_args_list}")
         if len(android_app_id_list) > 0:
             python_process = start_python_interpreter(item_list=android_app_id_list,
                                                       worker_function=flowdroid_worker_multiprocessing,
-                                                      number_of_processes=os.cpu_count(),
                                                       use_id_list=True,
                                                       module_name=self.MODULE_NAME,
                                                       interpreter_path=self.INTERPRETER_PATH,
@@ -85,6 +85,8 @@ class MobSFScanJob(ScanJob):
     SOURCE_DIR = "/var/www/source"
     MODULE_NAME = "static_analysis.MobSFScan.mobsfscan_wrapper"
     INTERPRETER_PATH = "/opt/firmwaredroid/python/mobsfscan/bin/python"
+    SCANNER_NAME = "MobSFScan"
+    SCANNER_VERSION_CODE = "import pkg_resources; print(pkg_resources.get_distribution('mobsfscan').version)"
 
     def __init__(self, object_id_list, **kwargs):
         self.object_id_list = object_id_list
@@ -96,12 +98,11 @@ class MobSFScanJob(ScanJob):
         """
         Starts multiple instances of Mobsfscan to analyse a list of Android apps on multiple processors.
         """
-        android_app_id_list = self.object_id_list
+        android_app_id_list = self.get_scan_id_list()
         logging.info(f"Mobsfscan analysis started! With {str(len(android_app_id_list))} apps.")
         if len(android_app_id_list) > 0:
             python_process = start_python_interpreter(item_list=android_app_id_list,
                                                       worker_function=mobsfscan_worker_multiprocessing,
-                                                      number_of_processes=os.cpu_count(),
                                                       use_id_list=True,
                                                       module_name=self.MODULE_NAME,
                                                       interpreter_path=self.INTERPRETER_PATH)
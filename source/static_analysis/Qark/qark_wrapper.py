@@ -142,6 +142,8 @@ class QarkScanJob(ScanJob):
     SOURCE_DIR = "/var/www/source"
     MODULE_NAME = "static_analysis.Qark.qark_wrapper"
     INTERPRETER_PATH = "/opt/firmwaredroid/python/qark/bin/python"
+    SCANNER_NAME = "Qark"
+    SCANNER_VERSION = "4.0.0"
 
     def __init__(self, object_id_list, **kwargs):
         self.object_id_list = object_id_list
@@ -153,12 +155,11 @@ class QarkScanJob(ScanJob):
         """
         Starts multiple instances of AndroGuard to analyse a list of Android apps on multiple processors.
         """
-        android_app_id_list = self.object_id_list
+        android_app_id_list = self.get_scan_id_list()
         logging.info(f"Qark analysis started! With {str(len(android_app_id_list))} apps.")
         if len(android_app_id_list) > 0:
             python_process = start_python_interpreter(item_list=android_app_id_list,
                                                       worker_function=qark_worker_multiprocessing,
-                                                      number_of_processes=os.cpu_count(),
                                                       use_id_list=True,
                                                       module_name=self.MODULE_NAME,
                                                       interpreter_path=self.INTERPRETER_PATH)
@@ -181,6 +181,8 @@ class QuarkEngineScanJob(ScanJob):
     SOURCE_DIR = "/var/www/source"
     MODULE_NAME = "static_analysis.QuarkEngine.quark_engine_wrapper"
     INTERPRETER_PATH = "/opt/firmwaredroid/python/quark_engine/bin/python"
+    SCANNER_NAME = "QuarkEngine"
+    SCANNER_VERSION_CODE = "from quark import __version__; print(__version__)"
 
     def __init__(self, object_id_list, **kwargs):
         self.object_id_list = object_id_list
@@ -192,12 +194,11 @@ class QuarkEngineScanJob(ScanJob):
         """
         Starts multiple instances of AndroGuard to analyse a list of Android apps on multiple processors.
         """
-        android_app_id_list = self.object_id_list
+        android_app_id_list = self.get_scan_id_list()
         logging.info(f"QuarkEngine analysis started! With {str(len(android_app_id_list))} apps.")
         if len(android_app_id_list) > 0:
             python_process = start_python_interpreter(item_list=android_app_id_list,
                                                       worker_function=quark_engine_worker_multiprocessing,
-                                                      number_of_processes=os.cpu_count(),
                                                       use_id_list=True,
                                                       module_name=self.MODULE_NAME,
                                                       interpreter_path=self.INTERPRETER_PATH)
@@ -112,6 +112,8 @@ class TrueseeingScanJob(ScanJob):
     SOURCE_DIR = "/var/www/source"
     MODULE_NAME = "static_analysis.Trueseeing.trueseeing_wrapper"
     INTERPRETER_PATH = "/opt/firmwaredroid/python/trueseeing/bin/python"
+    SCANNER_NAME = "Trueseeing"
+    SCANNER_VERSION_CODE = "import trueseeing; print(trueseeing.__version__)"
 
     def __init__(self, object_id_list, **kwargs):
         self.object_id_list = object_id_list
@@ -123,12 +125,11 @@ class TrueseeingScanJob(ScanJob):
         """
         Starts multiple instances of the scanner to analyse a list of Android apps on multiple processors.
         """
-        android_app_id_list = self.object_id_list
+        android_app_id_list = self.get_scan_id_list()
         logging.info(f"Analysis started! With {str(len(android_app_id_list))} apps.")
         if len(android_app_id_list) > 0:
             python_process = start_python_interpreter(item_list=android_app_id_list,
                                                       worker_function=trueseeing_worker_multiprocessing,
-                                                      number_of_processes=os.cpu_count(),
                                                       use_id_list=True,
                                                       module_name=self.MODULE_NAME,
                                                       interpreter_path=self.INTERPRETER_PATH)
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import os
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+import django
+from graphql import parse
+from graphql.language.ast import FragmentDefinitionNode, OperationDefinitionNode
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "webserver.settings")
+
+
+def create_info(query):
+    document = parse(query)
+    operation = next(definition for definition in document.definitions
+                     if isinstance(definition, OperationDefinitionNode))
+    fragments = {definition.name.value: definition for definition in document.definitions
+                 if isinstance(definition, FragmentDefinitionNode)}
+    return SimpleNamespace(field_nodes=[operation.selection_set.selections[0]],
+                           fragments=fragments,
+                           context=SimpleNamespace())
+
+
+class TestFieldProjection(unittest.TestCase):
+    """Test the projection of graphql selection sets to the fields loaded from MongoDB."""
+
+    @classmethod
+    def setUpClass(cls):
+        with patch("redis.StrictRedis.ping"), patch("setup.default_setup.setup_default_settings"):
+            django.setup()
+        import api.v2.schema.FirmwareDroidRootSchema  # noqa: F401 - registers the graphql types of the models
+
+    def get_projection(self, query, model_name="ApkScannerReport"):
+        from api.v2.types.FieldProjection import get_projection_fields
+        from api.v2.types.KeysetPagination import CONNECTION_NODE_PATH
+        from mongoengine.base import get_document
+        return get_projection_fields(create_info(query), get_document(model_name), CONNECTION_NODE_PATH)
+
+    def test_inline_fragments_of_the_model(self):
+        """Test that inline fragments are projected and fragments on types of other models are skipped."""
+        query = """{ apk_scanner_report_connection { edges { node {
+                       id scannerName
+                       ... on ApkidReport { results }
+                       ... on QarkReport { issueList }
+                   } } } }"""
+        self.assertEqual(self.get_projection(query), ["issue_list", "results", "scanner_name"])
+        self.assertEqual(self.get_projection(query, "ApkidReport"), ["results", "scanner_name"])
+
+    def test_named_fragments(self):
+        """Test that fragment spreads are resolved at the node and on the connection itself."""
+        query = """{ apk_scanner_report_connection { ...ReportEdges } }
+                   fragment ReportEdges on ApkScannerReportConnection { edges { node { scanStatus ...Metrics } } }
+                   fragment Metrics on ApkidReport { taskMetrics { wallTimeSeconds peakRssBytes } }"""
+        self.assertEqual(self.get_projection(query),
+                         ["scan_status", "task_metrics.peak_rss_bytes", "task_metrics.wall_time_seconds"])
+
+    def test_nested_connection_paths(self):
+        """Test that only the node of the connection is projected and nested references load the reference only."""
+        query = """{ apk_scanner_report_connection {
+                       pageInfo { endCursor hasNextPage }
+                       edges { cursor node { scannerVersion androidAppIdReference { packagename } } }
+                       edges { node { _cls } }
+                   } }"""
+        self.assertEqual(self.get_projection(query), ["android_app_id_reference", "scanner_version"])
+        page_info_query = "{ apk_scanner_report_connection { pageInfo { hasNextPage } } }"
+        self.assertEqual(self.get_projection(page_info_query), ["id"])
+
+    def test_unknown_field_loads_full_documents(self):
+        """Test that no projection is used if a selected field is not a model field."""
+        query = """{ apk_scanner_report_connection { edges { node {
+                       scannerName
+                       ... on ApkidReport { customResolverField }
+                   } } } }"""
+        self.assertIsNone(self.get_projection(query))
+        self.assertIsNone(self.get_projection(query, "ApkidReport"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import os
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+import django
+from bson import ObjectId
+from graphql import parse
+from graphql.language.ast import FragmentDefinitionNode, OperationDefinitionNode
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "webserver.settings")
+
+CONNECTION_QUERY = "{ ssdeep_hash_connection { edges { node { id filename } } } }"
+
+
+def create_info(query):
+    document = parse(query)
+    operation = next(definition for definition in document.definitions
+                     if isinstance(definition, OperationDefinitionNode))
+    fragments = {definition.name.value: definition for definition in document.definitions
+                 if isinstance(definition, FragmentDefinitionNode)}
+    return SimpleNamespace(field_nodes=[operation.selection_set.selections[0]],
+                           fragments=fragments,
+                           context=SimpleNamespace())
+
+
+def create_tied_object_id_list(count):
+    timestamp = ObjectId().binary[:4]
+    return [ObjectId(timestamp + bytes(5) + index.to_bytes(3, "big")) for index in range(count)]
+
+
+class TestKeysetPagination(unittest.TestCase):
+    """Test the keyset pagination of relay connections on an in-memory database."""
+
+    @classmethod
+    def setUpClass(cls):
+        with patch("redis.StrictRedis.ping"), patch("setup.default_setup.setup_default_settings"):
+            django.setup()
+        from database.connector import init_mock_db
+        init_mock_db("fmd_tests_keyset_pagination")
+
+    def setUp(self):
+        from model.SsDeepHash import SsDeepHash
+        self.model = SsDeepHash
+        self.model._get_collection().delete_many({})
+
+    def insert_documents(self, object_id_list):
+        self.model._get_collection().insert_many([{"_id": object_id, "filename": "libc.so", "digest": "3:a:b"}
+                                                  for object_id in object_id_list])
+
+    def get_page(self, first=None, after=None):
+        from api.v2.schema.SsDeepHashSchema import SsDeepHashConnection
+        from api.v2.types.KeysetPagination import get_keyset_connection
+        return get_keyset_connection(SsDeepHashConnection, self.model, create_info(CONNECTION_QUERY),
+                                     first=first, after=after)
+
+    def test_cursor_round_trip(self):
+        """Test that a cursor decodes to the object-id it was created from and invalid cursors are rejected."""
+        from api.v2.types.KeysetPagination import encode_keyset_cursor, decode_keyset_cursor
+        object_id = ObjectId()
+        self.assertEqual(decode_keyset_cursor(encode_keyset_cursor(object_id)), object_id)
+        self.assertEqual(decode_keyset_cursor(encode_keyset_cursor(str(object_id))), object_id)
+        for cursor in ["not-base64!", "YXJyYXljb25uZWN0aW9uOjE=", encode_keyset_cursor("123")]:
+            with self.assertRaises(ValueError):
+                decode_keyset_cursor(cursor)
+
+    def test_pages_end_at_boundaries(self):
+        """Test that the pages are consecutive and has_next_page is only set if another document follows."""
+        object_id_list = [ObjectId() for _ in range(4)]
+        self.insert_documents(object_id_list)
+        first_page = self.get_page(first=2)
+        second_page = self.get_page(first=2, after=first_page.page_info.end_cursor)
+        last_page = self.get_page(first=2, after=second_page.page_info.end_cursor)
+
+        self.assertEqual([edge.node.pk for edge in first_page.edges], object_id_list[:2])
+        self.assertTrue(first_page.page_info.has_next_page)
+        self.assertFalse(first_page.page_info.has_previous_page)
+        self.assertEqual([edge.node.pk for edge in second_page.edges], object_id_list[2:])
+        self.assertFalse(second_page.page_info.has_next_page)
+        self.assertTrue(second_page.page_info.has_previous_page)
+        self.assertEqual(second_page.page_info.start_cursor, second_page.edges[0].cursor)
+        self.assertEqual(last_page.edges, [])
+        self.assertIsNone(last_page.page_info.end_cursor)
+        self.assertFalse(last_page.page_info.has_next_page)
+
+    def test_page_size_is_capped(self):
+        """Test that requests above MAX_PAGE_SIZE are capped and negative page sizes are rejected."""
+        from api.v2.types.KeysetPagination import get_page_size, MAX_PAGE_SIZE, DEFAULT_PAGE_SIZE
+        self.assertEqual(get_page_size(MAX_PAGE_SIZE + 1), MAX_PAGE_SIZE)
+        self.assertEqual(get_page_size(), DEFAULT_PAGE_SIZE)
+        with self.assertRaises(ValueError):
+            get_page_size(-1)
+        self.insert_documents([ObjectId() for _ in range(3)])
+        with patch("api.v2.types.KeysetPagination.MAX_PAGE_SIZE", 2):
+            page = self.get_page(first=10)
+        self.assertEqual(len(page.edges), 2)
+        self.assertTrue(page.page_info.has_next_page)
+
+    def test_tied_documents_are_returned_once(self):
+        """Test that documents with equal values and the same object-id timestamp are neither skipped nor repeated."""
+        object_id_list = create_tied_object_id_list(5)
+        self.insert_documents(reversed(object_id_list))
+        returned_id_list = []
+        after = None
+        while True:
+            page = self.get_page(first=2, after=after)
+            returned_id_list.extend(edge.node.pk for edge in page.edges)
+            if not page.page_info.has_next_page:
+                break
+            after = page.page_info.end_cursor
+        self.assertEqual(returned_id_list, object_id_list)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import os
+import unittest
+from unittest.mock import patch
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "webserver.settings")
+
+
+class TestRootSchema(unittest.TestCase):
+    """Test that the graphql schema of the api can be built."""
+
+    @classmethod
+    def setUpClass(cls):
+        with patch("redis.StrictRedis.ping"), patch("setup.default_setup.setup_default_settings"):
+            django.setup()
+
+    def test_schema_builds(self):
+        """Test that all types of the root schema can be resolved."""
+        from api.v2.schema.FirmwareDroidRootSchema import schema
+        android_app_type = schema.graphql_schema.get_type("AndroidAppType")
+        self.assertIn("apkScannerReportList", android_app_type.fields)
+        self.assertIsNotNone(schema.graphql_schema.get_type("AndroidFirmwareType").fields)
+
+
+if __name__ == '__main__':
+    unittest.main()
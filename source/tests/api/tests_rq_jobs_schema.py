@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+import django
+from graphql import GraphQLResolveInfo
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "webserver.settings")
+
+
+def create_job(job_id, origin):
+    job = MagicMock(id=job_id, origin=origin, created_at=None, started_at=None, ended_at=None)
+    job.get_status.return_value = "queued"
+    return job
+
+
+class TestRqJobsSchema(unittest.TestCase):
+    """Test the resolvers of the rq job list."""
+
+    @classmethod
+    def setUpClass(cls):
+        with patch("redis.StrictRedis.ping"), patch("setup.default_setup.setup_default_settings"):
+            django.setup()
+
+    def test_jobs_by_id_are_fetched_once(self):
+        """Test that jobs requested by id are returned once with the queue they were enqueued on."""
+        from api.v2.schema.RqJobsSchema import RqQueueQuery
+        info = MagicMock(spec=GraphQLResolveInfo)
+        info.context = MagicMock()
+        info.context.user.is_superuser = True
+        job_list = [create_job("job-1", "default-python"), create_job("job-2", "high-python")]
+        with patch("api.v2.schema.RqJobsSchema.django_rq.get_queue"), \
+                patch("api.v2.schema.RqJobsSchema.Job.fetch_many", return_value=job_list) as mock_fetch_many:
+            result = RqQueueQuery.resolve_rq_job_list(None, info, job_ids=["job-1", "job-2", "job-3"])
+            filtered_result = RqQueueQuery.resolve_rq_job_list(None, info, queue_name="high-python",
+                                                               job_ids=["job-1", "job-2"])
+        self.assertEqual(mock_fetch_many.call_count, 2)
+        self.assertEqual([(job.id, job.queue_name) for job in result],
+                         [("job-1", "default-python"), ("job-2", "high-python")])
+        self.assertEqual([job.id for job in filtered_result], ["job-2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import unittest
+from unittest.mock import patch
+from app_metrics.recorder import MetricRecorder, get_metric_key
+from app_metrics.collector import parse_metric_hash, get_cumulative_buckets
+
+
+class RecordingPipeline:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def hincrby(self, key, field, value):
+        self._add(key, field, value)
+
+    def hincrbyfloat(self, key, field, value):
+        self._add(key, field, value)
+
+    def _add(self, key, field, value):
+        hash_dict = self.connection.hash_dict.setdefault(key, {})
+        hash_dict[field.encode()] = hash_dict.get(field.encode(), 0) + value
+
+    def execute(self):
+        self.connection.execute_count += 1
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.hash_dict = {}
+        self.execute_count = 0
+
+    def pipeline(self, transaction=True):
+        return RecordingPipeline(self)
+
+
+@patch.object(MetricRecorder, "ensure_flusher")
+class TestMetricRecorder(unittest.TestCase):
+    """Test that metrics are summed up per process and written into one redis hash per metric."""
+
+    def test_histogram_round_trip(self, mock_ensure_flusher):
+        """Test that observations are stored in buckets and collected as a cumulative histogram."""
+        connection = RecordingConnection()
+        recorder = MetricRecorder(connection_factory=lambda: connection)
+        for value in (0.05, 3, 4, 100000):
+            recorder.observe("fmd_import_stage_duration_seconds", value, stage="extract")
+        recorder.flush()
+        recorder.flush()
+        self.assertEqual(connection.execute_count, 1)
+        raw_dict = connection.hash_dict[get_metric_key("fmd_import_stage_duration_seconds")]
+        value_dict = parse_metric_hash(raw_dict)[("extract",)]
+        self.assertEqual(value_dict["count"], 4)
+        self.assertEqual(value_dict["sum"], 100007.05)
+        bucket_dict = dict(get_cumulative_buckets([0.1, 1, 5], value_dict))
+        self.assertEqual(bucket_dict, {"0.1": 1, "1": 1, "5": 3, "+Inf": 4})
+
+    def test_failed_flush_keeps_metrics(self, mock_ensure_flusher):
+        """Test that metrics are kept for the next flush if redis can not be reached."""
+        connection = RecordingConnection()
+        connection_list = [None, connection]
+
+        def connection_factory():
+            connection = connection_list.pop(0)
+            if connection is None:
+                raise ConnectionError("redis is down")
+            return connection
+
+        recorder = MetricRecorder(connection_factory=connection_factory)
+        recorder.increment("fmd_extraction_cache_requests_total", result="hit")
+        recorder.flush()
+        recorder.increment("fmd_extraction_cache_requests_total", result="hit")
+        recorder.flush()
+        raw_dict = connection.hash_dict[get_metric_key("fmd_extraction_cache_requests_total")]
+        self.assertEqual(parse_metric_hash(raw_dict), {("hit",): {"value": 2}})
+
+
+if __name__ == '__main__':
+    unittest.main()
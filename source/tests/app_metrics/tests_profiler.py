@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import os
+import unittest
+from unittest.mock import patch
+from app_metrics import profiler
+from app_metrics.profiler import (profile_job, create_task_profile_path, write_task_profile, collect_task_profile,
+                                  select_stored_functions, PROFILE_MODE_ENV)
+
+
+def busy_function(count):
+    return sum(index * index for index in range(count))
+
+
+class TestProfiler(unittest.TestCase):
+    """Test the opt-in profiling of jobs and forked scan tasks."""
+
+    def test_profile_job_is_opt_in_and_not_nested(self):
+        """Test that only requested jobs are profiled and nested blocks run in the outer profiler."""
+        save_list = []
+
+        def save_function(label, profile_request, job_profiler):
+            save_list.append((label, profile_request, job_profiler))
+
+        with patch.dict(os.environ, {PROFILE_MODE_ENV: ""}):
+            with profile_job("not_requested", save_function=save_function) as job_profiler:
+                self.assertIsNone(job_profiler)
+        with patch.dict(os.environ, {PROFILE_MODE_ENV: "cprofile", "FMD_PROGRESS_JOB_ID": "job-1"}):
+            with profile_job("outer", save_function=save_function) as job_profiler:
+                with profile_job("inner", save_function=save_function) as inner_profiler:
+                    self.assertIsNone(inner_profiler)
+                    busy_function(1000)
+        self.assertEqual(len(save_list), 1)
+        label, profile_request, job_profiler = save_list[0]
+        self.assertEqual(label, "outer")
+        self.assertEqual(profile_request["job_id"], "job-1")
+        function_stats = job_profiler.get_function_stats()
+        busy_key = next(key for key in function_stats if key.endswith("(busy_function)"))
+        self.assertEqual(function_stats[busy_key][0], 1)
+
+    def test_forked_task_profile_is_collected(self):
+        """Test that the profile of a forked task is written to a file and stored by the parent process."""
+        profile_request = {"mode": "cprofile", "job_id": "job-2", "parent_job_id": None}
+        profile_path = create_task_profile_path()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                with profile_job("busy_function", profile_request, write_task_profile(profile_path)):
+                    busy_function(1000)
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        with patch.object(profiler, "store_job_profile") as store_mock:
+            collect_task_profile("busy_function", profile_path)
+        self.assertFalse(os.path.exists(profile_path))
+        label, stored_request, function_stats, duration_seconds = store_mock.call_args.args
+        self.assertEqual((label, stored_request), ("busy_function", profile_request))
+        self.assertTrue(any(key.endswith("(busy_function)") for key in function_stats))
+
+    def test_select_stored_functions(self):
+        """Test that the stored functions keep the top functions by self and by cumulative time."""
+        function_stats = {"self_heavy": [1, 9.0, 9.0],
+                          "cumulative_heavy": [1, 0.0, 10.0],
+                          "cheap": [1, 0.1, 0.1],
+                          "cheapest": [1, 0.0, 0.0]}
+        self.assertEqual(set(select_stored_functions(function_stats, max_count=2)), {"self_heavy", "cumulative_heavy"})
+
+
+if __name__ == '__main__':
+    unittest.main()
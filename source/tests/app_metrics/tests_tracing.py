@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from app_metrics import tracing
+from app_metrics.tracing import start_span, get_timing_summary, get_current_span
+
+
+class TestTracing(unittest.TestCase):
+    """Test the nested spans of the firmware import and their export."""
+
+    def test_nested_spans_are_exported_as_otlp_json(self):
+        """Test that a finished root span writes its trace with parent ids, attributes and errors."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            export_path = os.path.join(temp_dir, "traces.jsonl")
+            with patch.object(tracing, "TRACE_EXPORT_PATH", export_path):
+                with start_span("import_firmware", file_name="firmware.zip") as root_span:
+                    with start_span("index_partition", partition="system"):
+                        self.assertEqual(get_current_span().name, "index_partition")
+                    with self.assertRaises(RuntimeError):
+                        with start_span("extract_image_strategy", strategy="ext4"):
+                            raise RuntimeError("mount failed")
+                self.assertIsNone(get_current_span())
+            with open(export_path, encoding="utf-8") as export_file:
+                line_list = export_file.readlines()
+        self.assertEqual(len(line_list), 1)
+        span_list = json.loads(line_list[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        span_dict = {span["name"]: span for span in span_list}
+        self.assertEqual(span_dict["index_partition"]["parentSpanId"], root_span.span_id)
+        self.assertNotIn("parentSpanId", span_dict["import_firmware"])
+        self.assertEqual(span_dict["index_partition"]["attributes"],
+                         [{"key": "partition", "value": {"stringValue": "system"}}])
+        self.assertEqual(span_dict["extract_image_strategy"]["status"]["code"], tracing.STATUS_CODE_ERROR)
+        self.assertEqual({span["traceId"] for span in span_list}, {root_span.trace.trace_id})
+
+    def test_timing_summary(self):
+        """Test that the summary sums up the finished children of a span by name."""
+        with start_span("import_firmware") as root_span:
+            for partition_name in ("system", "vendor"):
+                with start_span("index_partition", partition=partition_name):
+                    pass
+            with start_span("store"):
+                pass
+        summary = get_timing_summary(root_span)
+        self.assertEqual(set(summary["stage_seconds"].keys()), {"index_partition", "store"})
+        self.assertGreaterEqual(summary["total_seconds"], summary["stage_seconds"]["store"])
+        self.assertEqual(summary["trace_id"], root_span.trace.trace_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
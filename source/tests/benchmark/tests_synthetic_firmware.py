@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import hashlib
+import os
+import random
+import struct
+import tempfile
+import unittest
+from benchmark.benchmark_runner import compare_with_baseline, get_stage_status, summarize_stage_runs, STATUS_OK, \
+    STATUS_FAILED
+from benchmark.synthetic_firmware import (create_sparse_image, create_dat_files, create_super_image, BLOCK_SIZE,
+                                          SPARSE_CHUNK_TYPE_RAW, LP_PARTITION_RESERVED_BYTES,
+                                          LP_METADATA_GEOMETRY_SIZE, LP_SECTOR_SIZE)
+from extractor.dat2img_converter import start_dat_conversion
+
+
+def create_raw_image(image_path, block_count):
+    """Writes an image with random blocks and runs of zero blocks."""
+    rng = random.Random(3)
+    with open(image_path, "wb") as image_file:
+        for index in range(block_count):
+            image_file.write(bytes(BLOCK_SIZE) if index % 5 in (1, 2) else rng.randbytes(BLOCK_SIZE))
+
+
+def read_sparse_image(sparse_image_path):
+    with open(sparse_image_path, "rb") as sparse_file:
+        data = sparse_file.read()
+    _, _, _, _, _, block_size, _, chunk_count, _ = struct.unpack("<I4H4I", data[:28])
+    offset = 28
+    raw_data = b""
+    for _ in range(chunk_count):
+        chunk_type, _, block_count, total_size = struct.unpack("<2H2I", data[offset:offset + 12])
+        raw_data += data[offset + 12:offset + total_size] if chunk_type == SPARSE_CHUNK_TYPE_RAW \
+            else bytes(block_count * block_size)
+        offset += total_size
+    return raw_data
+
+
+class TestSyntheticFirmware(unittest.TestCase):
+    """Test the synthetic firmware formats of the benchmarks."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.raw_image_path = os.path.join(self.temp_dir.name, "system.img")
+        create_raw_image(self.raw_image_path, 20)
+        with open(self.raw_image_path, "rb") as image_file:
+            self.raw_data = image_file.read()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_sparse_image_round_trip(self):
+        """Test that the sparse image expands to the raw image."""
+        sparse_image_path = create_sparse_image(self.raw_image_path, os.path.join(self.temp_dir.name, "sparse.img"))
+        self.assertLess(os.path.getsize(sparse_image_path), len(self.raw_data))
+        self.assertEqual(read_sparse_image(sparse_image_path), self.raw_data)
+
+    def test_dat_files_are_converted_by_the_importer(self):
+        """Test that the dat converter of the importer restores the raw image from the dat files."""
+        dat_path, transfer_list_path = create_dat_files(self.raw_image_path,
+                                                        os.path.join(self.temp_dir.name, "system.new.dat"),
+                                                        os.path.join(self.temp_dir.name, "system.transfer.list"))
+        output_path = os.path.join(self.temp_dir.name, "converted.img")
+        start_dat_conversion(dat_path, transfer_list_path, output_path)
+        with open(output_path, "rb") as output_file:
+            self.assertEqual(output_file.read(), self.raw_data)
+
+    def test_super_image_metadata(self):
+        """Test that the super image has valid checksums and contains the partition at its extent."""
+        super_image_path = create_super_image({"system": self.raw_image_path},
+                                              os.path.join(self.temp_dir.name, "super.img"))
+        with open(super_image_path, "rb") as super_file:
+            data = super_file.read()
+        geometry = data[LP_PARTITION_RESERVED_BYTES:LP_PARTITION_RESERVED_BYTES + 52]
+        self.assertEqual(hashlib.sha256(geometry[:8] + bytes(32) + geometry[40:]).digest(), geometry[8:40])
+        header_offset = LP_PARTITION_RESERVED_BYTES + 2 * LP_METADATA_GEOMETRY_SIZE
+        header = data[header_offset:header_offset + 128]
+        self.assertEqual(hashlib.sha256(header[:12] + bytes(32) + header[44:]).digest(), header[12:44])
+        tables_size = struct.unpack("<I", header[44:48])[0]
+        tables = data[header_offset + 128:header_offset + 128 + tables_size]
+        self.assertEqual(hashlib.sha256(tables).digest(), header[48:80])
+        name, _, _, _, _ = struct.unpack("<36s4I", tables[:52])
+        self.assertEqual(name.rstrip(b"\x00"), b"system_a")
+        num_sectors, _, first_sector, _ = struct.unpack("<QIQI", tables[52:76])
+        partition_data = data[first_sector * LP_SECTOR_SIZE:(first_sector + num_sectors) * LP_SECTOR_SIZE]
+        self.assertEqual(partition_data, self.raw_data)
+
+    def test_compare_with_baseline(self):
+        """Test that slower, larger or failed stages are reported as regression."""
+        baseline = {"scenario": {"file_count": 1}, "seed": 1,
+                    "stages": {"hashing": {"status": "ok", "duration_seconds": 10, "peak_rss_mb": 100},
+                               "indexer": {"status": "ok", "duration_seconds": 10, "peak_rss_mb": 100},
+                               "scanner": {"status": "ok", "duration_seconds": 10, "peak_rss_mb": 100}}}
+        result = {"scenario": {"file_count": 1}, "seed": 1,
+                  "stages": {"hashing": {"status": "ok", "duration_seconds": 12, "peak_rss_mb": 110},
+                             "indexer": {"status": "ok", "duration_seconds": 14, "peak_rss_mb": 150},
+                             "scanner": {"status": "failed", "peak_rss_mb": 50}}}
+        regression_list = compare_with_baseline(result, baseline, tolerance=0.25, memory_tolerance=0.25)
+        self.assertEqual(len(regression_list), 3)
+        self.assertTrue(all(not regression.startswith("hashing") for regression in regression_list))
+        with self.assertRaises(ValueError):
+            compare_with_baseline(dict(result, seed=2), baseline)
+
+    def test_failed_items_are_not_reported_as_ok(self):
+        """Test that a stage without a processed item fails and failed items are not counted as throughput."""
+        self.assertEqual(get_stage_status({"item_count": 5, "failed_count": 5}), STATUS_FAILED)
+        self.assertEqual(get_stage_status({"item_count": 5, "failed_count": 1}), STATUS_OK)
+        self.assertEqual(get_stage_status({"item_count": 0}), STATUS_OK)
+        summary = summarize_stage_runs([{"status": STATUS_OK, "duration_seconds": 2, "cpu_seconds": 1,
+                                         "peak_rss_mb": 10, "item_count": 5, "failed_count": 1,
+                                         "byte_count": 4 * 1024 * 1024}])
+        self.assertEqual(summary["items_per_second"], 2)
+        self.assertEqual(summary["megabytes_per_second"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import logging
+import time
+import unittest
+from unittest.mock import Mock, patch
+from log4mongo.handlers import MongoHandler
+from context.context_creator import AsyncTaggedMongoHandler
+
+
+def create_handler(**kwargs):
+    with patch.object(MongoHandler, "_connect"):
+        handler = AsyncTaggedMongoHandler(tags=["test"], details={}, **kwargs)
+    handler.collection = Mock()
+    return handler
+
+
+def create_record(level=logging.INFO):
+    return logging.LogRecord("apk_scanner_logger", level, __file__, 1, "message", None, None)
+
+
+class TestAsyncTaggedMongoHandler(unittest.TestCase):
+    """Test the queue based mongo log handler."""
+
+    def test_records_are_inserted_in_batches(self):
+        """Test that queued records are written with one insert_many on flush."""
+        handler = create_handler()
+        handler._ensure_writer = Mock()
+        for _ in range(3):
+            handler.emit(create_record())
+        handler.flush()
+        handler.collection.insert_many.assert_called_once()
+        document_list = handler.collection.insert_many.call_args[0][0]
+        self.assertEqual(len(document_list), 3)
+        self.assertEqual(document_list[0]["tags"], ["test"])
+
+    def test_close_writes_all_records(self):
+        """Test that the writer thread is stopped and no record is lost on close."""
+        handler = create_handler(flush_interval=60)
+        for _ in range(5):
+            handler.emit(create_record())
+        handler.close()
+        self.assertFalse(handler._writer_thread.is_alive())
+        inserted_count = sum(len(call[0][0]) for call in handler.collection.insert_many.call_args_list)
+        self.assertEqual(inserted_count, 5)
+
+    def test_flush_writes_batch_of_writer(self):
+        """Test that flush waits for the records the writer thread already took from the queue."""
+        handler = create_handler(flush_interval=60)
+        for _ in range(5):
+            handler.emit(create_record())
+        deadline = time.monotonic() + 5
+        while handler.get_statistics()["queued_count"] > 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        handler.collection.insert_many.assert_not_called()
+        handler.flush()
+        inserted_count = sum(len(call[0][0]) for call in handler.collection.insert_many.call_args_list)
+        self.assertEqual(inserted_count, 5)
+        self.assertTrue(handler._writer_thread.is_alive())
+        handler.close()
+
+    def test_full_queue_drops_records(self):
+        """Test that records are dropped and counted when the queue is full."""
+        handler = create_handler(queue_size=2)
+        handler._ensure_writer = Mock()
+        for _ in range(5):
+            handler.emit(create_record(logging.ERROR))
+        self.assertEqual(handler.get_statistics()["dropped_count"], 3)
+        self.assertEqual(handler.get_statistics()["queued_count"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import unittest
+from unittest.mock import patch
+from mongoengine import connection
+from database import connector
+
+
+def fake_register_connection(db_settings, alias='default', **kwargs):
+    connection._connections[alias] = object()
+
+
+@patch("database.connector.mongoengine.get_connection")
+@patch("database.connector.register_connection", side_effect=fake_register_connection)
+class TestConnectionRegistry(unittest.TestCase):
+    """Test that every process keeps a single registered connection."""
+
+    def setUp(self):
+        connector.multiprocess_disconnect_all()
+        connector._connection_registry["pid"] = None
+
+    def test_init_db_connects_once(self, mock_register, mock_get_connection):
+        """Test that repeated calls in the same process reuse the connection."""
+        connector.init_db({})
+        connector.init_db({})
+        self.assertEqual(mock_register.call_count, 1)
+        self.assertTrue(connector.is_db_connected())
+
+    def test_init_db_reconnects_after_fork(self, mock_register, mock_get_connection):
+        """Test that a pid change creates a new connection."""
+        connector.init_db({})
+        connector._connection_registry["pid"] = -1
+        self.assertFalse(connector.is_db_connected())
+        connector.init_db({})
+        self.assertEqual(mock_register.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
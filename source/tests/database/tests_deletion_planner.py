@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+from database.deletion_planner import DeletionPlan, iter_object_id_chunks, remove_disk_paths
+
+
+class TestDeletionPlanner(unittest.TestCase):
+    """Test the bulk helpers of the deletion planner."""
+
+    def test_id_chunks(self):
+        """Test that ids are split into chunks of the batch size."""
+        chunk_list = list(iter_object_id_chunks(range(5), batch_size=2))
+        self.assertEqual(chunk_list, [[0, 1], [2, 3], [4]])
+
+    def test_planned_ids_are_deduplicated(self):
+        """Test that ids reached over several delete rules are only planned once."""
+        document_class = Mock()
+        document_class._get_collection_name.return_value = "android_app"
+        plan = DeletionPlan()
+        self.assertEqual(plan.add_ids(document_class, [1, 2]), [1, 2])
+        self.assertEqual(plan.add_ids(document_class, [2, 3]), [3])
+        self.assertEqual(plan.get_document_count_dict(), {"android_app": 3})
+
+    def test_remove_disk_paths(self):
+        """Test that files and directories are removed in parallel and missing paths are ignored."""
+        with tempfile.TemporaryDirectory() as root_dir:
+            file_path = os.path.join(root_dir, "firmware.zip")
+            dir_path = os.path.join(root_dir, "apps")
+            os.makedirs(os.path.join(dir_path, "nested"))
+            open(file_path, "w").close()
+            removed_count = remove_disk_paths([file_path, dir_path, os.path.join(root_dir, "missing")])
+            self.assertEqual(removed_count, 2)
+            self.assertEqual(os.listdir(root_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import unittest
+from database.query_document import iter_documents_by_ids
+
+
+class FakeDocument:
+    def __init__(self, pk):
+        self.pk = pk
+
+
+class FakeQuerySet:
+    def __init__(self, document_list):
+        self.document_list = document_list
+
+    def only(self, *field_names):
+        return self
+
+    def no_dereference(self):
+        return self
+
+    def __iter__(self):
+        return iter(self.document_list)
+
+
+class FakeDocumentClass:
+    """Stores documents by object-id and records the ids of every $in query."""
+
+    def __init__(self, object_id_list):
+        self.document_dict = {object_id: FakeDocument(object_id) for object_id in object_id_list}
+        self.query_list = []
+
+    def objects(self, pk__in):
+        self.query_list.append(list(pk__in))
+        return FakeQuerySet([self.document_dict[object_id] for object_id in sorted(pk__in)
+                             if object_id in self.document_dict])
+
+
+class TestQueryDocument(unittest.TestCase):
+    """Test the batched loading of documents by object-id."""
+
+    def setUp(self):
+        self.object_id_list = [f"{index:024x}" for index in range(7)]
+
+    def test_documents_keep_input_order(self):
+        """Test that the documents are yielded in input order and not in database order."""
+        document_class = FakeDocumentClass(self.object_id_list)
+        reversed_id_list = list(reversed(self.object_id_list))
+        document_list = list(iter_documents_by_ids(reversed_id_list, document_class))
+        self.assertEqual([document.pk for document in document_list], reversed_id_list)
+
+    def test_missing_ids_are_skipped(self):
+        """Test that ids without document are skipped."""
+        document_class = FakeDocumentClass(self.object_id_list[:3])
+        document_list = list(iter_documents_by_ids(self.object_id_list, document_class))
+        self.assertEqual([document.pk for document in document_list], self.object_id_list[:3])
+
+    def test_ids_are_queried_in_batches(self):
+        """Test that every batch of ids is loaded with one query."""
+        document_class = FakeDocumentClass(self.object_id_list)
+        document_list = list(iter_documents_by_ids(self.object_id_list, document_class, batch_size=3))
+        self.assertEqual(len(document_list), 7)
+        self.assertEqual([len(id_chunk) for id_chunk in document_class.query_list], [3, 3, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
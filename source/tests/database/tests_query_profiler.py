@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+from database.query_profiler import (get_command_shape, get_docs_examined, get_docs_returned,
+                                     SlowOperationProfiler)
+
+
+class TestQueryShape(unittest.TestCase):
+    """Test the normalisation of commands for the slow operation log."""
+
+    def test_find_values_are_replaced(self):
+        """Test that finds which only differ in their values have the same shape."""
+        shape = get_command_shape("find", {"find": "firmware_file",
+                                           "filter": {"firmware_id_reference": "a", "name": {"$regex": "^x"}}})
+        other_shape = get_command_shape("find", {"find": "firmware_file",
+                                                 "filter": {"firmware_id_reference": "b", "name": {"$regex": "y"}}})
+        self.assertEqual(shape, other_shape)
+        self.assertEqual(json.loads(shape), {"filter": {"firmware_id_reference": "?", "name": {"$regex": "?"}}})
+
+    def test_pipeline_stages_are_reduced(self):
+        """Test that only the $match stages of a pipeline keep their structure."""
+        shape = get_command_shape("aggregate", {"pipeline": [{"$match": {"$or": [{"md5": "a"}, {"sha1": "b"}]}},
+                                                             {"$group": {"_id": "$md5"}}]})
+        self.assertEqual(json.loads(shape), {"pipeline": [{"$match": {"$or": [{"md5": "?"}, {"sha1": "?"}]}},
+                                                          "$group"]})
+
+    def test_docs_examined_are_summed(self):
+        """Test that the examined documents of every stage are summed."""
+        explain_reply = {"stages": [{"$cursor": {"executionStats": {"totalDocsExamined": 5}}},
+                                    {"$lookup": {"executionStats": {"totalDocsExamined": 7}}}]}
+        self.assertEqual(get_docs_examined(explain_reply), 12)
+        self.assertEqual(get_docs_returned("find", {"cursor": {"firstBatch": [{}, {}]}}), 2)
+
+
+class TestSlowOperationProfiler(unittest.TestCase):
+    """Test that only slow commands are queued."""
+
+    @patch.object(SlowOperationProfiler, "ensure_writer")
+    def test_threshold(self, mock_ensure_writer):
+        profiler = SlowOperationProfiler(threshold_ms=100)
+        for request_id, duration_micros in ((1, 50 * 1000), (2, 150 * 1000)):
+            command = {"find": "android_app", "filter": {"firmware_id_reference": request_id}}
+            profiler.started(SimpleNamespace(command_name="find", command=command, database_name="db",
+                                             request_id=request_id))
+            profiler.succeeded(SimpleNamespace(command_name="find", request_id=request_id,
+                                               duration_micros=duration_micros,
+                                               reply={"cursor": {"firstBatch": []}}))
+        self.assertEqual(profiler.record_queue.qsize(), 1)
+        self.assertEqual(profiler.record_queue.get()["duration_ms"], 150)
+        self.assertEqual(profiler.started_command_dict, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import io
+import unittest
+from file_download.download_backend import (parse_range_header, is_if_range_valid, RangeNotSatisfiable,
+                                            RangeFileReader)
+
+
+class TestRangeRequests(unittest.TestCase):
+    """Test the parsing of Range and If-Range headers."""
+
+    def test_parse_range_header(self):
+        self.assertEqual(parse_range_header("bytes=0-99", 1000), (0, 99))
+        self.assertEqual(parse_range_header("bytes=900-", 1000), (900, 999))
+        self.assertEqual(parse_range_header("bytes=-100", 1000), (900, 999))
+        self.assertEqual(parse_range_header("bytes=500-5000", 1000), (500, 999))
+        self.assertIsNone(parse_range_header(None, 1000))
+        self.assertIsNone(parse_range_header("bytes=0-1,5-6", 1000))
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range_header("bytes=1000-", 1000)
+
+    def test_if_range(self):
+        self.assertTrue(is_if_range_valid(None, '"a-1"', "Mon, 01 Jan 2024 00:00:00 GMT"))
+        self.assertTrue(is_if_range_valid('"a-1"', '"a-1"', "Mon, 01 Jan 2024 00:00:00 GMT"))
+        self.assertFalse(is_if_range_valid('"a-2"', '"a-1"', "Mon, 01 Jan 2024 00:00:00 GMT"))
+        self.assertFalse(is_if_range_valid("Tue, 02 Jan 2024 00:00:00 GMT", '"a-1"',
+                                           "Mon, 01 Jan 2024 00:00:00 GMT"))
+
+    def test_range_file_reader(self):
+        file = io.BytesIO(b"0123456789")
+        file.seek(2)
+        reader = RangeFileReader(file, 5)
+        self.assertEqual(reader.read(3), b"234")
+        self.assertEqual(reader.read(10), b"56")
+        self.assertEqual(reader.read(10), b"")
+
+
+if __name__ == '__main__':
+    unittest.main()
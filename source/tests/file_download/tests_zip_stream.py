@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+from file_download.zip_stream import iter_zip_stream
+
+
+class TestZipStream(unittest.TestCase):
+    """Test the streamed zip archives."""
+
+    def test_stream_is_valid_zip(self):
+        """Test that apks are stored, text is deflated and missing files are skipped."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            apk_path = os.path.join(temp_dir, "app.apk")
+            xml_path = os.path.join(temp_dir, "build.xml")
+            with open(apk_path, "wb") as apk_file:
+                apk_file.write(os.urandom(300000))
+            with open(xml_path, "w") as xml_file:
+                xml_file.write("<module/>" * 1000)
+            entry_list = [("1/app.apk", apk_path), ("2/build.xml", xml_path), ("3/missing.apk", "/nonexistent")]
+            chunk_list = list(iter_zip_stream(entry_list, block_size=65536))
+        self.assertGreater(len(chunk_list), 2)
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunk_list))) as zip_file:
+            self.assertIsNone(zip_file.testzip())
+            info_dict = {info.filename: info for info in zip_file.infolist()}
+        self.assertEqual(sorted(info_dict), ["1/app.apk", "2/build.xml"])
+        self.assertEqual(info_dict["1/app.apk"].compress_type, zipfile.ZIP_STORED)
+        self.assertEqual(info_dict["2/build.xml"].compress_type, zipfile.ZIP_DEFLATED)
+
+
+if __name__ == '__main__':
+    unittest.main()
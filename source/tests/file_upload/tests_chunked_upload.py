@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import hashlib
+import os
+import tempfile
+import unittest
+from file_upload import chunked_upload
+from file_upload.chunked_upload import (create_upload_session, write_upload_chunk, finalize_upload_session,
+                                        UploadSessionError, DuplicateUploadError)
+from hashing.upload_digest import read_digest_record
+
+USER_ID = 1
+
+
+class TestChunkedUpload(unittest.TestCase):
+    """Test the resumable upload sessions."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store_paths = {"UPLOADS": os.path.join(self.temp_dir.name, "uploads")}
+        self.import_path = os.path.join(self.temp_dir.name, "firmware_import")
+        self.data = os.urandom(3000)
+        state = create_upload_session(self.store_paths, "firmware", "firmware.zip", len(self.data), 0, USER_ID)
+        self.session_id = state["session_id"]
+
+    def tearDown(self):
+        chunked_upload._hasher_cache.clear()
+        self.temp_dir.cleanup()
+
+    def test_resume_after_restart(self):
+        """Test that the hashes are restored if the hashers of a session are lost."""
+        write_upload_chunk(self.store_paths, self.session_id, USER_ID, 0, [self.data[:1000], self.data[1000:1500]])
+        chunked_upload._hasher_cache.clear()
+        with self.assertRaises(UploadSessionError) as context:
+            write_upload_chunk(self.store_paths, self.session_id, USER_ID, 1000, [self.data[1000:]])
+        self.assertEqual(context.exception.received_bytes, 1500)
+        write_upload_chunk(self.store_paths, self.session_id, USER_ID, 1500, [self.data[1500:]])
+        digest_dict = finalize_upload_session(self.store_paths, self.session_id, USER_ID, self.import_path,
+                                              lambda digests: False)
+        file_path = os.path.join(self.import_path, "firmware.zip")
+        self.assertEqual(digest_dict["sha256"], hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(digest_dict["md5"], hashlib.md5(self.data).hexdigest())
+        self.assertEqual(read_digest_record(self.store_paths, file_path), digest_dict)
+        with open(file_path, "rb") as upload_file:
+            self.assertEqual(upload_file.read(), self.data)
+
+    def test_incomplete_and_duplicate_upload(self):
+        """Test that incomplete uploads can not be finalized and duplicates are removed."""
+        write_upload_chunk(self.store_paths, self.session_id, USER_ID, 0, [self.data[:100]])
+        with self.assertRaises(UploadSessionError):
+            finalize_upload_session(self.store_paths, self.session_id, USER_ID, self.import_path, lambda d: False)
+        write_upload_chunk(self.store_paths, self.session_id, USER_ID, 100, [self.data[100:]])
+        with self.assertRaises(DuplicateUploadError):
+            finalize_upload_session(self.store_paths, self.session_id, USER_ID, self.import_path, lambda d: True)
+        self.assertFalse(os.path.exists(os.path.join(self.import_path, "firmware.zip")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import unittest
+from unittest.mock import MagicMock, patch
+from firmware_handler.firmware_importer import lock_store_import, FIRMWARE_IMPORT_LOCK_PREFIX
+
+
+@patch("firmware_handler.firmware_importer.get_redis_connection")
+@patch("firmware_handler.firmware_importer.get_current_rq_job", return_value=None)
+@patch("firmware_handler.firmware_importer.redis_lock.Lock")
+class TestFirmwareImportLock(unittest.TestCase):
+    """Test that the imports of a store are mutually exclusive."""
+
+    def setUp(self):
+        self.store_setting = MagicMock(uuid="store-1")
+
+    def test_free_lock_is_acquired_without_waiting(self, mock_lock, mock_job, mock_connection):
+        """Test that the lock of the store is acquired once and released after the import."""
+        import_lock = mock_lock.return_value
+        import_lock.acquire.return_value = True
+        with lock_store_import(self.store_setting):
+            import_lock.release.assert_not_called()
+        self.assertEqual(mock_lock.call_args[0][1], f"{FIRMWARE_IMPORT_LOCK_PREFIX}store-1")
+        self.assertTrue(mock_lock.call_args[1]["auto_renewal"])
+        import_lock.acquire.assert_called_once_with(blocking=False)
+        import_lock.release.assert_called_once()
+
+    def test_busy_lock_waits_and_is_released_on_error(self, mock_lock, mock_job, mock_connection):
+        """Test that a second import waits for the running import and releases the lock if it fails."""
+        import_lock = mock_lock.return_value
+        import_lock.acquire.return_value = False
+        with self.assertRaises(ValueError):
+            with lock_store_import(self.store_setting):
+                raise ValueError("No files in import folder")
+        self.assertEqual(import_lock.acquire.call_count, 2)
+        self.assertEqual(import_lock.acquire.call_args_list[1], ((),))
+        import_lock.release.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
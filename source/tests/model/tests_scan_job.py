@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import os
+import unittest
+from unittest.mock import patch
+import django
+from bson import ObjectId
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "webserver.settings")
+
+SCANNER_NAME = "APKiD"
+
+
+def create_scan_job(object_id_list, scanner_version, scanner_name=SCANNER_NAME):
+    from model.Interfaces.ScanJob import ScanJob
+
+    class ExampleScanJob(ScanJob):
+        SCANNER_NAME = scanner_name
+        SCANNER_VERSION = scanner_version
+
+        def __init__(self, object_id_list, kwargs):
+            self.object_id_list = object_id_list
+
+        def start_scan(self):
+            pass
+
+    return ExampleScanJob(object_id_list, {})
+
+
+class TestScanJob(unittest.TestCase):
+    """Test the selection of apps for incremental scans on an in-memory database."""
+
+    @classmethod
+    def setUpClass(cls):
+        with patch("redis.StrictRedis.ping"), patch("setup.default_setup.setup_default_settings"):
+            django.setup()
+        from database.connector import init_mock_db
+        init_mock_db("fmd_tests_scan_job")
+
+    def setUp(self):
+        from model import ApkScannerReport
+        collection = ApkScannerReport._get_collection()
+        collection.delete_many({})
+        self.app_id_dict = {name: str(ObjectId()) for name in ["completed", "failed", "retried", "missing",
+                                                               "other_version", "other_scanner"]}
+        self.object_id_list = list(self.app_id_dict.values())
+        for name, scanner_name, scanner_version, scan_status in [("completed", SCANNER_NAME, "1.0", "completed"),
+                                                                 ("failed", SCANNER_NAME, "1.0", "failed"),
+                                                                 ("retried", SCANNER_NAME, "1.0", "failed"),
+                                                                 ("retried", SCANNER_NAME, "1.0", "completed"),
+                                                                 ("other_version", SCANNER_NAME, "2.0", "completed"),
+                                                                 ("other_scanner", "Androwarn", "1.0", "completed")]:
+            collection.insert_one({"_cls": "ApkScannerReport.ApkidReport",
+                                   "android_app_id_reference": ObjectId(self.app_id_dict[name]),
+                                   "scanner_name": scanner_name,
+                                   "scanner_version": scanner_version,
+                                   "scan_status": scan_status})
+
+    def get_app_ids(self, *name_list):
+        return [self.app_id_dict[name] for name in name_list]
+
+    def test_scan_status_dict(self):
+        """Test that the scan states are grouped per app for one scanner and version."""
+        from model.Interfaces.ScanJob import get_app_scan_status_dict
+        scan_status_dict = get_app_scan_status_dict(self.object_id_list, SCANNER_NAME, "1.0")
+        self.assertEqual(scan_status_dict, {self.app_id_dict["completed"]: {"completed"},
+                                            self.app_id_dict["failed"]: {"failed"},
+                                            self.app_id_dict["retried"]: {"completed", "failed"}})
+        all_version_dict = get_app_scan_status_dict(self.object_id_list, SCANNER_NAME)
+        self.assertEqual(all_version_dict[self.app_id_dict["other_version"]], {"completed"})
+        self.assertNotIn(self.app_id_dict["other_scanner"], all_version_dict)
+
+    def test_filter_scan_id_list(self):
+        """Test that completed apps are skipped and only failed apps are kept when rescanning failed apps."""
+        from model.Interfaces.ScanJob import filter_scan_id_list
+        scan_status_dict = {self.app_id_dict["completed"]: {"completed"},
+                            self.app_id_dict["failed"]: {"failed"},
+                            self.app_id_dict["retried"]: {"completed", "failed"}}
+        self.assertEqual(filter_scan_id_list(self.object_id_list, scan_status_dict),
+                         self.get_app_ids("failed", "missing", "other_version", "other_scanner"))
+        self.assertEqual(filter_scan_id_list(self.object_id_list, scan_status_dict, rescan_failed_only=True),
+                         self.get_app_ids("failed"))
+
+    def test_incremental_scan_id_list(self):
+        """Test that reports of the same scanner version decide which apps are scanned again."""
+        scan_job = create_scan_job(self.object_id_list, "1.0")
+        self.assertEqual(scan_job.get_scan_id_list(), self.object_id_list)
+        scan_job.set_scan_mode(incremental=True)
+        self.assertEqual(scan_job.get_scan_id_list(),
+                         self.get_app_ids("failed", "missing", "other_version", "other_scanner"))
+        scan_job.set_scan_mode(rescan_failed_only=True)
+        self.assertEqual(scan_job.get_scan_id_list(), self.get_app_ids("failed"))
+
+    def test_new_scanner_version_scans_again(self):
+        """Test that apps with reports of an older scanner version are scanned again."""
+        scan_job = create_scan_job(self.object_id_list, "2.0")
+        scan_job.set_scan_mode(incremental=True)
+        self.assertEqual(scan_job.get_scan_id_list(),
+                         self.get_app_ids("completed", "failed", "retried", "missing", "other_scanner"))
+        unnamed_scan_job = create_scan_job(self.object_id_list, "2.0", scanner_name=None)
+        unnamed_scan_job.set_scan_mode(incremental=True)
+        self.assertEqual(unnamed_scan_job.get_scan_id_list(), self.object_id_list)
+
+
+if __name__ == '__main__':
+    unittest.main()
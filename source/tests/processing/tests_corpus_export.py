@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import datetime
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import django
+import zstandard
+from bson import ObjectId, DBRef
+from processing.corpus_export import to_export_value, read_manifest, write_manifest, iter_export_rows, \
+    start_corpus_export, EXPORT_FORMAT_PARQUET
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "webserver.settings")
+
+EXPORT_ID = "6f0d1b4e-8a7e-4c8e-9b6a-3f1e2d4c5b6a"
+
+
+def read_ndjson_chunk(file_path):
+    with open(file_path, "rb") as chunk_file:
+        content = zstandard.ZstdDecompressor().stream_reader(chunk_file).read()
+    return [json.loads(line) for line in content.decode("utf-8").splitlines()]
+
+
+class TestCorpusExport(unittest.TestCase):
+    """Test the serialisation and manifest handling of the corpus export."""
+
+    def test_export_values_are_json_compatible(self):
+        """Test that mongodb types are converted recursively."""
+        object_id = ObjectId()
+        value = {"ref": DBRef("android_app", object_id),
+                 "date": datetime.datetime(2024, 1, 2, 3, 4, 5),
+                 "list": [object_id, b"\x00\x01"]}
+        self.assertEqual(to_export_value(value), {"ref": str(object_id),
+                                                  "date": "2024-01-02T03:04:05",
+                                                  "list": [str(object_id), "AAE="]})
+
+    def test_manifest_roundtrip(self):
+        """Test that the manifest is replaced and read back."""
+        with tempfile.TemporaryDirectory() as export_folder:
+            self.assertIsNone(read_manifest(export_folder))
+            write_manifest(export_folder, {"row_count": 1, "chunk_list": []})
+            write_manifest(export_folder, {"row_count": 2, "chunk_list": []})
+            manifest = read_manifest(export_folder)
+            self.assertEqual(manifest["row_count"], 2)
+            self.assertIn("update_date", manifest)
+
+
+class TestCorpusExportResume(unittest.TestCase):
+    """Test that exports are written in chunks and resumed on an in-memory database."""
+
+    @classmethod
+    def setUpClass(cls):
+        with patch("redis.StrictRedis.ping"), patch("setup.default_setup.setup_default_settings"):
+            django.setup()
+        from database.connector import init_mock_db
+        init_mock_db("fmd_tests_corpus_export")
+
+    def setUp(self):
+        from model.SsDeepHash import SsDeepHash
+        collection = SsDeepHash._get_collection()
+        collection.delete_many({})
+        self.object_id_list = sorted(ObjectId() for _ in range(5))
+        collection.insert_many([{"_id": object_id, "filename": f"lib{index}.so", "digest": "3:a:b"}
+                                for index, object_id in enumerate(self.object_id_list)])
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        folder_patch = patch("processing.corpus_export.get_export_folder", return_value=self.temp_dir.name)
+        folder_patch.start()
+        self.addCleanup(folder_patch.stop)
+
+    def start_export(self, progress, export_format="ndjson"):
+        with patch("processing.corpus_export.get_job_progress", return_value=progress):
+            return start_corpus_export(EXPORT_ID,
+                                       "SsDeepHash",
+                                       object_id_list=[str(object_id) for object_id in self.object_id_list],
+                                       field_name_list=["filename"],
+                                       export_format=export_format,
+                                       rows_per_chunk=2)
+
+    def test_interrupted_export_resumes_without_duplicates(self):
+        """Test that a resumed export continues after the last complete chunk and counts the total once."""
+        def iter_interrupted_rows(model, manifest):
+            for row_index, row in enumerate(iter_export_rows(model, manifest)):
+                if row_index == 3:
+                    raise RuntimeError("Worker stopped")
+                yield row
+
+        first_progress, second_progress = MagicMock(), MagicMock()
+        with patch("processing.corpus_export.iter_export_rows", side_effect=iter_interrupted_rows):
+            with self.assertRaises(RuntimeError):
+                self.start_export(first_progress)
+        interrupted_manifest = read_manifest(self.temp_dir.name)
+        self.assertEqual(interrupted_manifest["row_count"], 2)
+        self.assertEqual(len(interrupted_manifest["chunk_list"]), 1)
+
+        manifest = self.start_export(second_progress)
+        exported_id_list = [row["id"] for chunk in manifest["chunk_list"]
+                            for row in read_ndjson_chunk(os.path.join(self.temp_dir.name, chunk["file_name"]))]
+        self.assertEqual(exported_id_list, [str(object_id) for object_id in self.object_id_list])
+        self.assertEqual(manifest["row_count"], 5)
+        self.assertEqual([chunk["row_count"] for chunk in manifest["chunk_list"]], [2, 2, 1])
+        self.assertFalse([file_name for file_name in os.listdir(self.temp_dir.name) if file_name.endswith(".tmp")])
+        first_progress.start.assert_called_once_with(stage="export", items_total=5)
+        second_progress.start.assert_called_once_with(stage="export", items_total=None)
+        done_count = sum(call[1]["count"] for progress in [first_progress, second_progress]
+                         for call in progress.item_done.call_args_list)
+        self.assertEqual(done_count, 5)
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_parquet_export(self):
+        """Test that parquet chunks contain the typed columns of all rows."""
+        import pyarrow.parquet
+        manifest = self.start_export(None, export_format=EXPORT_FORMAT_PARQUET)
+        table_list = [pyarrow.parquet.read_table(os.path.join(self.temp_dir.name, chunk["file_name"]))
+                      for chunk in manifest["chunk_list"]]
+        self.assertEqual(table_list[0].schema.names, ["id", "filename"])
+        self.assertEqual([row["id"] for table in table_list for row in table.to_pylist()],
+                         [str(object_id) for object_id in self.object_id_list])
+        self.assertEqual(table_list[-1].to_pylist(), [{"id": str(self.object_id_list[-1]), "filename": "lib4.so"}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import unittest
+from unittest.mock import MagicMock, patch
+from rq.job import JobStatus
+from processing.job_coalescing import create_job_fingerprint, enqueue_unique, JOB_FINGERPRINT_KEY_PREFIX
+
+
+class FakeConnection:
+    def __init__(self):
+        self.value_dict = {}
+
+    def get(self, key):
+        value = self.value_dict.get(key)
+        return value.encode() if value else None
+
+    def set(self, key, value, ex=None):
+        self.value_dict[key] = value
+
+
+def create_queue():
+    queue = MagicMock()
+    queue.connection = FakeConnection()
+    job_list = []
+
+    def enqueue(func, *args, **kwargs):
+        job = MagicMock(id=f"job-{len(job_list)}", meta=kwargs.get("meta"))
+        job.get_status.return_value = JobStatus.QUEUED
+        job_list.append(job)
+        return job
+
+    queue.enqueue.side_effect = enqueue
+    return queue, job_list
+
+
+class TestJobFingerprint(unittest.TestCase):
+    """Test the fingerprints used to coalesce identical job requests."""
+
+    def test_id_order_is_ignored(self):
+        """Test that the same ids in another order or with duplicates have the same fingerprint."""
+        fingerprint = create_job_fingerprint("scan:APKID", ["b", "a"], {"incremental": False, "kwargs": {}})
+        other_fingerprint = create_job_fingerprint("scan:APKID", ["a", "b", "a"], {"kwargs": {}, "incremental": False})
+        self.assertEqual(fingerprint, other_fingerprint)
+
+    def test_arguments_are_part_of_the_fingerprint(self):
+        """Test that another scanner or other arguments create another fingerprint."""
+        fingerprint = create_job_fingerprint("scan:APKID", ["a"], {"incremental": False})
+        self.assertNotEqual(fingerprint, create_job_fingerprint("scan:EXODUS", ["a"], {"incremental": False}))
+        self.assertNotEqual(fingerprint, create_job_fingerprint("scan:APKID", ["a"], {"incremental": True}))
+
+
+
+@patch("processing.job_coalescing.redis_lock.Lock")
+class TestEnqueueUnique(unittest.TestCase):
+    """Test that identical requests are coalesced into the job in flight."""
+
+    def setUp(self):
+        self.queue, self.job_list = create_queue()
+        fetch_patcher = patch("processing.job_coalescing.Job.fetch",
+                              side_effect=lambda job_id, connection: next(job for job in self.job_list
+                                                                          if job.id == job_id))
+        fetch_patcher.start()
+        self.addCleanup(fetch_patcher.stop)
+
+    def test_identical_request_returns_job_in_flight(self, mock_lock):
+        """Test that a second identical request returns the queued job instead of enqueuing."""
+        job = enqueue_unique(self.queue, "fingerprint", print, "a", job_timeout=10, meta={"profile_mode": None})
+        other_job = enqueue_unique(self.queue, "fingerprint", print, "a", job_timeout=10)
+        self.assertIs(other_job, job)
+        self.assertEqual(self.queue.enqueue.call_count, 1)
+        self.assertEqual(job.meta["fingerprint"], "fingerprint")
+        self.assertEqual(self.queue.connection.value_dict[f"{JOB_FINGERPRINT_KEY_PREFIX}fingerprint"], job.id)
+
+    def test_ended_job_is_not_coalesced(self, mock_lock):
+        """Test that a new job is enqueued if the job of the fingerprint ended or another request is made."""
+        job = enqueue_unique(self.queue, "fingerprint", print)
+        job.get_status.return_value = JobStatus.FINISHED
+        new_job = enqueue_unique(self.queue, "fingerprint", print)
+        self.assertIsNot(new_job, job)
+        self.assertIsNot(enqueue_unique(self.queue, "other_fingerprint", print), new_job)
+        self.assertEqual(self.queue.enqueue.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import unittest
+from processing.job_progress import JobProgress, parse_job_progress, get_progress_key
+
+
+class RecordingPipeline:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def hincrby(self, key, name, value):
+        self.connection.hash_dict.setdefault(key, {})
+        self.connection.hash_dict[key][name] = self.connection.hash_dict[key].get(name, 0) + value
+
+    def hset(self, key, mapping):
+        self.connection.hash_dict.setdefault(key, {}).update(mapping)
+
+    def expire(self, key, seconds):
+        pass
+
+    def execute(self):
+        self.connection.execute_count += 1
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.hash_dict = {}
+        self.execute_count = 0
+
+    def pipeline(self, transaction=True):
+        return RecordingPipeline(self)
+
+    def hsetnx(self, key, name, value):
+        self.hash_dict.setdefault(key, {}).setdefault(name, value)
+
+
+class TestJobProgress(unittest.TestCase):
+    """Test the progress reporting of long-running jobs."""
+
+    def test_counters_are_batched(self):
+        """Test that items are summed up in memory and written with one pipeline per flush."""
+        connection = RecordingConnection()
+        progress = JobProgress("job-1", connection, flush_interval=3600)
+        progress.start(stage="import", items_total=3)
+        execute_count = connection.execute_count
+        progress.item_done(100)
+        progress.item_done(50)
+        progress.item_failed()
+        self.assertEqual(connection.execute_count, execute_count)
+        progress.finish()
+        stored = connection.hash_dict[get_progress_key("job-1")]
+        self.assertEqual(stored["items_done"], 2)
+        self.assertEqual(stored["items_failed"], 1)
+        self.assertEqual(stored["bytes_processed"], 150)
+        self.assertEqual(stored["stage"], "import")
+        self.assertEqual(stored["status"], "finished")
+
+    def test_parse_throughput(self):
+        """Test that the rate is computed between the first and the last report."""
+        progress = parse_job_progress("job-1", {b"items_total": b"10", b"items_done": b"4", b"items_failed": b"1",
+                                                b"bytes_processed": b"1000", b"started_at": b"100.0",
+                                                b"updated_at": b"110.0", b"stage": b"scan:APKiD"})
+        self.assertEqual(progress["stage"], "scan:APKiD")
+        self.assertEqual(progress["items_per_second"], 0.5)
+        self.assertEqual(progress["bytes_per_second"], 100.0)
+        self.assertEqual(progress["percent"], 50.0)
+        self.assertIsNone(parse_job_progress("job-2", {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
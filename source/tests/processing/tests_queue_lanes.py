@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import unittest
+from processing.queue_lanes import resolve_lane_queue_name, get_base_queue_name
+
+QUEUE_NAME_LIST = ["extractor", "scanner", "extractor_interactive", "scanner_interactive", "extractor_bulk",
+                   "scanner_bulk"]
+
+
+class TestQueueLanes(unittest.TestCase):
+    """Test the selection of priority lanes."""
+
+    def test_lane_by_job_size(self):
+        """Test that small scans are interactive and large scans bulk."""
+        self.assertEqual(resolve_lane_queue_name("scanner", 10, queue_name_list=QUEUE_NAME_LIST),
+                         "scanner_interactive")
+        self.assertEqual(resolve_lane_queue_name("scanner", 1000, queue_name_list=QUEUE_NAME_LIST), "scanner")
+        self.assertEqual(resolve_lane_queue_name("scanner", 100000, queue_name_list=QUEUE_NAME_LIST),
+                         "scanner_bulk")
+        self.assertEqual(resolve_lane_queue_name("extractor", queue_name_list=QUEUE_NAME_LIST), "extractor")
+
+    def test_explicit_lane(self):
+        """Test that a requested lane or lane queue overrides the size."""
+        self.assertEqual(resolve_lane_queue_name("scanner", 100000, "normal", QUEUE_NAME_LIST), "scanner")
+        self.assertEqual(resolve_lane_queue_name("scanner_bulk", 10, queue_name_list=QUEUE_NAME_LIST),
+                         "scanner_bulk")
+        self.assertEqual(resolve_lane_queue_name("scanner", 10, queue_name_list=["scanner"]), "scanner")
+        self.assertEqual(get_base_queue_name("extractor_interactive"), "extractor")
+
+
+if __name__ == '__main__':
+    unittest.main()
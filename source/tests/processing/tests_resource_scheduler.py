@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import unittest
+from unittest.mock import patch
+from processing.resource_scheduler import AdaptiveTaskScheduler, estimate_task_memory_bytes, get_resource_profile, \
+    get_max_number_of_processes, MB
+
+GB = 1024 * MB
+
+
+class TestResourceScheduler(unittest.TestCase):
+    """Test the admission control of the adaptive scan scheduler."""
+
+    def test_profile_fallback(self):
+        """Test that unknown modules use the default profile."""
+        profile = get_resource_profile("static_analysis.Unknown.unknown_wrapper")
+        self.assertEqual(profile["cpu_per_task"], 1)
+
+    def test_estimate_scales_with_apk_size(self):
+        """Test that bigger apks get a bigger memory estimate."""
+        profile = get_resource_profile("static_analysis.FlowDroid.flowdroid_wrapper")
+        small = estimate_task_memory_bytes(profile, 1 * MB)
+        large = estimate_task_memory_bytes(profile, 100 * MB)
+        self.assertGreater(large, small)
+
+    @patch("processing.resource_scheduler.get_available_cpu_count", return_value=64)
+    @patch("processing.resource_scheduler.get_memory_limit_bytes", return_value=32 * GB)
+    def test_heavy_scanner_limited_by_memory(self, mock_limit, mock_cpu):
+        """Test that heavy scanners run fewer processes than light ones on the same host."""
+        heavy = get_max_number_of_processes(get_resource_profile("static_analysis.FlowDroid.flowdroid_wrapper"))
+        light = get_max_number_of_processes(get_resource_profile("static_analysis.APKiD.apkid_wrapper"))
+        self.assertLess(heavy, 8)
+        self.assertGreater(light, 64)
+
+    @patch("processing.resource_scheduler.get_memory_usage_bytes", return_value=1 * GB)
+    @patch("processing.resource_scheduler.get_memory_limit_bytes", return_value=10 * GB)
+    def test_admission_respects_budget(self, mock_limit, mock_usage):
+        """Test that tasks are only admitted while they fit into the memory budget."""
+        scheduler = AdaptiveTaskScheduler(get_resource_profile(None), max_workers=10)
+        self.assertTrue(scheduler.can_admit(6 * GB))
+        scheduler.admit(6 * GB)
+        self.assertFalse(scheduler.can_admit(4 * GB))
+        self.assertTrue(scheduler.can_admit(2 * GB))
+        scheduler.release(6 * GB)
+        self.assertTrue(scheduler.can_admit(20 * GB))
+
+    @patch("processing.resource_scheduler.get_memory_usage_bytes", return_value=95 * GB)
+    @patch("processing.resource_scheduler.get_memory_limit_bytes", return_value=100 * GB)
+    def test_backoff_under_pressure(self, mock_limit, mock_usage):
+        """Test that no further task is admitted while the memory usage is above the watermark."""
+        scheduler = AdaptiveTaskScheduler(get_resource_profile(None), max_workers=10)
+        scheduler.admit(1 * GB)
+        self.assertFalse(scheduler.can_admit(1 * GB))
+        self.assertLess(scheduler.next_backoff(), scheduler.next_backoff())
+
+
+if __name__ == '__main__':
+    unittest.main()
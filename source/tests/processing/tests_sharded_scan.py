@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import unittest
+from unittest.mock import MagicMock
+from rq.job import JobStatus
+from processing.sharded_scan import create_cost_balanced_shards, requeue_shard_job
+
+
+class TestShardedScan(unittest.TestCase):
+    """Test the sharding of scans and the retry of shards."""
+
+    def test_shards_have_balanced_cost(self):
+        """Test that the shards have roughly the same cost and keep the input order."""
+        cost_list = [("a", 10), ("b", 10), ("c", 10), ("d", 10), ("e", 40)]
+        shard_list = create_cost_balanced_shards(cost_list, 2)
+        self.assertEqual(shard_list, [["a", "b", "c", "d"], ["e"]])
+        self.assertEqual([object_id for shard in shard_list for object_id in shard], ["a", "b", "c", "d", "e"])
+
+    def test_shard_size_is_limited(self):
+        """Test that a shard never exceeds the maximal size and empty input has no shards."""
+        cost_list = [(str(index), 1) for index in range(10)]
+        shard_list = create_cost_balanced_shards(cost_list, 1, max_shard_size=3)
+        self.assertEqual([len(shard) for shard in shard_list], [3, 3, 3, 1])
+        self.assertEqual(create_cost_balanced_shards([], 4), [])
+
+    def test_single_expensive_app_gets_own_shard(self):
+        """Test that an app above the target cost is not merged with the following apps."""
+        shard_list = create_cost_balanced_shards([("a", 100), ("b", 1), ("c", 1)], 3)
+        self.assertEqual(shard_list, [["a"], ["b", "c"]])
+
+    def test_requeue_shard_job(self):
+        """Test that failed shards are requeued and stopped or canceled shards enqueued on the queue."""
+        queue = MagicMock()
+        failed_job = MagicMock()
+        failed_job.get_status.return_value = JobStatus.FAILED
+        requeue_shard_job(failed_job, queue)
+        failed_job.requeue.assert_called_once()
+        queue.enqueue_job.assert_not_called()
+        for status in [JobStatus.STOPPED, JobStatus.CANCELED]:
+            shard_job = MagicMock()
+            shard_job.get_status.return_value = status
+            requeue_shard_job(shard_job, queue)
+            shard_job.requeue.assert_not_called()
+            queue.enqueue_job.assert_called_with(shard_job)
+            queue.canceled_job_registry.remove.assert_called_with(shard_job)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import os
+import unittest
+from unittest.mock import patch
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "webserver.settings")
+
+
+class TestStatisticsEngine(unittest.TestCase):
+    """Test the statistics reports on an in-memory database."""
+
+    @classmethod
+    def setUpClass(cls):
+        with patch("redis.StrictRedis.ping"), patch("setup.default_setup.setup_default_settings"):
+            django.setup()
+        from database.connector import init_mock_db
+        init_mock_db("fmd_tests_statistics_engine")
+
+    def test_firmware_report_without_apps(self):
+        """Test that a report is stored for firmware samples without apps."""
+        from model import AndroidFirmware
+        from processing.statistics_engine import create_statistics_report
+        AndroidFirmware._get_collection().insert_one({"file_size_bytes": 10,
+                                                      "android_app_id_list": [],
+                                                      "os_vendor": "Google"})
+        report = create_statistics_report("FirmwareStatisticsReport", incremental=False)
+        self.assertEqual(report.report_count, 1)
+        self.assertEqual(report.android_app_count, 0)
+        self.assertIsNotNone(report.pk)
+
+    def test_quark_engine_report_counts_threat_levels(self):
+        """Test that the threat levels of completed quark-engine reports are counted per app."""
+        from bson import ObjectId
+        from model import QuarkEngineReport
+        from processing.statistics_engine import create_statistics_report
+        app_id_list = [ObjectId(), ObjectId()]
+        for app_id, threat_level, scan_status in [(app_id_list[0], "High Risk", "completed"),
+                                                  (app_id_list[1], "Low Risk", "completed"),
+                                                  (app_id_list[1], "High Risk", "failed")]:
+            QuarkEngineReport._get_collection().insert_one({"_cls": "ApkScannerReport.QuarkEngineReport",
+                                                           "android_app_id_reference": app_id,
+                                                           "scan_status": scan_status,
+                                                           "results": {"malware": {"threat_level": threat_level}}})
+        report = create_statistics_report("QuarkEngineStatisticsReport", incremental=False)
+        self.assertEqual(report.report_count, 2)
+        self.assertEqual(report.android_app_count, 2)
+        self.assertEqual(report.threat_level_count_dict, {"High Risk": 1, "Low Risk": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
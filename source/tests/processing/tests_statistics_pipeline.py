@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import unittest
+from database.mongodb_key_replacer import MONGODB_REPLACEMENT_CHARS
+from processing.statistics_pipeline import (create_value_count_pipeline, create_count_facet, create_bucket_facet,
+                                            create_max_facet, parse_facet_result, merge_facet_results,
+                                            group_results_to_count_dict)
+
+
+class TestStatisticsPipeline(unittest.TestCase):
+    """Test the aggregation pipeline builders of the statistics engine."""
+
+    def test_value_count_pipeline_unwinds_in_order(self):
+        """Test that arrays are unwound before the values are grouped."""
+        pipeline = create_value_count_pipeline("results.trackers.name", ["results.trackers"])
+        self.assertEqual(pipeline, [{"$unwind": "$results.trackers"},
+                                    {"$group": {"_id": "$results.trackers.name", "count": {"$sum": 1}}}])
+
+    def test_group_keys_are_valid_mongodb_keys(self):
+        """Test that grouped values with invalid key chars are escaped and summed up."""
+        count_dict = group_results_to_count_dict([{"_id": "com.example", "count": 2},
+                                                  {"_id": None, "count": 1},
+                                                  {"_id": "com.example", "count": 3}])
+        self.assertEqual(count_dict, {f"com{MONGODB_REPLACEMENT_CHARS}example": 5, "None": 1})
+
+    def test_incremental_merge(self):
+        """Test that facet results of an incremental run are added to the previous results."""
+        facet_dict = {"total": create_count_facet(),
+                      "buckets": create_bucket_facet("$size", [0, 10]),
+                      "last_id": create_max_facet("$_id")}
+        previous_result_dict = parse_facet_result(facet_dict, {"total": [{"value": 4}],
+                                                               "buckets": [{"_id": 0, "count": 4}],
+                                                               "last_id": [{"value": 7}]})
+        result_dict = parse_facet_result(facet_dict, {"total": [{"value": 2}],
+                                                      "buckets": [{"_id": 0, "count": 1},
+                                                                  {"_id": "other", "count": 1}],
+                                                      "last_id": []})
+        merged_dict = merge_facet_results(facet_dict, previous_result_dict, result_dict)
+        self.assertEqual(merged_dict, {"total": 6, "buckets": {"0": 5, "other": 1}, "last_id": 7})
+
+
+if __name__ == '__main__':
+    unittest.main()
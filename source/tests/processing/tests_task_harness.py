@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import sys
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+from processing import task_harness
+from processing.task_harness import run_scan_task, store_task_metrics, EXIT_CODE_TIMEOUT
+
+
+def exiting_worker(task):
+    pass
+
+
+def sleeping_worker(task, seconds):
+    time.sleep(seconds)
+
+
+class TestTaskHarness(unittest.TestCase):
+    """Test the timeout and the metrics of the scan task harness."""
+
+    def run_task(self, worker_function, worker_args_list, timeout):
+        with patch.dict(sys.modules, {"context.context_creator": MagicMock()}), \
+                patch.object(task_harness, "record_task_metrics"), \
+                patch.object(task_harness, "store_task_metrics") as store_mock:
+            metrics = run_scan_task(worker_function, "app-1", worker_args_list, timeout=timeout,
+                                    scanner_name="scanner")
+        store_mock.assert_called_once()
+        self.assertEqual(store_mock.call_args[0][3], metrics)
+        return metrics
+
+    def test_run_scan_task_normal_exit(self):
+        """Test that a task exiting in time has exit code 0 and is not marked as timed out."""
+        metrics = self.run_task(exiting_worker, [], timeout=10)
+        self.assertFalse(metrics["timed_out"])
+        self.assertEqual(metrics["exit_code"], 0)
+        self.assertLess(metrics["wall_time_seconds"], 10)
+
+    def test_run_scan_task_timeout(self):
+        """Test that a task exceeding the timeout is killed and marked as timed out."""
+        metrics = self.run_task(sleeping_worker, [30], timeout=0.2)
+        self.assertTrue(metrics["timed_out"])
+        self.assertEqual(metrics["exit_code"], EXIT_CODE_TIMEOUT)
+        self.assertLess(metrics["wall_time_seconds"], 10)
+
+    def test_store_task_metrics_of_timed_out_task(self):
+        """Test that a failed report keeps the metrics if the task did not write a report."""
+        metrics = {"timed_out": True, "exit_code": EXIT_CODE_TIMEOUT}
+        model_mock = MagicMock()
+        module_dict = {"model": model_mock,
+                       "model.Interfaces": MagicMock(),
+                       "model.Interfaces.ScanJob": MagicMock(SCAN_STATUS_FAILED="failed")}
+        model_mock.ApkScannerReport.objects.return_value.update.return_value = 0
+        with patch.dict(sys.modules, module_dict):
+            store_task_metrics("app-1", "scanner", None, metrics)
+        report_kwargs = model_mock.ApkScannerReport.call_args[1]
+        self.assertEqual(report_kwargs["scan_status"], "failed")
+        self.assertEqual(report_kwargs["scanner_name"], "scanner")
+        model_mock.ScanTaskMetrics.assert_called_with(**metrics)
+        model_mock.ApkScannerReport.return_value.save.assert_called_once()
+
+        model_mock.reset_mock()
+        model_mock.ApkScannerReport.objects.return_value.update.return_value = 1
+        with patch.dict(sys.modules, module_dict):
+            store_task_metrics("app-1", "scanner", None, metrics)
+        model_mock.ApkScannerReport.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# This file is part of FirmwareDroid - https://github.com/FirmwareDroid/FirmwareDroid/blob/main/LICENSE.md
+# See the file 'LICENSE' for copying permission.
+import os
+import unittest
+from unittest.mock import Mock
+from processing.work_manifest import create_work_manifest, read_work_manifest, remove_work_manifest
+
+
+class TestWorkManifest(unittest.TestCase):
+    """Test the work manifest transport of the standalone python worker."""
+
+    def test_roundtrip_in_chunks(self):
+        """Test that ids are streamed back in order and in chunks."""
+        id_list = [f"{i:024x}" for i in range(7)]
+        manifest_path = create_work_manifest(id_list)
+        try:
+            chunk_list = list(read_work_manifest(manifest_path, chunk_size=3))
+            self.assertEqual([len(chunk) for chunk in chunk_list], [3, 3, 1])
+            self.assertEqual([object_id for chunk in chunk_list for object_id in chunk], id_list)
+        finally:
+            remove_work_manifest(manifest_path)
+        self.assertFalse(os.path.exists(manifest_path))
+
+    def test_documents_are_written_by_id(self):
+        """Test that documents are serialised by their id attribute."""
+        document = Mock()
+        document.id = "5f0c6b7c2a1e4c3b9d8e7f60"
+        manifest_path = create_work_manifest([document])
+        try:
+            self.assertEqual(list(read_work_manifest(manifest_path)), [[document.id]])
+        finally:
+            remove_work_manifest(manifest_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
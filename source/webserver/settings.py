@@ -140,6 +140,14 @@ FIRMWARE_FOLDER_FILE_EXTRACT = ""
 FIRMWARE_FOLDER_CACHE = ""
 LIBS_FOLDER = ""
 
+# Download Config: files in the store are sent by nginx from the internal location (X-Accel-Redirect).
+DOWNLOAD_ACCEL_REDIRECT_ENABLED = os.environ.get("DOWNLOAD_ACCEL_REDIRECT_ENABLED", "false").lower() == "true"
+DOWNLOAD_ACCEL_REDIRECT_ROOT = MAIN_FOLDER
+DOWNLOAD_ACCEL_REDIRECT_LOCATION = "/protected_file_store/"
+
+# Metrics Config: the /metrics endpoint is disabled if no token is set.
+METRICS_AUTH_TOKEN = os.environ.get("METRICS_AUTH_TOKEN", "")
+
 # Database Config
 DB_REPLICA_SET = os.environ['MONGODB_REPLICA_SET']
 DB_HOST = os.environ['MONGODB_HOSTNAME']
@@ -212,7 +220,8 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework.authtoken',
     "file_download",
-    "file_upload"
+    "file_upload",
+    "app_metrics"
 ]
 
 MIDDLEWARE = [
@@ -313,23 +322,24 @@ REDIS_PASSWORD = os.environ['REDIS_PASSWORD']
 REDIS_HOST = "redis"  # "localhost" if DEBUG else "redis"
 
 # RQ Config
+# Every queue class has three lanes: "<class>_interactive", "<class>" (normal) and "<class>_bulk". Workers listen on
+# the lanes in priority order and drain the first non-empty lane. Dedicated bulk workers listen on the bulk lane
+# first, so large jobs make progress while interactive jobs keep arriving.
+RQ_QUEUE_DEFAULTS = {
+    'HOST': REDIS_HOST,
+    'PORT': 6379,
+    'DB': 0,
+    'PASSWORD': REDIS_PASSWORD,
+    'DEFAULT_TIMEOUT': 60 * 60 * 24 * 14,
+    'DEFAULT_RESULT_TTL': 60 * 60 * 24 * 3,
+}
 RQ_QUEUES = {
-    'extractor': {
-        'HOST': REDIS_HOST,
-        'PORT': 6379,
-        'DB': 0,
-        'PASSWORD': REDIS_PASSWORD,
-        'DEFAULT_TIMEOUT': 60 * 60 * 24 * 14,
-        'DEFAULT_RESULT_TTL': 60 * 60 * 24 * 3,
-    },
-    'scanner': {
-        'HOST': REDIS_HOST,
-        'PORT': 6379,
-        'DB': 0,
-        'PASSWORD': REDIS_PASSWORD,
-        'DEFAULT_TIMEOUT': 60 * 60 * 24 * 14,
-        'DEFAULT_RESULT_TTL': 60 * 60 * 24 * 3,
-    }
+    'extractor': dict(RQ_QUEUE_DEFAULTS),
+    'scanner': dict(RQ_QUEUE_DEFAULTS),
+    'extractor_interactive': dict(RQ_QUEUE_DEFAULTS, DEFAULT_TIMEOUT=60 * 60 * 24),
+    'scanner_interactive': dict(RQ_QUEUE_DEFAULTS, DEFAULT_TIMEOUT=60 * 60 * 24),
+    'extractor_bulk': dict(RQ_QUEUE_DEFAULTS),
+    'scanner_bulk': dict(RQ_QUEUE_DEFAULTS),
 }
 
 